@@ -3,15 +3,12 @@ echo ===================================================
 echo SISNAV COSTEIRO - ATUALIZADOR DE DADOS
 echo ===================================================
 echo.
-echo 1. Atualizando Base de Mares (rebuild_csv.py)...
-python rebuild_csv.py
-echo.
-echo 2. Atualizando Base Meteorologica (update_weather_batch.py)...
-python update_weather_batch.py
+echo Atualizando Mares e Meteorologia (ingest.py)...
+python ingest.py
 echo.
 echo ===================================================
 echo ATUALIZACAO CONCLUIDA!
-echo Os arquivos tides_scraped.csv e weather_scraped.csv foram renovados.
+echo Os arquivos tides_scraped.csv, weather_scraped.csv e maritimo_mare_meteo.json foram renovados.
 echo Voce pode fechar esta janela.
 echo ===================================================
 pause
@@ -0,0 +1,311 @@
+"""
+Efemérides Locais do Sol e da Lua
+Nascer e pôr do sol, crepúsculos civil e náutico e fase da lua para qualquer
+posição e período numa chamada vetorizada (NumPy; sem NumPy, laço por
+elemento), sem coleta: posição do Sol pelas fórmulas de baixa precisão de
+Meeus (as do NOAA Solar Calculator, ~1 min nos horários) e longitude da Lua
+pelos termos principais da série de Meeus (fases em ~10 min). Os eventos
+saem do ângulo horário no próprio horário do evento (três iterações a
+partir do meio-dia local).
+Na rota, dá a luz no ETA de cada waypoint e na passagem pelos faróis
+(navegação noturna e faróis do relatório). Substitui, para esses usos, o
+nascer / pôr do sol do TideDataCollector._extract_sun_times (os dois
+primeiros "HH:MM" da linha da tábua).
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import math
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from columnar_store import from_epoch_minutes, to_epoch_minutes
+from route_timeline import RouteTimeline
+from tide_harmonics import UTC_OFFSET_H
+from voyage_metocean import DEFAULT_SPEED_KN
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, laço por elemento
+    np = None
+
+SUNRISE_ALT = -0.833          # refração + semidiâmetro: borda superior no horizonte
+CIVIL_ALT = -6.0
+NAUTICAL_ALT = -12.0
+SYNODIC_DAYS = 29.530588853
+MAX_DAYS = 366
+MAX_CELLS = 500000            # posições x dias por chamada
+
+DAY, CIVIL, NAUTICAL, NIGHT = 'DAY', 'CIVIL', 'NAUTICAL', 'NIGHT'
+
+# (campo, altura do Sol, -1 = manhã / +1 = tarde), do primeiro ao último no dia
+EVENTS = (('nautical_dawn', NAUTICAL_ALT, -1), ('civil_dawn', CIVIL_ALT, -1), ('sunrise', SUNRISE_ALT, -1),
+          ('sunset', SUNRISE_ALT, 1), ('civil_dusk', CIVIL_ALT, 1), ('nautical_dusk', NAUTICAL_ALT, 1))
+
+MOON_PHASES = ('Lua nova', 'Crescente', 'Quarto crescente', 'Crescente gibosa',
+               'Lua cheia', 'Minguante gibosa', 'Quarto minguante', 'Minguante')
+
+RAD = math.pi / 180
+_J2000 = to_epoch_minutes(datetime(2000, 1, 1, 12))      # UT
+_MIN_PER_CENTURY = 36525 * 1440
+_OFFSET_MIN = UTC_OFFSET_H * 60
+
+_PY = SimpleNamespace(sin=math.sin, cos=math.cos, tan=math.tan, asin=math.asin, acos=math.acos,
+                      floor=math.floor, clip=lambda x, lo, hi: min(max(x, lo), hi))
+_NP = SimpleNamespace(sin=np.sin, cos=np.cos, tan=np.tan, asin=np.arcsin, acos=np.arccos,
+                      floor=np.floor, clip=np.clip) if np is not None else None
+
+# Termos principais da longitude da Lua (Meeus, tabela 47.A): (D, M, M', F, 1e-6 grau)
+_MOON_TERMS = (
+    (0, 0, 1, 0, 6288774), (2, 0, -1, 0, 1274027), (2, 0, 0, 0, 658314), (0, 0, 2, 0, 213618),
+    (0, 1, 0, 0, -185116), (0, 0, 0, 2, -114332), (2, 0, -2, 0, 58793), (2, -1, -1, 0, 57066),
+    (2, 0, 1, 0, 53322), (2, -1, 0, 0, 45758), (0, 1, -1, 0, -40923), (1, 0, 0, 0, -34720),
+    (0, 1, 1, 0, -30383), (2, 0, 0, -2, 15327), (0, 0, 1, 2, -12528), (0, 0, 1, -2, 10980),
+    (4, 0, -1, 0, 10675), (0, 0, 3, 0, 10034), (4, 0, -2, 0, 8548), (2, 1, -1, 0, -7888),
+    (2, 1, 0, 0, -6766), (1, 0, -1, 0, -5163), (1, 1, 0, 0, 4987), (2, -1, 1, 0, 4036),
+)
+
+
+def _xp(x):
+    return _NP if np is not None and isinstance(x, np.ndarray) else _PY
+
+
+def _array(values) -> Any:
+    return np.asarray(values, dtype=float) if np is not None else [float(v) for v in values]
+
+
+def _sun(t_utc, xp):
+    """Declinação (rad), equação do tempo (min) e longitude aparente (graus) em minutos UT desde 1970"""
+    t = (t_utc - _J2000) / _MIN_PER_CENTURY
+    l0 = (280.46646 + t * (36000.76983 + 0.0003032 * t)) % 360
+    m = (357.52911 + t * (35999.05029 - 0.0001537 * t)) * RAD
+    e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    c = (xp.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t)) + xp.sin(2 * m) * (0.019993 - 0.000101 * t)
+         + xp.sin(3 * m) * 0.000289)
+    omega = (125.04 - 1934.136 * t) * RAD
+    lam = l0 + c - 0.00569 - 0.00478 * xp.sin(omega)
+    eps = (23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+           + 0.00256 * xp.cos(omega)) * RAD
+    decl = xp.asin(xp.sin(eps) * xp.sin(lam * RAD))
+    y = xp.tan(eps / 2) ** 2
+    l0r = l0 * RAD
+    eot = 4 / RAD * (y * xp.sin(2 * l0r) - 2 * e * xp.sin(m) + 4 * e * y * xp.sin(m) * xp.cos(2 * l0r)
+                     - 0.5 * y * y * xp.sin(4 * l0r) - 1.25 * e * e * xp.sin(2 * m))
+    return decl, eot, lam
+
+
+def _altitude(lat, lon, t_utc, xp):
+    decl, eot, _ = _sun(t_utc, xp)
+    hour_angle = ((t_utc % 1440) + eot + 4 * lon) / 4 - 180
+    phi = lat * RAD
+    s = xp.sin(phi) * xp.sin(decl) + xp.cos(phi) * xp.cos(decl) * xp.cos(hour_angle * RAD)
+    return xp.asin(xp.clip(s, -1.0, 1.0)) / RAD
+
+
+def _event(lat, lon, day, alt, sign, xp):
+    """
+    Horário (minutos locais) em que o Sol passa pela altura alt no dia local
+    `day` (minuto da meia-noite), manhã (sign=-1) ou tarde (+1), e cos do
+    ângulo horário (> 1: não chega a subir até alt; < -1: não desce)
+    """
+    anchor = day - _OFFSET_MIN + 720          # meio-dia local, em UT
+    phi = lat * RAD
+    t = anchor
+    for _ in range(3):
+        decl, eot, _ = _sun(t, xp)
+        noon = anchor - anchor % 1440 + 720 - 4 * lon - eot
+        noon = noon + 1440 * xp.floor((anchor - noon) / 1440 + 0.5)
+        cos_h = (math.sin(alt * RAD) - xp.sin(phi) * xp.sin(decl)) / (xp.cos(phi) * xp.cos(decl))
+        t = noon + sign * 4 * xp.acos(xp.clip(cos_h, -1.0, 1.0)) / RAD
+    return t + _OFFSET_MIN, cos_h
+
+
+def sun_altitude(lats: Sequence[float], lons: Sequence[float], minutes: Sequence[float]) -> List[float]:
+    """Altura do Sol (graus) em cada (lat, lon, minuto local desde 1970)"""
+    if np is not None:
+        lat, lon, t = (np.asarray(v, dtype=float) for v in (lats, lons, minutes))
+        return _altitude(lat, lon, t - _OFFSET_MIN, _NP).tolist()
+    return [_altitude(float(a), float(o), float(m) - _OFFSET_MIN, _PY) for a, o, m in zip(lats, lons, minutes)]
+
+
+def light(altitude: float) -> str:
+    """Condição de luz pela altura do Sol"""
+    if altitude >= SUNRISE_ALT:
+        return DAY
+    if altitude >= CIVIL_ALT:
+        return CIVIL
+    if altitude >= NAUTICAL_ALT:
+        return NAUTICAL
+    return NIGHT
+
+
+def sun_events(lats: Sequence[float], lons: Sequence[float], days: Sequence[int]) -> Dict[str, List[Optional[float]]]:
+    """
+    Eventos do Sol de cada (lat, lon, dia local em minutos da meia-noite),
+    elemento a elemento
+
+    Returns:
+        {campo de EVENTS: [minuto local ou None]} e 'polar': [None | 'DAY' |
+        'NIGHT'] (Sol sem nascer / pôr no dia)
+    """
+    out: Dict[str, List[Optional[float]]] = {}
+    if np is not None:
+        lat, lon, day = (np.asarray(v, dtype=float) for v in (lats, lons, days))
+        for name, alt, sign in EVENTS:
+            t, cos_h = _event(lat, lon, day, alt, sign, _NP)
+            ok = np.abs(cos_h) <= 1
+            out[name] = [v if k else None for v, k in zip(t.tolist(), ok.tolist())]
+            if name == 'sunrise':
+                polar = [None if k else DAY if c < -1 else NIGHT for k, c in zip(ok.tolist(), cos_h.tolist())]
+    else:
+        for name, alt, sign in EVENTS:
+            rows = [_event(float(a), float(o), float(d), alt, sign, _PY) for a, o, d in zip(lats, lons, days)]
+            out[name] = [t if abs(c) <= 1 else None for t, c in rows]
+            if name == 'sunrise':
+                polar = [None if abs(c) <= 1 else DAY if c < -1 else NIGHT for _, c in rows]
+    out['polar'] = polar
+    return out
+
+
+def moon(minutes: Sequence[float]) -> Dict[str, List[Any]]:
+    """
+    Fase da Lua em minutos locais desde 1970
+
+    Returns:
+        'elongation' (graus, 0 = nova, 180 = cheia), 'illumination' (fração
+        iluminada), 'age_days' (desde a lua nova) e 'phase' (nome)
+    """
+    t_utc = _array(minutes)
+    xp = _xp(t_utc)
+    if xp is _PY:
+        rows = [_moon_one(m - _OFFSET_MIN, _PY) for m in t_utc]
+        elong, illum = [r[0] for r in rows], [r[1] for r in rows]
+    else:
+        elong, illum = _moon_one(t_utc - _OFFSET_MIN, _NP)
+        elong, illum = elong.tolist(), illum.tolist()
+    return {
+        'elongation': elong,
+        'illumination': illum,
+        'age_days': [e / 360 * SYNODIC_DAYS for e in elong],
+        'phase': [MOON_PHASES[int((e + 22.5) // 45) % 8] for e in elong],
+    }
+
+
+def _moon_one(t_utc, xp):
+    """Elongação eclíptica Lua - Sol (graus, 0..360) e fração iluminada"""
+    t = (t_utc - _J2000) / _MIN_PER_CENTURY
+    d = (297.8501921 + 445267.1114034 * t) % 360
+    m = (357.5291092 + 35999.0502909 * t) % 360
+    mp = (134.9633964 + 477198.8675055 * t) % 360
+    f = (93.2720950 + 483202.0175233 * t) % 360
+    lp = 218.3164477 + 481267.88123421 * t
+    e = 1 - 0.002516 * t
+    lon = lp
+    for kd, km, kmp, kf, coef in _MOON_TERMS:
+        lon = lon + coef * 1e-6 * e ** abs(km) * xp.sin((kd * d + km * m + kmp * mp + kf * f) * RAD)
+    _, _, sun_lon = _sun(t_utc, xp)
+    sun_true = sun_lon + 0.00478 * xp.sin((125.04 - 1934.136 * t) * RAD)     # sem a nutação, como a Lua
+    elong = (lon - sun_true) % 360
+    # Ângulo de fase (Meeus 48.4) e fração iluminada
+    dr, mr, mpr = d * RAD, m * RAD, mp * RAD
+    i = (180 - d - 6.289 * xp.sin(mpr) + 2.100 * xp.sin(mr) - 1.274 * xp.sin(2 * dr - mpr)
+         - 0.658 * xp.sin(2 * dr) - 0.214 * xp.sin(2 * mpr) - 0.110 * xp.sin(dr))
+    return elong, (1 + xp.cos(i * RAD)) / 2
+
+
+_CLOCK = [f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)]
+
+
+def _hhmm(values: List[Optional[float]]) -> List[Optional[str]]:
+    """Minutos locais desde 1970 -> "HH:MM" (arredondado ao minuto)"""
+    return [None if v is None else _CLOCK[int(math.floor(v + 0.5)) % 1440] for v in values]
+
+
+def almanac(points: Sequence[Dict[str, float]], start: Union[date, datetime], days: int = 1) -> Dict[str, Any]:
+    """
+    Tábua diária de cada posição: eventos do Sol (HH:MM locais), duração do
+    dia e fase da Lua ao meio-dia local; todas as posições x dias numa chamada
+
+    Raises:
+        ValueError: Período ou tamanho fora dos limites
+    """
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days deve estar entre 1 e {MAX_DAYS}")
+    if len(points) * days > MAX_CELLS:
+        raise ValueError(f"no máximo {MAX_CELLS} posições x dias por chamada")
+    first = to_epoch_minutes(date(start.year, start.month, start.day))
+    lats = [float(p['lat']) for p in points for _ in range(days)]
+    lons = [float(p['lon']) for p in points for _ in range(days)]
+    day_m = [first + k * 1440 for _ in points for k in range(days)]
+    events = sun_events(lats, lons, day_m)
+    clocks = {name: _hhmm(events[name]) for name, _, _ in EVENTS}
+    phases = moon([d + 720 for d in day_m[:days]])
+    dates = [from_epoch_minutes(d).date().isoformat() for d in day_m[:days]]
+    positions = []
+    for j, p in enumerate(points):
+        rows = []
+        for k in range(days):
+            i = j * days + k
+            row = {'date': dates[k]}
+            row.update({name: clocks[name][i] for name, _, _ in EVENTS})
+            rise, set_ = events['sunrise'][i], events['sunset'][i]
+            row['day_length_h'] = round((set_ - rise) / 60, 2) if rise is not None and set_ is not None else \
+                (24.0 if events['polar'][i] == DAY else 0.0)
+            row['polar'] = events['polar'][i]
+            row['moon_phase'] = phases['phase'][k]
+            row['moon_illumination'] = round(phases['illumination'][k], 2)
+            rows.append(row)
+        positions.append({'lat': float(p['lat']), 'lon': float(p['lon']), 'days': rows})
+    return {'start': from_epoch_minutes(first).date().isoformat(), 'days': days,
+            'utc_offset_h': UTC_OFFSET_H, 'positions': positions}
+
+
+def _at(lats: List[float], lons: List[float], minutes: List[float]) -> List[Dict[str, Any]]:
+    """Luz, eventos do dia local e Lua em cada (lat, lon, minuto local)"""
+    alt = sun_altitude(lats, lons, minutes)
+    days = [m - m % 1440 for m in minutes]
+    events = sun_events(lats, lons, days)
+    clocks = {name: _hhmm(events[name]) for name, _, _ in EVENTS}
+    phases = moon(minutes)
+    out = []
+    for i in range(len(minutes)):
+        row = {'sun_alt': round(alt[i], 1), 'light': light(alt[i])}
+        row.update({name: clocks[name][i] for name, _, _ in EVENTS})
+        row['moon_phase'] = phases['phase'][i]
+        row['moon_illumination'] = round(phases['illumination'][i], 2)
+        out.append(row)
+    return out
+
+
+def route_almanac(points: Sequence[Dict[str, float]], etd: datetime,
+                  speeds_kn: Union[float, Sequence[float]] = DEFAULT_SPEED_KN,
+                  passages: Sequence[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    """
+    Luz no ETA de cada waypoint (e na passagem pelo través de cada ponto de
+    `passages`, ex: faróis), com os eventos do Sol do dia e a fase da Lua
+
+    Raises:
+        ValueError: Rota curta ou velocidades inválidas
+    """
+    tl = RouteTimeline(points, etd, speeds_kn)
+    start = to_epoch_minutes(etd) + etd.second / 60
+    minutes = [start + h * 60 for h in tl.hours]
+    waypoints = _at(tl.lats, tl.lons, minutes)
+    for i, row in enumerate(waypoints):
+        row.update({'index': i, 'lat': tl.lats[i], 'lon': tl.lons[i],
+                    'eta': (etd + timedelta(hours=tl.hours[i])).isoformat(timespec='minutes')})
+    result = {
+        'etd': etd.isoformat(timespec='minutes'), 'eta': tl.eta.isoformat(timespec='minutes'),
+        'total_nm': round(tl.total_nm, 2), 'utc_offset_h': UTC_OFFSET_H, 'waypoints': waypoints,
+        'light_count': {k: sum(1 for w in waypoints if w['light'] == k) for k in (DAY, CIVIL, NAUTICAL, NIGHT)},
+    }
+    if passages:
+        abeam = tl.passages(passages)
+        lats = [float(p['lat']) for p in passages]
+        lons = [float(p['lon']) for p in passages]
+        rows = _at(lats, lons, [start + a['hours'] * 60 for a in abeam])
+        for a, row in zip(abeam, rows):
+            a.update(row)
+        result['passages'] = abeam
+    return result
@@ -2,64 +2,175 @@
 import os
 import json
 import glob
-from parse_gpx import parse_gpx
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import xml.etree.ElementTree as ET
+from parse_gpx import read_points
+import route_graph
+import route_lod
+from http_cache import atomic_write
 
-def build_index(gpx_dir, output_file):
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Manifesto: arquivo GPX -> hash do conteúdo -> entrada já parseada (com níveis de detalhe)
+MANIFEST_FILE = os.path.join(SCRIPT_DIR, 'data', 'route_index_manifest.json')
+MANIFEST_VERSION = 1
+POOL_MIN_FILES = 4      # abaixo disso, abrir o pool de processos custa mais do que parsear direto
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def index_file(gpx_path):
+    """Parseia um GPX e monta a entrada do índice (roda nos processos do pool)"""
+    # Parser em streaming: só as coordenadas, sem os dicts/textos do parse_gpx
+    try:
+        points = read_points(gpx_path)
+    except ET.ParseError as e:
+        print(f"Error parsing GPX: {e}")
+        return None
+
+    if not len(points):
+        return None
+
+    # Simplifica estrutura para o Index (economizar banda)
+    # Guarda apenas metadados e coordenadas
+    simple_points = [{"lat": lat, "lon": lon} for lat, lon in points.coords()]
+
+    # Metadados úteis para o roteador ("De Onde -> Para Onde")
+    # Heurística: Nome do arquivo é "Origem x Destino.gpx"
+    filename = os.path.basename(gpx_path).replace('.gpx', '').lower()
+    parts = filename.split(' x ')
+
+    meta = {
+        "id": filename,
+        "origin": parts[0].strip() if len(parts) > 0 else "?",
+        "destination": parts[1].strip() if len(parts) > 1 else "?",
+        "points": simple_points
+    }
+    # Já serializado, com grafo e níveis de detalhe: arquivo inalterado não é
+    # reparseado, simplificado nem recodificado
+    lod = {str(level): route_lod.simplify_route(meta, level) for level in route_lod.LOD_TOLERANCES_M}
+    return {
+        "id": filename,
+        "n_points": len(simple_points),
+        "summary": route_graph.summarize(meta),
+        "route_json": json.dumps(meta, ensure_ascii=False),
+        "lod_json": {level: json.dumps(r, ensure_ascii=False) for level, r in lod.items()},
+        "lod_points": {level: len(r['points']) for level, r in lod.items()},
+    }
+
+
+def _json_array(fragments):
+    """Lista JSON a partir de itens já serializados (mesmo texto do json.dump da lista)"""
+    return ('[' + ', '.join(fragments) + ']').encode('utf-8')
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest.get('files', {})
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {}
+
+
+def save_manifest(path, files):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, json.dumps({"version": MANIFEST_VERSION, "files": files}, ensure_ascii=False).encode('utf-8'))
+
+
+def build_index(gpx_dir, output_file, manifest_file=MANIFEST_FILE, workers=None):
+    """
+    Gera known_routes.json, route_graph.json e os níveis de detalhe
+
+    Só os GPX novos ou alterados (hash do conteúdo diferente do manifesto) são
+    parseados; numa reconstrução com vários arquivos, em paralelo num pool de
+    processos. Todos os arquivos são gravados de forma atômica.
+    Retorna {'parsed', 'reused', 'routes'}.
+    """
     print(f"Building Route Index from: {gpx_dir}")
-    
-    all_routes = []
-    
-    # 1. Busca todos os arquivos .gpx
-    gpx_files = glob.glob(os.path.join(gpx_dir, "*.gpx"))
+
+    # 1. Busca todos os arquivos .gpx (ordem estável)
+    gpx_files = sorted(glob.glob(os.path.join(gpx_dir, "*.gpx")))
     print(f"Found {len(gpx_files)} GPX files.")
-    
+
+    previous = load_manifest(manifest_file)
+    files = {}
+    pending = []
     for gpx_path in gpx_files:
-        try:
-            # Reutiliza o parser existente
-            result = parse_gpx(gpx_path)
-            
-            if result and result.get('route'):
-                # Simplifica estrutura para o Index (economizar banda)
-                # Guarda apenas metadados e coordenadas
-                
-                # Extrai pontos
-                simple_points = [
-                    {"lat": pt['lat_dec'], "lon": pt['lon_dec']} 
-                    for pt in result['route']
-                ]
-                
-                # Metadados úteis para o roteador ("De Onde -> Para Onde")
-                # Heurística: Nome do arquivo é "Origem x Destino.gpx"
-                filename = os.path.basename(gpx_path).replace('.gpx', '').lower()
-                parts = filename.split(' x ')
-                
-                meta = {
-                    "id": filename,
-                    "origin": parts[0].strip() if len(parts) > 0 else "?",
-                    "destination": parts[1].strip() if len(parts) > 1 else "?",
-                    "points": simple_points
-                }
-                
-                all_routes.append(meta)
-                print(f"Indexado: {filename} ({len(simple_points)} pts)")
-                
-        except Exception as e:
-            print(f"Falha ao indexar {gpx_path}: {e}")
+        key = os.path.basename(gpx_path)
+        digest = file_hash(gpx_path)
+        cached = previous.get(key)
+        if cached and cached.get('sha256') == digest:
+            files[key] = cached
+        else:
+            pending.append((key, gpx_path, digest))
+
+    if len(pending) >= POOL_MIN_FILES and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(key, digest, pool.submit(index_file, path)) for key, path, digest in pending]
+            results = [(key, digest, f.exception() or f.result()) for key, digest, f in futures]
+    else:
+        results = []
+        for key, path, digest in pending:
+            try:
+                results.append((key, digest, index_file(path)))
+            except Exception as e:
+                results.append((key, digest, e))
+
+    for key, digest, entry in results:
+        if isinstance(entry, Exception):
+            # Falha inesperada: fica fora do manifesto e é tentada de novo na próxima vez
+            print(f"Falha ao indexar {key}: {entry}")
+            continue
+        files[key] = {"sha256": digest, "entry": entry}
+        if entry:
+            print(f"Indexado: {entry['id']} ({entry['n_points']} pts)")
+    print(f"{len(pending)} arquivo(s) parseado(s), {len(gpx_files) - len(pending)} reaproveitado(s) do manifesto.")
+
+    entries = [files[key]['entry'] for key in map(os.path.basename, gpx_files)
+               if key in files and files[key]['entry']]
 
     # 2. Salva JSON
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_routes, f, ensure_ascii=False)
-        
+    atomic_write(output_file, _json_array(e['route_json'] for e in entries))
+
     print(f"Index salvo (JS Compatible): {output_file}")
+
     # Cria wrapper JS para facilitar importação no browser sem fetch (opcional, mas útil localmente)
     # ou salvamos apenas como .json e deixamos o frontend carregar via fetch (se tiver server).
     # Como estamos rodando python -m http.server, fetch funciona.
 
+    # 3. Grafo pré-calculado (portos ajustados, distâncias, ida e volta) para /api/route
+    graph = route_graph.write_graph([], output_file, summaries=[e['summary'] for e in entries])
+    print(f"Grafo salvo: {route_graph.graph_path(output_file)} "
+          f"({len(graph['nodes'])} portos, {len(graph['edges'])} arestas)")
+    for route_id in graph['unsnapped']:
+        print(f"Aviso: extremidades de '{route_id}' não ficam a menos de "
+              f"{route_graph.SNAP_THRESHOLD_NM:.0f} NM de portos distintos (fora do grafo)")
+
+    # 4. Níveis de detalhe (Douglas-Peucker) para desenho no mapa
+    full = sum(e['n_points'] for e in entries)
+    for level in route_lod.LOD_TOLERANCES_M:
+        path = route_lod.level_path(output_file, level)
+        atomic_write(path, _json_array(e['lod_json'][str(level)] for e in entries))
+        count = sum(e['lod_points'][str(level)] for e in entries)
+        print(f"Nível {level} (erro <= {route_lod.LOD_TOLERANCES_M[level]:.0f} m): {count}/{full} pontos -> {path}")
+
+    # 5. Manifesto por último: se algo acima falhar, a próxima execução refaz
+    save_manifest(manifest_file, files)
+    return {'parsed': len(pending), 'reused': len(gpx_files) - len(pending), 'routes': len(entries)}
+
 if __name__ == "__main__":
     BASE_DIR = os.getcwd()
     GPX_DIR = os.path.join(BASE_DIR, 'gpx')
     OUTPUT_FILE = os.path.join(BASE_DIR, 'js', 'data', 'known_routes.json')
-    
+
     build_index(GPX_DIR, OUTPUT_FILE)
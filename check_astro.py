@@ -0,0 +1,275 @@
+"""
+Bancada das efemérides locais (astro.py / /api/astro / /api/voyage/astro)
+
+Confere:
+- declinação do Sol nos equinócios e solstícios e equação do tempo nos
+  extremos do ano contra os valores tabelados
+- nascer / pôr do sol de referência (Londres, solstício de 2024) em MAX_DIFF_MIN
+- ordem dos eventos (náutico < civil < nascer < pôr < civil < náutico), dia
+  de ~12h07 no equador e sol da meia-noite / noite polar em Tromsø
+- luas novas e cheias de 2024-2025 (horários publicados) em MAX_MOON_MIN
+- caminho sem NumPy igual ao vetorizado
+- nascer / pôr do sol coletados e gravados (parsings em data/http_cache e
+  páginas em data/page_archive): mediana da diferença em MAX_MEDIAN_SCRAPED_MIN,
+  listando os valores suspeitos (o _extract_sun_times pega os dois primeiros
+  "HH:MM" da linha da tábua)
+E mede a tábua de um ano para muitas posições numa chamada (limite:
+MAX_US_PER_CELL por posição x dia) e a luz nos waypoints de uma rota longa.
+
+Uso: python check_astro.py
+"""
+
+import glob
+import json
+import math
+import os
+import sys
+import time
+from datetime import date, datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import astro  # noqa: E402
+import http_cache  # noqa: E402
+import page_archive  # noqa: E402
+import route_graph  # noqa: E402
+from columnar_store import to_epoch_minutes  # noqa: E402
+from stations import STATIONS  # noqa: E402
+from voyage_metocean import REFERENCE_STATIONS  # noqa: E402
+
+MAX_DIFF_MIN = 2.0
+MAX_MOON_MIN = 20.0
+MAX_MEDIAN_SCRAPED_MIN = 3.0
+SUSPECT_MIN = 15.0
+MAX_US_PER_CELL = 20.0
+ROUTE_ID = 'rio grande rs x rio de janeiro rj'
+
+# Instantes UT: (declinação esperada, graus)
+SEASONS = [(datetime(2024, 3, 20, 3, 6), 0.0), (datetime(2024, 6, 20, 20, 51), 23.44),
+           (datetime(2024, 12, 21, 9, 20), -23.44), (datetime(2025, 3, 20, 9, 1), 0.0)]
+EQUATION_OF_TIME = [(datetime(2024, 2, 11, 12), -14.2), (datetime(2024, 11, 3, 12), 16.4)]
+# Fases em UT: (instante, elongação)
+MOON_EVENTS = [(datetime(2024, 4, 8, 18, 21), 0), (datetime(2024, 10, 2, 18, 49), 0),
+               (datetime(2025, 3, 29, 10, 58), 0), (datetime(2025, 9, 21, 19, 54), 0),
+               (datetime(2024, 3, 25, 7, 0), 180), (datetime(2024, 9, 18, 2, 34), 180),
+               (datetime(2025, 3, 14, 6, 55), 180), (datetime(2025, 9, 7, 18, 9), 180)]
+LONDON = (51.5074, -0.1278, date(2024, 6, 21), '03:43', '20:21')    # UT
+TROMSO = (69.6492, 18.9553)
+
+
+def local(ut: datetime) -> int:
+    """Minutos locais (UTC_OFFSET_H) de um instante UT"""
+    return to_epoch_minutes(ut) + astro.UTC_OFFSET_H * 60
+
+
+def minutes_of(hhmm: str) -> int:
+    h, m = hhmm.split(':')
+    return int(h) * 60 + int(m)
+
+
+def diff_min(a: str, b: str) -> float:
+    return abs((minutes_of(a) - minutes_of(b) + 720) % 1440 - 720)
+
+
+def check_sun():
+    failures = 0
+    for ut, expected in SEASONS:
+        decl = math.degrees(astro._sun(float(to_epoch_minutes(ut)), astro._PY)[0])
+        if abs(decl - expected) > 0.02:
+            print(f"   -> declinação em {ut:%Y-%m-%d %H:%M} UT: {decl:.3f}° (esperado {expected}°)")
+            failures += 1
+    for ut, expected in EQUATION_OF_TIME:
+        eot = astro._sun(float(to_epoch_minutes(ut)), astro._PY)[1]
+        if abs(eot - expected) > 0.3:
+            print(f"   -> equação do tempo em {ut:%Y-%m-%d}: {eot:.2f} min (esperado {expected})")
+            failures += 1
+
+    lat, lon, day, rise, set_ = LONDON
+    row = astro.almanac([{'lat': lat, 'lon': lon}], day)['positions'][0]['days'][0]
+    shift = -astro.UTC_OFFSET_H * 60
+    got_rise = (minutes_of(row['sunrise']) + shift) % 1440
+    got_set = (minutes_of(row['sunset']) + shift) % 1440
+    worst = max(abs(got_rise - minutes_of(rise)), abs(got_set - minutes_of(set_)))
+    print(f"Londres {day}: nascer / pôr a {worst:.0f} min dos tabelados")
+    if worst > MAX_DIFF_MIN:
+        print(f"   -> Londres: {row['sunrise']} / {row['sunset']} locais (tabelado {rise} / {set_} UT)")
+        failures += 1
+
+    # Ordem dos eventos, um ano em latitudes de -60 a 60
+    lats = [float(lat) for lat in range(-60, 61, 10) for _ in range(365)]
+    first = to_epoch_minutes(datetime(2026, 1, 1))
+    days = [first + 1440 * k for _ in range(13) for k in range(365)]
+    events = astro.sun_events(lats, [-40.0] * len(lats), days)
+    names = [name for name, _, _ in astro.EVENTS]
+    for i in range(len(days)):
+        times = [events[n][i] for n in names]
+        if None not in times and times != sorted(times):
+            print(f"   -> ordem dos eventos em lat {lats[i]}, dia {i % 365}: {times}")
+            failures += 1
+            break
+    equator = [row['day_length_h'] for row in
+               astro.almanac([{'lat': 0.0, 'lon': -40.0}], date(2026, 1, 1), 365)['positions'][0]['days']]
+    if not all(12.05 <= h <= 12.2 for h in equator):
+        print(f"   -> dia no equador entre {min(equator)} e {max(equator)} h")
+        failures += 1
+
+    summer, winter = (astro.almanac([{'lat': TROMSO[0], 'lon': TROMSO[1]}], day)['positions'][0]['days'][0]
+                      for day in (date(2024, 6, 21), date(2024, 12, 21)))
+    if summer['polar'] != astro.DAY or summer['sunrise'] is not None or winter['polar'] != astro.NIGHT \
+            or winter['sunset'] is not None or winter['civil_dawn'] is None:
+        print(f"   -> Tromsø: verão {summer}, inverno {winter}")
+        failures += 1
+    return failures
+
+
+def check_moon():
+    minutes = [local(ut) for ut, _ in MOON_EVENTS]
+    result = astro.moon(minutes)
+    rate = 360 / (astro.SYNODIC_DAYS * 1440)          # graus por minuto
+    worst = 0.0
+    failures = 0
+    for (ut, target), elong, illum, phase in zip(MOON_EVENTS, result['elongation'], result['illumination'],
+                                                   result['phase']):
+        err = abs((elong - target + 180) % 360 - 180) / rate
+        worst = max(worst, err)
+        if err > MAX_MOON_MIN or phase != astro.MOON_PHASES[target // 45] or abs(illum - target / 180) > 0.01:
+            print(f"   -> {phase} em {ut:%Y-%m-%d %H:%M} UT: {err:.0f} min, iluminada {illum:.3f}")
+            failures += 1
+    print(f"{len(MOON_EVENTS)} luas novas / cheias de 2024-2025: pior {worst:.1f} min")
+    return failures
+
+
+def check_plain():
+    """Caminho sem NumPy = vetorizado"""
+    if astro.np is None:
+        return 0
+    lats = [-33.0, -23.0, -3.7, 0.0, 51.5, 69.6]
+    lons = [-52.0, -43.2, -38.5, -30.0, -0.1, 19.0]
+    start = to_epoch_minutes(datetime(2026, 10, 17))
+    days = [start + 1440 * k for k in range(len(lats))]
+    minutes = [d + 617 for d in days]
+    fast = (astro.sun_events(lats, lons, days), astro.moon(minutes), astro.sun_altitude(lats, lons, minutes))
+    saved = astro.np
+    astro.np = None
+    try:
+        plain = (astro.sun_events(lats, lons, days), astro.moon(minutes), astro.sun_altitude(lats, lons, minutes))
+    finally:
+        astro.np = saved
+    worst = 0.0
+    for name in [n for n, _, _ in astro.EVENTS]:
+        for a, b in zip(fast[0][name], plain[0][name]):
+            if (a is None) != (b is None):
+                worst = math.inf
+            elif a is not None:
+                worst = max(worst, abs(a - b))
+    worst = max([worst] + [abs(a - b) for a, b in zip(fast[1]['elongation'], plain[1]['elongation'])]
+                + [abs(a - b) for a, b in zip(fast[2], plain[2])])
+    if worst > 1e-6 or fast[0]['polar'] != plain[0]['polar'] or fast[1]['phase'] != plain[1]['phase']:
+        print(f"   -> caminho sem NumPy difere ({worst:.2e})")
+        return 1
+    return 0
+
+
+def scraped_sun_times():
+    """
+    Nascer / pôr do sol gravados: (estação, data ISO, nascer, pôr), dos parsings
+    memorizados no cache HTTP e das páginas do arquivo (reparseadas)
+    """
+    by_url = {st.url().rstrip('/'): st for st in STATIONS}
+    out = []
+
+    def add(url, infos):
+        st = by_url.get((url or '').rstrip('/'))
+        if st is None:
+            return
+        for info in infos:
+            d, m, y = info['date'].split('/')
+            if ':' in info.get('sunrise', '') and ':' in info.get('sunset', ''):
+                out.append((st.id, f"{y}-{m}-{d}", info['sunrise'], info['sunset']))
+
+    for path in glob.glob(os.path.join(http_cache.CACHE_DIR, '*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for key, memo in (meta.get('parsed') or {}).items():
+            if key.startswith('tide_range:') and isinstance(memo.get('value'), list):
+                add(meta.get('url'), memo['value'])
+
+    if os.path.isdir(page_archive.ARCHIVE_DIR):
+        from scraping_tide import TideDataCollector
+        collector = TideDataCollector()
+        for entry in page_archive.PageArchive(page_archive.ARCHIVE_DIR, page_archive.REPLAY).entries():
+            if entry.get('url', '').rstrip('/') in by_url:
+                start = datetime.fromtimestamp(entry['fetched_at']).replace(hour=0, minute=0, second=0, microsecond=0)
+                infos = collector.parse_tide_page(entry['url'], entry['text'], start, 7)
+                add(entry['url'], [info.to_dict() for info in infos])
+    return sorted(set(out))
+
+
+def check_scraped():
+    coords = {r.id: (r.lat, r.lon) for r in REFERENCE_STATIONS}
+    rows = [r for r in scraped_sun_times() if r[0] in coords]
+    if not rows:
+        print("nenhum nascer / pôr do sol coletado gravado (data/http_cache, data/page_archive): comparação pulada")
+        return 0
+    points = [{'lat': coords[sid][0], 'lon': coords[sid][1]} for sid, _, _, _ in rows]
+    diffs, suspects = [], []
+    for point, (sid, day, rise, set_) in zip(points, rows):
+        row = astro.almanac([point], date.fromisoformat(day))['positions'][0]['days'][0]
+        for label, scraped, ours in (('nascer', rise, row['sunrise']), ('pôr', set_, row['sunset'])):
+            if ours is None:
+                continue
+            d = diff_min(scraped, ours)
+            diffs.append(d)
+            if d > SUSPECT_MIN:
+                suspects.append(f"{sid} {day} {label}: coletado {scraped}, calculado {ours}")
+    diffs.sort()
+    median = diffs[len(diffs) // 2]
+    print(f"{len(rows)} dias coletados gravados: diferença mediana {median:.0f} min, "
+          f"{len(suspects)} valor(es) suspeito(s) (> {SUSPECT_MIN:g} min)")
+    for s in suspects[:10]:
+        print(f"   suspeito: {s}")
+    if median > MAX_MEDIAN_SCRAPED_MIN:
+        print(f"   -> mediana acima de {MAX_MEDIAN_SCRAPED_MIN:g} min")
+        return 1
+    return 0
+
+
+def main():
+    failures = check_sun() + check_moon() + check_plain() + check_scraped()
+
+    points = [{'lat': -33.0 + 0.25 * k, 'lon': -52.0 + 0.15 * k} for k in range(100)]
+    best = math.inf
+    for _ in range(3):
+        t0 = time.perf_counter()
+        astro.almanac(points, date(2026, 1, 1), 365)
+        best = min(best, time.perf_counter() - t0)
+    per = best / (len(points) * 365) * 1e6
+    print(f"tábua de {len(points)} posições x 365 dias numa chamada: {best * 1000:.0f} ms "
+          f"({per:.1f} µs por posição x dia)")
+    if per > MAX_US_PER_CELL:
+        print(f"   -> acima de {MAX_US_PER_CELL} µs")
+        failures += 1
+
+    with open(route_graph.ROUTES_FILE, encoding='utf-8') as f:
+        route = {r['id']: r['points'] for r in json.load(f)}[ROUTE_ID]
+    t0 = time.perf_counter()
+    result = astro.route_almanac(route, datetime(2026, 10, 17, 6, 0), 10.0)
+    elapsed = time.perf_counter() - t0
+    print(f"{ROUTE_ID}, {len(route)} waypoints: luz no ETA em {elapsed * 1000:.0f} ms {result['light_count']}")
+    etas = [datetime.fromisoformat(w['eta']) for w in result['waypoints']]
+    if etas != sorted(etas) or etas[-1] != datetime.fromisoformat(result['eta']):
+        print("   -> ETAs fora de ordem ou diferentes da chegada")
+        failures += 1
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: efemérides dentro dos limites das referências publicadas")
+
+
+if __name__ == "__main__":
+    main()
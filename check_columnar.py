@@ -0,0 +1,176 @@
+"""
+Bancada do store colunar (columnar_store.py) contra o caminho CSV
+
+Gera o store a partir dos CSVs do repositório e de um CSV sintético maior
+(20 estações x 30 dias hora a hora), num diretório temporário, e confere:
+- toda consulta por estação / intervalo devolve as mesmas linhas que o CSV
+- abrir + consultar é pelo menos 10x mais rápido que ler o CSV + consultar
+  (csv.DictReader + strptime, como o inspect_csv.py)
+- a gravação da ingestão (WeatherCSVWriter) com duas estações fora do cadastro
+  intercaladas e 300 direções distintas (dicionário em uint16) gera CSV e cópia
+  colunar com as mesmas linhas
+
+Uso: python check_columnar.py
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import columnar_store  # noqa: E402
+import ingest  # noqa: E402
+from columnar_store import ColumnarStore, SCHEMAS  # noqa: E402
+from stations import STATIONS  # noqa: E402
+
+MIN_SPEEDUP = 10.0
+QUERIES = 200
+
+
+def synthetic_weather_csv(path: str, days: int = 30) -> None:
+    rnd = random.Random(42)
+    start = datetime(2026, 1, 1)
+    dirs = ['N', 'NNE', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'WNW', 'NW']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['station_id', 'station_name', 'date', 'time', 'wind_speed', 'wind_dir',
+                         'wave_height', 'wave_dir', 'temp'])
+        for st in STATIONS:
+            for h in range(days * 24):
+                moment = start + timedelta(hours=h)
+                writer.writerow([st.id, st.name, moment.strftime('%d/%m/%Y'), f"{moment.hour}:00",
+                                 float(rnd.randint(0, 40)), rnd.choice(dirs), round(rnd.uniform(0, 3), 1), '-',
+                                 float(rnd.randint(18, 32))])
+
+
+def csv_query(path: str, station_id: str, start: datetime, end: datetime):
+    """Caminho de hoje: lê e converte o arquivo inteiro, depois filtra"""
+    out = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            moment = datetime.strptime(f"{row['date']} {row['time']}", '%d/%m/%Y %H:%M')
+            if row['station_id'] == station_id and start <= moment < end:
+                out.append((moment, row))
+    out.sort(key=lambda item: item[0])
+    return out
+
+
+def store_query(kind: str, directory: str, station_id: str, start: datetime, end: datetime):
+    with ColumnarStore.open(kind, directory) as store:
+        return store.rows(station_id, start, end)
+
+
+def same_rows(kind: str, from_csv, from_store) -> bool:
+    if len(from_csv) != len(from_store):
+        return False
+    schema = SCHEMAS[kind]
+    for (moment, a), b in zip(from_csv, from_store):
+        if moment != b['ts'] or a['date'] != b['date']:
+            return False
+        if any(abs(float(a[k]) - b[k]) > 1e-4 for k in schema['floats']):
+            return False
+        if any(a[k] != b[k] for k in schema['codes']):
+            return False
+    return True
+
+
+def check(kind: str, csv_path: str, directory: str) -> int:
+    columnar_store.build_from_csv(csv_path, kind, directory)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    moments = sorted(datetime.strptime(f"{r['date']} {r['time']}", '%d/%m/%Y %H:%M') for r in rows)
+    stations = sorted({r['station_id'] for r in rows})
+    rnd = random.Random(7)
+    queries = []
+    for _ in range(QUERIES):
+        start = (moments[0] + (moments[-1] - moments[0]) * rnd.random()).replace(second=0, microsecond=0)
+        queries.append((rnd.choice(stations), start, start + timedelta(hours=rnd.choice([6, 24, 72]))))
+
+    failures = 0
+    for sid, start, end in queries[:40]:
+        if not same_rows(kind, csv_query(csv_path, sid, start, end), store_query(kind, directory, sid, start, end)):
+            print(f"   -> {kind}: {sid} {start:%d/%m %H:%M}..{end:%d/%m %H:%M} difere do CSV")
+            failures += 1
+
+    n_csv = 20
+    t0 = time.perf_counter()
+    for sid, start, end in queries[:n_csv]:
+        csv_query(csv_path, sid, start, end)
+    t_csv = (time.perf_counter() - t0) / n_csv
+    t0 = time.perf_counter()
+    for sid, start, end in queries:
+        store_query(kind, directory, sid, start, end)
+    t_store = (time.perf_counter() - t0) / len(queries)
+    speedup = t_csv / t_store
+    size_csv = os.path.getsize(csv_path)
+    size_store = os.path.getsize(columnar_store.latest_path(kind, directory))
+    print(f"{os.path.basename(csv_path):<24} {len(rows):>7} linhas  {size_csv / 1024:>7.0f} -> {size_store / 1024:>5.0f} KiB  "
+          f"CSV {t_csv * 1000:>7.2f} ms  colunar {t_store * 1000:>6.3f} ms  {speedup:>6.0f}x  "
+          f"{'OK' if not failures else 'DIFERE'}")
+    if speedup < MIN_SPEEDUP:
+        print(f"   -> {kind}: ganho {speedup:.1f}x abaixo de {MIN_SPEEDUP:.0f}x")
+        failures += 1
+    return failures
+
+
+def check_writer(directory: str) -> int:
+    """Estações desconhecidas intercaladas e dicionário acima de 256 valores, pelo writer da ingestão"""
+    start = datetime(2026, 1, 1)
+    rows = []
+    for h in range(300):
+        moment = start + timedelta(hours=h)
+        for sid in ('XX_B', 'XX_A'):    # fora do cadastro: mesma posição em _station_order
+            rows.append({'station_id': sid, 'station_name': sid, 'date': moment.strftime('%d/%m/%Y'),
+                         'time': f"{moment.hour}:00", 'wind_speed': float(h % 40), 'wind_dir': f"D{h}",
+                         'wave_height': 1.0, 'wave_dir': '-', 'temp': 25.0})
+    os.makedirs(directory, exist_ok=True)
+    writer = ingest.WeatherCSVWriter(os.path.join(directory, 'weather_scraped.csv'),
+                                     columnar_dir=os.path.join(directory, 'columnar'))
+    try:
+        writer._save(writer.merge([], rows, today=date(2026, 1, 1)))
+    except ValueError as e:
+        print(f"   -> writer: {e}")
+        return 1
+    failures = 0
+    with ColumnarStore.open('weather', writer.columnar_dir) as store:
+        typecode = store.column('wind_dir').format
+        for sid in ('XX_A', 'XX_B'):
+            got = [(r['ts'], r['wind_dir']) for r in store.rows(sid)]
+            expected = [(start + timedelta(hours=h), f"D{h}") for h in range(300)]
+            if got != expected:
+                print(f"   -> writer: linhas de {sid} na cópia colunar diferem do CSV")
+                failures += 1
+    if typecode != 'H':
+        print(f"   -> writer: dicionário de 300 direções gravado como '{typecode}', esperado 'H'")
+        failures += 1
+    print(f"writer: 2 estações fora do cadastro, 300 direções ({typecode}): {'OK' if not failures else 'DIFERE'}")
+    return failures
+
+
+def main():
+    failures = 0
+    print("(abrir + consultar uma estação/intervalo, por consulta)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind, filename in (('tides', 'tides_scraped.csv'), ('weather', 'weather_scraped.csv')):
+            path = os.path.join(SCRIPT_DIR, filename)
+            if os.path.exists(path):
+                failures += check(kind, path, os.path.join(tmp, 'repo'))
+        synthetic = os.path.join(tmp, 'weather_sintetico.csv')
+        synthetic_weather_csv(synthetic)
+        failures += check('weather', synthetic, os.path.join(tmp, 'sintetico'))
+        failures += check_writer(os.path.join(tmp, 'writer'))
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: store colunar equivalente ao CSV e mais rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Bancada da base SQLite (metocean_db.py) contra o caminho só de arquivos
+
+Sobe o servidor local do check_fetch_engine.py com páginas datadas de hoje e
+roda a ingestão duas vezes em paralelo, em diretórios temporários: uma
+mesclando direto nos arquivos (caminho de hoje) e outra gravando na base e
+exportando os arquivos dela. Confere:
+- tempo e vento hora a hora de vários dias chegam ao maritimo_mare_meteo.json
+  com todas as horas de todos os dias (coleta nova, recoleta e arquivo antigo
+  com todos os dias na mesma data)
+- os três arquivos exportados são idênticos aos mesclados, depois de cada uma
+  de três coletas (parcial, sobreposta com horários alterados, e uma base nova
+  semeada com os arquivos atuais)
+- as listas de cada porto na base (port_series) e no JSON exportado têm tantos
+  itens quanto os parsers extraem das páginas servidas (não só o mesmo que a
+  mescla dos arquivos, que perderia os mesmos itens)
+- as consultas do servidor (maré do dia, vento mais próximo, janela da
+  travessia) batem com o CSV, direto e pelas rotas /api/db/*
+
+Uso: python check_db.py
+"""
+
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from http.server import ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+sys.path.append(os.path.join(SCRIPT_DIR, 'scripts'))
+
+import check_fetch_engine  # noqa: E402
+from check_fetch_engine import StubHandler  # noqa: E402
+from fetch_engine import FetchEngine  # noqa: E402
+import ingest  # noqa: E402
+import metocean_db  # noqa: E402
+from metocean_db import MetoceanDB  # noqa: E402
+from stations import STATIONS  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MONTHS = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
+
+TIDE_PAGE = """<html><body><h1>Marés</h1><table>
+<tr><td>{d0}</td><td class="high">preia-mar 3:14 2,7 m</td><td>baixa-mar 9:20 0,4 m</td><td>65 médio</td></tr>
+<tr><td>{d1}</td><td class="high">preia-mar {t1} 2,6 m</td><td>baixa-mar 10:10 {h1} m</td><td>70 alto</td></tr>
+</table></body></html>"""
+
+MARES_PAGE = """<html><body><div>{day} {mon}</div><div>Marés Altura Coef.</div>
+<div>3:14</div><div>0,7 m</div><div>56</div><div>{t1}</div><div>2,1 m</div><div>57</div>
+<div>15:40</div><div>0,6 m</div><div>57</div><div>21:50</div><div>2,2 m</div><div>58</div></body></html>"""
+
+WIND_PAGE = """<html><body><div class="fecha_grande">{day}{mon}</div>
+<div class="f_text_tiempo"><div>0:00</div><div>WNW</div><div>{kmh} km/h</div><div>1:00</div><div>W</div><div>6 km/h</div>
+<div>6:00</div><div>S</div><div>12 km/h</div></div>
+<div class="fecha_grande">{day2}{mon2}</div>
+<div class="f_text_tiempo"><div>0:00</div><div>SW</div><div>8 km/h</div><div>3:00</div><div>SSW</div><div>10 km/h</div></div>
+</body></html>"""
+
+
+HOURLY_DAYS = 3
+
+
+def hourly_page(kind):
+    """Página de tempo ou vento com HOURLY_DAYS dias de 0:00 a 23:00, sem data por hora"""
+    cells = []
+    for d in range(HOURLY_DAYS):
+        for h in range(24):
+            if kind == 'vento':
+                cells.append(f"<div>{h}:00</div><div>NE</div><div>{d * 24 + h} km/h</div>")
+            else:
+                cells.append(f"<div>{h}:00</div><div>Nublado</div>")
+    return f"<html><body>{''.join(cells)}</body></html>"
+
+
+def check_hourly_merge():
+    """Séries hora a hora de vários dias sobrevivem à mescla do PortJSONWriter"""
+    import scraping_tabuademares
+    failures = 0
+    expected = HOURLY_DAYS * 24
+    station = STATIONS[0]
+    parsed = {'wind_hourly': [asdict(e) for e in scraping_tabuademares.parse_wind_hourly(hourly_page('vento'))],
+              'weather_hourly': [asdict(e) for e in scraping_tabuademares.parse_weather_hourly(hourly_page('tempo'))]}
+    for name, entries in parsed.items():
+        if len(entries) != expected or len({e['date_iso'] for e in entries}) != HOURLY_DAYS:
+            logger.error(f"[hora a hora] {name}: {len(entries)} itens em "
+                         f"{len({e['date_iso'] for e in entries})} dias, esperado {expected} em {HOURLY_DAYS}")
+            failures += 1
+
+    writer = ingest.PortJSONWriter(os.devnull)
+    result = ingest.StationResult(station=station, fetched_at_utc='', **parsed)
+    first = json.loads(writer.render([result])[0])
+    again = json.loads(writer.render([result], first)[0])
+    # Arquivo antigo: todos os dias com a data de hoje; a coleta nova falhou
+    legacy = {'ports': {station.port_key: {name: [{**e, 'date_iso': date.today().isoformat()} for e in entries]
+                                           for name, entries in parsed.items()}}}
+    kept = json.loads(writer.render([ingest.StationResult(station=station, fetched_at_utc='')], legacy)[0])
+    counts = {label: {name: len(out['ports'][station.port_key][name]) for name in parsed}
+              for label, out in (('coleta', first), ('recoleta', again), ('arquivo antigo', kept))}
+    if any(n != expected for c in counts.values() for n in c.values()):
+        logger.error(f"[hora a hora] mescla perdeu horas (esperado {expected}): {counts}")
+        failures += 1
+    logger.info(f"[hora a hora] {HOURLY_DAYS} dias x 24 h antes e depois da mescla: "
+                f"{'OK' if not failures else 'FALHOU'}  {counts}")
+    return failures
+
+
+class Version:
+    """Conteúdo servido: a versão 2 muda um horário e alturas (upsert de verdade)"""
+    n = 1
+
+
+def dated_page(path):
+    """Página servida para o caminho, datada de hoje (vento e tempo com mais de um dia)"""
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+    v2 = Version.n == 2
+    if path.endswith('/previsao/vento'):
+        return WIND_PAGE.format(day=today.day, mon=MONTHS[today.month - 1], kmh=9 if v2 else 4,
+                                day2=tomorrow.day, mon2=MONTHS[tomorrow.month - 1])
+    if path.endswith('/previsao/mares'):
+        return MARES_PAGE.format(day=today.day, mon=MONTHS[today.month - 1], t1='9:34' if v2 else '9:30')
+    if path.endswith('/previsao/tempo'):
+        return hourly_page('tempo')
+    return TIDE_PAGE.format(d0=today.day, d1=tomorrow.day,
+                            t1='4:02' if v2 else '4:00', h1='0,6' if v2 else '0,5')
+
+
+class DatedHandler(StubHandler):
+    def do_GET(self):
+        data = dated_page(self.path).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def ingest_run(out_dir, base, stations, db=None):
+    writers = [cls(os.path.join(out_dir, cls.filename)) for cls in ingest.WRITERS.values()]
+    ingest.run(writers=writers, stations=stations, base_url=base, days=2, db=db,
+               state_file=os.path.join(out_dir, 'ingest_state.json'),
+               engine=FetchEngine(max_workers=8, per_host=8, rate_per_s=1000, burst=1000))
+    files = {}
+    for w in writers:
+        with open(w.path, encoding='utf-8') as f:
+            files[w.filename] = f.read()
+    # Horário da coleta muda de uma execução para a outra
+    files['maritimo_mare_meteo.json'] = re.sub(r'"fetched_at_utc": "[^"]*"', '',
+                                               files['maritimo_mare_meteo.json'])
+    return files
+
+
+def check_raw_counts(label, db, out_dir, stations):
+    """Listas dos portos na base e no JSON exportado com tantos itens quanto os parsers extraem das páginas"""
+    import scraping_tabuademares
+    expected = {
+        'tides_7d': len(scraping_tabuademares.parse_tides_7d(dated_page('/previsao/mares'))),
+        'weather_hourly': len(scraping_tabuademares.parse_weather_hourly(dated_page('/previsao/tempo'))),
+        'wind_hourly': len(scraping_tabuademares.parse_wind_hourly(dated_page('/previsao/vento'))),
+    }
+    with open(os.path.join(out_dir, 'maritimo_mare_meteo.json'), encoding='utf-8') as f:
+        ports = json.load(f)['ports']
+    bad = []
+    for st in stations:
+        in_db = dict(db.conn.execute('SELECT series, COUNT(*) FROM port_series WHERE station_id = ? '
+                                     'GROUP BY series', (st.id,)).fetchall())
+        in_json = {name: len(ports[st.port_key][name]) for name in expected}
+        if {name: in_db.get(name, 0) for name in expected} != expected or in_json != expected:
+            bad.append((st.id, in_db, in_json))
+    logger.info(f"[{label}] itens por porto na base e no JSON == extraídos das páginas {expected}: "
+                f"{'OK' if not bad else bad[:2]}")
+    return 1 if bad else 0
+
+
+def compare(label, plain, from_db):
+    diff = [name for name in plain if plain[name] != from_db.get(name)]
+    rows = {name: text.count('\n') for name, text in from_db.items()}
+    logger.info(f"[{label}] exportado da base == mesclado nos arquivos: {'OK' if not diff else diff}  {rows}")
+    return 1 if diff else 0
+
+
+def check_queries(db, csv_dir):
+    failures = 0
+    with open(os.path.join(csv_dir, 'tides_scraped.csv'), newline='', encoding='utf-8') as f:
+        tides = list(csv.DictReader(f))
+    with open(os.path.join(csv_dir, 'weather_scraped.csv'), newline='', encoding='utf-8') as f:
+        weather = list(csv.DictReader(f))
+    today = date.today()
+    sid = tides[0]['station_id']
+
+    expected = [(r['time'], float(r['height']), r['type']) for r in tides
+                if r['station_id'] == sid and r['date'] == today.strftime('%d/%m/%Y')]
+    got = [(datetime.fromisoformat(e['time']).strftime('%-H:%M'), e['height'], e['type'])
+           for e in db.tide_events_for_day(sid, today)]
+    if got != expected or not got:
+        logger.error(f"[consultas] maré do dia difere do CSV: {got} != {expected}")
+        failures += 1
+
+    samples = [r for r in weather if r['station_id'] == sid]
+    at = datetime.combine(today, datetime.min.time()) + timedelta(hours=4, minutes=10)
+    nearest = db.nearest_weather(sid, at)
+    if not samples or nearest is None or not nearest['time'].endswith('T06:00') or nearest['gap_min'] != 110:
+        logger.error(f"[consultas] vento mais próximo de {at:%H:%M} errado: {nearest}")
+        failures += 1
+    if db.nearest_weather(sid, at + timedelta(days=5)) is not None:
+        logger.error("[consultas] vento mais próximo aceitou amostra distante demais")
+        failures += 1
+
+    start = datetime.combine(today, datetime.min.time())
+    end = start + timedelta(days=1, hours=12)
+    window = db.window([st.id for st in STATIONS[:3]], start, end)
+    for st in STATIONS[:3]:
+        n_tides = sum(1 for r in tides if r['station_id'] == st.id)
+        n_weather = sum(1 for r in weather if r['station_id'] == st.id)
+        if (len(window[st.id]['tides']), len(window[st.id]['weather'])) != (n_tides, n_weather):
+            logger.error(f"[consultas] janela de {st.id} difere do CSV")
+            failures += 1
+
+    # As mesmas consultas pelas rotas do servidor
+    import server
+    metocean_db._shared = db
+    client = server.app.test_client()
+    r = client.get(f"/api/db/tides?station={sid}&date={today.isoformat()}")
+    r_near = client.get(f"/api/db/weather/nearest?station={sid}&at={at.isoformat()}")
+    r_win = client.get(f"/api/db/window?stations={sid}&start={start.isoformat()}&end={end.isoformat()}")
+    r_bad = client.get("/api/db/window?stations=x")
+    if (r.status_code, r_near.status_code, r_win.status_code, r_bad.status_code) != (200, 200, 200, 400) \
+            or len(r.get_json()['events']) != len(expected) \
+            or r_near.get_json()['time'] != nearest['time'] \
+            or r_win.get_json()['stations'][sid] != json.loads(json.dumps(window[sid])):
+        logger.error("[consultas] rotas /api/db/* não batem com as consultas diretas")
+        failures += 1
+    metocean_db._shared = None
+    logger.info(f"[consultas] maré do dia ({len(got)} eventos), vento mais próximo ({nearest and nearest['time']}), "
+                f"janela de 3 estações: {'OK' if not failures else 'FALHOU'}")
+    return failures
+
+
+def main():
+    check_fetch_engine.LATENCY_S = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DatedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/br"
+    failures = check_hourly_merge()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_dir, db_dir, seeded_dir = (os.path.join(tmp, d) for d in ('arquivos', 'base', 'semeada'))
+        for d in (plain_dir, db_dir, seeded_dir):
+            os.makedirs(d)
+        db = MetoceanDB(os.path.join(db_dir, 'sisnav.db'))
+
+        # 1. Coleta parcial numa base vazia
+        failures += compare('coleta 1', ingest_run(plain_dir, base, STATIONS[:12]),
+                            ingest_run(db_dir, base, STATIONS[:12], db))
+        failures += check_raw_counts('coleta 1', db, db_dir, STATIONS[:12])
+
+        # 2. Coleta sobreposta, com um horário e alturas alterados
+        Version.n = 2
+        failures += compare('coleta 2', ingest_run(plain_dir, base, STATIONS[8:]),
+                            ingest_run(db_dir, base, STATIONS[8:], db))
+        failures += check_raw_counts('coleta 2', db, db_dir, STATIONS)
+
+        # 3. Base nova semeada com os arquivos atuais (primeira execução com --db)
+        for name in ('tides_scraped.csv', 'weather_scraped.csv', 'maritimo_mare_meteo.json'):
+            with open(os.path.join(plain_dir, name), 'rb') as src, open(os.path.join(seeded_dir, name), 'wb') as dst:
+                dst.write(src.read())
+        Version.n = 1
+        seeded = MetoceanDB(os.path.join(seeded_dir, 'sisnav.db'))
+        failures += compare('base semeada', ingest_run(plain_dir, base, STATIONS[:4]),
+                            ingest_run(seeded_dir, base, STATIONS[:4], seeded))
+        failures += check_raw_counts('base semeada', seeded, seeded_dir, STATIONS)
+
+        failures += check_queries(db, db_dir)
+        db.close()
+        seeded.close()
+
+    server.shutdown()
+    if failures:
+        logger.error(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    logger.info("OK: todas as verificações passaram")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Bancada das janelas de saída (departure_window.py / /api/voyage/departure-windows)
+
+Com os dados reais (tides_scraped.csv, weather_scraped.csv) confere:
+- maré no destino na chegada e vento / ondas máximos de cada candidato =
+  voyage_timeline rodado para aquele ETD (o caminho ponto a ponto)
+- toda saída dentro de uma janela respeita os limites e toda saída fora não
+- o caminho sem NumPy dá o mesmo resultado
+E mede, com 8 dias sintéticos de maré e tempo em todas as estações, a
+varredura de 7 dias a cada 15 min (limite: MAX_SWEEP_S).
+
+Uso: python check_departure_window.py
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import departure_window  # noqa: E402
+import route_graph  # noqa: E402
+import tide_engine  # noqa: E402
+import voyage_metocean  # noqa: E402
+from departure_window import sweep  # noqa: E402
+from route_lod import cumulative_nm  # noqa: E402
+
+SPEED_KN = 9.0
+LIMITS = {'min_tide_m': 0.5, 'max_wind_kn': 15.0, 'max_wave_m': 1.5}
+MAX_SWEEP_S = 1.0
+DENSE_POINTS = 2000
+
+
+def reference(points, etd, tides, weather):
+    """Caminho ponto a ponto: voyage_timeline para um ETD"""
+    out = voyage_metocean.voyage_timeline(points, etd, SPEED_KN, tides, weather)
+    wps = out['waypoints']
+    winds = [wp['wind_kn'] for wp in wps if wp['wind_kn'] is not None]
+    waves = [wp['wave_height'] for wp in wps if wp['wave_height'] is not None]
+    return wps[-1]['tide_height'], max(winds) if winds else None, max(waves) if waves else None
+
+
+def close(a, b, tol):
+    if a is None or b is None:
+        return a is None and b is None
+    return abs(a - b) <= tol
+
+
+def check_real(label, points, tides, weather):
+    failures = 0
+    start = datetime(2025, 12, 1)
+    result = sweep(points, SPEED_KN, start=start, tides=tides, weather=weather, candidates=True, **LIMITS)
+    cand = result['candidates']
+    n = result['n_candidates']
+    bad = 0
+    for k in range(0, n, 11):
+        etd = datetime.fromisoformat(cand['etd'][k])
+        tide, wind, wave = reference(points, etd, tides, weather)
+        if not (close(cand['arrival_tide_m'][k], tide, 1e-6) and close(cand['max_wind_kn'][k], wind, 0.06) and close(cand['max_wave_m'][k], wave, 1e-6)):
+            if bad < 3:
+                print(f"   -> {label} {cand['etd'][k]}: maré {cand['arrival_tide_m'][k]} x {tide}, "
+                      f"vento {cand['max_wind_kn'][k]} x {wind}, onda {cand['max_wave_m'][k]} x {wave}")
+            bad += 1
+    failures += bool(bad)
+
+    inside = set()
+    for w in result['windows']:
+        k0, k1 = cand['etd'].index(w['start']), cand['etd'].index(w['end'])
+        inside.update(range(k0, k1 + 1))
+    for k in range(n):
+        ok = (cand['arrival_tide_m'][k] is not None and cand['arrival_tide_m'][k] >= LIMITS['min_tide_m']
+              and cand['max_wind_kn'][k] is not None and cand['max_wind_kn'][k] <= LIMITS['max_wind_kn']
+              and cand['max_wave_m'][k] is not None and cand['max_wave_m'][k] <= LIMITS['max_wave_m'])
+        if ok != (k in inside) or ok != cand['feasible'][k]:
+            print(f"   -> {label} {cand['etd'][k]}: viável={ok}, na janela={k in inside}")
+            failures += 1
+            break
+    durations = [w['duration_h'] for w in result['windows']]
+    if durations != sorted(durations, reverse=True):
+        print(f"   -> {label}: janelas fora de ordem")
+        failures += 1
+
+    saved = departure_window.np
+    departure_window.np = None
+    try:
+        plain = sweep(points, SPEED_KN, start=start, tides=tides, weather=weather, candidates=True, **LIMITS)
+    finally:
+        departure_window.np = saved
+    if plain != result:
+        print(f"   -> {label}: caminho sem NumPy difere")
+        failures += 1
+
+    best = result['windows'][0] if result['windows'] else None
+    print(f"{label}: {n} saídas de {result['start']} a {result['end']}, {result['n_feasible']} viáveis, "
+          f"{len(result['windows'])} janela(s)" + (f"; melhor {best['start']} a {best['end']} "
+                                                     f"(sugerida {best['best_etd']})" if best else ""))
+    return failures
+
+
+def synthetic_data(rnd, start, days):
+    names = sorted({st.csv_name for st in voyage_metocean.REFERENCE_STATIONS})
+    tide_rows, weather_rows = [], []
+    for name in names:
+        t, high = start - timedelta(hours=rnd.uniform(0, 6)), rnd.random() < 0.5
+        while t < start + timedelta(days=days + 1):
+            tide_rows.append({'station_id': name, 'station_name': name, 'date': t.strftime('%d/%m/%Y'),
+                              'time': f"{t.hour}:{t.minute:02d}",
+                              'height': f"{rnd.uniform(1.2, 2.0) if high else rnd.uniform(0.0, 0.5):.1f}",
+                              'type': 'preia-mar' if high else 'baixa-mar'})
+            t += timedelta(minutes=372)
+            high = not high
+        for h in range((days + 1) * 24):
+            t = start + timedelta(hours=h)
+            weather_rows.append({'station_name': name, 'date': t.strftime('%d/%m/%Y'), 'time': f"{t.hour}:00",
+                                 'wind_speed': f"{rnd.uniform(5, 45):.1f}", 'wind_dir': 'SE',
+                                 'wave_height': f"{rnd.uniform(0.5, 2.5):.1f}", 'wave_dir': '-', 'temp': '25'})
+    return tide_engine.TideEngine.from_rows(tide_rows), voyage_metocean.WeatherTable(weather_rows)
+
+
+def densify(points, n):
+    along = cumulative_nm(points)
+    step, out, j = along[-1] / (n - 1), [], 0
+    for k in range(n):
+        s = k * step
+        while j < len(points) - 2 and along[j + 1] < s:
+            j += 1
+        f = 0.0 if along[j + 1] == along[j] else min(1.0, (s - along[j]) / (along[j + 1] - along[j]))
+        out.append({'lat': points[j]['lat'] + (points[j + 1]['lat'] - points[j]['lat']) * f,
+                    'lon': points[j]['lon'] + (points[j + 1]['lon'] - points[j]['lon']) * f})
+    return out
+
+
+def main():
+    rnd = random.Random(23)
+    failures = 0
+    with open(route_graph.ROUTES_FILE, encoding='utf-8') as f:
+        routes = {r['id']: r['points'] for r in json.load(f)}
+    tides, weather = tide_engine.TideEngine.from_csv(), voyage_metocean.WeatherTable.load()
+    for route_id in ('rio de janeiro rj x paranagua pr', 'rio grande rs x rio de janeiro rj'):
+        failures += check_real(route_id, routes[route_id], tides, weather)
+
+    start = datetime(2026, 10, 17)
+    tides, weather = synthetic_data(rnd, start, 8)
+    long_route = routes['rio grande rs x rio de janeiro rj']
+    for label, points in (('rio grande rs x rio de janeiro rj', long_route),
+                          (f'mesma rota com {DENSE_POINTS} pontos', densify(long_route, DENSE_POINTS))):
+        t0 = time.perf_counter()
+        result = sweep(points, SPEED_KN, start=start, end=start + timedelta(days=7), step_min=15,
+                       tides=tides, weather=weather, **LIMITS)
+        elapsed = time.perf_counter() - t0
+        print(f"7 dias a cada 15 min, {label}: {result['n_candidates']} saídas x {len(points)} waypoints "
+              f"em {elapsed * 1000:.0f} ms ({len(result['windows'])} janelas)")
+        if elapsed > MAX_SWEEP_S:
+            print(f"   -> acima de {MAX_SWEEP_S} s")
+            failures += 1
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: janelas de saída iguais ao voyage_timeline candidato a candidato")
+
+
+if __name__ == "__main__":
+    main()
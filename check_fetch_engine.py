@@ -0,0 +1,364 @@
+"""
+Bancada de teste do FetchEngine contra um servidor HTTP local (stand-in do tabuademares.com)
+
+Sobe um ThreadingHTTPServer em 127.0.0.1 com latência artificial, roda os três
+coletores (rebuild_csv / update_weather_batch / scraping_tabuademares) através do
+motor e confere:
+- limite de conexões simultâneas por host
+- taxa média respeitada pelo token bucket
+- tempo total bem abaixo da soma serial
+- cache em disco: reexecução dentro do TTL sem rede; fora dele, 304 + parsing memorizado;
+  parsings de dias anteriores não se acumulam nos metadados
+- ingestão única (ingest.py): cada URL baixada uma vez e os três arquivos gerados;
+  modo incremental só recoleta estações vencidas e preserva as que falham
+- arquivo de páginas (page_archive.py): uma coleta com --record e a reconstrução
+  com --replay, sem nenhuma requisição, geram os mesmos arquivos
+
+Uso: python check_fetch_engine.py
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+sys.path.append(os.path.join(SCRIPT_DIR, 'scripts'))
+
+from fetch_engine import FetchEngine  # noqa: E402
+from http_cache import CachedResponse, ResponseCache, extract_section  # noqa: E402
+from page_archive import PageArchive  # noqa: E402
+from scraping_tide import TideDataCollector  # noqa: E402
+from scraping_weather import WeatherCollector  # noqa: E402
+import scraping_tabuademares  # noqa: E402
+import ingest  # noqa: E402
+from stations import STATIONS  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LATENCY_S = 0.25
+N_PORTS = 18
+
+TIDE_PAGE = """<html><body><h1>Marés</h1><table>
+<tr><td>{d0}</td><td class="high">preia-mar 3:14 2,7 m</td><td>baixa-mar 9:20 0,4 m</td><td>65 médio</td></tr>
+<tr><td>{d1}</td><td class="high">preia-mar 4:00 2,6 m</td><td>baixa-mar 10:10 0,5 m</td><td>70 alto</td></tr>
+</table></body></html>"""
+
+MARES_PAGE = """<html><body><div>27 DEZ</div><div>Marés Altura Coef.</div>
+<div>3:14</div><div>0,7 m</div><div>56</div><div>9:30</div><div>2,1 m</div><div>57</div>
+<div>15:40</div><div>0,6 m</div><div>57</div><div>21:50</div><div>2,2 m</div><div>58</div></body></html>"""
+
+WIND_PAGE = """<html><body><div class="fecha_grande">26DEZ</div>
+<div class="f_text_tiempo"><div>0:00</div><div>WNW</div><div>4 km/h</div><div>1:00</div><div>W</div><div>6 km/h</div></div>
+</body></html>"""
+
+TEMPO_PAGE = """<html><body><div>0:00</div><div>Céu limpo</div><div>1:00</div><div>Nublado</div></body></html>"""
+
+
+class StubState:
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    stamps = []
+    fail_prefixes = ()   # caminhos que respondem 500 (simula estação fora do ar)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with StubState.lock:
+            StubState.in_flight += 1
+            StubState.max_in_flight = max(StubState.max_in_flight, StubState.in_flight)
+            StubState.stamps.append(time.monotonic())
+        try:
+            time.sleep(LATENCY_S)
+            if self.path.startswith(StubState.fail_prefixes or ('\0',)):
+                self.send_response(500)
+                self.end_headers()
+                return
+            if self.path.endswith('/previsao/vento'):
+                body = WIND_PAGE
+            elif self.path.endswith('/previsao/mares'):
+                body = MARES_PAGE
+            elif self.path.endswith('/previsao/tempo'):
+                body = TEMPO_PAGE
+            else:
+                today = time.localtime()
+                body = TIDE_PAGE.format(d0=today.tm_mday, d1=today.tm_mday + 1)
+            data = body.encode('utf-8')
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with StubState.lock:
+                StubState.in_flight -= 1
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def reset_stub():
+    with StubState.lock:
+        StubState.in_flight = 0
+        StubState.max_in_flight = 0
+        StubState.stamps = []
+
+
+def check_rate(stamps, rate, burst, label):
+    """Em qualquer janela, o nº de chegadas não pode exceder burst + rate * janela"""
+    stamps = sorted(stamps)
+    worst = 0.0
+    for i in range(len(stamps)):
+        for j in range(i, len(stamps)):
+            window = stamps[j] - stamps[i]
+            allowed = burst + rate * window + 1  # +1: tolerância de relógio
+            worst = max(worst, (j - i + 1) - allowed)
+    ok = worst <= 0
+    logger.info(f"[{label}] taxa: {'OK' if ok else 'EXCEDIDA'} (folga mínima {-worst:.1f} req)")
+    return ok
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    logger.info(f"Stand-in em {base} (latência {LATENCY_S}s)")
+
+    failures = 0
+    per_host, rate, burst = 4, 20.0, 8
+
+    # 1. scraping_tabuademares: 18 portos x 3 páginas
+    reset_stub()
+    engine = FetchEngine(max_workers=8, per_host=per_host, rate_per_s=rate, burst=burst)
+    ports = [(f"Porto {i:02d}", f"{base}/br/estado/porto-{i:02d}") for i in range(N_PORTS)]
+    t0 = time.monotonic()
+    results = engine.run(ports, lambda item: scraping_tabuademares.collect_port(item[1], engine=engine),
+                         key=lambda item: item[0])
+    elapsed = time.monotonic() - t0
+    serial = N_PORTS * 3 * LATENCY_S
+    engine.log_stats()
+    logger.info(f"[tabuademares] {elapsed:.2f}s (serial estimado {serial:.2f}s), "
+                f"pico de conexões {StubState.max_in_flight}/{per_host}")
+    if StubState.max_in_flight > per_host:
+        failures += 1
+    if not check_rate(StubState.stamps, rate, burst, 'tabuademares'):
+        failures += 1
+    if any(r is None or r['errors'] for r in results):
+        logger.error("[tabuademares] portos com erro no stand-in")
+        failures += 1
+
+    # 2. Coletor de marés (1 requisição por estação)
+    reset_stub()
+    engine = FetchEngine(max_workers=8, per_host=per_host, rate_per_s=rate, burst=burst)
+    tide = TideDataCollector(engine=engine)
+    tide.BASE_URL = base
+    results = engine.run(STATIONS,
+                         lambda st: tide.collect_tide_range(st.state, st.city, days=2),
+                         key=lambda st: st.id)
+    n_req = len(StubState.stamps)
+    logger.info(f"[marés] {n_req} requisições para {len(STATIONS)} estações, "
+                f"pico {StubState.max_in_flight}/{per_host}")
+    if n_req != len(STATIONS) or not all(results):
+        failures += 1
+
+    # 3. Coletor de vento
+    reset_stub()
+    engine = FetchEngine(max_workers=8, per_host=per_host, rate_per_s=rate, burst=burst)
+    weather = WeatherCollector(engine=engine)
+    results = engine.run(range(N_PORTS), lambda i: weather.scrape_wind(f"{base}/br/x/p{i}/previsao/vento"),
+                         key=lambda i: f"vento-{i:02d}")
+    logger.info(f"[vento] pico {StubState.max_in_flight}/{per_host}")
+    if StubState.max_in_flight > per_host or not all(results):
+        failures += 1
+
+    # 4. Cache em disco: 1ª rodada baixa, 2ª (no TTL) não toca a rede,
+    #    3ª (TTL vencido) revalida com 304 e reaproveita o parsing
+    parse_calls = []
+    original_parser = scraping_tabuademares.parse_tides_7d
+
+    def counting_parser(html):
+        parse_calls.append(1)
+        return original_parser(html)
+
+    scraping_tabuademares.parse_tides_7d = counting_parser
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def cached_round(ttl_s):
+            reset_stub()
+            parse_calls.clear()
+            engine = FetchEngine(max_workers=8, per_host=per_host, rate_per_s=rate, burst=burst,
+                                 cache=ResponseCache(cache_dir, ttl_s=ttl_s))
+            t0 = time.monotonic()
+            results = engine.run(ports, lambda item: scraping_tabuademares.collect_port(item[1], engine=engine),
+                                 key=lambda item: item[0])
+            hits = sum(t.cache_hits for t in engine.stats.values())
+            revalidated = sum(t.revalidated for t in engine.stats.values())
+            return time.monotonic() - t0, len(StubState.stamps), hits, revalidated, len(parse_calls), results
+
+        cold = cached_round(3600)
+        warm = cached_round(3600)
+        stale = cached_round(0)
+        for label, (elapsed, n_req, hits, reval, parses, _) in (('frio', cold), ('no TTL', warm), ('TTL vencido', stale)):
+            logger.info(f"[cache {label}] {elapsed:.2f}s, {n_req} req, {hits} do disco, {reval} x 304, "
+                        f"{parses} parsings de marés")
+        if warm[1] != 0 or warm[2] != N_PORTS * 3 or warm[4] != 0:
+            logger.error("[cache] rodada dentro do TTL deveria ser 100% disco e sem parsing")
+            failures += 1
+        if stale[3] != N_PORTS * 3 or stale[4] != 0:
+            logger.error("[cache] rodada com TTL vencido deveria revalidar (304) e reaproveitar o parsing")
+            failures += 1
+        def strip_stamp(results):
+            return [{k: v for k, v in r.items() if k != 'fetched_at_utc'} for r in results]
+
+        if strip_stamp(warm[5]) != strip_stamp(cold[5]):
+            logger.error("[cache] resultado do cache difere da coleta original")
+            failures += 1
+
+        # Uma semana de coletas diárias da mesma URL: os parsings de dias
+        # anteriores saem dos metadados em vez de se acumularem
+        cache = ResponseCache(cache_dir)
+        url = f"{ports[0][1]}/previsao/vento"
+        body = WIND_PAGE
+        for k in range(1, 8):
+            day = (date.today() + timedelta(days=k)).isoformat()
+            cache.store(url, CachedResponse(url, body))
+            for stage in ('wind', 'wind_hourly'):
+                cache.memo_parse(url, extract_section(body), f"{stage}:{day}", lambda: [])
+        memos = sorted(cache.lookup(url)['parsed'])
+        logger.info(f"[cache] parsings memorizados após 7 dias: {memos}")
+        if memos != [f"wind:{day}", f"wind_hourly:{day}"]:
+            logger.error("[cache] parsings de dias anteriores continuam nos metadados")
+            failures += 1
+    scraping_tabuademares.parse_tides_7d = original_parser
+
+    # 5. Ingestão única: cada página de cada estação uma vez, três arquivos
+    reset_stub()
+    stub_paths = []
+    original_get = StubHandler.do_GET
+
+    def recording_get(handler):
+        with StubState.lock:
+            stub_paths.append(handler.path)
+        original_get(handler)
+
+    StubHandler.do_GET = recording_get
+    with tempfile.TemporaryDirectory() as out_dir:
+        engine = FetchEngine(max_workers=8, per_host=per_host, rate_per_s=rate, burst=burst)
+        writers = [cls(os.path.join(out_dir, cls.filename)) for cls in ingest.WRITERS.values()]
+        state_file = os.path.join(out_dir, 'ingest_state.json')
+        t0 = time.monotonic()
+        results = ingest.run(writers=writers, engine=engine, base_url=f"{base}/br", days=2,
+                             state_file=state_file)
+        elapsed = time.monotonic() - t0
+        n_pages = len(STATIONS) * len(ingest.PAGES)
+        logger.info(f"[ingestão] {elapsed:.2f}s, {len(stub_paths)} requisições ({n_pages} páginas distintas; "
+                    f"as três coletas separadas faziam {len(STATIONS) * 5})")
+        if len(stub_paths) != n_pages or len(set(stub_paths)) != n_pages:
+            logger.error("[ingestão] alguma página foi baixada mais de uma vez")
+            failures += 1
+        if not all(os.path.exists(w.path) for w in writers) or any(
+                not r.tide_days or not r.wind or not r.tides_7d or not r.wind_hourly for r in results):
+            logger.error("[ingestão] arquivos ou dados faltando")
+            failures += 1
+
+        # 6. Incremental: nada vencido -> nenhuma requisição; uma estação velha e
+        #    outra fora do ar -> só as duas são tentadas e a que falhou mantém as linhas
+        def snapshot():
+            with open(writers[0].path, encoding='utf-8') as f:
+                return f.read()
+
+        def incremental_round():
+            reset_stub()
+            stub_paths.clear()
+            engine = FetchEngine(max_workers=8, per_host=per_host, rate_per_s=rate, burst=burst)
+            ingest.run(writers=writers, engine=engine, base_url=f"{base}/br", days=2,
+                       state_file=state_file, incremental=True, min_horizon_days=0)
+            return list(stub_paths)
+
+        before = snapshot()
+        n_idle = len(incremental_round())
+        stale, down = STATIONS[0], STATIONS[1]
+        state = ingest.load_state(state_file)
+        state[stale.id]['fetched_at'] -= ingest.STATION_TTL_S + 60
+        state[down.id]['fetched_at'] -= ingest.STATION_TTL_S + 60
+        ingest.save_state(state, state_file)
+        StubState.fail_prefixes = (f"/br/{down.state}/{down.city}",)
+        down_prefix = StubState.fail_prefixes[0]
+        paths = incremental_round()
+        StubState.fail_prefixes = ()
+        # A estação fora do ar recebe novas tentativas (resilience.py); a vencida, uma por página
+        n_stale = len([p for p in paths if not p.startswith(down_prefix)])
+        n_down = len(paths) - n_stale
+        after = snapshot()
+        kept = [ln for ln in before.splitlines() if ln.startswith(down.id)]
+        logger.info(f"[incremental] sem vencidas: {n_idle} req; vencida: {n_stale} req; fora do ar: {n_down} req; "
+                    f"{len(kept)} linhas de {down.id} preservadas")
+        if n_idle != 0 or n_stale != len(ingest.PAGES) or not n_down or not kept or \
+                [ln for ln in after.splitlines() if ln.startswith(down.id)] != kept:
+            logger.error("[incremental] coleta incremental / preservação de linhas incorreta")
+            failures += 1
+        if ingest.load_state(state_file)[down.id]['ok']:
+            logger.error("[incremental] estação fora do ar marcada como ok")
+            failures += 1
+
+    # 7. Arquivo de páginas: grava uma coleta e reconstrói a partir dele, offline
+    with tempfile.TemporaryDirectory() as tmp:
+        def dataset_run(name, archive):
+            out_dir = os.path.join(tmp, name)
+            os.makedirs(out_dir)
+            writers = [cls(os.path.join(out_dir, cls.filename)) for cls in ingest.WRITERS.values()]
+            reset_stub()
+            stub_paths.clear()
+            t0 = time.monotonic()
+            ingest.run(writers=writers, base_url=f"{base}/br", days=2, archive=archive,
+                       state_file=os.path.join(out_dir, 'ingest_state.json'),
+                       engine=FetchEngine(max_workers=8, per_host=per_host, rate_per_s=rate, burst=burst))
+            elapsed = time.monotonic() - t0
+            files = {}
+            for w in writers:
+                with open(w.path, encoding='utf-8') as f:
+                    files[w.filename] = f.read()
+            # Horário da coleta: o da gravação é "agora", o do replay é o da captura
+            files['maritimo_mare_meteo.json'] = re.sub(r'"fetched_at_utc": "[^"]*"', '',
+                                                       files['maritimo_mare_meteo.json'])
+            return elapsed, len(stub_paths), files
+
+        archive_dir = os.path.join(tmp, 'page_archive')
+        rec_s, rec_req, recorded = dataset_run('record', PageArchive(archive_dir, mode='record'))
+        rep_s, rep_req, replayed = dataset_run('replay', PageArchive(archive_dir, mode='replay'))
+        n_captures = sum(1 for _ in PageArchive(archive_dir, mode='replay').entries())
+        logger.info(f"[arquivo] gravação: {rec_s:.2f}s, {rec_req} req, {n_captures} páginas arquivadas; "
+                    f"replay: {rep_s:.2f}s, {rep_req} req")
+        if rep_req != 0 or n_captures != len(STATIONS) * len(ingest.PAGES):
+            logger.error("[arquivo] replay tocou a rede ou faltaram páginas no arquivo")
+            failures += 1
+        if replayed != recorded:
+            logger.error(f"[arquivo] reconstrução difere da coleta gravada: "
+                         f"{[k for k in recorded if recorded[k] != replayed.get(k)]}")
+            failures += 1
+    StubHandler.do_GET = original_get
+
+    server.shutdown()
+    if failures:
+        logger.error(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    logger.info("OK: todas as verificações passaram")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Bancada do índice espacial (geo_index.py) contra a varredura linear
+
+Consulta todas as camadas (estações, portos, faróis, abrigos) e uma camada
+sintética de 5000 pontos com os waypoints de todas as rotas do
+js/data/known_routes.json e pontos aleatórios na costa, e confere:
+- k mais próximos (k = 1 e 3) iguais aos da varredura linear com haversine
+- "todos dentro do raio" iguais aos da varredura linear
+- tempo por consulta do índice x varredura linear (como no navegador)
+
+Uso: python check_geo_index.py
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import geo_index  # noqa: E402
+from geo_index import GeoIndex  # noqa: E402
+from voyage_metocean import haversine_nm  # noqa: E402
+
+ROUTES = os.path.join(SCRIPT_DIR, 'js', 'data', 'known_routes.json')
+RADIUS_NM = 30.0
+MIN_SPEEDUP_SYNTHETIC = 10.0
+
+
+def linear_nearest(features, lat, lon, k):
+    dists = sorted((haversine_nm(lat, lon, f['lat'], f['lon']), n) for n, f in enumerate(features))
+    return dists[:k]
+
+
+def linear_within(features, lat, lon, radius):
+    return sorted((d, n) for n, f in enumerate(features) if (d := haversine_nm(lat, lon, f['lat'], f['lon'])) <= radius)
+
+
+def same(found, expected, features):
+    """Mesmos ids e distâncias (tolerância de arredondamento, empates em qualquer ordem)"""
+    if len(found) != len(expected):
+        return False
+    if any(abs(f['distance_nm'] - d) > 1e-3 for f, (d, _) in zip(found, expected)):
+        return False
+    # Empate exato pode sair em ordem diferente: compara o conjunto
+    return {f['id'] for f in found} == {features[n]['id'] for _, n in expected} or \
+        [round(f['distance_nm'], 3) for f in found] == [round(d, 3) for d, _ in expected]
+
+
+def check_layer(index: GeoIndex, queries):
+    failures = 0
+    for lat, lon in queries:
+        for k in (1, 3):
+            if not same(index.nearest(lat, lon, k), linear_nearest(index.features, lat, lon, k), index.features):
+                print(f"   -> {index.name}: {k} mais próximos de ({lat:.3f}, {lon:.3f}) diferem")
+                failures += 1
+        if not same(index.within(lat, lon, RADIUS_NM), linear_within(index.features, lat, lon, RADIUS_NM),
+                    index.features):
+            print(f"   -> {index.name}: raio {RADIUS_NM} NM em ({lat:.3f}, {lon:.3f}) difere")
+            failures += 1
+        if failures > 5:
+            break
+
+    t0 = time.perf_counter()
+    for lat, lon in queries:
+        linear_nearest(index.features, lat, lon, 1)
+    t_linear = (time.perf_counter() - t0) / len(queries)
+    t0 = time.perf_counter()
+    for lat, lon in queries:
+        index.nearest(lat, lon, 1)
+    t_index = (time.perf_counter() - t0) / len(queries)
+    speedup = t_linear / t_index
+    print(f"{index.name:<12} {len(index.features):>5} pontos  {len(queries)} consultas  "
+          f"linear {t_linear * 1e6:>8.1f} µs  índice {t_index * 1e6:>6.1f} µs  {speedup:>5.1f}x  "
+          f"{'OK' if not failures else 'DIFERE'}")
+    return failures, speedup
+
+
+def main():
+    with open(ROUTES, encoding='utf-8') as f:
+        routes = json.load(f)
+    rnd = random.Random(3)
+    queries = [(p['lat'], p['lon']) for r in routes for p in r['points']]
+    queries += [(rnd.uniform(-33, 4), rnd.uniform(-52, -34)) for _ in range(300)]
+
+    failures = 0
+    for layer in geo_index.LAYERS:
+        bad, _ = check_layer(geo_index.get_index(layer), queries)
+        failures += bad
+
+    synthetic = GeoIndex('sintética', [{'id': f"P{n}", 'name': f"P{n}", 'lat': rnd.uniform(-34, 5),
+                                        'lon': rnd.uniform(-53, -32)} for n in range(5000)])
+    bad, speedup = check_layer(synthetic, queries[:400])
+    failures += bad
+    if speedup < MIN_SPEEDUP_SYNTHETIC:
+        print(f"   -> camada sintética: ganho {speedup:.1f}x abaixo de {MIN_SPEEDUP_SYNTHETIC:.0f}x")
+        failures += 1
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: índice espacial igual à varredura linear")
+
+
+if __name__ == "__main__":
+    main()
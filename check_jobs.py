@@ -0,0 +1,136 @@
+"""
+Bancada do executor de jobs (jobs.py) e da API de atualização do server.py
+
+Roda a atualização de verdade (ingest.run) contra o stand-in HTTP do
+check_fetch_engine.py, gravando os arquivos num diretório temporário, e confere:
+- POST /api/update-data responde na hora (202) com o job id
+- pedidos simultâneos são agrupados no mesmo job
+- /api/jobs/<id> mostra progresso estação a estação até 100%
+- cancelamento: estações ainda não iniciadas são puladas e o job termina 'cancelled'
+- atualização completa pedida durante um ciclo incremental do agendador não é
+  engolida por ele: vira job na fila, que roda depois; pedidos cobertos pelo
+  job em andamento (subconjunto) são agrupados, os demais ampliam o da fila
+
+Uso: python check_jobs.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import check_fetch_engine  # noqa: E402
+import ingest  # noqa: E402
+import jobs  # noqa: E402
+import server  # noqa: E402
+from fetch_engine import FetchEngine  # noqa: E402
+from stations import STATIONS  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def wait_finished(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    seen_progress = []
+    while time.monotonic() < deadline:
+        status = client.get(f'/api/jobs/{job_id}').get_json()
+        seen_progress.append(status['progress'])
+        if status['status'] not in jobs.ACTIVE:
+            return status, seen_progress
+        time.sleep(0.1)
+    raise TimeoutError(f"job {job_id} não terminou em {timeout}s")
+
+
+def main():
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), check_fetch_engine.StubHandler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{stub.server_address[1]}/br"
+
+    failures = 0
+    client = server.app.test_client()
+    original_run = ingest.run
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        # A tarefa do job chama ingest.run(); aqui ela aponta para o stand-in e o diretório temporário
+        def stub_run(**kwargs):
+            return original_run(
+                base_url=base, days=2,
+                writers=[cls(os.path.join(out_dir, cls.filename)) for cls in ingest.WRITERS.values()],
+                state_file=os.path.join(out_dir, 'ingest_state.json'),
+                engine=FetchEngine(max_workers=4, per_host=2, rate_per_s=8, burst=2), **kwargs)
+
+        ingest.run = stub_run
+
+        # 1. Resposta imediata + agrupamento
+        t0 = time.monotonic()
+        first = client.post('/api/update-data', json={'mode': 'full'})
+        elapsed = time.monotonic() - t0
+        second = client.post('/api/update-data', json={'mode': 'full'})
+        job_id = first.get_json()['job_id']
+        logger.info(f"[api] POST respondeu {first.status_code} em {elapsed * 1000:.0f} ms; "
+                    f"segundo pedido -> job {second.get_json()['job_id']} ({second.get_json()['requests']} pedidos)")
+        if first.status_code != 202 or elapsed > 1.0 or second.get_json()['job_id'] != job_id:
+            logger.error("[api] pedido bloqueou ou não foi agrupado")
+            failures += 1
+
+        final, progress = wait_finished(client, job_id)
+        per_station = [s['status'] for s in final['stations'].values()]
+        logger.info(f"[job] {final['status']} | progresso visto: {sorted(set(progress))[:6]}...{progress[-1]} | "
+                    f"estações ok {per_station.count('ok')}/{len(STATIONS)}")
+        if final['status'] != jobs.DONE or per_station.count('ok') != len(STATIONS) or len(set(progress)) < 4:
+            logger.error("[job] progresso por estação ausente ou job incompleto")
+            failures += 1
+
+        # 2. Cancelamento logo após o início
+        job_id = client.post('/api/update-data', json={'mode': 'full'}).get_json()['job_id']
+        time.sleep(0.6)
+        client.post(f'/api/jobs/{job_id}/cancel')
+        final, _ = wait_finished(client, job_id)
+        pending = [s for s in final['stations'].values() if s['status'] == 'pendente']
+        logger.info(f"[cancelar] {final['status']}, {len(pending)} estações puladas")
+        if final['status'] != jobs.CANCELLED or not pending:
+            logger.error("[cancelar] job não foi cancelado")
+            failures += 1
+
+        # 3. Job novo depois do cancelado (não fica preso ao anterior)
+        job_id2 = client.post('/api/update-data', json={'mode': 'incremental'}).get_json()['job_id']
+        final, _ = wait_finished(client, job_id2)
+        logger.info(f"[incremental] {final['status']}, {len(final['stations'])} estações recoletadas")
+        if job_id2 == job_id or final['status'] != jobs.DONE:
+            failures += 1
+
+        # 4. Completa durante um ciclo incremental: fila, não agrupamento
+        some = [st.id for st in STATIONS[:3]]
+        cycle = jobs.submit_update('incremental', stations=some, origin='scheduler')
+        subset = jobs.submit_update('incremental', stations=some[:1], origin='scheduler')
+        full = jobs.submit_update('full')
+        other = jobs.submit_update('incremental', stations=[STATIONS[4].id], origin='scheduler')
+        queued = full.status
+        final_cycle, _ = wait_finished(client, cycle.id)
+        final_full, _ = wait_finished(client, full.id)
+        logger.info(f"[fila] ciclo {cycle.id} ({cycle.requests} pedidos) -> {final_cycle['status']}, "
+                    f"{len(final_cycle['stations'])} estações; completa {full.id} ({queued} -> "
+                    f"{final_full['status']}, {len(final_full['stations'])} estações, {full.requests} pedidos)")
+        if subset is not cycle or full is cycle or other is not full or queued != jobs.QUEUED or \
+                final_cycle['status'] != jobs.DONE or final_full['status'] != jobs.DONE or \
+                len(final_full['stations']) != len(STATIONS) or final_full['started_at'] < final_cycle['finished_at']:
+            logger.error("[fila] atualização completa agrupada no ciclo incremental ou fora de ordem")
+            failures += 1
+
+    ingest.run = original_run
+    stub.shutdown()
+    if failures:
+        logger.error(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    logger.info("OK: todas as verificações passaram")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Bancada do núcleo de navegação em Python (navmath.py)
+
+Confere, contra o próprio js/core/NavMath.js rodado no node (pulado se não
+houver node):
+- calc_leg: rumo e distância em pernas aleatórias, E/W, N/S e nulas
+- format_pos e parse_dms: textos idênticos / mesmos valores
+E, sem o JS:
+- leg_table (vetorizado) = calc_leg perna a perna; acumulado e ETA (velocidade
+  constante e por perna) = soma das pernas
+E mede o leg_table numa rota de 10000 pontos (limite: MAX_MS_PER_1000_LEGS).
+
+Uso: python check_navmath.py
+"""
+
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import navmath  # noqa: E402
+from navmath import calc_leg, format_pos, leg_table, parse_dms  # noqa: E402
+
+NAVMATH_JS = os.path.join(SCRIPT_DIR, 'js', 'core', 'NavMath.js')
+TOLERANCE = 1e-9            # graus (rumo) e NM (distância)
+ROUTE_POINTS = 10000
+MAX_MS_PER_1000_LEGS = 0.5
+
+DMS_SAMPLES = ["04°25.86' N", "23° 07.358' S", "043 33.741 W", "12°30'15\" S", "", "abc",
+               "5.5", "  -3 30", "1e2 N", "048°30.000'W", "0° 0.5' s", "22 54.2 s 43"]
+
+NODE_DRIVER = """
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const num = v => (Number.isNaN(v) ? null : v);
+process.stdout.write(JSON.stringify({
+    legs: input.legs.map(l => { const r = NavMath.calcLeg(...l); return [r.crs, r.dist]; }),
+    pos: input.pos.map(p => NavMath.formatPos(p[0], p[1])),
+    dms: input.dms.map(s => num(NavMath.parseDMS(s)))
+}));
+"""
+
+
+def sample_legs(rnd, n):
+    legs = []
+    for _ in range(n):
+        lat1, lon1 = rnd.uniform(-60, 60), rnd.uniform(-60, 0)
+        kind = rnd.random()
+        if kind < 0.1:
+            lat2, lon2 = lat1, lon1 + rnd.uniform(-5, 5)             # E/W
+        elif kind < 0.2:
+            lat2, lon2 = lat1 + rnd.uniform(-5, 5), lon1             # N/S
+        elif kind < 0.25:
+            lat2, lon2 = lat1, lon1                                   # nula
+        else:
+            lat2, lon2 = lat1 + rnd.uniform(-3, 3), lon1 + rnd.uniform(-3, 3)
+        legs.append([lat1, lon1, lat2, lon2])
+    return legs
+
+
+def run_js(payload):
+    with open(NAVMATH_JS, encoding='utf-8') as f:
+        source = f.read().replace('export default NavMath;', '')
+    out = subprocess.run(['node', '-e', source + NODE_DRIVER], input=json.dumps(payload),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def same(a, b):
+    if a is None or b is None or (isinstance(b, float) and math.isnan(b)):
+        return (a is None or math.isnan(a)) and (b is None or math.isnan(b))
+    return abs(a - b) <= TOLERANCE
+
+
+def check_js(rnd):
+    failures = 0
+    legs = sample_legs(rnd, 2000)
+    pos = [[rnd.uniform(-90, 90), rnd.choice(('lat', 'lon'))] for _ in range(2000)]
+    pos += [[v, 'lat'] for v in (0.0, -0.0, 23.5, -23.125, 45.99999999, 1 / 3)]
+    js = run_js({'legs': legs, 'pos': pos, 'dms': DMS_SAMPLES})
+
+    worst_crs = worst_dist = 0.0
+    for leg, (crs, dist) in zip(legs, js['legs']):
+        py = calc_leg(*leg)
+        worst_crs = max(worst_crs, abs(py.crs - crs))
+        worst_dist = max(worst_dist, abs(py.dist - dist))
+    if worst_crs > TOLERANCE or worst_dist > TOLERANCE:
+        print(f"   -> calc_leg difere do JS: rumo {worst_crs:.2e}°, distância {worst_dist:.2e} NM")
+        failures += 1
+    print(f"calc_leg x NavMath.calcLeg ({len(legs)} pernas): diferença máx. rumo {worst_crs:.1e}°, "
+          f"distância {worst_dist:.1e} NM")
+
+    diff = [(p, js_text) for p, js_text in zip(pos, js['pos']) if format_pos(*p) != js_text]
+    for (val, kind), js_text in diff[:5]:
+        print(f"   -> format_pos({val!r}, {kind!r}) = {format_pos(val, kind)!r}, JS {js_text!r}")
+    failures += bool(diff)
+    bad = [(s, js_val) for s, js_val in zip(DMS_SAMPLES, js['dms']) if not same(parse_dms(s), js_val)]
+    for s, js_val in bad:
+        print(f"   -> parse_dms({s!r}) = {parse_dms(s)!r}, JS {js_val!r}")
+    failures += bool(bad)
+    print(f"format_pos: {len(pos) - len(diff)}/{len(pos)} iguais; parse_dms: "
+          f"{len(DMS_SAMPLES) - len(bad)}/{len(DMS_SAMPLES)} iguais")
+    return failures
+
+
+def check_table(rnd):
+    failures = 0
+    lats, lons = [-23.0], [-43.0]
+    for _ in range(ROUTE_POINTS - 1):
+        lats.append(lats[-1] + rnd.uniform(-0.05, 0.05))
+        lons.append(lons[-1] + rnd.choice((0.0, rnd.uniform(-0.05, 0.05))))
+    speeds = [rnd.uniform(6, 14) for _ in range(ROUTE_POINTS - 1)]
+
+    table = leg_table(lats, lons, 12.0)
+    scalar = [calc_leg(lats[i], lons[i], lats[i + 1], lons[i + 1]) for i in range(ROUTE_POINTS - 1)]
+    worst = max(max(abs(a - b.crs), abs(d - b.dist)) for a, d, b in zip(table.crs, table.dist, scalar))
+    along = [0.0]
+    for leg in scalar:
+        along.append(along[-1] + leg.dist)
+    if worst > TOLERANCE or max(abs(a - b) for a, b in zip(table.along, along)) > 1e-6:
+        print(f"   -> leg_table difere do calc_leg ({worst:.2e})")
+        failures += 1
+    if max(abs(e - a / 12.0) for e, a in zip(table.eta_h, table.along)) > 1e-9:
+        print("   -> ETA com velocidade constante difere do acumulado / velocidade")
+        failures += 1
+    eta = leg_table(lats, lons, speeds).eta_h
+    hours = [0.0]
+    for leg, v in zip(scalar, speeds):
+        hours.append(hours[-1] + leg.dist / v)
+    if len(eta) != ROUTE_POINTS or max(abs(a - b) for a, b in zip(eta, hours)) > 1e-6:
+        print("   -> ETA com velocidade por perna difere da soma das pernas")
+        failures += 1
+    for bad_speed in (0.0, speeds[:-1]):
+        try:
+            leg_table(lats, lons, bad_speed)
+            print(f"   -> speed_kn inválida aceita ({len(bad_speed) if isinstance(bad_speed, list) else bad_speed})")
+            failures += 1
+        except ValueError:
+            pass
+    if leg_table([1.0], [2.0], 10.0) != ([], [], [0.0], [0.0]) or leg_table([], []) != ([], [], [], None):
+        print("   -> rota com 0 ou 1 ponto")
+        failures += 1
+
+    def best_ms(fn, repeat=7):
+        best = math.inf
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best * 1000
+
+    per_k = 1000 / (ROUTE_POINTS - 1)
+    t_vec = best_ms(lambda: leg_table(lats, lons, 12.0))
+    t_loop = best_ms(lambda: [calc_leg(lats[i], lons[i], lats[i + 1], lons[i + 1])
+                              for i in range(ROUTE_POINTS - 1)], repeat=3)
+    engine = 'NumPy' if navmath.np is not None else 'Python puro'
+    print(f"leg_table ({engine}), {ROUTE_POINTS} pontos: {t_vec:.2f} ms ({t_vec * per_k:.3f} ms/1000 pernas); "
+          f"calc_leg em laço: {t_loop:.2f} ms ({t_loop / t_vec:.0f}x)")
+    if navmath.np is not None and t_vec * per_k > MAX_MS_PER_1000_LEGS:
+        print(f"   -> acima de {MAX_MS_PER_1000_LEGS} ms por 1000 pernas")
+        failures += 1
+    return failures
+
+
+def main():
+    rnd = random.Random(21)
+    failures = 0
+    if shutil.which('node'):
+        failures += check_js(rnd)
+    else:
+        print("node não encontrado: comparação com o NavMath.js pulada")
+    failures += check_table(rnd)
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print(f"OK: navmath igual ao NavMath.js (tolerância {TOLERANCE:g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Bancada do parser de GPX em streaming (parse_gpx.py)
+
+Confere:
+- parse_gpx (adaptador sobre o read_points) devolve exatamente o mesmo dict
+  do parser antigo (ET.parse da árvore inteira) nos arquivos do gpx/ e em
+  GPX sintéticos (<rte>, <trk> com vários segmentos, <rte> antes e depois
+  do <trk>, sem namespace)
+- decimação: pontos mantidos a pelo menos min_dist_m / min_interval_s uns
+  dos outros e o último ponto de cada segmento preservado
+E mede o pico de memória (tracemalloc) do parser antigo, do parse_gpx, do
+read_points e do iter_points em trilhos de 10000 e 100000 pontos: o
+iter_points deve ficar constante.
+
+Uso: python check_parse_gpx.py
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+from parse_gpx import _flat_m, iter_points, parse_gpx, read_points  # noqa: E402
+
+SIZES = (10000, 100000)
+MAX_STREAM_GROWTH = 1.5     # pico do iter_points com 10x mais pontos: até 1.5x
+
+
+def legacy_parse_gpx(file_path):
+    """parse_gpx antigo: árvore inteira em memória, um dict formatado por ponto"""
+    root = ET.parse(file_path).getroot()
+    ns = {'gpx': 'http://www.topografix.com/GPX/1/1'}
+    if not root.tag.startswith('{http'):
+        ns = {}
+        prefix = ""
+    else:
+        prefix = "gpx:"
+    route_points = []
+    for rte in root.findall(f'.//{prefix}rte', ns):
+        for pt in rte.findall(f'{prefix}rtept', ns):
+            lat = float(pt.get('lat'))
+            lon = float(pt.get('lon'))
+            name_el = pt.find(f'{prefix}name', ns)
+            name = name_el.text if name_el is not None else f"WPT {len(route_points)+1}"
+            route_points.append({
+                "sequence": len(route_points) + 1, "lat_dec": lat, "lon_dec": lon,
+                "lat_raw": f"{abs(lat):.4f} {'N' if lat>=0 else 'S'}",
+                "lon_raw": f"{abs(lon):.4f} {'E' if lon>=0 else 'W'}",
+                "name": name, "chart": ""})
+    if not route_points:
+        for trk in root.findall(f'.//{prefix}trk', ns):
+            for trkseg in trk.findall(f'{prefix}trkseg', ns):
+                for pt in trkseg.findall(f'{prefix}trkpt', ns):
+                    lat = float(pt.get('lat'))
+                    lon = float(pt.get('lon'))
+                    route_points.append({
+                        "sequence": len(route_points) + 1, "lat_dec": lat, "lon_dec": lon,
+                        "lat_raw": f"{lat:.4f}", "lon_raw": f"{lon:.4f}",
+                        "name": f"TRK {len(route_points)+1}", "chart": ""})
+    return {"source_type": "GPX", "metadata": {"filename": os.path.basename(file_path)},
+            "route": route_points}
+
+
+def track_xml(rnd, n, segments=1, t0=1716671226):
+    lat, lon, t = rnd.uniform(-30, -3), rnd.uniform(-50, -35), t0
+    segs = []
+    for _ in range(segments):
+        rows = []
+        for _ in range(n // segments):
+            lat += rnd.uniform(-0.0002, 0.0004)
+            lon += rnd.uniform(-0.0002, 0.0004)
+            t += rnd.choice((1, 1, 2, 5))
+            rows.append(f'<trkpt lat="{lat:.6f}" lon="{lon:.6f}"><ele>0.0</ele>'
+                        f'<time>{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))}</time></trkpt>')
+        segs.append(f'<trkseg>{"".join(rows)}</trkseg>')
+    return f'<trk><name>trilho</name>{"".join(segs)}</trk>'
+
+
+def rte_xml(rnd, n):
+    rows = [f'<rtept lat="{rnd.uniform(-30, 5):.6f}" lon="{rnd.uniform(-50, -30):.6f}">'
+            + (f'<name>WP{i:03d}</name>' if i % 3 else '') + '</rtept>' for i in range(n)]
+    return f'<rte><name>rota</name><time>1716671226</time>{"".join(rows)}</rte>'
+
+
+def write_gpx(path, body, ns=True):
+    xmlns = ' xmlns="http://www.topografix.com/GPX/1/1"' if ns else ''
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8" ?><gpx{xmlns} version="1.1" creator="bancada">'
+                f'<metadata><name>x</name></metadata><wpt lat="-23" lon="-43"><name>w</name></wpt>{body}</gpx>')
+
+
+def peak_kib(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024, elapsed
+
+
+def drain(path):
+    for _ in iter_points(path):
+        pass
+
+
+def check_decimation(path, min_dist_m, min_interval_s, segment):
+    """Espaçamento dos pontos mantidos e último ponto de cada segmento preservado"""
+    failures = 0
+    full = list(iter_points(path))
+    kept = list(iter_points(path, min_dist_m, min_interval_s))
+    ends = {full[i] for i in range(segment - 1, len(full), segment)}
+    for a, b in zip(kept, kept[1:]):
+        if b in ends or a in ends:
+            continue
+        if _flat_m(a.lat, a.lon, b.lat, b.lon) < min_dist_m or b.time - a.time < min_interval_s:
+            print(f"   -> decimação ({min_dist_m} m, {min_interval_s} s): pontos próximos demais mantidos")
+            failures += 1
+            break
+    if kept[0] != full[0] or not ends <= set(kept):
+        print(f"   -> decimação ({min_dist_m} m, {min_interval_s} s): extremidades dos segmentos não preservadas")
+        failures += 1
+    print(f"decimação {min_dist_m:.0f} m / {min_interval_s:.0f} s: {len(kept)}/{len(full)} pontos")
+    return failures
+
+
+def main():
+    rnd = random.Random(3)
+    failures = 0
+    gpx_dir = os.path.join(SCRIPT_DIR, 'gpx')
+    names = sorted(n for n in os.listdir(gpx_dir) if n.endswith('.gpx'))
+    for name in names:
+        path = os.path.join(gpx_dir, name)
+        if parse_gpx(path) != legacy_parse_gpx(path):
+            print(f"   -> {name}: parse_gpx difere do parser antigo")
+            failures += 1
+    print(f"{len(names)} arquivos do gpx/ iguais ao parser antigo")
+
+    tmp = tempfile.mkdtemp(prefix='sisnav_gpx_')
+    try:
+        cases = {
+            'rte': (rte_xml(rnd, 300), True),
+            'trk (3 segmentos)': (track_xml(rnd, 3000, segments=3), True),
+            'rte depois do trk': (track_xml(rnd, 500) + rte_xml(rnd, 40), True),
+            'rte antes do trk': (rte_xml(rnd, 40) + track_xml(rnd, 500), True),
+            'sem namespace': (rte_xml(rnd, 50) + track_xml(rnd, 200), False),
+        }
+        for label, (body, ns) in cases.items():
+            path = os.path.join(tmp, 'caso.gpx')
+            write_gpx(path, body, ns)
+            if parse_gpx(path) != legacy_parse_gpx(path):
+                print(f"   -> {label}: parse_gpx difere do parser antigo")
+                failures += 1
+        print(f"{len(cases)} GPX sintéticos iguais ao parser antigo")
+
+        path = os.path.join(tmp, 'decimacao.gpx')
+        write_gpx(path, track_xml(rnd, 5000, segments=2))
+        failures += check_decimation(path, 50.0, 0.0, 2500)
+        failures += check_decimation(path, 0.0, 30.0, 2500)
+        failures += check_decimation(path, 50.0, 30.0, 2500)
+
+        stream_peaks = []
+        for n in SIZES:
+            path = os.path.join(tmp, f'trilho_{n}.gpx')
+            write_gpx(path, track_xml(rnd, n))
+            size = os.path.getsize(path) / 1024 / 1024
+            print(f"trilho de {n} pontos ({size:.1f} MiB): pico de memória / tempo")
+            for label, fn in (('parser antigo', legacy_parse_gpx), ('parse_gpx', parse_gpx),
+                              ('read_points', read_points), ('iter_points', drain)):
+                peak, elapsed = peak_kib(fn, path)
+                print(f"  {label:<14} {peak:>9.0f} KiB  {elapsed:.2f} s")
+                if fn is drain:
+                    stream_peaks.append(peak)
+        if stream_peaks[-1] > stream_peaks[0] * MAX_STREAM_GROWTH:
+            print(f"   -> pico do iter_points cresceu com o arquivo ({stream_peaks[0]:.0f} -> "
+                  f"{stream_peaks[-1]:.0f} KiB)")
+            failures += 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: parser em streaming igual ao antigo, memória constante")
+
+
+if __name__ == "__main__":
+    main()
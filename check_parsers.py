@@ -0,0 +1,215 @@
+"""
+Equivalência e desempenho dos backends de extração HTML ('fast' x 'bs4')
+
+Roda todos os parsers (parse_tides_7d, parse_wind_hourly, parse_weather_hourly,
+WeatherCollector.parse_wind e a tabela do TideDataCollector) com os dois backends
+sobre páginas gravadas e exige resultados idênticos. Depois mede tempo e pico de
+memória (tracemalloc) de cada backend.
+
+Fontes de páginas, nesta ordem:
+- páginas reais versionadas em fixtures/pages/ (<estação>_<página>_<AAAA-MM-DD>.html.gz,
+  uma de cada página de ingest.PAGES: tábua, marés, tempo e vento), gravadas
+  com `python check_parsers.py --record [BR_RIO ...]` (do site) ou
+  `--record --from-archive` (das capturas de `python ingest.py --record`);
+  falta de qualquer uma delas reprova a bancada
+- arquivos passados na linha de comando (.html ou .html.gz)
+- páginas gravadas pelo cache HTTP dos coletores (data/http_cache/*.html.gz)
+  e a captura mais recente de cada URL do arquivo de páginas (data/page_archive/,
+  gerado com `python ingest.py --record`)
+- página sintética no formato do site (sempre incluída, para o benchmark)
+
+Uso: python check_parsers.py [pagina.html ...]
+     python check_parsers.py --record [ID da estação ...]   (precisa de acesso ao site)
+     python check_parsers.py --record --from-archive [ID da estação ...]   (data/page_archive/)
+"""
+
+import glob
+import gzip
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+sys.path.append(os.path.join(SCRIPT_DIR, 'scripts'))
+
+from http_cache import CACHE_DIR, atomic_write  # noqa: E402
+from ingest import PAGES  # noqa: E402
+from page_archive import ARCHIVE_DIR, PageArchive  # noqa: E402
+from scraping_tide import TideDataCollector  # noqa: E402
+from scraping_weather import WeatherCollector  # noqa: E402
+import scraping_tabuademares  # noqa: E402
+from resilience import resilient_get  # noqa: E402
+from stations import get_station  # noqa: E402
+
+BENCH_REPEAT = 5
+FIXTURES_DIR = os.path.join(SCRIPT_DIR, 'fixtures', 'pages')
+FIXTURE_STATIONS = ['BR_RIO']
+
+
+def synthetic_port_page(days: int = 7) -> str:
+    """Página no formato do tabuademares (cabeçalhos de data, blocos horários, tabela, ruído)"""
+    months = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
+    today = datetime.now()
+    parts = ['<!DOCTYPE html><html><head><title>Marés</title><style>.a{color:red}</style>',
+             '<script>window.ads = "3:14 0,7 m 56";</script></head><body>',
+             '<nav>' + ''.join(f'<a href="/br/p{i}">Porto {i}</a>' for i in range(400)) + '</nav>',
+             '<h1>Tábua de marés de Porto Sintético</h1><table class="tabla_mareas">']
+    for d in range(days):
+        day = (today.day + d - 1) % 28 + 1
+        parts.append(f'<tr><td class="dia">{day}</td>'
+                     f'<td class="high"><span>preia-mar</span> 3:{d:02d} 2,{d} m</td>'
+                     f'<td>baixa-mar 9:{d:02d} 0,{d} m</td><td>6{d} médio</td><td>5:3{d} 17:4{d}</td></tr>')
+    parts.append('</table>')
+    for d in range(days):
+        day = (today.day + d - 1) % 28 + 1
+        mon = months[today.month - 1]
+        parts.append(f'<div class="fecha_grande">{day}{mon}<span>Sexta-feira</span></div>')
+        parts.append(f'<div>{day} {mon}</div><div>Marés Altura Coef.</div>')
+        for h in range(0, 24, 6):
+            parts.append(f'<div>{h}:{d}5</div><div>{h % 3},{d} m</div><div>5{d}</div>')
+        parts.append('<div class="f_text_tiempo">')
+        for h in range(24):
+            parts.append(f'<div class="hora"><div>{h}:00</div><div>WNW</div><div>{(h * 7 + d) % 30} km/h</div>'
+                         f'<img src="/i/{h}.png"><div>Céu limpo</div><!-- hora {h} --></div>')
+        parts.append('</div><div class="f_text_temperatura">')
+        parts.append(''.join(f'<div>{20 + h % 8}°</div>' for h in range(24)))
+        parts.append('</div>')
+    parts.append('<footer>' + '<p>Texto de rodapé &amp; avisos legais.</p>' * 200 + '</footer></body></html>')
+    return ''.join(parts)
+
+
+def record_fixtures(station_ids, archive: PageArchive = None):
+    """
+    Grava as páginas de ingest.PAGES de cada estação em fixtures/pages/
+
+    Sem archive baixa do site; com archive (modo replay) usa a captura
+    arquivada de cada URL, datada pelo horário da captura.
+    """
+    import requests
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for sid in station_ids:
+        station = get_station(sid)
+        if station is None:
+            raise SystemExit(f"estação desconhecida: {sid}")
+        for page, path in PAGES.items():
+            if archive is not None:
+                response = archive.respond(station.url(path))
+                day = datetime.fromtimestamp(response.fetched_at).strftime('%Y-%m-%d')
+            else:
+                response = resilient_get(requests, station.url(path), headers=scraping_tabuademares.HEADERS)
+                day = datetime.now().strftime('%Y-%m-%d')
+            response.raise_for_status()
+            target = os.path.join(FIXTURES_DIR, f"{sid}_{page}_{day}.html.gz")
+            atomic_write(target, gzip.compress(response.text.encode('utf-8'), compresslevel=9))
+            print(f"{target}: {len(response.text) / 1024:.0f} KiB")
+
+
+def fixture_date(name: str):
+    """Data de gravação do nome <estação>_<página>_<AAAA-MM-DD>.html.gz (None se não seguir o padrão)"""
+    try:
+        return datetime.strptime(name[:-len('.html.gz')].rsplit('_', 1)[1], '%Y-%m-%d')
+    except (IndexError, ValueError):
+        return None
+
+
+def missing_fixtures():
+    """Páginas de ingest.PAGES sem nenhuma gravação real em fixtures/pages/"""
+    names = [os.path.basename(p) for p in glob.glob(os.path.join(FIXTURES_DIR, '*.html.gz'))]
+    return [page for page in PAGES if not any(f"_{page}_" in n for n in names)]
+
+
+def load_pages(paths):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html.gz'))):
+        with gzip.open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read().decode('utf-8', 'replace')))
+    archived = not paths
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(CACHE_DIR, '*.html.gz')))
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read().decode('utf-8', 'replace')))
+    if archived and os.path.isdir(ARCHIVE_DIR):
+        for entry in PageArchive(ARCHIVE_DIR, mode='replay').entries():
+            pages.append((entry['url'].split('://', 1)[-1], entry['text']))
+    pages.append(('sintetica', synthetic_port_page()))
+    return pages
+
+
+def run_all(html: str, backend: str, when: datetime = None):
+    """Saída de todos os parsers para uma página (comparável com ==); when = dia da gravação"""
+    dates = [(when or datetime.now()).replace(day=1)]
+    dates += [datetime(dates[0].year, dates[0].month, d) for d in range(2, 29)]
+    tide = TideDataCollector(parser_backend=backend)
+    wind = WeatherCollector(parser_backend=backend)
+    return {
+        'tides_7d': scraping_tabuademares.parse_tides_7d(html, backend),
+        'wind_hourly': scraping_tabuademares.parse_wind_hourly(html, backend),
+        'weather_hourly': scraping_tabuademares.parse_weather_hourly(html, backend),
+        'scrape_wind': wind.parse_wind(html),
+        'tide_table': tide._extract_tide_range(html, dates),
+    }
+
+
+def measure(html: str, backend: str, when: datetime = None):
+    t0 = time.perf_counter()
+    for _ in range(BENCH_REPEAT):
+        run_all(html, backend, when)
+    elapsed = (time.perf_counter() - t0) / BENCH_REPEAT
+
+    tracemalloc.start()
+    run_all(html, backend, when)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    import logging
+    logging.disable(logging.WARNING)       # avisos de "data não encontrada" não interessam aqui
+    devnull = open(os.devnull, 'w')
+
+    if sys.argv[1:2] == ['--record']:
+        args = sys.argv[2:]
+        archive = PageArchive(ARCHIVE_DIR, mode='replay') if '--from-archive' in args else None
+        record_fixtures([a for a in args if a != '--from-archive'] or FIXTURE_STATIONS, archive)
+        return
+    pages = load_pages(sys.argv[1:])
+    failures = 0
+    # Sem as páginas reais a equivalência só valeria para a sintética
+    missing = missing_fixtures()
+    if missing:
+        print(f"   -> sem página real gravada de {', '.join(missing)} em fixtures/pages "
+              f"(python check_parsers.py --record [--from-archive])")
+        failures += 1
+    print(f"{'página':<48} {'KiB':>6}  {'equiv.':<7} {'fast ms':>8} {'bs4 ms':>8} {'x':>5} "
+          f"{'fast KiB':>9} {'bs4 KiB':>9}")
+    for name, html in pages:
+        stdout, sys.stdout = sys.stdout, devnull   # WeatherCollector imprime diagnósticos
+        try:
+            when = fixture_date(name) if name.endswith('.html.gz') else None
+            fast, ref = run_all(html, 'fast', when), run_all(html, 'bs4', when)
+            t_fast, m_fast = measure(html, 'fast', when)
+            t_ref, m_ref = measure(html, 'bs4', when)
+        finally:
+            sys.stdout = stdout
+        diffs = [k for k in ref if fast[k] != ref[k]]
+        failures += bool(diffs)
+        status = 'OK' if not diffs else 'DIFERE'
+        print(f"{name[:48]:<48} {len(html) / 1024:>6.0f}  {status:<7} {t_fast * 1000:>8.1f} {t_ref * 1000:>8.1f} "
+              f"{t_ref / t_fast:>5.1f} {m_fast / 1024:>9.0f} {m_ref / 1024:>9.0f}")
+        for k in diffs:
+            print(f"   -> {k}: fast={str(fast[k])[:120]} | bs4={str(ref[k])[:120]}")
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões) (páginas reais ausentes ou backends diferentes)")
+        sys.exit(1)
+    print("OK: backends equivalentes em todas as páginas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Bancada de resiliência (resilience.py) contra um stand-in HTTP com falhas injetadas
+
+Cada caminho do servidor local segue um roteiro de respostas ('503', '429',
+'reset' = conexão derrubada sem resposta, 'stall' = servidor mudo além do
+timeout, 'ok'); sem roteiro, responde a página de vento. Confere:
+- falhas temporárias (5xx, 429, conexão derrubada) são superadas pelas novas
+  tentativas, com e sem FetchEngine, nos três coletores
+- servidor mudo: a requisição desiste dentro de RetryPolicy.worst_case_s
+- host fora do ar: o disjuntor abre e as estações seguintes falham na hora;
+  depois do resfriamento uma tentativa de teste fecha o disjuntor
+- tentativa de teste que falha com outra RequestException (corpo cortado,
+  redirecionamentos demais) ou erro do chamador não prende o disjuntor em
+  meio-aberto; corpo cortado (ChunkedEncodingError) vale nova tentativa
+
+Uso: python check_resilience.py
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+sys.path.append(os.path.join(SCRIPT_DIR, 'scripts'))
+
+import check_fetch_engine  # noqa: E402
+import resilience  # noqa: E402
+import scraping_tabuademares  # noqa: E402
+from fetch_engine import FetchEngine  # noqa: E402
+from resilience import BreakerRegistry, CircuitBreaker, CircuitOpenError, RetryPolicy  # noqa: E402
+from scraping_tide import TideDataCollector  # noqa: E402
+from scraping_weather import WeatherCollector  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STALL_S = 3.0
+
+
+class FaultHandler(BaseHTTPRequestHandler):
+    # Definidos por servidor (subclasse criada em start_server)
+    plans = None        # caminho -> lista de faltas, consumidas uma por requisição
+    down = None         # threading.Event: host inteiro respondendo 500
+    hits = None         # caminho -> nº de requisições recebidas
+    lock = None
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+            plan = self.plans.get(self.path)
+            fault = plan.pop(0) if plan else 'ok'
+        if self.down.is_set():
+            fault = '500'
+        if fault == 'reset':
+            self.close_connection = True
+            self.connection.close()
+            return
+        if fault == 'stall':
+            time.sleep(STALL_S)
+        elif fault != 'ok':
+            self.send_response(int(fault))
+            if fault == '429':
+                self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path.endswith('/previsao/vento'):
+            body = check_fetch_engine.WIND_PAGE
+        else:
+            today = time.localtime()
+            body = check_fetch_engine.TIDE_PAGE.format(d0=today.tm_mday, d1=today.tm_mday + 1)
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # cliente já desistiu (timeout de leitura)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_server():
+    handler = type('Handler', (FaultHandler,), {
+        'plans': {}, 'down': threading.Event(), 'hits': {}, 'lock': threading.Lock()})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def check_half_open_errors(policy):
+    """Meio-aberto: qualquer erro da tentativa de teste libera o disjuntor"""
+    failures = 0
+    url = 'http://host.invalido/br/x'
+    errors = [requests.exceptions.ChunkedEncodingError('corpo cortado'),
+              requests.TooManyRedirects('redirecionamentos demais'), ValueError('erro do chamador')]
+    for error in errors:
+        now = [0.0]
+        breakers = BreakerRegistry(threshold=1, cooldown_s=1.0)
+        breaker = breakers.get('host.invalido')
+        breaker._clock = lambda: now[0]
+        breaker.record_failure()            # aberto
+        now[0] = 2.0                        # resfriado: meio-aberto
+
+        def fail(timeout, error=error):
+            raise error
+        try:
+            resilience.send_with_retries(url, fail, policy=policy, breakers=breakers)
+        except Exception:
+            pass
+        now[0] = 4.0
+        ok = requests.Response()
+        ok.status_code = 200
+        try:
+            response = resilience.send_with_retries(url, lambda t: ok, policy=policy, breakers=breakers)
+            state = breaker.state if response is ok else 'sem resposta'
+        except CircuitOpenError:
+            state = breaker.state
+        logger.info(f"[meio-aberto] teste com {type(error).__name__} -> depois {state}")
+        if state != CircuitBreaker.CLOSED:
+            failures += 1
+
+    # Corpo cortado é repetido como as falhas de conexão
+    calls = []
+
+    def chunked_once(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise requests.exceptions.ChunkedEncodingError('corpo cortado')
+        response = requests.Response()
+        response.status_code = 200
+        return response
+    response = resilience.send_with_retries(url, chunked_once, policy=policy, breakers=BreakerRegistry())
+    if response.status_code != 200 or len(calls) != 2:
+        logger.error(f"[meio-aberto] ChunkedEncodingError não foi repetido ({len(calls)} tentativas)")
+        failures += 1
+    return failures
+
+
+def main():
+    failures = 0
+    # Esperas curtas para a bancada: mesmo algoritmo, escala menor
+    fast = RetryPolicy(attempts=3, base_s=0.05, cap_s=0.2, connect_timeout_s=1.0, read_timeout_s=0.5)
+    resilience.DEFAULT_POLICY = fast     # coletores sem motor
+
+    # 1. Falhas temporárias superadas pelas novas tentativas
+    server, handler, base = start_server()
+    handler.plans.update({
+        '/br/sc/itajai/previsao/vento': ['503', 'reset'],
+        '/br/rj/rio/previsao/vento': ['429'],
+        '/br/sp/santos': ['reset', '502'],
+        '/br/pe/suape': ['503'],
+        '/br/ce/fortaleza/previsao/vento': ['reset'],
+    })
+    engine = FetchEngine(max_workers=4, per_host=2, rate_per_s=50, burst=10, retry=fast)
+    weather = WeatherCollector(engine=engine)
+    wind = engine.run(['sc/itajai', 'rj/rio'], lambda p: weather.scrape_wind(f"{base}/br/{p}/previsao/vento"),
+                      key=str)
+    retries = sum(t.retries for t in engine.stats.values())
+    tide = TideDataCollector()      # sem motor: resilient_get com disjuntores padrão
+    tide.BASE_URL = base
+    tides = tide.collect_tide_range('sp', 'santos', days=2)
+    html = scraping_tabuademares._get(f"{base}/br/pe/suape")
+    wind_plain = WeatherCollector().scrape_wind(f"{base}/br/ce/fortaleza/previsao/vento")
+    logger.info(f"[transitórias] vento via motor: {[len(w) for w in wind]} ({retries} novas tentativas); "
+                f"marés sem motor: {len(tides)} dias; tabuademares: {len(html)} bytes; "
+                f"vento sem motor: {len(wind_plain)} pontos; requisições {dict(sorted(handler.hits.items()))}")
+    if not all(wind) or retries != 3 or len(tides) != 2 or not html or not wind_plain or \
+            handler.hits.get('/br/sp/santos') != 3:
+        logger.error("[transitórias] falha temporária não foi superada")
+        failures += 1
+
+    # 2. Servidor mudo: desiste dentro do pior caso calculado (e não em attempts x STALL_S)
+    handler.plans['/br/x/mudo/previsao/vento'] = ['stall'] * fast.attempts
+    engine = FetchEngine(max_workers=1, per_host=1, rate_per_s=50, burst=10, retry=fast)
+    t0 = time.monotonic()
+    try:
+        engine.get(f"{base}/br/x/mudo/previsao/vento")
+        outcome = 'respondeu'
+    except Exception as e:
+        outcome = type(e).__name__
+    elapsed = time.monotonic() - t0
+    bound = fast.worst_case_s()
+    logger.info(f"[mudo] {outcome} em {elapsed:.2f}s (limite {bound:.2f}s; sem timeout seriam "
+                f"{fast.attempts * STALL_S:.0f}s+)")
+    if outcome != 'ReadTimeout' or elapsed > bound + 0.3:
+        failures += 1
+    server.shutdown()
+
+    # 3. Host fora do ar: disjuntor abre e as demais estações falham na hora
+    server, handler, base = start_server()
+    handler.down.set()
+    breakers = BreakerRegistry(threshold=4, cooldown_s=1.0)
+    engine = FetchEngine(max_workers=4, per_host=2, rate_per_s=50, burst=10, retry=fast, breakers=breakers)
+    weather = WeatherCollector(engine=engine)
+    paths = [f"{base}/br/x/p{i:02d}/previsao/vento" for i in range(20)]
+    t0 = time.monotonic()
+    results = engine.run(paths, weather.scrape_wind, key=str)
+    elapsed = time.monotonic() - t0
+    sent = sum(handler.hits.values())
+    fast_fail = [t for t in engine.stats.values() if t.requests == 0]
+    state = breakers.states()
+    logger.info(f"[fora do ar] {len(paths)} estações em {elapsed:.2f}s, {sent} requisições enviadas, "
+                f"{len(fast_fail)} falharam sem tocar a rede; disjuntor {state}")
+    if any(results) or sent > 2 * breakers.threshold or len(fast_fail) < len(paths) - 4 or \
+            list(state.values()) != [CircuitBreaker.OPEN]:
+        failures += 1
+    try:
+        engine.get(paths[0])
+        rejected = False
+    except CircuitOpenError:
+        rejected = True
+
+    #    ...volta ao ar: após o resfriamento, uma tentativa de teste fecha o disjuntor
+    handler.down.clear()
+    time.sleep(breakers.cooldown_s + 0.1)
+    half_open = list(breakers.states().values())
+    recovered = weather.scrape_wind(paths[0])
+    logger.info(f"[recuperação] rejeitada enquanto aberto: {rejected}; após resfriamento {half_open} -> "
+                f"{list(breakers.states().values())}, {len(recovered)} pontos")
+    if not rejected or half_open != [CircuitBreaker.HALF_OPEN] or not recovered or \
+            list(breakers.states().values()) != [CircuitBreaker.CLOSED]:
+        failures += 1
+    server.shutdown()
+
+    failures += check_half_open_errors(fast)
+
+    if failures:
+        logger.error(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    logger.info("OK: todas as verificações passaram")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Bancada do corredor da rota (route_corridor.py / /api/route/corridor)
+
+Para todas as rotas do js/data/known_routes.json confere:
+- o resultado com pré-filtro por grade é igual ao da força bruta
+  (todas as pernas x todas as features)
+- todo farol a menos da largura de algum waypoint (o critério do
+  App.getNearestLighthouse) está no corredor
+- as features saem em ordem de distância percorrida
+E mede grade x força bruta numa camada sintética de 20000 pontos na costa,
+com rotas de 1x, 2x e 4x o comprimento (custo deve crescer ~linear).
+
+Uso: python check_route_corridor.py
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import route_corridor  # noqa: E402
+from route_corridor import FeatureGrid, corridor  # noqa: E402
+from voyage_metocean import haversine_nm  # noqa: E402
+
+ROUTES = os.path.join(SCRIPT_DIR, 'js', 'data', 'known_routes.json')
+MIN_SPEEDUP_SYNTHETIC = 10.0
+
+
+class BruteGrid(FeatureGrid):
+    """Sem pré-filtro: toda perna testa todas as features"""
+
+    def leg_candidates(self, lat1, lon1, lat2, lon2, width_nm):
+        return list(range(len(self.features)))
+
+
+def keys(result):
+    return [(m['layer'], m['id'], m['leg'], m['distance_nm'], m['along_nm'], m['side']) for m in result['matches']]
+
+
+def main():
+    with open(ROUTES, encoding='utf-8') as f:
+        routes = json.load(f)
+    grids = {layer: route_corridor.get_grid(layer) for layer in route_corridor.LAYERS}
+    brute = {layer: BruteGrid(g.features) for layer, g in grids.items()}
+
+    failures = 0
+    total = 0
+    for route in routes:
+        points = route['points']
+        fast = corridor(points, grids=grids)
+        slow = corridor(points, grids=brute)
+        total += len(fast['matches'])
+        if keys(fast) != keys(slow):
+            print(f"   -> {route['id']}: grade difere da força bruta")
+            failures += 1
+        along = [m['along_nm'] for m in fast['matches']]
+        if along != sorted(along):
+            print(f"   -> {route['id']}: fora de ordem ao longo da derrota")
+            failures += 1
+        found = {m['id'] for m in fast['matches']}
+        width = fast['widths_nm']['lighthouses']
+        for lh in grids['lighthouses'].features:
+            near = min(haversine_nm(p['lat'], p['lon'], lh['lat'], lh['lon']) for p in points)
+            if near <= width * 0.98 and lh['id'] not in found:
+                print(f"   -> {route['id']}: {lh['name']} a {near:.1f} NM de um waypoint ficou fora do corredor")
+                failures += 1
+    print(f"{len(routes)} rotas, {total} auxílios no corredor: "
+          f"{'grade igual à força bruta' if not failures else 'DIFERE'}")
+
+    # Escala: camada sintética densa ao longo da costa
+    rnd = random.Random(7)
+    coast = [(p['lat'], p['lon']) for r in routes for p in r['points']]
+    synthetic = [{'id': f"P{n}", 'name': f"P{n}", 'lat': lat + rnd.uniform(-0.6, 0.6), 'lon': lon + rnd.uniform(-0.6, 0.6)}
+                 for n, (lat, lon) in enumerate(rnd.choice(coast) for _ in range(20000))]
+    fast_grid = {'sintética': FeatureGrid(synthetic)}
+    slow_grid = {'sintética': BruteGrid(synthetic)}
+    largest = max(routes, key=lambda r: len(r['points']))['points']
+    timings = []
+    for mult in (1, 2, 4):
+        points = (largest + largest[::-1]) * (mult // 2) if mult > 1 else largest
+        t0 = time.perf_counter()
+        fast = corridor(points, layers=['sintética'], width_nm=10, grids=fast_grid)
+        t_fast = time.perf_counter() - t0
+        timings.append(t_fast)
+        line = f"sintética 20000 pontos, rota {len(points) - 1} pernas: grade {t_fast * 1000:.1f} ms"
+        if mult == 1:
+            t0 = time.perf_counter()
+            slow = corridor(points, layers=['sintética'], width_nm=10, grids=slow_grid)
+            t_slow = time.perf_counter() - t0
+            line += f", força bruta {t_slow * 1000:.0f} ms ({t_slow / t_fast:.0f}x)"
+            if keys(fast) != keys(slow):
+                print("   -> camada sintética: grade difere da força bruta")
+                failures += 1
+            if t_slow / t_fast < MIN_SPEEDUP_SYNTHETIC:
+                print(f"   -> ganho abaixo de {MIN_SPEEDUP_SYNTHETIC:.0f}x")
+                failures += 1
+        print(line)
+    print(f"custo relativo 1x/2x/4x: {', '.join(f'{t / timings[0]:.1f}' for t in timings)}")
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: corredor da rota igual à força bruta")
+
+
+if __name__ == "__main__":
+    main()
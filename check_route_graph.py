@@ -0,0 +1,140 @@
+"""
+Bancada do grafo de rotas (route_graph.py / /api/route)
+
+Com o known_routes.json e os portos do PortDatabase.js, para todos os pares
+de portos confere:
+- o grafo gravado é igual ao montado agora (ajuste das extremidades, distâncias)
+- há caminho exatamente quando o BFS do App.autoFindRoute encontra um
+- o caminho do Dijkstra é o de menor distância entre todos os caminhos simples
+- os pontos costurados são as rotas dos trechos na ordem (invertidas quando reverse)
+E mede o custo por clique: grafo montado no navegador + BFS (como era) x
+consulta em cache.
+
+Uso: python check_route_graph.py
+"""
+
+import json
+import os
+import sys
+import time
+from collections import deque
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import geo_index  # noqa: E402
+import route_graph  # noqa: E402
+from route_graph import RouteGraph, build_graph  # noqa: E402
+from navmath import rhumb_legs  # noqa: E402
+
+
+def frontend_bfs(routes, ports, dep, arr):
+    """App.autoFindRoute antigo: ajusta as extremidades a cada clique e roda BFS (menos trechos)"""
+    def closest(lat, lon):
+        best, best_d = None, 9999
+        for p in ports:
+            d = rhumb_legs([lat, p['lat']], [lon, p['lon']])[0]
+            if d < best_d:
+                best_d, best = d, p['id']
+        return best if best_d < route_graph.SNAP_THRESHOLD_NM else None
+
+    graph = {}
+    for r in routes:
+        a = closest(r['points'][0]['lat'], r['points'][0]['lon'])
+        b = closest(r['points'][-1]['lat'], r['points'][-1]['lon'])
+        if a and b and a != b:
+            graph.setdefault(a, []).append(b)
+            graph.setdefault(b, []).append(a)
+    queue, seen = deque([[dep]]), set()
+    while queue:
+        path = queue.popleft()
+        if path[-1] == arr:
+            return path
+        if path[-1] in seen:
+            continue
+        seen.add(path[-1])
+        queue.extend(path + [n] for n in graph.get(path[-1], ()) if n not in seen)
+    return None
+
+
+def simple_paths(graph: RouteGraph, dep, arr, visited=None):
+    """Todos os caminhos simples (listas de arestas) de dep até arr"""
+    visited = (visited or set()) | {dep}
+    for edge in graph.adjacency.get(dep, ()):
+        if edge['to'] == arr:
+            yield [edge]
+        elif edge['to'] not in visited:
+            for rest in simple_paths(graph, edge['to'], arr, visited):
+                yield [edge] + rest
+
+
+def main():
+    with open(route_graph.ROUTES_FILE, encoding='utf-8') as f:
+        routes = json.load(f)
+    with open(route_graph.GRAPH_FILE, encoding='utf-8') as f:
+        stored = json.load(f)
+    ports = geo_index.load_ports()
+    failures = 0
+
+    fresh = build_graph(routes, ports)
+    if (fresh['nodes'], fresh['edges']) != (stored['nodes'], stored['edges']):
+        print("   -> route_graph.json desatualizado (rodar build_route_index.py)")
+        failures += 1
+
+    graph = RouteGraph(stored, routes)
+    ids = [p['id'] for p in ports]
+    found = 0
+    for dep in ids:
+        for arr in ids:
+            if dep == arr:
+                continue
+            result = graph.route(dep, arr)
+            expected = frontend_bfs(routes, ports, dep, arr)
+            if (result is None) != (expected is None):
+                print(f"   -> {dep} -> {arr}: grafo {'sem' if result is None else 'com'} caminho, BFS "
+                      f"{'sem' if expected is None else 'com'}")
+                failures += 1
+            if result is None:
+                continue
+            found += 1
+            best = min(sum(e['dist_nm'] for e in p) for p in simple_paths(graph, dep, arr))
+            if abs(result['dist_nm'] - best) > 0.01:
+                print(f"   -> {dep} -> {arr}: {result['dist_nm']} NM, menor caminho simples {best:.2f} NM")
+                failures += 1
+            points = []
+            for seg in result['segments']:
+                pts = graph.routes[seg['route_id']]
+                points += pts[::-1] if seg['reverse'] else pts
+            if [(p['lat'], p['lon']) for p in result['points']] != [(p['lat'], p['lon']) for p in points]:
+                print(f"   -> {dep} -> {arr}: pontos costurados diferem dos trechos")
+                failures += 1
+    print(f"{len(ids)} portos, {len(stored['edges'])} arestas, {found} pares com rota: "
+          f"{'OK' if not failures else 'DIFERE'}")
+
+    pairs = [(a, b) for a in ids for b in ids if a != b]
+    t0 = time.perf_counter()
+    for dep, arr in pairs:
+        frontend_bfs(routes, ports, dep, arr)
+    t_front = (time.perf_counter() - t0) / len(pairs)
+    cached = RouteGraph(stored, routes)
+    for dep, arr in pairs:
+        cached.route(dep, arr)
+    t0 = time.perf_counter()
+    for dep, arr in pairs:
+        cached.route(dep, arr)
+    t_cached = (time.perf_counter() - t0) / len(pairs)
+    t0 = time.perf_counter()
+    for dep, arr in pairs:
+        RouteGraph(stored, routes).shortest_path(dep, arr)
+    t_dijkstra = (time.perf_counter() - t0) / len(pairs)
+    print(f"por clique: grafo + BFS {t_front * 1000:.2f} ms, Dijkstra (com carga) {t_dijkstra * 1000:.3f} ms, "
+          f"cache {t_cached * 1e6:.1f} µs")
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: menor caminho pelo grafo pré-calculado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Bancada do índice de rotas incremental (build_route_index.py)
+
+Numa pasta temporária com os GPX do gpx/ e mais trilhos sintéticos, confere:
+- reconstrução a frio em paralelo = sequencial = parse de todos os arquivos
+  (o comportamento antigo), com os níveis de detalhe do route_lod
+- upload de um arquivo novo, alteração e remoção: só o arquivo mexido é
+  parseado e o índice fica igual ao de uma reconstrução completa
+- manifesto corrompido cai numa reconstrução completa
+- um leitor lendo o known_routes.json em laço durante as gravações nunca vê
+  JSON pela metade
+E mede a latência do upload (incremental) contra a reconstrução a frio.
+
+Uso: python check_route_index.py
+"""
+
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import build_route_index  # noqa: E402
+import route_lod  # noqa: E402
+from build_route_index import build_index  # noqa: E402
+from parse_gpx import parse_gpx  # noqa: E402
+
+SYNTHETIC_FILES = 24
+SYNTHETIC_POINTS = 3000
+
+
+def write_track(path, rnd, n):
+    lat, lon = rnd.uniform(-30, -3), rnd.uniform(-50, -35)
+    rows = []
+    for _ in range(n):
+        lat += rnd.uniform(-0.002, 0.004)
+        lon += rnd.uniform(-0.002, 0.004)
+        rows.append(f'<trkpt lat="{lat:.6f}" lon="{lon:.6f}"></trkpt>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0"?><gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+                f'<trk><trkseg>{"".join(rows)}</trkseg></trk></gpx>')
+
+
+def legacy_routes(gpx_dir):
+    """build_index antigo: parse de todos os arquivos"""
+    out = {}
+    for name in os.listdir(gpx_dir):
+        if name.endswith('.gpx'):
+            result = parse_gpx(os.path.join(gpx_dir, name))
+            if result and result.get('route'):
+                out[name.replace('.gpx', '').lower()] = [{"lat": p['lat_dec'], "lon": p['lon_dec']}
+                                                         for p in result['route']]
+    return out
+
+
+def index_routes(output):
+    with open(output, encoding='utf-8') as f:
+        return {r['id']: r['points'] for r in json.load(f)}
+
+
+def quiet_build(*args, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return build_index(*args, **kwargs)
+
+
+def main():
+    rnd = random.Random(5)
+    failures = 0
+    tmp = tempfile.mkdtemp(prefix='sisnav_routes_')
+    try:
+        gpx_dir = os.path.join(tmp, 'gpx')
+        shutil.copytree(os.path.join(SCRIPT_DIR, 'gpx'), gpx_dir)
+        for n in range(SYNTHETIC_FILES):
+            write_track(os.path.join(gpx_dir, f"trilho {n:02d} x destino {n:02d}.gpx"), rnd, SYNTHETIC_POINTS)
+        output = os.path.join(tmp, 'data', 'known_routes.json')
+        manifest = os.path.join(tmp, 'data', 'manifest.json')
+        total = len([n for n in os.listdir(gpx_dir) if n.endswith('.gpx')])
+
+        # Reconstrução a frio: sequencial x pool
+        t0 = time.perf_counter()
+        quiet_build(gpx_dir, output, manifest_file=os.path.join(tmp, 'seq.json'), workers=1)
+        t_seq = time.perf_counter() - t0
+        sequential = open(output, 'rb').read()
+        t0 = time.perf_counter()
+        stats = quiet_build(gpx_dir, output, manifest_file=manifest)
+        t_cold = time.perf_counter() - t0
+        if open(output, 'rb').read() != sequential:
+            print("   -> pool e sequencial geraram índices diferentes")
+            failures += 1
+        if stats['parsed'] != total or index_routes(output) != legacy_routes(gpx_dir):
+            print(f"   -> reconstrução a frio difere do parse completo ({stats})")
+            failures += 1
+        with open(output, encoding='utf-8') as f:
+            routes = json.load(f)
+        for level in route_lod.LOD_TOLERANCES_M:
+            with open(route_lod.level_path(output, level), encoding='utf-8') as f:
+                if json.load(f) != route_lod.build_level(routes, level):
+                    print(f"   -> nível {level} difere do route_lod.build_level")
+                    failures += 1
+        print(f"a frio, {total} arquivos: sequencial {t_seq:.2f} s, pool {t_cold:.2f} s "
+              f"({os.cpu_count()} CPUs)")
+
+        # Sem mudanças: nada parseado
+        stats = quiet_build(gpx_dir, output, manifest_file=manifest)
+        if stats['parsed'] != 0:
+            print(f"   -> sem mudanças, {stats['parsed']} arquivo(s) parseado(s)")
+            failures += 1
+
+        # Upload de um arquivo novo (o caso do /api/upload-gpx)
+        write_track(os.path.join(gpx_dir, "novo x porto.gpx"), rnd, SYNTHETIC_POINTS)
+        t0 = time.perf_counter()
+        stats = quiet_build(gpx_dir, output, manifest_file=manifest)
+        t_upload = time.perf_counter() - t0
+        if stats['parsed'] != 1 or index_routes(output) != legacy_routes(gpx_dir):
+            print(f"   -> upload: {stats}")
+            failures += 1
+        print(f"upload de 1 arquivo com {total} no índice: {t_upload * 1000:.0f} ms "
+              f"(a frio {t_cold * 1000:.0f} ms, {t_cold / t_upload:.0f}x)")
+
+        # Alteração e remoção
+        write_track(os.path.join(gpx_dir, "trilho 03 x destino 03.gpx"), rnd, 50)
+        os.remove(os.path.join(gpx_dir, "trilho 04 x destino 04.gpx"))
+        stats = quiet_build(gpx_dir, output, manifest_file=manifest)
+        routes = index_routes(output)
+        if stats['parsed'] != 1 or routes != legacy_routes(gpx_dir) or "trilho 04 x destino 04" in routes:
+            print(f"   -> alteração/remoção: {stats}")
+            failures += 1
+
+        # Manifesto corrompido
+        with open(manifest, 'w') as f:
+            f.write('{"version": 1, "files": ')
+        stats = quiet_build(gpx_dir, output, manifest_file=manifest, workers=1)
+        if stats['reused'] != 0 or index_routes(output) != legacy_routes(gpx_dir):
+            print(f"   -> manifesto corrompido: {stats}")
+            failures += 1
+
+        # Leitor concorrente nunca vê arquivo pela metade
+        stop, torn, reads = threading.Event(), [], [0]
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    with open(output, encoding='utf-8') as f:
+                        json.load(f)
+                    reads[0] += 1
+                except ValueError as e:
+                    torn.append(e)
+                except OSError:
+                    pass
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for n in range(5):
+            write_track(os.path.join(gpx_dir, f"leitura {n} x teste.gpx"), rnd, 200)
+            quiet_build(gpx_dir, output, manifest_file=manifest, workers=1)
+        stop.set()
+        thread.join()
+        if torn:
+            print(f"   -> leitor viu JSON incompleto {len(torn)} vez(es)")
+            failures += 1
+        print(f"leitor concorrente: {reads[0]} leituras, {len(torn)} incompletas")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print(f"OK: índice incremental (manifesto em {os.path.relpath(build_route_index.MANIFEST_FILE, SCRIPT_DIR)})")
+
+
+if __name__ == "__main__":
+    main()
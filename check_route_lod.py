@@ -0,0 +1,120 @@
+"""
+Bancada dos níveis de detalhe das rotas (route_lod.py)
+
+Para as rotas do js/data/known_routes.json confere, em cada nível:
+- os arquivos known_routes_lod<n>.json são iguais aos gerados agora
+- todo ponto descartado fica a até a tolerância do trecho simplificado
+  (e o max_error_m declarado é o medido)
+- along_nm dos pontos mantidos e dist_nm são os exatos (todos os pontos)
+- primeiro e último ponto preservados
+E mede, num trilho sintético de 20000 pontos (rota densificada com ruído de
+GPS, como um <trk> gravado a bordo), pontos, tamanho do JSON, erro de
+distância da geometria simplificada e tempo de geração por nível.
+
+Uso: python check_route_lod.py
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import route_graph  # noqa: E402
+import route_lod  # noqa: E402
+from route_lod import LOD_TOLERANCES_M, build_level, cumulative_nm, level_path  # noqa: E402
+
+SYNTHETIC_POINTS = 20000
+GPS_NOISE_M = 3.0
+MIN_REDUCTION_L1 = 5.0      # trilho sintético: nível 1 com pelo menos 5x menos pontos
+
+
+def check_level(routes, data, level):
+    failures = 0
+    tolerance = LOD_TOLERANCES_M[level]
+    for route, lod in zip(routes, data):
+        points = route['points']
+        along = cumulative_nm(points)
+        index = {(p['lat'], p['lon']): i for i, p in enumerate(points)}
+        kept = [index[(p['lat'], p['lon'])] for p in lod['points']]
+        measured = route_lod.max_error_m(points, kept)
+        if measured > tolerance + 1e-6 or abs(measured - lod['max_error_m']) > 0.05:
+            print(f"   -> {route['id']} nível {level}: erro {measured:.1f} m (declarado {lod['max_error_m']}, "
+                  f"limite {tolerance:.0f})")
+            failures += 1
+        if kept[0] != 0 or kept[-1] != len(points) - 1:
+            print(f"   -> {route['id']} nível {level}: extremidades não preservadas")
+            failures += 1
+        if any(abs(p['along_nm'] - along[i]) > 0.001 for p, i in zip(lod['points'], kept)) \
+                or abs(lod['dist_nm'] - along[-1]) > 0.001:
+            print(f"   -> {route['id']} nível {level}: distâncias diferentes das exatas")
+            failures += 1
+    return failures
+
+
+def synthetic_track(route, n, rnd):
+    """Rota densificada em ~n pontos com ruído de GPS de GPS_NOISE_M metros"""
+    pts = route['points']
+    legs = cumulative_nm(pts)
+    step = legs[-1] / (n - 1)
+    out, j = [], 0
+    for k in range(n):
+        s = k * step
+        while j < len(pts) - 2 and legs[j + 1] < s:
+            j += 1
+        f = 0.0 if legs[j + 1] == legs[j] else min(1.0, (s - legs[j]) / (legs[j + 1] - legs[j]))
+        lat = pts[j]['lat'] + (pts[j + 1]['lat'] - pts[j]['lat']) * f
+        lon = pts[j]['lon'] + (pts[j + 1]['lon'] - pts[j]['lon']) * f
+        noise = GPS_NOISE_M / 1852 / 60
+        out.append({'lat': round(lat + rnd.gauss(0, noise), 6),
+                    'lon': round(lon + rnd.gauss(0, noise) / math.cos(math.radians(lat)), 6)})
+    return {'id': 'sintético', 'origin': route['origin'], 'destination': route['destination'], 'points': out}
+
+
+def main():
+    with open(route_graph.ROUTES_FILE, encoding='utf-8') as f:
+        routes = json.load(f)
+    failures = 0
+    for level in LOD_TOLERANCES_M:
+        data = build_level(routes, level)
+        with open(level_path(route_graph.ROUTES_FILE, level), encoding='utf-8') as f:
+            if json.load(f) != data:
+                print(f"   -> {level_path(route_graph.ROUTES_FILE, level)} desatualizado (rodar build_route_index.py)")
+                failures += 1
+        failures += check_level(routes, data, level)
+        print(f"nível {level} (<= {LOD_TOLERANCES_M[level]:.0f} m): {sum(len(r['points']) for r in data)}"
+              f"/{sum(len(r['points']) for r in routes)} pontos nas {len(routes)} rotas")
+
+    rnd = random.Random(11)
+    largest = max(routes, key=lambda r: len(r['points']))
+    track = synthetic_track(largest, SYNTHETIC_POINTS, rnd)
+    full_bytes = len(json.dumps([track], ensure_ascii=False))
+    full_nm = cumulative_nm(track['points'])[-1]
+    print(f"trilho sintético: {SYNTHETIC_POINTS} pontos, {full_bytes / 1024:.0f} KiB, {full_nm:.2f} NM")
+    for level in LOD_TOLERANCES_M:
+        t0 = time.perf_counter()
+        data = build_level([track], level)
+        elapsed = time.perf_counter() - t0
+        lod = data[0]
+        failures += check_level([track], data, level)
+        size = len(json.dumps(data, ensure_ascii=False))
+        reduction = SYNTHETIC_POINTS / len(lod['points'])
+        print(f"  nível {level}: {len(lod['points']):>5} pontos ({reduction:.0f}x), {size / 1024:>5.0f} KiB, "
+              f"erro transversal {lod['max_error_m']:.1f} m, distância da geometria -{lod['dist_error_nm']:.3f} NM "
+              f"(exibida: {lod['dist_nm']:.2f} NM exata), {elapsed * 1000:.0f} ms")
+        if level == 1 and reduction < MIN_REDUCTION_L1:
+            print(f"   -> nível 1 reduziu só {reduction:.1f}x")
+            failures += 1
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: níveis de detalhe dentro da tolerância, distâncias exatas")
+
+
+if __name__ == "__main__":
+    main()
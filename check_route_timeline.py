@@ -0,0 +1,199 @@
+"""
+Bancada da linha do tempo da rota (route_timeline.py / /api/voyage/timeline)
+
+Numa rota costeira real (known_routes.json) e numa sintética de 10000
+pontos, com pernas rebocando e sem reboque, confere:
+- position_at = caminhada perna a perna (como se faz à mão), e a posição
+  fica sobre a loxodrômica da perna (calc_leg do início da perna até ela dá
+  o rumo da perna e a distância percorrida)
+- time_at_distance(position_at(t).along_nm) volta a t; waypoints no ETA
+  acumulado; antes da saída / depois da chegada
+- passage de um ponto sobre a rota devolve a própria distância; afastado
+  (rota real), o lado e a distância ao través; a busca vetorizada da perna
+  mais próxima dá o mesmo que o laço por perna (caminho sem NumPy)
+E mede consultas em lote (bisect) contra a caminhada linear e MAX_PASSAGES
+passagens numa rota de PASSAGE_POINTS pontos (limite: MAX_PASSAGES_S).
+
+Uso: python check_route_timeline.py
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import route_graph  # noqa: E402
+import route_timeline  # noqa: E402
+from navmath import calc_leg  # noqa: E402
+from route_timeline import RouteTimeline, leg_speeds, parse_speed  # noqa: E402
+
+ETD = datetime(2026, 10, 17, 6, 0)
+SYNTHETIC_POINTS = 10000
+QUERIES = 5000
+PASSAGE_POINTS = 5000
+MAX_PASSAGES_S = 1.0
+
+
+def walk(points, speeds, when):
+    """Referência: caminha perna a perna somando os tempos"""
+    elapsed = (when - ETD).total_seconds() / 3600
+    along = 0.0
+    for i in range(len(points) - 1):
+        leg = calc_leg(points[i]['lat'], points[i]['lon'], points[i + 1]['lat'], points[i + 1]['lon'])
+        hours = leg.dist / speeds[i]
+        if elapsed <= hours:
+            return along + max(elapsed, 0.0) * speeds[i], i
+        elapsed -= hours
+        along += leg.dist
+    return along, len(points) - 2
+
+
+def check_route(label, points, speeds, rnd, n_queries, offset=False):
+    failures = 0
+    tl = RouteTimeline(points, ETD, speeds)
+    times = [ETD + timedelta(hours=rnd.uniform(-2, tl.duration_h + 2)) for _ in range(n_queries)]
+
+    t0 = time.perf_counter()
+    positions = tl.positions_at(times)
+    t_batch = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    reference = [walk(points, speeds, t) for t in times[:200]]
+    t_walk = (time.perf_counter() - t0) / 200 * n_queries
+
+    worst_along = worst_track = worst_back = 0.0
+    for pos, (along, _) in zip(positions, reference):
+        worst_along = max(worst_along, abs(pos['along_nm'] - along))
+    for pos, when in zip(positions, times):
+        i = pos['leg']
+        done = pos['along_nm'] - tl.along[i]
+        if done > 0.5:
+            leg = calc_leg(points[i]['lat'], points[i]['lon'], pos['lat'], pos['lon'])
+            worst_track = max(worst_track, abs(leg.dist - done))
+        if pos['status'] == 'under_way':
+            back = tl.time_at_distance(pos['along_nm'])['hours']
+            worst_back = max(worst_back, abs(back - (when - ETD).total_seconds() / 3600) * 60)
+    if worst_along > 0.002 or worst_track > 0.01 or worst_back > 0.05:
+        print(f"   -> {label}: along {worst_along:.4f} NM, fora da loxodrômica {worst_track:.4f} NM, "
+              f"ida e volta {worst_back:.3f} min")
+        failures += 1
+
+    before = tl.position_at(ETD - timedelta(hours=1))
+    after = tl.position_at(tl.eta + timedelta(hours=1))
+    if (before['status'], before['along_nm']) != ('before', 0.0) or after['status'] != 'arrived' \
+            or abs(after['along_nm'] - tl.total_nm) > 0.001:
+        print(f"   -> {label}: antes da saída / depois da chegada")
+        failures += 1
+    elapsed = 0.0
+    for i, wp in enumerate(tl.summary()['waypoints']):
+        if wp['eta'] != (ETD + timedelta(hours=elapsed)).isoformat(timespec='minutes'):
+            print(f"   -> {label}: waypoint {i} com ETA {wp['eta']}")
+            failures += 1
+            break
+        if i < len(speeds):
+            elapsed += tl.dist[i] / speeds[i]
+    if tl.time_at_distance(tl.total_nm + 1)['eta'] is not None:
+        print(f"   -> {label}: distância além do fim com horário")
+        failures += 1
+
+    # Passagem: ponto sobre a rota e afastado para bombordo/boreste
+    k = len(points) // 2
+    on = tl.passage(points[k]['lat'], points[k]['lon'])
+    if abs(on['along_nm'] - tl.along[k]) > 0.01 or on['off_track_nm'] > 0.01:
+        print(f"   -> {label}: passagem pelo waypoint {k} em {on['along_nm']} NM (esperado {tl.along[k]:.3f})")
+        failures += 1
+
+    if offset:
+        # 1 NM a bombordo do meio da perna k
+        i = k
+        mid_lat = (points[i]['lat'] + points[i + 1]['lat']) / 2
+        mid_lon = (points[i]['lon'] + points[i + 1]['lon']) / 2
+        port = math.radians(tl.crs[i] - 90)
+        lat = mid_lat + math.cos(port) / 60
+        lon = mid_lon + math.sin(port) / 60 / math.cos(math.radians(mid_lat))
+        side = tl.passage(lat, lon)
+        if side['side'] != 'BB' or abs(side['off_track_nm'] - 1.0) > 0.02 or side['leg'] != i:
+            print(f"   -> {label}: ponto 1 NM a bombordo da perna {i}: {side}")
+            failures += 1
+
+    print(f"{label}: {len(points)} pontos, {tl.total_nm:.1f} NM em {tl.duration_h:.1f} h; "
+          f"{n_queries} posições em lote {t_batch * 1000:.1f} ms (caminhada linear ~{t_walk * 1000:.0f} ms)")
+    return failures
+
+
+def check_passages(rnd, points, speeds):
+    """Passagens em lote: vetorizado = laço por perna, e dentro do tempo"""
+    failures = 0
+    tl = RouteTimeline(points, ETD, speeds)
+    lats = [p['lat'] for p in points]
+    lons = [p['lon'] for p in points]
+    queries = [{'lat': rnd.uniform(min(lats), max(lats)), 'lon': rnd.uniform(min(lons), max(lons))}
+               for _ in range(route_timeline.MAX_PASSAGES)]
+    t0 = time.perf_counter()
+    fast = tl.passages(queries)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(queries)} passagens numa rota de {len(points)} pontos: {elapsed * 1000:.0f} ms")
+    if elapsed > MAX_PASSAGES_S:
+        print(f"   -> acima de {MAX_PASSAGES_S} s")
+        failures += 1
+    if route_timeline.np is not None:
+        saved = route_timeline.np
+        route_timeline.np = None
+        try:
+            plain = RouteTimeline(points, ETD, speeds).passages(queries[:50])
+        finally:
+            route_timeline.np = saved
+        if plain != fast[:50]:
+            diff = next(i for i, (a, b) in enumerate(zip(plain, fast)) if a != b)
+            print(f"   -> laço por perna difere na passagem {diff}: {plain[diff]} x {fast[diff]}")
+            failures += 1
+    return failures
+
+
+def main():
+    rnd = random.Random(22)
+    failures = 0
+
+    if parse_speed("8,5 NÓS") != 8.5 or parse_speed("10 kn") != 10.0 or parse_speed("") is not None:
+        print("   -> parse_speed")
+        failures += 1
+    if leg_speeds(4, 10.0, 6.0, [1, 2]) != [10.0, 6.0, 6.0, 10.0] or leg_speeds(2, 10.0, 6.0, True) != [6.0, 6.0]:
+        print("   -> leg_speeds")
+        failures += 1
+    for bad in ((4, 10.0, None, [1]), (4, 10.0, 6.0, [7]), (4, 0.0, None, None)):
+        try:
+            leg_speeds(*bad)
+            print(f"   -> leg_speeds{bad} aceito")
+            failures += 1
+        except ValueError:
+            pass
+
+    with open(route_graph.ROUTES_FILE, encoding='utf-8') as f:
+        route = max(json.load(f), key=lambda r: len(r['points']))
+    points = route['points']
+    n_legs = len(points) - 1
+    speeds = leg_speeds(n_legs, 10.0, 6.0, range(n_legs // 3, 2 * n_legs // 3))
+    failures += check_route(route['id'], points, speeds, rnd, 500, offset=True)
+
+    synthetic = [{'lat': -23.0, 'lon': -43.0}]
+    for _ in range(SYNTHETIC_POINTS - 1):
+        synthetic.append({'lat': synthetic[-1]['lat'] + rnd.uniform(-0.02, 0.02),
+                          'lon': synthetic[-1]['lon'] + rnd.choice((0.0, rnd.uniform(-0.02, 0.02)))})
+    speeds = [rnd.choice((6.0, 10.0)) for _ in range(SYNTHETIC_POINTS - 1)]
+    failures += check_route("sintética", synthetic, speeds, rnd, QUERIES)
+
+    failures += check_passages(rnd, synthetic[:PASSAGE_POINTS], speeds[:PASSAGE_POINTS - 1])
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: linha do tempo da rota igual à caminhada perna a perna")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Bancada do agendador de atualização (scheduler.py)
+
+Usa o stand-in HTTP do check_fetch_engine.py e arquivos num diretório
+temporário para conferir:
+- fila de prioridade (sem dados / previsão curta / coleta mais antiga) e limite por ciclo
+- ciclo adiado quando há atualização manual em andamento ou outro processo com a trava
+- estado persistido: um agendador novo respeita o próximo horário gravado
+  (reiniciar o worker não dispara coleta)
+
+Uso: python check_scheduler.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import check_fetch_engine  # noqa: E402
+import ingest  # noqa: E402
+import jobs  # noqa: E402
+import scheduler  # noqa: E402
+from fetch_engine import FetchEngine  # noqa: E402
+from stations import STATIONS  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), check_fetch_engine.StubHandler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{stub.server_address[1]}/br"
+    failures = 0
+    original_run, original_status = ingest.run, ingest.refresh_status
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, 'ingest_state.json')
+
+        def writers():
+            return [cls(os.path.join(tmp, cls.filename)) for cls in ingest.WRITERS.values()]
+
+        # O stand-in só tem 2 dias de tábua: horizonte mínimo 0 para a idade decidir
+        def stub_run(**kwargs):
+            return original_run(base_url=base, days=2, writers=writers(), state_file=state_file,
+                                min_horizon_days=0,
+                                engine=FetchEngine(max_workers=4, per_host=2, rate_per_s=10, burst=4), **kwargs)
+
+        def stub_status(**kwargs):
+            kwargs.setdefault('state_file', state_file)
+            return original_status(writers=writers(), min_horizon_days=0, **kwargs)
+
+        ingest.run, ingest.refresh_status = stub_run, stub_status
+
+        def new_scheduler(**kwargs):
+            return scheduler.RefreshScheduler(state_file=os.path.join(tmp, 'scheduler_state.json'),
+                                              lock_file=os.path.join(tmp, 'scheduler.lock'),
+                                              ingest_state_file=state_file, **kwargs)
+
+        # 0. Base inicial completa
+        ingest.run()
+
+        # 1. Prioridade: três estações envelhecidas em graus diferentes + uma sem dados
+        state = ingest.load_state(state_file)
+        for st, hours in ((STATIONS[3], 7), (STATIONS[7], 30), (STATIONS[12], 12)):
+            state[st.id]['fetched_at'] = time.time() - hours * 3600
+        del state[STATIONS[15].id]
+        ingest.save_state(state, state_file)
+        sched = new_scheduler(max_stations=3)
+        queue = [s.station.id for s in sched.due_stations()]
+        expected = [STATIONS[15].id, STATIONS[7].id, STATIONS[12].id]
+        logger.info(f"[prioridade] fila {queue} (esperado {expected})")
+        if queue != expected:
+            failures += 1
+
+        # 2. Ciclo: coleta só as três primeiras; a quarta fica para o próximo
+        job = sched.run_cycle()
+        stats = sched.load_state()
+        collected = list(job.stations) if job else []
+        remaining = [s.station.id for s in sched.due_stations()]
+        logger.info(f"[ciclo] job {job.status if job else None}, coletadas {collected}, "
+                    f"restantes {remaining}, próximo em {(stats['next_run_at'] - time.time()) / 60:.0f} min")
+        if not job or collected != expected or remaining != [STATIONS[3].id]:
+            failures += 1
+        if not (sched.interval_s - sched.jitter_s - 5 <= stats['next_run_at'] - stats['last_run_at']
+                <= sched.interval_s + sched.jitter_s + 5):
+            logger.error("[ciclo] próximo horário fora de intervalo +/- jitter")
+            failures += 1
+
+        # 3. Sem sobreposição: atualização manual em andamento / outro processo com a trava
+        manual = jobs.submit_update('full')
+        skipped_busy = sched.run_cycle()
+        while manual.active:
+            time.sleep(0.2)
+        other = scheduler._FileLock(os.path.join(tmp, 'scheduler.lock'))
+        other.acquire()
+        skipped_locked = sched.run_cycle()
+        other.release()
+        logger.info(f"[sobreposição] com job manual: {skipped_busy}; com trava de outro processo: {skipped_locked} "
+                    f"({sched.load_state()['last_result']})")
+        if skipped_busy is not None or skipped_locked is not None:
+            failures += 1
+
+        # 4. Reinício: próximo horário no futuro -> nenhum job ao subir
+        state = ingest.load_state(state_file)
+        state[STATIONS[0].id]['fetched_at'] -= 10 * 3600
+        ingest.save_state(state, state_file)
+        sched._save_state(next_run_at=time.time() + 3600)
+        restarted = new_scheduler(startup_delay_s=0, jitter_s=0)
+        jobs_before = len(jobs.runner.list())
+        restarted.start()
+        time.sleep(1.5)
+        started_on_restart = len(jobs.runner.list()) - jobs_before
+        restarted.stop()
+
+        #    ...e com o horário vencido, o ciclo roda só com a estação vencida
+        sched._save_state(next_run_at=time.time() - 1)
+        restarted = new_scheduler(startup_delay_s=0, jitter_s=0)
+        restarted.start()
+        deadline = time.time() + 20
+        while time.time() < deadline and restarted.load_state().get('last_result') != jobs.DONE:
+            time.sleep(0.2)
+        restarted.stop()
+        last = restarted.load_state()
+        logger.info(f"[reinício] jobs ao subir com próximo no futuro: {started_on_restart}; "
+                    f"com horário vencido: {last.get('last_result')} {last.get('last_stations')}")
+        if started_on_restart != 0 or last.get('last_result') != jobs.DONE or \
+                last.get('last_stations') != [STATIONS[0].id]:
+            failures += 1
+
+    ingest.run, ingest.refresh_status = original_run, original_status
+    stub.shutdown()
+    if failures:
+        logger.error(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    logger.info("OK: todas as verificações passaram")
+
+
+if __name__ == "__main__":
+    main()
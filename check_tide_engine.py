@@ -0,0 +1,158 @@
+"""
+Bancada do motor de marés (tide_engine.py) contra a lógica do frontend
+
+Reproduz em Python o TideCSVService.getInterpolatedTide (mapas por estação e
+dia, eventos de três dias remontados e ordenados a cada chamada, busca
+linear) e confere, para todas as estações do tides_scraped.csv, a cada
+10 minutos do período inteiro:
+- mesma altura (2 casas) e mesma tendência, com e sem NumPy
+- próxima preia-mar / baixa-mar coerentes com os eventos do CSV
+- uma travessia de 5 dias a cada 10 min (721 horários) é pelo menos 10x mais
+  rápida numa chamada do motor do que horário a horário
+
+Uso: python check_tide_engine.py
+"""
+
+import csv
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import tide_engine  # noqa: E402
+from tide_engine import TideEngine  # noqa: E402
+
+MIN_SPEEDUP = 10.0
+STEP_MIN = 10
+
+
+class FrontendTides:
+    """TideCSVService (parseTideCSV + getInterpolatedTide), linha a linha"""
+
+    def __init__(self, rows):
+        self.cache = {}
+        for row in rows:
+            day, month, year = row['date'].split('/')
+            self.cache.setdefault(row['station_name'], {}).setdefault(f"{year}-{month}-{day}", []).append({
+                'time': row['time'], 'height': float(row['height']),
+                'type': 'HIGH' if 'preia' in row['type'].lower() else 'LOW'})
+
+    def interpolated(self, name, moment):
+        station = self.cache.get(name)
+        if not station:
+            return None
+        events = []
+        for delta in (-1, 0, 1):
+            key = (moment + timedelta(days=delta)).strftime('%Y-%m-%d')
+            for ev in station.get(key, []):
+                h, m = map(int, ev['time'].split(':'))
+                yy, mm, dd = map(int, key.split('-'))
+                events.append({**ev, 'timestamp': datetime(yy, mm, dd, h, m)})
+        events.sort(key=lambda ev: ev['timestamp'])
+        prev = nxt = None
+        for ev in events:
+            if ev['timestamp'] <= moment:
+                prev = ev
+            else:
+                nxt = ev
+                break
+        if prev and nxt:
+            t1, t2 = prev['timestamp'], nxt['timestamp']
+            if (t2 - t1) > timedelta(hours=8):
+                value = prev['height']
+            else:
+                mu = (1 - math.cos((moment - t1) / (t2 - t1) * math.pi)) / 2
+                value = prev['height'] * (1 - mu) + nxt['height'] * mu
+            return round(value, 2), 'RISING' if nxt['type'] == 'HIGH' else 'FALLING'
+        if prev:
+            return round(prev['height'], 2), 'STABLE'
+        return None
+
+
+def check_station(engine, frontend, st, rows):
+    """Falhas de uma estação, comparando o período inteiro a cada STEP_MIN"""
+    moments = sorted(datetime.strptime(f"{r['date']} {r['time']}", '%d/%m/%Y %H:%M') for r in rows)
+    start = moments[0].replace(hour=0, minute=0) - timedelta(days=1)
+    end = moments[-1] + timedelta(days=1)
+    times = tide_engine.time_range(start, end, STEP_MIN)
+    out = engine.interpolate(st.station_id, times)
+
+    failures = 0
+    for i, moment in enumerate(times):
+        expected = frontend.interpolated(st.name, moment)
+        got = (out['height'][i], out['trend'][i]) if out['height'][i] is not None else None
+        # Empate no meio centímetro: np.cos e math.cos podem diferir no último bit e arredondar para lados opostos
+        same = expected == got or (expected is not None and got is not None and expected[1] == got[1]
+                                   and abs(expected[0] - got[0]) <= 0.0101)
+        if not same:
+            print(f"   -> {st.station_id} {moment:%d/%m %H:%M}: motor {got} != frontend {expected}")
+            failures += 1
+
+        for key, kind in (('next_high', 'preia'), ('next_low', 'baixa')):
+            upcoming = [m for m, r in zip(moments, rows) if m > moment and kind in r['type']]
+            event = out[key][i]
+            if (event and event['time']) != (upcoming[0].isoformat(timespec='minutes') if upcoming else None):
+                print(f"   -> {st.station_id} {moment:%d/%m %H:%M}: {key} {event}")
+                failures += 1
+        if failures > 5:
+            break
+    return failures, len(times)
+
+
+def main():
+    path = tide_engine.TIDES_CSV
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    frontend = FrontendTides(rows)
+    failures = 0
+
+    numpy = tide_engine.np
+    for label, np_module in (('NumPy', numpy), ('bisect', None)):
+        tide_engine.np = np_module
+        if label == 'NumPy' and numpy is None:
+            print("NumPy ausente: só o caminho bisect")
+            continue
+        engine = TideEngine.from_csv(path)
+        n_times, before = 0, failures
+        for st in engine.stations.values():
+            station_rows = sorted((r for r in rows if r['station_id'] == st.station_id),
+                                  key=lambda r: datetime.strptime(f"{r['date']} {r['time']}", '%d/%m/%Y %H:%M'))
+            bad, n = check_station(engine, frontend, st, station_rows)
+            failures += bad
+            n_times += n
+        print(f"[{label}] {len(engine.stations)} estações, {n_times} horários: "
+              f"{'iguais ao frontend' if failures == before else 'DIFEREM'}")
+    tide_engine.np = numpy
+
+    engine = TideEngine.from_csv(path)
+    st = max(engine.stations.values(), key=lambda s: len(s.ts))
+    first = datetime(1970, 1, 1) + timedelta(minutes=int(st.ts[0]))
+    voyage = tide_engine.time_range(first, first + timedelta(days=5), STEP_MIN)
+    t0 = time.perf_counter()
+    for moment in voyage:
+        frontend.interpolated(st.name, moment)
+    t_loop = time.perf_counter() - t0
+    repeats = 20
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        engine.interpolate(st.station_id, voyage)
+    t_engine = (time.perf_counter() - t0) / repeats
+    speedup = t_loop / t_engine
+    print(f"travessia de 5 dias ({len(voyage)} horários, {st.name}): horário a horário {t_loop * 1000:.1f} ms, "
+          f"motor {t_engine * 1000:.2f} ms ({speedup:.0f}x)")
+    if speedup < MIN_SPEEDUP:
+        print(f"   -> ganho {speedup:.1f}x abaixo de {MIN_SPEEDUP:.0f}x")
+        failures += 1
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: motor de marés igual ao frontend e mais rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Bancada do modelo harmônico de marés (tide_harmonics.py / /api/tide/harmonic)
+
+Confere:
+- velocidades das constituintes (números de Doodson) = valores tabelados
+- extremos previstos = máximos e mínimos de uma varredura minuto a minuto
+- maré sintética de constantes conhecidas (40 dias de extremos): o ajuste
+  recupera amplitudes e fases e a previsão 30 dias adiante repete os extremos
+- tides_scraped.csv: toda estação ajustada, com a previsão dos últimos
+  HOLDOUT_DAYS dias (fora do ajuste) dentro de MAX_HOLDOUT_* dos coletados
+- caminho sem NumPy e ida e volta pelo JSON dão as mesmas alturas
+E mede as alturas contínuas (limite: MAX_US_PER_SAMPLE por horário).
+
+Uso: python check_tide_harmonics.py
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import tide_engine  # noqa: E402
+import tide_harmonics  # noqa: E402
+from tide_harmonics import HarmonicModel, fit, fit_all  # noqa: E402
+
+TABLE_SPEEDS = {'M2': 28.9841042, 'S2': 30.0, 'N2': 28.4397295, 'K2': 30.0821373, 'K1': 15.0410686,
+                'O1': 13.9430356, 'P1': 14.9589314, 'Q1': 13.3986609, 'M4': 57.9682084}
+TRUTH = {'M2': (1.10, 120.0), 'S2': (0.38, 145.0), 'K1': (0.14, 210.0), 'O1': (0.11, 175.0),
+         'M4': (0.06, 40.0), 'N2': (0.21, 120.0)}
+MAX_HOLDOUT_HEIGHT_M = 0.30
+MAX_HOLDOUT_TIME_MIN = 45.0
+MAX_US_PER_SAMPLE = 5.0
+
+
+def truth_model():
+    """Constantes conhecidas, com as inferidas nas razões de equilíbrio do próprio módulo"""
+    constants = dict(TRUTH)
+    for name, ref, ratio in (('K2', 'S2', 0.2718), ('P1', 'K1', 0.3309), ('Q1', 'O1', 0.1941)):
+        constants[name] = (constants[ref][0] * ratio, constants[ref][1])
+    return HarmonicModel('SYN', 'Sintética', 1.2, constants)
+
+
+def check_extremes(model):
+    """Extremos contra a varredura minuto a minuto (3 dias)"""
+    start = tide_harmonics.to_epoch_minutes(datetime(2026, 10, 17))
+    grid = list(range(start, start + 3 * 1440))
+    h = list(model.heights_minutes(grid))
+    brute = [grid[k] for k in range(1, len(grid) - 1) if (h[k] - h[k - 1]) * (h[k + 1] - h[k]) <= 0]
+    found = [m for m, _, _ in model.extremes_minutes(grid[1], grid[-1])]
+    worst = max((min(abs(f - b) for f in found) for b in brute), default=math.inf)
+    if len(found) != len(brute) or worst > 1.0:
+        print(f"   -> extremos: {len(found)} previstos x {len(brute)} na varredura (pior {worst:.1f} min)")
+        return 1
+    return 0
+
+
+def check_synthetic():
+    failures = 0
+    truth = truth_model()
+    failures += check_extremes(truth)
+    t0 = tide_harmonics.to_epoch_minutes(datetime(2026, 1, 1))
+    events = truth.extremes_minutes(t0, t0 + 40 * 1440)
+    model = fit('SYN', 'Sintética', [round(m) for m, _, _ in events], [round(h, 3) for _, h, _ in events])
+    worst_amp = max(abs(model.constants[n][0] - a) for n, (a, _) in truth.constants.items())
+    worst_phase = max(abs((model.constants[n][1] - g + 180) % 360 - 180) for n, (_, g) in TRUTH.items())
+    if worst_amp > 0.005 or worst_phase > 1.0 or abs(model.z0 - truth.z0) > 0.005:
+        print(f"   -> sintética: amplitude {worst_amp:.4f} m, fase {worst_phase:.2f}°, z0 {model.z0:.4f}")
+        failures += 1
+    later = t0 + 70 * 1440
+    expected = truth.extremes_minutes(later, later + 5 * 1440)
+    got = model.extremes_minutes(later, later + 5 * 1440)
+    worst_t = max((min(abs(g[0] - e[0]) for g in got) for e in expected), default=math.inf)
+    worst_h = max((abs(g[1] - e[1]) for g, e in zip(got, expected)), default=math.inf)
+    if len(got) != len(expected) or worst_t > 2.0 or worst_h > 0.01:
+        print(f"   -> sintética 30 dias adiante: {len(got)} x {len(expected)} extremos, "
+              f"{worst_t:.1f} min, {worst_h:.3f} m")
+        failures += 1
+    print(f"sintética ({len(events)} extremos em 40 dias): amplitudes {worst_amp * 1000:.1f} mm, "
+          f"fases {worst_phase:.2f}°; 30 dias adiante {worst_t:.1f} min / {worst_h * 100:.1f} cm")
+    return failures
+
+
+def check_real():
+    failures = 0
+    engine = tide_engine.TideEngine.from_csv()
+    models = fit_all(engine)
+    if set(models) != set(engine.stations):
+        print(f"   -> estações sem ajuste: {sorted(set(engine.stations) - set(models))}")
+        failures += 1
+    for sid, m in models.items():
+        h = m.holdout
+        if h.get('matched') != h.get('n') or h.get('height_rms_m', math.inf) > MAX_HOLDOUT_HEIGHT_M \
+                or h.get('time_rms_min', math.inf) > MAX_HOLDOUT_TIME_MIN:
+            print(f"   -> {sid} {m.name}: validação {h}")
+            failures += 1
+    heights = sorted(m.holdout.get('height_rms_m', math.inf) for m in models.values())
+    minutes = sorted(m.holdout.get('time_rms_min', math.inf) for m in models.values())
+    print(f"tides_scraped.csv, {len(models)} estações, últimos {tide_harmonics.HOLDOUT_DAYS:g} dias fora do "
+          f"ajuste: altura rms mediana {heights[len(heights) // 2]:.2f} m (pior {heights[-1]:.2f}), "
+          f"horário rms mediano {minutes[len(minutes) // 2]:.0f} min (pior {minutes[-1]:.0f})")
+
+    # Sem NumPy e pelo JSON: mesmas alturas
+    st = engine.station('BR_RIO')
+    model = models['BR_RIO']
+    times = [datetime(2026, 10, 17, h, 30) for h in range(24)]
+    saved = tide_harmonics.np
+    tide_harmonics.np = None
+    try:
+        plain = tide_harmonics.fit_station(st)
+        plain_heights = plain.heights(times)
+    finally:
+        tide_harmonics.np = saved
+    worst = max(abs(a - b) for a, b in zip(plain_heights, model.heights(times)))
+    if worst > 0.011:
+        print(f"   -> caminho sem NumPy difere ({worst:.3f} m)")
+        failures += 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tide_harmonics.json')
+        tide_harmonics.save(models, path, engine.source)
+        back = tide_harmonics.load(path)['BR_RIO']
+    worst = max(abs(a - b) for a, b in zip(back.heights(times), model.heights(times)))
+    if worst > 0.011 or back.holdout != model.holdout:
+        print(f"   -> ida e volta pelo JSON difere ({worst:.3f} m)")
+        failures += 1
+    return failures, model
+
+
+def main():
+    failures = 0
+    worst = max(abs(tide_harmonics.SPEED[n] - v) for n, v in TABLE_SPEEDS.items())
+    if worst > 1e-5:
+        print(f"   -> velocidades das constituintes diferem da tabela ({worst:.2e}°/h)")
+        failures += 1
+    failures += check_synthetic()
+    real_failures, model = check_real()
+    failures += real_failures
+
+    if tide_harmonics.np is not None:
+        t = tide_harmonics.np.arange(100000) * 10.0 + tide_harmonics.to_epoch_minutes(datetime(2026, 10, 17))
+        best = math.inf
+        for _ in range(5):
+            t0 = time.perf_counter()
+            model.heights_minutes(t)
+            best = min(best, time.perf_counter() - t0)
+        per = best / len(t) * 1e6
+        print(f"alturas contínuas, {len(model.constants)} constituintes: {per:.2f} µs por horário")
+        if per > MAX_US_PER_SAMPLE:
+            print(f"   -> acima de {MAX_US_PER_SAMPLE} µs")
+            failures += 1
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: constantes harmônicas recuperadas e previsão dentro dos limites nos dias fora do ajuste")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Bancada da linha do tempo da travessia (voyage_metocean.py / /api/voyage/metocean)
+
+Para cada rota do js/data/known_routes.json, com ETD no início dos dados de
+tempo e de maré, compara a resposta em lote com o caminho do navegador
+refeito ponto a ponto em Python (TideLocator.findNearest + getInterpolatedTide
++ getWeatherAt, como o WeatherAPI.fetchMetOcean) e confere:
+- mesma estação de referência, maré, tendência, vento em nós e temperatura
+- ETA do último ponto = ETD + distância total / velocidade
+- a maior rota (175 pontos) resolve numa chamada em poucos milissegundos
+
+Uso: python check_voyage_metocean.py
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+from check_tide_engine import FrontendTides  # noqa: E402
+import tide_engine  # noqa: E402
+import voyage_metocean  # noqa: E402
+from voyage_metocean import REFERENCE_STATIONS, WeatherTable, haversine_nm, voyage_timeline  # noqa: E402
+
+ROUTES = os.path.join(SCRIPT_DIR, 'js', 'data', 'known_routes.json')
+MAX_BATCH_MS = 50.0
+SPEED_KN = 10.0
+
+
+class FrontendWeather:
+    """TideCSVService.getWeatherAt: mesmo dia, hora mais próxima (empate: a primeira)"""
+
+    def __init__(self, rows):
+        self.cache = {}
+        for row in rows:
+            day, month, year = row['date'].split('/')
+            self.cache.setdefault(row['station_name'], {}).setdefault(f"{year}-{month}-{day}", []).append(row)
+
+    def at(self, name, moment):
+        day = self.cache.get(name, {}).get(moment.strftime('%Y-%m-%d'))
+        if not day:
+            return None
+        target = moment.hour * 60 + moment.minute
+        closest, best = None, 9999
+        for row in day:
+            h, m = map(int, row['time'].split(':'))
+            if abs(target - (h * 60 + m)) < best:
+                best, closest = abs(target - (h * 60 + m)), row
+        return closest
+
+
+def frontend_waypoint(lat, lon, moment, tides, weather):
+    """WeatherAPI.fetchMetOcean de um ponto"""
+    dists = [haversine_nm(lat, lon, st.lat, st.lon) for st in REFERENCE_STATIONS]
+    i = min(range(len(dists)), key=dists.__getitem__)
+    if dists[i] > voyage_metocean.MAX_RADIUS_NM:
+        return (None, None, None, None, None)
+    st = REFERENCE_STATIONS[i]
+    tide = tides.interpolated(st.csv_name, moment) or (None, None)
+    sample = weather.at(st.csv_name, moment)
+    wind = float(sample['wind_speed']) if sample else None
+    return (st.id, tide[0], tide[1], round(wind * voyage_metocean.KMH_TO_KN, 1) if wind is not None else None,
+            float(sample['temp']) if sample else None)
+
+
+def main():
+    with open(tide_engine.TIDES_CSV, newline='', encoding='utf-8') as f:
+        tide_rows = list(csv.DictReader(f))
+    with open(voyage_metocean.WEATHER_CSV, newline='', encoding='utf-8') as f:
+        weather_rows = list(csv.DictReader(f))
+    with open(ROUTES, encoding='utf-8') as f:
+        routes = json.load(f)
+    front_tides, front_weather = FrontendTides(tide_rows), FrontendWeather(weather_rows)
+    tides = tide_engine.TideEngine.from_rows(tide_rows)
+    weather = WeatherTable(weather_rows)
+
+    # ETDs em que há maré e tempo no CSV
+    days = sorted({datetime.strptime(r['date'], '%d/%m/%Y') for r in weather_rows})
+    etds = [days[0] + timedelta(hours=6), days[0] + timedelta(hours=13, minutes=20)]
+
+    failures = 0
+    checked = 0
+    for route in routes:
+        for etd in etds:
+            out = voyage_timeline(route['points'], etd, SPEED_KN, tides=tides, weather=weather)
+            for wp in out['waypoints']:
+                eta = datetime.fromisoformat(wp['eta'])
+                expected = frontend_waypoint(wp['lat'], wp['lon'], eta, front_tides, front_weather)
+                got = ((wp['ref_station'] or {}).get('id'), wp['tide_height'], wp['tide_trend'], wp['wind_kn'],
+                       wp['temp'])
+                checked += 1
+                same_tide = got[1] == expected[1] or (got[1] is not None and expected[1] is not None
+                                                      and abs(got[1] - expected[1]) <= 0.0101)
+                if not same_tide or got[:1] + got[2:] != expected[:1] + expected[2:]:
+                    print(f"   -> {route['id']} ponto {wp['index']} ({wp['eta']}): {got} != {expected}")
+                    failures += 1
+            total_h = out['total_nm'] / SPEED_KN
+            if abs((datetime.fromisoformat(out['eta']) - etd).total_seconds() / 3600 - total_h) > 1 / 60:
+                print(f"   -> {route['id']}: ETA {out['eta']} não bate com {out['total_nm']} NM a {SPEED_KN} nós")
+                failures += 1
+    print(f"{len(routes)} rotas, {checked} pontos: {'iguais ao caminho do navegador' if not failures else 'DIFEREM'}")
+
+    largest = max(routes, key=lambda r: len(r['points']))
+    etd = etds[0]
+    t0 = time.perf_counter()
+    out = voyage_timeline(largest['points'], etd, SPEED_KN, tides=tides, weather=weather)
+    for wp in out['waypoints']:
+        frontend_waypoint(wp['lat'], wp['lon'], datetime.fromisoformat(wp['eta']), front_tides, front_weather)
+    t_loop = time.perf_counter() - t0
+    repeats = 20
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        voyage_timeline(largest['points'], etd, SPEED_KN, tides=tides, weather=weather)
+    t_batch = (time.perf_counter() - t0) / repeats
+    print(f"{largest['id']} ({len(largest['points'])} pontos): ponto a ponto {t_loop * 1000:.1f} ms, "
+          f"lote {t_batch * 1000:.2f} ms")
+    if t_batch * 1000 > MAX_BATCH_MS:
+        print(f"   -> lote acima de {MAX_BATCH_MS:.0f} ms")
+        failures += 1
+
+    if failures:
+        print(f"FALHOU: {failures} verificação(ões)")
+        sys.exit(1)
+    print("OK: linha do tempo em lote igual ao caminho do navegador")
+
+
+if __name__ == "__main__":
+    main()
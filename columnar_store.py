@@ -0,0 +1,365 @@
+"""
+Armazenamento Colunar de Marés e Meteorologia
+Cópia binária dos CSVs (tides_scraped.csv / weather_scraped.csv) gerada na
+ingestão, para consultas por estação e intervalo de tempo sem reparsear texto:
+- estações codificadas num dicionário (uint16)
+- horários em minutos desde 1970-01-01, horário local da estação (int32)
+- alturas, vento, ondas e temperatura em float32
+- textos repetidos (tipo da maré, direções) codificados em dicionário (uint8;
+  uint16 se a coluna passar de 256 valores distintos)
+As colunas ficam alinhadas num único arquivo lido por mmap: abrir o store só
+lê o cabeçalho, e uma consulta é uma busca binária sobre a coluna de horários
+(as linhas estão ordenadas por estação e horário).
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import bisect
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from http_cache import atomic_write
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, arrays() devolve memoryviews
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(SCRIPT_DIR, 'data', 'columnar')
+
+MAGIC = b'SNCOL1\0\0'
+ALIGN = 8
+KEEP_GENERATIONS = 2     # gerações mantidas (um leitor pode estar com a anterior aberta)
+
+EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+# Colunas de cada dataset, além de station (H) e ts (i)
+SCHEMAS: Dict[str, Dict[str, Sequence[str]]] = {
+    'tides': {'floats': ('height',), 'codes': ('type',)},
+    'weather': {'floats': ('wind_speed', 'wave_height', 'temp'), 'codes': ('wind_dir', 'wave_dir')},
+}
+
+TimeLike = Union[None, int, date, datetime]
+
+
+def to_epoch_minutes(value: Union[date, datetime]) -> int:
+    """Minutos desde 1970-01-01 00:00 (sem fuso: o horário local da estação; segundos são truncados)"""
+    minutes = (value.toordinal() - _EPOCH_ORDINAL) * 1440
+    if isinstance(value, datetime):
+        minutes += value.hour * 60 + value.minute
+    return minutes
+
+
+def from_epoch_minutes(minutes: int) -> datetime:
+    return EPOCH + timedelta(minutes=minutes)
+
+
+def _row_minutes(day: str, hhmm: str) -> Optional[int]:
+    """'DD/MM/YYYY' + 'H:MM' -> minutos (sem strptime, que domina o custo da carga do CSV)"""
+    try:
+        d, m, y = day.split('/')
+        h, mi = hhmm.split(':')
+        return (date(int(y), int(m), int(d)).toordinal() - _EPOCH_ORDINAL) * 1440 + int(h) * 60 + int(mi)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+# Maior código de dicionário por typecode
+CODE_LIMITS = {'B': 0xFF, 'H': 0xFFFF}
+
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+
+# ---------------------------
+# Gravação
+# ---------------------------
+def encode(kind: str, rows: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Monta o arquivo colunar a partir das linhas do CSV (dicts com as colunas do CSV)
+
+    As linhas devem vir ordenadas por estação e horário, como os writers da
+    ingestão gravam; linhas com data/hora ilegível são descartadas.
+    """
+    schema = SCHEMAS[kind]
+    stations: List[str] = []
+    names: Dict[str, str] = {}
+    station_index: Dict[str, int] = {}
+    dicts: Dict[str, List[str]] = {name: [] for name in schema['codes']}
+    dict_index: Dict[str, Dict[str, int]] = {name: {} for name in schema['codes']}
+    columns = {'station': array('H'), 'ts': array('i')}
+    columns.update({name: array('f') for name in schema['floats']})
+    codes_of: Dict[str, List[int]] = {name: [] for name in schema['codes']}
+
+    for row in rows:
+        ts = _row_minutes(row.get('date'), row.get('time'))
+        if ts is None:
+            continue
+        sid = row['station_id']
+        if sid not in station_index:
+            if len(stations) > CODE_LIMITS['H']:
+                raise ValueError(f"mais de {CODE_LIMITS['H'] + 1} estações: não cabem no dicionário uint16")
+            station_index[sid] = len(stations)
+            stations.append(sid)
+            names[sid] = row.get('station_name', sid)
+        columns['station'].append(station_index[sid])
+        columns['ts'].append(ts)
+        for name in schema['floats']:
+            columns[name].append(_float(row.get(name)))
+        for name in schema['codes']:
+            value = str(row.get(name, ''))
+            if value not in dict_index[name]:
+                dict_index[name][value] = len(dicts[name])
+                dicts[name].append(value)
+            codes_of[name].append(dict_index[name][value])
+
+    # Códigos em uint8 enquanto o dicionário couber; uint16 acima de 256 valores
+    for name, values in codes_of.items():
+        typecode = next((t for t in ('B', 'H') if len(dicts[name]) - 1 <= CODE_LIMITS[t]), None)
+        if typecode is None:
+            raise ValueError(f"coluna {name}: {len(dicts[name])} valores distintos não cabem no dicionário uint16")
+        columns[name] = array(typecode, values)
+
+    # Faixa contígua de cada estação (exige as linhas agrupadas por estação)
+    ranges: Dict[str, List[int]] = {}
+    codes = columns['station']
+    for i, code in enumerate(codes):
+        sid = stations[code]
+        if sid in ranges and ranges[sid][1] != i:
+            raise ValueError(f"linhas de {sid} não estão contíguas: ordene por estação antes de gravar")
+        ranges.setdefault(sid, [i, i])[1] = i + 1
+
+    header = {
+        'kind': kind,
+        'rows': len(codes),
+        'byteorder': sys.byteorder,
+        'created_at': time.time(),
+        'stations': stations,
+        'station_names': names,
+        'station_ranges': ranges,
+        'dicts': dicts,
+        'columns': [],
+    }
+    # Offsets dependem do tamanho do cabeçalho: reserva espaço e recalcula até estabilizar
+    blobs = [(name, col.typecode, col.tobytes()) for name, col in columns.items()]
+    reserve = 0
+    while True:
+        offset = len(MAGIC) + 4 + reserve
+        offset += _pad(offset)
+        header['columns'] = []
+        for name, typecode, blob in blobs:
+            header['columns'].append({'name': name, 'typecode': typecode, 'offset': offset})
+            offset += len(blob) + _pad(len(blob))
+        raw = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(raw) <= reserve:
+            break
+        reserve = len(raw) + 64
+
+    out = bytearray(MAGIC + struct.pack('<I', reserve) + raw.ljust(reserve, b' '))
+    for (name, typecode, blob), col in zip(blobs, header['columns']):
+        out += b'\0' * (col['offset'] - len(out))
+        out += blob
+    return bytes(out)
+
+
+def write_store(kind: str, rows: Iterable[Dict[str, Any]], directory: str = STORE_DIR) -> str:
+    """
+    Grava uma nova geração do store (<kind>-<ns>.col) e remove as antigas
+
+    Cada geração é um arquivo novo, nunca sobrescrito: leitores com mmap aberto
+    continuam válidos (no Windows não dá para substituir arquivo mapeado).
+    """
+    return write_encoded(kind, encode(kind, rows), directory)
+
+
+def write_encoded(kind: str, data: bytes, directory: str = STORE_DIR) -> str:
+    """Grava uma geração já codificada por encode (ver write_store)"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}-{time.time_ns()}.col")
+    atomic_write(path, data)
+    for old in _generations(kind, directory)[:-KEEP_GENERATIONS]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass    # ainda aberto por algum leitor (Windows): fica para a próxima
+    return path
+
+
+def _generations(kind: str, directory: str) -> List[str]:
+    def stamp(path):
+        try:
+            return int(os.path.basename(path)[len(kind) + 1:-4])
+        except ValueError:
+            return -1
+    return sorted(glob.glob(os.path.join(directory, f"{kind}-*.col")), key=stamp)
+
+
+def latest_path(kind: str, directory: str = STORE_DIR) -> Optional[str]:
+    generations = _generations(kind, directory)
+    return generations[-1] if generations else None
+
+
+# ---------------------------
+# Leitura
+# ---------------------------
+class ColumnarStore:
+    """
+    Leitor do store colunar (uma geração, por mmap)
+
+    Uso típico:
+        with ColumnarStore.open('tides') as store:
+            lo, hi = store.slice('BR_SSZ', datetime(2026, 1, 5), datetime(2026, 1, 6))
+            alturas = store.column('height')[lo:hi]          # float32, sem cópia
+            eventos = store.rows('BR_SSZ', date(2026, 1, 5))  # dicts decodificados
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: não é um store colunar")
+        (size,) = struct.unpack_from('<I', self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._mm[start:start + size].decode('utf-8'))
+        if self.header['byteorder'] != sys.byteorder:
+            self.close()
+            raise ValueError(f"{path}: gravado em máquina {self.header['byteorder']}-endian")
+
+        self.kind: str = self.header['kind']
+        self.n_rows: int = self.header['rows']
+        self.stations: List[str] = self.header['stations']
+        self.station_names: Dict[str, str] = self.header['station_names']
+        self.dicts: Dict[str, List[str]] = self.header['dicts']
+        self._ranges: Dict[str, List[int]] = self.header['station_ranges']
+        self._buffer = memoryview(self._mm)
+        self._columns: Dict[str, memoryview] = {}
+        for col in self.header['columns']:
+            itemsize = array(col['typecode']).itemsize
+            end = col['offset'] + itemsize * self.n_rows
+            self._columns[col['name']] = self._buffer[col['offset']:end].cast(col['typecode'])
+
+    @classmethod
+    def open(cls, kind: str, directory: str = STORE_DIR) -> 'ColumnarStore':
+        """Abre a geração mais recente do dataset ('tides' ou 'weather')"""
+        path = latest_path(kind, directory)
+        if path is None:
+            raise FileNotFoundError(f"store colunar '{kind}' não encontrado em {directory}")
+        return cls(path)
+
+    def close(self) -> None:
+        for view in getattr(self, '_columns', {}).values():
+            view.release()
+        self._columns = {}
+        if getattr(self, '_buffer', None) is not None:
+            self._buffer.release()
+            self._buffer = None
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> 'ColumnarStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def column(self, name: str) -> memoryview:
+        """Coluna inteira, sem cópia (memoryview tipado: 'H', 'i', 'f' ou 'B'/'H' nos dicionários)"""
+        return self._columns[name]
+
+    def station_range(self, station_id: str) -> Tuple[int, int]:
+        """[lo, hi) das linhas da estação ((0, 0) se ausente)"""
+        lo, hi = self._ranges.get(station_id, (0, 0))
+        return lo, hi
+
+    def slice(self, station_id: str, start: TimeLike = None, end: TimeLike = None) -> Tuple[int, int]:
+        """
+        [lo, hi) das linhas da estação com start <= horário < end
+
+        start / end: datetime, date (meia-noite) ou minutos desde a época; None = sem limite
+        """
+        lo, hi = self.station_range(station_id)
+        ts = self._columns['ts']
+        if start is not None:
+            lo = bisect.bisect_left(ts, self._minutes(start), lo, hi)
+        if end is not None:
+            hi = bisect.bisect_left(ts, self._minutes(end), lo, hi)
+        return lo, hi
+
+    def arrays(self, station_id: str, start: TimeLike = None, end: TimeLike = None) -> Dict[str, Any]:
+        """Fatias de todas as colunas (sem cópia; com NumPy instalado, np.ndarray)"""
+        lo, hi = self.slice(station_id, start, end)
+        out = {name: view[lo:hi] for name, view in self._columns.items() if name != 'station'}
+        if np is not None:
+            out = {name: np.frombuffer(view, dtype=view.format) for name, view in out.items()}
+        return out
+
+    def rows(self, station_id: str, start: TimeLike = None, end: TimeLike = None) -> List[Dict[str, Any]]:
+        """Linhas decodificadas (mesmas chaves do CSV, com 'ts' em datetime)"""
+        lo, hi = self.slice(station_id, start, end)
+        schema = SCHEMAS[self.kind]
+        ts = self._columns['ts']
+        out = []
+        for i in range(lo, hi):
+            moment = from_epoch_minutes(ts[i])
+            row = {'station_id': station_id, 'station_name': self.station_names.get(station_id, station_id),
+                   'ts': moment, 'date': moment.strftime('%d/%m/%Y'), 'time': f"{moment.hour}:{moment.minute:02d}"}
+            for name in schema['floats']:
+                row[name] = self._columns[name][i]
+            for name in schema['codes']:
+                row[name] = self.dicts[name][self._columns[name][i]]
+            out.append(row)
+        return out
+
+    @staticmethod
+    def _minutes(value: TimeLike) -> int:
+        return value if isinstance(value, int) else to_epoch_minutes(value)
+
+
+def build_from_csv(csv_path: str, kind: str, directory: str = STORE_DIR) -> str:
+    """Gera o store a partir de um CSV já gravado (uso avulso / dados antigos)"""
+    import csv
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    rows.sort(key=lambda r: (r.get('station_id', ''), _row_minutes(r.get('date'), r.get('time')) or 0))
+    return write_store(kind, rows, directory)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Uso: python columnar_store.py  (gera os stores a partir dos CSVs atuais)
+    for kind, filename in (('tides', 'tides_scraped.csv'), ('weather', 'weather_scraped.csv')):
+        source = os.path.join(SCRIPT_DIR, filename)
+        if os.path.exists(source):
+            logger.info(f"{filename} -> {build_from_csv(source, kind)}")
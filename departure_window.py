@@ -0,0 +1,208 @@
+"""
+Janelas de Saída (/api/voyage/departure-windows)
+Varre ETDs candidatos a cada step_min minutos pelo horizonte da previsão e,
+para cada um, calcula o ETA de todos os waypoints (mesma linha do tempo da
+route_timeline, com velocidade por perna), a maré na estação de destino na
+chegada (tide_engine) e o vento / ondas máximos ao longo da rota (amostra do
+weather_scraped.csv mais próxima no mesmo dia, como o voyage_timeline).
+Tudo em matrizes candidatos x waypoints (NumPy; sem NumPy, laços por
+candidato). Saídas viáveis consecutivas formam janelas, ordenadas pela
+duração; a saída sugerida é o meio da janela (mais folga para atrasos).
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import tide_engine
+import voyage_metocean
+from columnar_store import from_epoch_minutes, to_epoch_minutes
+from navmath import leg_table
+from voyage_metocean import DEFAULT_SPEED_KN, KMH_TO_KN, MAX_RADIUS_NM, REFERENCE_STATIONS, nearest_reference
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, laços em Python puro
+    np = None
+
+DEFAULT_STEP_MIN = 15
+DEFAULT_HORIZON_DAYS = 7      # sem dados para limitar o horizonte
+MAX_CANDIDATES = 20000
+
+
+def _offsets(lats: Sequence[float], lons: Sequence[float], speeds_kn) -> List[int]:
+    """Minutos da saída até cada waypoint (truncados como o to_epoch_minutes do voyage_timeline)"""
+    base = datetime(2000, 1, 1)
+    return [to_epoch_minutes(base + timedelta(hours=h)) - to_epoch_minutes(base)
+            for h in leg_table(lats, lons, speeds_kn).eta_h]
+
+
+def _horizon(dest: Optional[str], names: Sequence[str], tides, weather):
+    """(primeiro, último) minuto com dados de maré no destino e de tempo na rota; None sem dados"""
+    spans = []
+    st = tides.station(dest) if dest else None
+    if st is not None and len(st.ts):
+        spans.append((int(st.ts[0]), int(st.ts[-1])))
+    for name in names:
+        ts = weather.ts.get(name)
+        if ts:
+            spans.append((ts[0], ts[-1]))
+    if not spans:
+        return None
+    return max(s[0] for s in spans), min(s[1] for s in spans)
+
+
+def _windows(etd: List[int], feasible: List[bool], step_min: int) -> List[tuple]:
+    """Trechos consecutivos de saídas viáveis: (primeiro índice, último índice)"""
+    runs, first = [], None
+    for i, ok in enumerate(feasible):
+        if ok and first is None:
+            first = i
+        if first is not None and (not ok or i == len(feasible) - 1 or etd[i + 1] - etd[i] != step_min):
+            runs.append((first, i if ok else i - 1))
+            first = None
+    return runs
+
+
+def _none(values) -> List[Optional[float]]:
+    return [None if v is None or math.isnan(v) else round(v, 2) for v in values]
+
+
+def sweep(points: Sequence[Dict[str, float]], speeds_kn: Union[float, Sequence[float]] = DEFAULT_SPEED_KN,
+          start: datetime = None, end: datetime = None, step_min: int = DEFAULT_STEP_MIN,
+          min_tide_m: float = None, max_wind_kn: float = None, max_wave_m: float = None,
+          tides: tide_engine.TideEngine = None, weather: voyage_metocean.WeatherTable = None,
+          candidates: bool = False) -> Dict[str, Any]:
+    """
+    Janelas de saída viáveis, da mais longa para a mais curta
+
+    Args:
+        points: Rota ([{'lat', 'lon'}], pelo menos dois pontos)
+        speeds_kn: Velocidade constante ou uma por perna
+        start / end: Primeira e última saída (padrão: o horizonte com dados de
+            maré no destino e de tempo na rota, a partir de agora); ETDs em
+            múltiplos de step_min
+        min_tide_m: Maré mínima no destino na chegada
+        max_wind_kn / max_wave_m: Vento / onda máximos em todos os waypoints
+            costeiros (sem amostra no horário: saída não viável)
+        candidates: Devolve também a série de todos os candidatos (gráfico)
+
+    Raises:
+        ValueError: Rota curta, passo inválido, candidatos demais ou maré
+            mínima com destino sem estação a menos de MAX_RADIUS_NM
+    """
+    if len(points) < 2:
+        raise ValueError("a rota precisa de pelo menos dois pontos")
+    if step_min <= 0:
+        raise ValueError("step_min deve ser > 0")
+    tides = tides or tide_engine.get_engine()
+    weather = weather or voyage_metocean.get_weather()
+    lats = [float(p['lat']) for p in points]
+    lons = [float(p['lon']) for p in points]
+    offsets = _offsets(lats, lons, speeds_kn)
+
+    # Estação de referência de cada waypoint (só as costeiras, como o TideLocator)
+    ref_index, ref_dist = nearest_reference(lats, lons)
+    names = [REFERENCE_STATIONS[i].csv_name if d <= MAX_RADIUS_NM else None for i, d in zip(ref_index, ref_dist)]
+    dest = names[-1]
+    if min_tide_m is not None and (dest is None or tides.station(dest) is None):
+        raise ValueError(f"destino sem estação de maré a menos de {MAX_RADIUS_NM:.0f} NM")
+    groups: Dict[str, List[int]] = {}
+    for i, name in enumerate(names):
+        if name is not None:
+            groups.setdefault(name, []).append(i)
+
+    # Candidatos: do início (ou agora) ao fim do horizonte menos a travessia
+    span = _horizon(dest if min_tide_m is not None else None,
+                    list(groups) if max_wind_kn is not None or max_wave_m is not None else [], tides, weather)
+    if start is None:
+        now = to_epoch_minutes(datetime.now())
+        start_m = max(now, span[0]) if span else now
+    else:
+        start_m = to_epoch_minutes(start)
+    if end is None:
+        end_m = span[1] - offsets[-1] if span else start_m + DEFAULT_HORIZON_DAYS * 1440
+    else:
+        end_m = to_epoch_minutes(end)
+    start_m = -(-start_m // step_min) * step_min
+    n = max(0, (end_m - start_m) // step_min + 1)
+    if n > MAX_CANDIDATES:
+        raise ValueError(f"{n} saídas candidatas (máximo {MAX_CANDIDATES}); aumente step_min")
+    etd = [start_m + k * step_min for k in range(n)]
+
+    # Maré no destino na chegada
+    tide = [math.nan] * n
+    if dest is not None and tides.station(dest) is not None and n:
+        heights = tides.interpolate(dest, [from_epoch_minutes(m + offsets[-1]) for m in etd])['height']
+        tide = [math.nan if h is None else h for h in heights]
+
+    # Vento e ondas máximos nos waypoints costeiros: candidatos x waypoints
+    if np is not None:
+        eta = np.array(etd, dtype=np.int64)[:, None] + np.array(offsets, dtype=np.int64)[None, :]
+        wind = np.full(n, np.nan)
+        wave = np.full(n, np.nan)
+        for name, cols in groups.items():
+            idx = weather.closest_index(name, eta[:, cols])
+            found = idx >= 0
+            safe = np.maximum(idx, 0)
+            wind = np.fmax(wind, np.fmax.reduce(np.where(found, weather.series(name, 'wind_speed')[safe], np.nan),
+                                                axis=1) * KMH_TO_KN)
+            wave = np.fmax(wave, np.fmax.reduce(np.where(found, weather.series(name, 'wave_height')[safe], np.nan),
+                                                axis=1))
+        wind, wave = wind.tolist(), wave.tolist()
+    else:
+        wind, wave = [math.nan] * n, [math.nan] * n
+        for name, cols in groups.items():
+            for k, m in enumerate(etd):
+                for sample in weather.closest(name, [m + offsets[i] for i in cols]):
+                    if sample is None:
+                        continue
+                    kmh, h = voyage_metocean._float(sample['wind_speed']), voyage_metocean._float(sample['wave_height'])
+                    if kmh is not None:
+                        wind[k] = max(kmh * KMH_TO_KN, wind[k]) if not math.isnan(wind[k]) else kmh * KMH_TO_KN
+                    if h is not None:
+                        wave[k] = max(h, wave[k]) if not math.isnan(wave[k]) else h
+
+    # NaN (sem dado) nunca passa num limite pedido
+    feasible = [(min_tide_m is None or t >= min_tide_m)
+                and (max_wind_kn is None or w <= max_wind_kn)
+                and (max_wave_m is None or v <= max_wave_m)
+                for t, w, v in zip(tide, wind, wave)]
+
+    def iso(m):
+        return from_epoch_minutes(m).isoformat(timespec='minutes')
+
+    windows = []
+    for first, last in _windows(etd, feasible, step_min):
+        best = (first + last) // 2
+        cand = range(first, last + 1)
+        windows.append({
+            'start': iso(etd[first]), 'end': iso(etd[last]),
+            'duration_h': round((etd[last] - etd[first]) / 60, 2),
+            'best_etd': iso(etd[best]), 'best_eta': iso(etd[best] + offsets[-1]),
+            'arrival_tide_m': _none([tide[best]])[0],
+            'max_wind_kn': _none([wind[best]])[0],
+            'max_wave_m': _none([wave[best]])[0],
+            'worst_tide_m': _none([min(tide[k] for k in cand)])[0],
+            'worst_wind_kn': _none([max(wind[k] for k in cand)])[0],
+        })
+    windows.sort(key=lambda w: (-w['duration_h'], w['start']))
+    for rank, w in enumerate(windows, 1):
+        w['rank'] = rank
+
+    result = {
+        'start': iso(start_m) if n else None, 'end': iso(etd[-1]) if n else None,
+        'step_min': step_min, 'n_candidates': n, 'n_feasible': sum(feasible),
+        'duration_h': round(offsets[-1] / 60, 2),
+        'dest_station': dest,
+        'limits': {'min_tide_m': min_tide_m, 'max_wind_kn': max_wind_kn, 'max_wave_m': max_wave_m},
+        'windows': windows,
+    }
+    if candidates:
+        result['candidates'] = {
+            'etd': [iso(m) for m in etd], 'arrival_tide_m': _none(tide),
+            'max_wind_kn': _none(wind), 'max_wave_m': _none(wave), 'feasible': feasible,
+        }
+    return result
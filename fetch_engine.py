@@ -0,0 +1,303 @@
+"""
+Motor de Coleta Concorrente (Fetch Engine)
+Pool de threads compartilhado pelos coletores de marés e meteorologia, com
+limite de conexões simultâneas por host e limitador de taxa (token bucket)
+para manter a coleta educada com a fonte, e timeouts, novas tentativas e
+disjuntor por host (resilience.py) para não travar quando ela falha.
+Opcionalmente grava as páginas ou as serve de um arquivo local (page_archive.py).
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from http_cache import ResponseCache
+from page_archive import PageArchive
+from resilience import BreakerRegistry, RetryPolicy, Timeout, send_with_retries
+
+logger = logging.getLogger(__name__)
+
+# Padrões de coleta (ajustáveis por instância)
+MAX_WORKERS = 8          # threads do pool
+PER_HOST_LIMIT = 4       # conexões simultâneas por host
+RATE_PER_SECOND = 6.0    # requisições por segundo (média) por host
+BURST = 6                # rajada máxima permitida pelo token bucket
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Language': 'pt-BR,pt;q=0.9',
+}
+
+
+class TokenBucket:
+    """Limitador de taxa clássico: repõe `rate` fichas por segundo até `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Bloqueia até haver fichas disponíveis
+
+        Returns:
+            Tempo (s) esperado pela ficha
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                deficit = (tokens - self._tokens) / self.rate
+            time.sleep(deficit)
+            waited += deficit
+
+
+@dataclass
+class StationTiming:
+    """Estatísticas de tempo de uma estação (ou qualquer chave de tarefa)"""
+    station: str
+    requests: int = 0
+    retries: int = 0        # novas tentativas após falha temporária
+    cache_hits: int = 0     # servidas do disco sem rede (dentro do TTL)
+    revalidated: int = 0    # 304 Not Modified
+    replayed: int = 0       # servidas do arquivo de páginas (modo replay)
+    bytes: int = 0
+    wait_s: float = 0.0     # tempo aguardando limite de host / token bucket
+    fetch_s: float = 0.0    # tempo em rede
+    total_s: float = 0.0    # tempo total da tarefa (rede + parsing)
+    ok: bool = True
+    error: str = ''
+
+
+class FetchEngine:
+    """
+    Executa as coletas das estações em paralelo respeitando a fonte
+
+    Uso típico:
+        engine = FetchEngine()
+        results = engine.run(STATIONS_MAP, coletar_estacao, key=lambda st: st['id'])
+        engine.log_stats()
+
+    Dentro de `coletar_estacao`, todas as chamadas a `engine.get(url)` passam
+    pelo limite por host e pelo token bucket e são contabilizadas na estação.
+    Com `cache`, páginas dentro do TTL nem chegam à rede e as demais são
+    revalidadas com If-None-Match / If-Modified-Since. Falhas temporárias
+    (rede, timeout, 5xx, 429) são repetidas com backoff e, depois de falhas
+    seguidas, o disjuntor do host faz as próximas requisições falharem na hora.
+    Com `archive` em modo record, cada página entregue aos coletores é gravada;
+    em modo replay, as páginas vêm só do arquivo (sem cache nem rede).
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, per_host: int = PER_HOST_LIMIT,
+                 rate_per_s: float = RATE_PER_SECOND, burst: float = BURST,
+                 headers: Dict[str, str] = None, timeout: Timeout = None,
+                 cache: Optional[ResponseCache] = None, retry: Optional[RetryPolicy] = None,
+                 breakers: Optional[BreakerRegistry] = None, archive: Optional[PageArchive] = None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self.timeout = timeout      # None: timeouts da política (conexão, leitura)
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.breakers = breakers or BreakerRegistry()
+        self.archive = archive
+
+        self.stats: Dict[str, StationTiming] = {}
+        self._stats_lock = threading.Lock()
+        self._hosts_lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_buckets: Dict[str, TokenBucket] = {}
+        self._local = threading.local()
+
+    # ---------------------------
+    # Infra por host / por thread
+    # ---------------------------
+    def _limits_for(self, host: str):
+        with self._hosts_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+                self._host_buckets[host] = TokenBucket(self.rate_per_s, self.burst)
+            return self._host_slots[host], self._host_buckets[host]
+
+    def _session(self) -> requests.Session:
+        # requests.Session não é garantidamente thread-safe: uma por thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def _timing(self, station: Optional[str]) -> Optional[StationTiming]:
+        if station is None:
+            return None
+        with self._stats_lock:
+            if station not in self.stats:
+                self.stats[station] = StationTiming(station=station)
+            return self.stats[station]
+
+    # ---------------------------
+    # API pública
+    # ---------------------------
+    def get(self, url: str, headers: Dict[str, str] = None, timeout: Timeout = None,
+            station: str = None) -> requests.Response:
+        """
+        GET educado: consulta o cache, aguarda vaga no host e ficha do token bucket
+        (ou, em modo replay, responde do arquivo de páginas)
+
+        Args:
+            url: Endereço a baixar
+            headers: Cabeçalhos extras (sobrepõem os padrões da sessão)
+            timeout: Timeout em segundos ou (conexão, leitura) (padrão do motor)
+            station: Chave para estatísticas (padrão: tarefa corrente de run())
+
+        Returns:
+            requests.Response ou http_cache.CachedResponse (mesma interface usada
+            pelos coletores); o chamador decide sobre raise_for_status
+
+        Raises:
+            resilience.CircuitOpenError: host com disjuntor aberto
+            page_archive.ArchiveMiss: modo replay e URL fora do arquivo
+        """
+        station = station if station is not None else getattr(self._local, 'station', None)
+        timing = self._timing(station)
+
+        if self.archive is not None and self.archive.replaying:
+            response = self.archive.respond(url)
+            self._count(timing, replayed=1, bytes=len(response.content))
+            return response
+
+        response = self._cached_or_network_get(url, headers, timeout, timing)
+        if self.archive is not None and self.archive.recording:
+            self.archive.record(url, response)
+        return response
+
+    def _cached_or_network_get(self, url: str, headers: Optional[Dict[str, str]], timeout: Timeout,
+                               timing: Optional[StationTiming]) -> requests.Response:
+        cache_meta = self.cache.lookup(url) if self.cache is not None else None
+        if cache_meta is not None:
+            if self.cache.is_fresh(cache_meta):
+                cached = self.cache.respond(url, cache_meta)
+                if cached is not None:
+                    self._count(timing, cache_hits=1)
+                    return cached
+            headers = {**(headers or {}), **self.cache.conditional_headers(cache_meta)}
+
+        response = self._network_get(url, headers, timeout, timing)
+
+        if self.cache is not None:
+            if response.status_code == 304 and cache_meta is not None:
+                cached = self.cache.respond(url, cache_meta, revalidated=True)
+                if cached is not None:
+                    self._count(timing, revalidated=1)
+                    return cached
+                # Corpo em cache ilegível: baixa de novo sem condicionais
+                plain = {k: v for k, v in headers.items() if k not in ('If-None-Match', 'If-Modified-Since')}
+                response = self._network_get(url, plain, timeout, timing)
+            if response.status_code == 200:
+                self.cache.store(url, response)
+        return response
+
+    def _network_get(self, url: str, headers: Optional[Dict[str, str]], timeout: Timeout,
+                     timing: Optional[StationTiming]) -> requests.Response:
+        slots, bucket = self._limits_for(urlsplit(url).netloc)
+
+        def attempt(timeouts):
+            # Cada tentativa ocupa vaga e ficha; o backoff acontece fora da vaga
+            t0 = time.monotonic()
+            with slots:
+                bucket.acquire()
+                t1 = time.monotonic()
+                try:
+                    return self._session().get(url, headers=headers, timeout=timeouts)
+                finally:
+                    t2 = time.monotonic()
+                    self._count(timing, requests=1, wait_s=t1 - t0, fetch_s=t2 - t1)
+
+        response = send_with_retries(url, attempt, policy=self.retry, breakers=self.breakers,
+                                     timeout=timeout or self.timeout,
+                                     on_retry=lambda n, reason: self._count(timing, retries=1))
+        self._count(timing, bytes=len(response.content or b''))
+        return response
+
+    def _count(self, timing: Optional[StationTiming], **deltas) -> None:
+        if timing is None:
+            return
+        with self._stats_lock:
+            for field, delta in deltas.items():
+                setattr(timing, field, getattr(timing, field) + delta)
+
+    def memo_parse(self, url: str, section: str, key: str, parse: Callable[[], Any],
+                   dump: Callable[[Any], Any] = None, load: Callable[[Any], Any] = None) -> Any:
+        """Parsing memorizado pelo hash da seção (ver ResponseCache.memo_parse); sem cache, só parse()"""
+        if self.cache is None:
+            return parse()
+        return self.cache.memo_parse(url, section, key, parse, dump=dump, load=load)
+
+    def run(self, items: Iterable[Any], func: Callable[[Any], Any],
+            key: Callable[[Any], str] = str) -> List[Any]:
+        """
+        Executa func(item) para cada item no pool de threads
+
+        Exceções de uma tarefa não derrubam as demais: são registradas nas
+        estatísticas e o resultado correspondente fica None.
+
+        Returns:
+            Resultados na mesma ordem de `items`
+        """
+        items = list(items)
+
+        def task(item):
+            station = key(item)
+            timing = self._timing(station)
+            self._local.station = station
+            t0 = time.monotonic()
+            try:
+                return func(item)
+            except Exception as e:
+                logger.error(f"Falha na coleta de {station}: {e}")
+                timing.ok = False
+                timing.error = str(e)
+                return None
+            finally:
+                timing.total_s += time.monotonic() - t0
+                self._local.station = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(task, items))
+
+        if self.cache is not None:
+            self.cache.evict()
+        return results
+
+    def log_stats(self) -> None:
+        """Registra no log o tempo de cada estação e o total de requisições"""
+        with self._stats_lock:
+            timings = sorted(self.stats.values(), key=lambda t: -t.total_s)
+        for t in timings:
+            status = 'OK' if t.ok else f'ERRO ({t.error})'
+            logger.info(f"  {t.station:<28} {t.requests:>2} req  {t.retries:>2} retry  {t.cache_hits:>2} cache  {t.revalidated:>2} 304  "
+                        f"{t.bytes / 1024:>7.1f} KiB  "
+                        f"espera {t.wait_s:5.2f}s  rede {t.fetch_s:5.2f}s  total {t.total_s:5.2f}s  {status}")
+        logger.info(f"Total: {sum(t.requests for t in timings)} requisições "
+                    f"({sum(t.cache_hits for t in timings)} do cache, {sum(t.revalidated for t in timings)} revalidadas, "
+                    f"{sum(t.retries for t in timings)} novas tentativas, {sum(t.replayed for t in timings)} do arquivo) "
+                    f"em {len(timings)} estações")
@@ -0,0 +1,269 @@
+"""
+Índice Espacial de Estações, Portos, Faróis e Abrigos
+KD-tree sobre vetores unitários da esfera (x, y, z), montada uma vez por
+camada quando os arquivos são carregados, com consultas dos k mais próximos
+e de todos dentro de um raio em milhas náuticas. Substitui as varreduras
+lineares do TideLocator.findNearest, do findClosestPortId (App.autoFindRoute)
+e do App.getNearestLighthouse; atende a rota /api/nearest.
+Camadas:
+- stations: estações de referência do TideLocator (voyage_metocean.REFERENCE_STATIONS)
+- ports: js/services/PortDatabase.js
+- lighthouses: library/LIGHTHOUSES.txt (coordenadas em graus e minutos)
+- shelters: library/SHELTERS.txt (só as linhas com colunas LAT/LON)
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from navmath import EARTH_RADIUS_NM
+from voyage_metocean import REFERENCE_STATIONS
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LIGHTHOUSES_FILE = os.path.join(SCRIPT_DIR, 'library', 'LIGHTHOUSES.txt')
+SHELTERS_FILE = os.path.join(SCRIPT_DIR, 'library', 'SHELTERS.txt')
+PORTS_FILE = os.path.join(SCRIPT_DIR, 'js', 'services', 'PortDatabase.js')
+
+Feature = Dict[str, Any]   # {'id', 'name', 'lat', 'lon', ...}
+
+
+# ---------------------------
+# Geometria
+# ---------------------------
+def to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def chord_to_nm(chord2: float) -> float:
+    """Corda ao quadrado (esfera unitária) -> distância de círculo máximo em NM"""
+    return 2 * math.asin(min(1.0, math.sqrt(chord2) / 2)) * EARTH_RADIUS_NM
+
+
+def nm_to_chord2(dist_nm: float) -> float:
+    angle = min(dist_nm / EARTH_RADIUS_NM, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2
+
+
+def parse_dms(value: str) -> Optional[float]:
+    """"04°25.86' N" -> 4.431 (mesma regra do NavMath.parseDMS; None se ilegível)"""
+    if not value:
+        return None
+    clean = re.sub(r"[°'\"]", ' ', value).strip().upper()
+    factor = -1 if ('S' in clean or 'W' in clean) else 1
+    parts = re.sub(r'[NSEW]', '', clean).split()
+    try:
+        numbers = [float(p) for p in parts[:3]]
+    except ValueError:
+        return None
+    if not numbers:
+        return None
+    numbers += [0.0] * (3 - len(numbers))
+    return factor * (numbers[0] + numbers[1] / 60 + numbers[2] / 3600)
+
+
+# ---------------------------
+# KD-tree
+# ---------------------------
+class KDTree:
+    """
+    KD-tree 3D (pontos na esfera unitária)
+
+    Distância euclidiana (corda) é monotônica com a de círculo máximo, então
+    os vizinhos da árvore são os mesmos da haversine.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float, float]]):
+        self.points = list(points)
+        # Nó: (índice do ponto, eixo, filho esquerdo, filho direito); -1 = vazio
+        self.nodes: List[Tuple[int, int, int, int]] = []
+        self.root = self._build(list(range(len(self.points))), 0)
+
+    def _build(self, idx: List[int], depth: int) -> int:
+        if not idx:
+            return -1
+        # Eixo de maior espalhamento (as costas são quase planas em um dos eixos)
+        axis = max(range(3), key=lambda a: max(self.points[i][a] for i in idx) - min(self.points[i][a] for i in idx))
+        idx.sort(key=lambda i: self.points[i][axis])
+        mid = len(idx) // 2
+        node = len(self.nodes)
+        self.nodes.append((idx[mid], axis, -1, -1))
+        left = self._build(idx[:mid], depth + 1)
+        right = self._build(idx[mid + 1:], depth + 1)
+        self.nodes[node] = (idx[mid], axis, left, right)
+        return node
+
+    @staticmethod
+    def _d2(a, b) -> float:
+        return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+    def knn(self, q: Tuple[float, float, float], k: int = 1) -> List[Tuple[float, int]]:
+        """[(corda², índice)] dos k mais próximos, do mais perto para o mais longe"""
+        heap: List[Tuple[float, int]] = []   # max-heap por -corda²
+        stack = [self.root] if self.root >= 0 else []
+        while stack:
+            node = stack.pop()
+            i, axis, left, right = self.nodes[node]
+            d2 = self._d2(q, self.points[i])
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, -i))
+            elif d2 < -heap[0][0] or (d2 == -heap[0][0] and i < -heap[0][1]):
+                heapq.heapreplace(heap, (-d2, -i))
+            diff = q[axis] - self.points[i][axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Empilha o lado distante primeiro: o próximo visitado é o lado do ponto
+            if far >= 0 and (len(heap) < k or diff * diff <= -heap[0][0]):
+                stack.append(far)
+            if near >= 0:
+                stack.append(near)
+        return sorted((-d, -i) for d, i in heap)
+
+    def within(self, q: Tuple[float, float, float], chord2: float) -> List[Tuple[float, int]]:
+        """[(corda², índice)] de todos a até chord2, do mais perto para o mais longe"""
+        out = []
+        stack = [self.root] if self.root >= 0 else []
+        while stack:
+            node = stack.pop()
+            i, axis, left, right = self.nodes[node]
+            d2 = self._d2(q, self.points[i])
+            if d2 <= chord2:
+                out.append((d2, i))
+            diff = q[axis] - self.points[i][axis]
+            if left >= 0 and (diff < 0 or diff * diff <= chord2):
+                stack.append(left)
+            if right >= 0 and (diff >= 0 or diff * diff <= chord2):
+                stack.append(right)
+        return sorted(out)
+
+
+class GeoIndex:
+    """Uma camada (lista de features com lat/lon) indexada"""
+
+    def __init__(self, name: str, features: Sequence[Feature]):
+        self.name = name
+        self.features = [f for f in features if f.get('lat') is not None and f.get('lon') is not None]
+        self.tree = KDTree([to_xyz(f['lat'], f['lon']) for f in self.features])
+
+    def _match(self, d2: float, i: int) -> Feature:
+        return {**self.features[i], 'distance_nm': round(chord_to_nm(d2), 3)}
+
+    def nearest(self, lat: float, lon: float, k: int = 1, radius_nm: float = None) -> List[Feature]:
+        """k mais próximos (opcionalmente só os dentro de radius_nm)"""
+        found = self.tree.knn(to_xyz(lat, lon), k)
+        if radius_nm is not None:
+            limit = nm_to_chord2(radius_nm)
+            found = [(d2, i) for d2, i in found if d2 <= limit]
+        return [self._match(d2, i) for d2, i in found]
+
+    def within(self, lat: float, lon: float, radius_nm: float) -> List[Feature]:
+        """Todos a até radius_nm, do mais perto para o mais longe"""
+        return [self._match(d2, i) for d2, i in self.tree.within(to_xyz(lat, lon), nm_to_chord2(radius_nm))]
+
+
+# ---------------------------
+# Camadas
+# ---------------------------
+def _read_tsv(path: str) -> List[Dict[str, str]]:
+    """Arquivos da biblioteca: TSV com cabeçalho (NAME, ...)"""
+    with open(path, encoding='utf-8') as f:
+        lines = [line.rstrip('\r\n') for line in f if line.strip()]
+    header = [h.strip().upper() for h in lines[0].split('\t')]
+    return [dict(zip(header, (p.strip() for p in line.split('\t')))) for line in lines[1:]]
+
+
+def load_lighthouses(path: str = LIGHTHOUSES_FILE) -> List[Feature]:
+    out = []
+    for n, row in enumerate(_read_tsv(path)):
+        lat, lon = parse_dms(row.get('LAT')), parse_dms(row.get('LON'))
+        if lat is None or lon is None:
+            continue
+        out.append({'id': f"LH{n:03d}", 'name': row.get('NAME', ''), 'lat': lat, 'lon': lon,
+                    'lat_dms': row.get('LAT'), 'lon_dms': row.get('LON'),
+                    'char': row.get('CHARACTERISTIC', ''), 'desc': row.get('DESCRIPTION', '')})
+    return out
+
+
+def load_shelters(path: str = SHELTERS_FILE) -> List[Feature]:
+    """Abrigos; entram no índice só os que têm LAT/LON (graus decimais ou graus e minutos)"""
+    out = []
+    for n, row in enumerate(_read_tsv(path)):
+        lat, lon = row.get('LAT'), row.get('LON')
+        out.append({'id': f"SH{n:03d}", 'name': row.get('NAME', ''), 'type': row.get('TYPE', ''),
+                    'details': row.get('DETAILS', ''),
+                    'lat': parse_dms(lat) if lat else None, 'lon': parse_dms(lon) if lon else None})
+    return out
+
+
+_PORT_RE = re.compile(r"\{\s*id:\s*'([^']+)',\s*name:\s*'([^']+)',\s*lat:\s*(-?[\d.]+),\s*lon:\s*(-?[\d.]+)"
+                      r"(?:,\s*csvName:\s*'([^']*)')?")
+
+
+def load_ports(path: str = PORTS_FILE) -> List[Feature]:
+    """Portos do PortDatabase.js (fonte única, também usada pelo frontend)"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return [{'id': m.group(1), 'name': m.group(2), 'lat': float(m.group(3)), 'lon': float(m.group(4)),
+             'csv_name': m.group(5)} for m in _PORT_RE.finditer(text)]
+
+
+def load_stations() -> List[Feature]:
+    return [{'id': st.id, 'name': st.name, 'lat': st.lat, 'lon': st.lon, 'csv_name': st.csv_name}
+            for st in REFERENCE_STATIONS]
+
+
+LAYERS = {
+    'stations': (load_stations, ()),
+    'ports': (load_ports, (PORTS_FILE,)),
+    'lighthouses': (load_lighthouses, (LIGHTHOUSES_FILE,)),
+    'shelters': (load_shelters, (SHELTERS_FILE,)),
+}
+
+_indexes: Dict[str, GeoIndex] = {}
+_stamps: Dict[str, Tuple] = {}
+_lock = threading.Lock()
+
+
+def get_index(layer: str) -> GeoIndex:
+    """
+    Índice da camada, montado na primeira consulta e refeito quando o arquivo muda
+
+    Raises:
+        KeyError: Camada desconhecida
+    """
+    loader, files = LAYERS[layer]
+    stamp = tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in files)
+    with _lock:
+        if layer not in _indexes or _stamps[layer] != stamp:
+            _indexes[layer] = GeoIndex(layer, loader())
+            _stamps[layer] = stamp
+            logger.info(f"Índice espacial '{layer}': {len(_indexes[layer].features)} pontos")
+        return _indexes[layer]
+
+
+def nearest_batch(points: Sequence[Dict[str, float]], layers: Sequence[str] = ('stations',), k: int = 1,
+                  radius_nm: float = None) -> List[Dict[str, List[Feature]]]:
+    """
+    Para cada ponto, as features mais próximas de cada camada
+
+    k: quantos por camada; com radius_nm, só os dentro do raio (k=0: todos os do raio)
+    """
+    indexes = [get_index(layer) for layer in layers]
+    out = []
+    for p in points:
+        lat, lon = float(p['lat']), float(p['lon'])
+        result = {}
+        for index in indexes:
+            if k <= 0 and radius_nm is not None:
+                result[index.name] = index.within(lat, lon, radius_nm)
+            else:
+                result[index.name] = index.nearest(lat, lon, max(k, 1), radius_nm)
+        out.append(result)
+    return out
@@ -0,0 +1,323 @@
+"""
+Extração de Texto HTML com Backend Plugável
+Os parsers só precisam do texto de poucos blocos da página (tabela de marés,
+blocos f_text_tiempo, cabeçalhos de data). O backend "fast" extrai esse texto em
+streaming sobre html.parser.HTMLParser, sem montar árvore; o backend "bs4"
+(BeautifulSoup) continua disponível como referência e fallback.
+As duas implementações devolvem as mesmas estruturas leves (Block / TableRow),
+com get_text() de mesma semântica do BeautifulSoup.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import os
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Backend padrão: SISNAV_PARSER=bs4 força o BeautifulSoup
+PARSER_BACKEND = os.environ.get('SISNAV_PARSER', 'fast')
+
+# Elementos sem conteúdo (nunca ficam abertos na pilha)
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+}
+# Conteúdo ignorado pelo get_text() do BeautifulSoup
+SKIP_CONTENT = {'script', 'style', 'template'}
+
+ClassPredicate = Callable[[str], bool]
+
+
+@dataclass
+class Block:
+    """Texto de um elemento capturado (equivalente leve a um Tag do bs4)"""
+    tag: str
+    classes: List[str] = field(default_factory=list)
+    pieces: List[str] = field(default_factory=list)   # strings na ordem do documento
+    markup: str = ''                                  # tags de abertura + texto (para buscas por substring)
+
+    def get_text(self, separator: str = '', strip: bool = False) -> str:
+        if strip:
+            return separator.join(p.strip() for p in self.pieces if p.strip())
+        return separator.join(self.pieces)
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    def get(self, attr: str, default=None):
+        if attr == 'class':
+            return self.classes or default
+        return default
+
+
+@dataclass
+class TableRow(Block):
+    cells: List[Block] = field(default_factory=list)
+
+
+def _class_matches(classes: List[str], predicate: ClassPredicate) -> bool:
+    """Mesma regra do bs4 para class_: qualquer classe isolada ou o atributo inteiro"""
+    if not classes:
+        return False
+    if any(predicate(c) for c in classes):
+        return True
+    return len(classes) > 1 and predicate(' '.join(classes))
+
+
+# ---------------------------
+# Backend rápido (streaming)
+# ---------------------------
+class _StopParsing(Exception):
+    pass
+
+
+class _StreamingExtractor(HTMLParser):
+    """
+    Percorre o HTML uma vez, mantendo apenas a pilha de tags abertas
+
+    Cada elemento aceito por `want(tag, classes, open_captures)` vira um Block
+    que recebe todo o texto dos seus descendentes. `page` acumula o texto da
+    página inteira quando solicitado.
+    """
+
+    def __init__(self, want=None, collect_page: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.want = want
+        self.page: Optional[List[str]] = [] if collect_page else None
+        self.captured: List[Block] = []
+        self.ancestors: List[Tuple[int, ...]] = []   # índices capturados que envolvem cada captura
+        self._stack: List[Tuple[str, Optional[int]]] = []
+        self._open: List[int] = []
+        self._skip = 0
+
+    # Pilha no estilo do construtor html.parser do bs4: fechamento sem abertura
+    # correspondente é ignorado; fechamento de tag mais externa fecha as internas.
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            self.handle_startendtag(tag, attrs)
+            return
+        self._mark(tag)
+        cap = self._capture(tag, attrs)
+        self._stack.append((tag, cap))
+        if cap is not None:
+            self._open.append(cap)
+        if tag in SKIP_CONTENT:
+            self._skip += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._mark(tag)
+        cap = self._capture(tag, attrs)
+        if cap is not None:
+            self._close(cap)
+
+    def handle_endtag(self, tag):
+        for pos in range(len(self._stack) - 1, -1, -1):
+            if self._stack[pos][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > pos:
+            name, cap = self._stack.pop()
+            if name in SKIP_CONTENT:
+                self._skip -= 1
+            if cap is not None:
+                self._open.remove(cap)
+                self._close(cap)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self.page is not None:
+            self.page.append(data)
+        for cap in self._open:
+            block = self.captured[cap]
+            block.pieces.append(data)
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> entra no get_text() do bs4
+        if data.startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+
+    def _mark(self, tag) -> None:
+        """Tags de abertura dos descendentes entram no markup dos blocos abertos"""
+        if self._open:
+            starttag = self.get_starttag_text() or ''
+            for cap in self._open:
+                self.captured[cap].markup += starttag
+
+    def _capture(self, tag, attrs) -> Optional[int]:
+        if self.want is None:
+            return None
+        classes = []
+        for name, value in attrs:
+            if name == 'class' and value:
+                classes = value.split()
+        if not self.want(tag, classes, self._open):
+            return None
+        starttag = self.get_starttag_text() or ''
+        block = TableRow(tag=tag, classes=classes, markup=starttag) if tag == 'tr' else Block(tag=tag, classes=classes, markup=starttag)
+        self.captured.append(block)
+        self.ancestors.append(tuple(self._open))
+        return len(self.captured) - 1
+
+    def _close(self, cap: int) -> None:
+        block = self.captured[cap]
+        block.markup += ''.join(block.pieces)
+
+    def run(self, html: str) -> '_StreamingExtractor':
+        try:
+            self.feed(html)
+            self.close()
+        except _StopParsing:
+            pass
+        return self
+
+
+class _TableExtractor(_StreamingExtractor):
+    """Primeiro <h1> e primeira <table>, com as linhas e células dela"""
+
+    def __init__(self):
+        super().__init__(want=self._want)
+        self.h1: Optional[int] = None
+        self.table: Optional[int] = None
+
+    def _want(self, tag, _classes, open_caps):
+        if tag == 'h1':
+            return self.h1 is None
+        if tag == 'table':
+            return self.table is None
+        if tag in ('tr', 'td'):
+            return self.table is not None and self.table in open_caps
+        return False
+
+    def _capture(self, tag, attrs):
+        cap = super()._capture(tag, attrs)
+        if cap is not None:
+            if tag == 'h1' and self.h1 is None:
+                self.h1 = cap
+            elif tag == 'table' and self.table is None:
+                self.table = cap
+        return cap
+
+    def _close(self, cap):
+        super()._close(cap)
+        # O resto da página não interessa depois da tabela (e do título)
+        if cap == self.table and self.h1 is not None:
+            raise _StopParsing()
+
+
+class FastBackend:
+    """Extração em streaming sobre html.parser (sem árvore)"""
+
+    name = 'fast'
+
+    def page_text(self, html: str, separator: str = '\n') -> str:
+        """Equivale a BeautifulSoup(html, 'html.parser').get_text(separator, strip=True)"""
+        page = _StreamingExtractor(collect_page=True).run(html).page
+        return separator.join(p.strip() for p in page if p.strip())
+
+    def find_blocks(self, html: str, tag: str, predicates: Dict[str, ClassPredicate]) -> Dict[str, List[Block]]:
+        """
+        Equivale a {nome: soup.find_all(tag, class_=pred)} numa única passada
+
+        Um elemento pode entrar em mais de uma lista se casar com vários predicados.
+        """
+        owners: List[List[str]] = []
+
+        def want(t, classes, _open):
+            if t != tag:
+                return False
+            names = [name for name, pred in predicates.items() if _class_matches(classes, pred)]
+            if names:
+                owners.append(names)
+                return True
+            return False
+
+        extractor = _StreamingExtractor(want=want).run(html)
+        found: Dict[str, List[Block]] = {name: [] for name in predicates}
+        for block, names in zip(extractor.captured, owners):
+            for name in names:
+                found[name].append(block)
+        return found
+
+    def first_table(self, html: str) -> Tuple[Optional[str], List[TableRow]]:
+        """
+        Texto do primeiro <h1> e linhas (com células) da primeira <table>
+
+        Equivale a soup.find('h1'), soup.find('table').find_all('tr') e
+        row.find_all('td'); a leitura para assim que a tabela fecha.
+        """
+        extractor = _TableExtractor().run(html)
+
+        h1 = extractor.captured[extractor.h1].text if extractor.h1 is not None else None
+        table = extractor.table
+        if table is None:
+            return h1, []
+
+        rows: List[TableRow] = []
+        row_index: Dict[int, TableRow] = {}
+        for idx, block in enumerate(extractor.captured):
+            if table not in extractor.ancestors[idx]:
+                continue
+            if block.tag == 'tr':
+                rows.append(block)
+                row_index[idx] = block
+            elif block.tag == 'td':
+                for anc in extractor.ancestors[idx]:
+                    if anc in row_index:
+                        row_index[anc].cells.append(block)
+        return h1, rows
+
+
+# ---------------------------
+# Backend BeautifulSoup (referência / fallback)
+# ---------------------------
+class SoupBackend:
+    """Mesma interface sobre a árvore completa do BeautifulSoup"""
+
+    name = 'bs4'
+
+    @staticmethod
+    def _soup(html: str):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(html, 'html.parser')
+
+    @staticmethod
+    def _block(el, cls=Block) -> Block:
+        return cls(tag=el.name, classes=list(el.get('class') or []), pieces=list(el.strings), markup=str(el))
+
+    def page_text(self, html: str, separator: str = '\n') -> str:
+        return self._soup(html).get_text(separator, strip=True)
+
+    def find_blocks(self, html: str, tag: str, predicates: Dict[str, ClassPredicate]) -> Dict[str, List[Block]]:
+        soup = self._soup(html)
+        return {
+            name: [self._block(el) for el in soup.find_all(tag, class_=lambda c, p=pred: bool(c) and p(c))]
+            for name, pred in predicates.items()
+        }
+
+    def first_table(self, html: str) -> Tuple[Optional[str], List[TableRow]]:
+        soup = self._soup(html)
+        h1 = soup.find('h1')
+        h1_text = h1.text if h1 else None
+        table = soup.find('table')
+        if not table:
+            return h1_text, []
+        rows = []
+        for tr in table.find_all('tr'):
+            row = self._block(tr, TableRow)
+            row.cells = [self._block(td) for td in tr.find_all('td')]
+            rows.append(row)
+        return h1_text, rows
+
+
+_BACKENDS = {'fast': FastBackend(), 'bs4': SoupBackend()}
+
+
+def get_backend(name: str = None):
+    """Backend pelo nome ('fast' | 'bs4'); padrão PARSER_BACKEND. Nome desconhecido cai no bs4."""
+    if name is not None and not isinstance(name, str):
+        return name
+    return _BACKENDS.get(name or PARSER_BACKEND, _BACKENDS['bs4'])
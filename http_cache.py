@@ -0,0 +1,282 @@
+"""
+Cache HTTP em Disco para os Coletores
+Guarda as páginas baixadas (gzip) com ETag / Last-Modified, responde direto do
+disco dentro do TTL e revalida com requisição condicional depois dele.
+Também memoriza o resultado do parsing por hash da seção relevante da página,
+evitando rodar o BeautifulSoup de novo quando o conteúdo não mudou.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, 'data', 'http_cache')
+DEFAULT_TTL_S = 3 * 3600             # previsões do site mudam a cada ~6h
+MAX_CACHE_BYTES = 64 * 1024 * 1024   # teto do diretório antes da evicção
+
+_SCRIPT_RE = re.compile(r'<script\b.*?</script\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Grava via arquivo temporário + os.replace (leitores nunca veem arquivo pela metade)"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def extract_section(html: str, start_marker: str = None, end_marker: str = None) -> str:
+    """
+    Recorta a parte da página que alimenta o parser, sem montar árvore
+
+    Vai da primeira ocorrência de start_marker até o fim da última de end_marker.
+    Sem marcadores (ou não encontrados), usa o corpo sem <script>, que costuma
+    carregar anúncios e carimbos de tempo que mudam a cada requisição.
+    """
+    if start_marker and end_marker:
+        start = html.find(start_marker)
+        end = html.rfind(end_marker)
+        if start != -1 and end != -1 and end >= start:
+            return html[start:end + len(end_marker)]
+    body_start = html.find('<body')
+    body = html[body_start:] if body_start != -1 else html
+    return _SCRIPT_RE.sub('', body)
+
+
+def section_hash(section: str) -> str:
+    return hashlib.sha1(section.encode('utf-8', 'replace')).hexdigest()
+
+
+class CachedResponse:
+    """Resposta servida do cache, com a interface usada pelos coletores"""
+
+    def __init__(self, url: str, text: str, status_code: int = 200, headers: Dict[str, str] = None,
+                 revalidated: bool = False, fetched_at: float = None):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.from_cache = True
+        self.revalidated = revalidated
+        self.fetched_at = fetched_at    # quando o corpo foi baixado / confirmado pela fonte
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode('utf-8')
+
+    def raise_for_status(self) -> None:
+        return None
+
+
+def _prune_memos(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parsings memorizados só do dia mais recente de cada etapa
+
+    As chaves levam o dia ("wind:2026-10-17"): a de ontem nunca mais é
+    consultada e, sem poda, os metadados de uma URL ativa cresceriam um item
+    por dia (a evicção não remove URLs ainda em uso).
+    """
+    def stage_day(key: str):
+        stage, _, rest = key.partition(':')
+        return stage, rest.partition(':')[0]
+
+    latest: Dict[str, str] = {}
+    for key in parsed:
+        stage, day = stage_day(key)
+        latest[stage] = max(day, latest.get(stage, ''))
+    return {key: memo for key, memo in parsed.items() if latest[stage_day(key)[0]] == stage_day(key)[1]}
+
+
+class ResponseCache:
+    """
+    Cache persistente de respostas, chaveado pela URL
+
+    Cada URL vira dois arquivos no diretório do cache:
+    - <sha1>.json: metadados (ETag, Last-Modified, horários, parsings memorizados)
+    - <sha1>.html.gz: corpo da página
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, ttl_s: float = DEFAULT_TTL_S,
+                 max_bytes: int = MAX_CACHE_BYTES):
+        self.directory = directory
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    # ---------------------------
+    # Arquivos
+    # ---------------------------
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.html.gz'
+
+    def _read_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('url') == url else None
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        meta_path, _ = self._paths(meta['url'])
+        atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def _read_body(self, url: str) -> Optional[str]:
+        _, body_path = self._paths(url)
+        try:
+            with gzip.open(body_path, 'rb') as f:
+                return f.read().decode('utf-8')
+        except (OSError, EOFError, UnicodeDecodeError):
+            return None
+
+    # ---------------------------
+    # Consulta / gravação
+    # ---------------------------
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Metadados da URL em cache (ou None)"""
+        return self._read_meta(url)
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        return (time.time() - meta.get('fetched_at', 0)) < self.ttl_s
+
+    @staticmethod
+    def conditional_headers(meta: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def respond(self, url: str, meta: Dict[str, Any], revalidated: bool = False) -> Optional[CachedResponse]:
+        """Monta a resposta a partir do disco e marca o último acesso (para a evicção)"""
+        text = self._read_body(url)
+        if text is None:
+            return None
+        with self._lock:
+            meta['accessed_at'] = time.time()
+            if revalidated:
+                meta['fetched_at'] = meta['accessed_at']
+            self._write_meta(meta)
+        return CachedResponse(url, text, headers={'ETag': meta.get('etag') or ''}, revalidated=revalidated,
+                              fetched_at=meta.get('fetched_at'))
+
+    def store(self, url: str, response) -> None:
+        """Grava uma resposta 200 recém-baixada"""
+        _, body_path = self._paths(url)
+        text = response.text
+        now = time.time()
+        with self._lock:
+            previous = self._read_meta(url) or {}
+            atomic_write(body_path, gzip.compress(text.encode('utf-8'), compresslevel=6))
+            meta = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': now,
+                'accessed_at': now,
+                'size': os.path.getsize(body_path),
+                # Parsings anteriores continuam válidos se o hash da seção bater
+                # (só o dia mais recente de cada etapa; ver _prune_memos)
+                'parsed': _prune_memos(previous.get('parsed', {})),
+            }
+            self._write_meta(meta)
+
+    def memo_parse(self, url: str, section: str, key: str, parse: Callable[[], Any],
+                   dump: Callable[[Any], Any] = None, load: Callable[[Any], Any] = None) -> Any:
+        """
+        Reaproveita o resultado do parser se a seção da página não mudou
+
+        Args:
+            url: URL da página (entrada do cache)
+            section: Trecho que alimenta o parser (ver extract_section)
+            key: "<etapa>:<dia>[:argumentos]" (ex: "tide_range:2026-10-17:10"); ao
+                gravar, as chaves da mesma etapa de dias anteriores são descartadas
+            parse: Executa o parsing de fato
+            dump / load: Conversão do resultado para/de JSON (padrão: identidade)
+        """
+        digest = section_hash(section)
+        meta = self._read_meta(url)
+        if meta is not None:
+            memo = meta.get('parsed', {}).get(key)
+            if memo and memo.get('hash') == digest:
+                return load(memo['value']) if load else memo['value']
+
+        result = parse()
+        if meta is not None:
+            with self._lock:
+                meta = self._read_meta(url) or meta
+                parsed = meta.get('parsed', {})
+                parsed[key] = {
+                    'hash': digest,
+                    'value': dump(result) if dump else result,
+                }
+                meta['parsed'] = _prune_memos(parsed)
+                self._write_meta(meta)
+        return result
+
+    # ---------------------------
+    # Manutenção
+    # ---------------------------
+    def evict(self) -> int:
+        """
+        Remove entradas vencidas há mais de 4x o TTL e, se o diretório passar de
+        max_bytes, as menos acessadas até caber
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        entries = []
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                meta_path = os.path.join(self.directory, name)
+                body_path = meta_path[:-len('.json')] + '.html.gz'
+                try:
+                    size = os.path.getsize(meta_path) + (os.path.getsize(body_path) if os.path.exists(body_path) else 0)
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    meta, size = {}, 0
+                entries.append((meta.get('accessed_at', 0), meta.get('fetched_at', 0), size, meta_path, body_path))
+
+            now = time.time()
+            total = sum(e[2] for e in entries)
+            removed = 0
+            for accessed_at, fetched_at, size, meta_path, body_path in sorted(entries):
+                expired = (now - fetched_at) > 4 * self.ttl_s
+                if not expired and total <= self.max_bytes:
+                    continue
+                for path in (meta_path, body_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                total -= size
+                removed += 1
+
+        if removed:
+            logger.info(f"Cache HTTP: {removed} entradas removidas ({total / 1024:.0f} KiB restantes)")
+        return removed
@@ -0,0 +1,704 @@
+"""
+Ingestão Única de Marés e Meteorologia
+Baixa cada página de cada estação uma única vez por atualização, roda cada
+parser uma única vez e distribui o resultado para os writers de cada formato
+consumido pelo frontend:
+- tides_scraped.csv (TideCSVService)
+- weather_scraped.csv (TideCSVService)
+- maritimo_mare_meteo.json (TideJSONService)
+Substitui as três coletas independentes (rebuild_csv.py, update_weather_batch.py
+e scripts/scraping_tabuademares.py), que agora são atalhos para este módulo.
+Os arquivos são mesclados (upsert por estação/data/hora), nunca truncados; no
+modo incremental só são coletadas as estações com previsão curta ou dados velhos.
+Com --record as páginas baixadas vão para o arquivo local (page_archive.py);
+com --replay os datasets são reconstruídos a partir dele, sem rede.
+Com --db (ou SISNAV_DB) a coleta é gravada na base SQLite (metocean_db.py)
+numa única transação, e os arquivos passam a ser exportações da base.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import abc
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, 'scripts'))
+
+from fetch_engine import FetchEngine  # noqa: E402
+from http_cache import ResponseCache, atomic_write  # noqa: E402
+from page_archive import PageArchive, archive_from_args  # noqa: E402
+import columnar_store  # noqa: E402
+from metocean_db import MetoceanDB, db_from_args, from_env  # noqa: E402
+from scraping_tide import DailyTideInfo, TideDataCollector  # noqa: E402
+from scraping_weather import WeatherCollector, WeatherData  # noqa: E402
+from stations import BASE_URL, STATIONS, Station  # noqa: E402
+import scraping_tabuademares  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+DAYS_TO_SCRAPE = 10   # Previsão para 10 dias (tábua de marés)
+
+# Modo incremental: recoleta só a estação com pouca previsão pela frente ou dados velhos
+MIN_HORIZON_DAYS = 3          # dias de previsão restantes abaixo dos quais recoleta
+STATION_TTL_S = 6 * 3600      # idade máxima da última coleta bem-sucedida
+STATE_FILE = os.path.join(SCRIPT_DIR, 'data', 'ingest_state.json')
+
+# Páginas de cada estação (caminho relativo à URL da estação)
+PAGES = {
+    'tabua': '',                   # tábua de marés (tabela com vários dias)
+    'mares': 'previsao/mares',     # marés hora a hora com coeficiente (7 dias)
+    'tempo': 'previsao/tempo',     # condição do tempo hora a hora
+    'vento': 'previsao/vento',     # vento hora a hora
+}
+
+
+@dataclass
+class StationResult:
+    """Tudo o que foi extraído das páginas de uma estação numa atualização"""
+    station: Station
+    fetched_at_utc: str
+    tide_days: List[DailyTideInfo] = field(default_factory=list)            # página 'tabua'
+    wind: List[WeatherData] = field(default_factory=list)                   # página 'vento'
+    tides_7d: List[Dict[str, Any]] = field(default_factory=list)            # página 'mares'
+    weather_hourly: List[Dict[str, Any]] = field(default_factory=list)      # página 'tempo'
+    wind_hourly: List[Dict[str, Any]] = field(default_factory=list)         # página 'vento'
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    fetched: bool = True       # False se a coleta da estação falhou por inteiro
+
+
+# ---------------------------
+# Coleta
+# ---------------------------
+def collect_station(station: Station, pages: Sequence[str], engine: FetchEngine,
+                    tide: TideDataCollector, weather: WeatherCollector,
+                    start: datetime, days: int = DAYS_TO_SCRAPE,
+                    base_url: str = BASE_URL) -> StationResult:
+    """
+    Baixa as páginas pedidas da estação (uma requisição por página) e roda os
+    parsers de todos os formatos sobre o mesmo HTML
+
+    Falhas de uma página ficam em `errors` e não impedem as demais.
+    """
+    result = StationResult(station=station, fetched_at_utc=datetime.now(timezone.utc).isoformat())
+    replay = engine.archive is not None and engine.archive.replaying
+
+    for page in pages:
+        url = station.url(PAGES[page], base_url)
+        try:
+            response = engine.get(url)
+            response.raise_for_status()
+            html = response.text
+        except Exception as e:
+            result.errors.append({'stage': page, 'url': url, 'err': str(e)})
+            continue
+        if replay:
+            # Reconstrução offline: vale o horário da captura, não o de agora
+            result.fetched_at_utc = datetime.fromtimestamp(response.fetched_at, timezone.utc).isoformat()
+
+        if page == 'tabua':
+            result.tide_days = tide.parse_tide_page(url, html, start, days)
+        elif page == 'mares':
+            result.tides_7d = scraping_tabuademares.parse_cached(
+                url, html, 'tides_7d', scraping_tabuademares.parse_tides_7d, engine)
+        elif page == 'tempo':
+            result.weather_hourly = scraping_tabuademares.parse_cached(
+                url, html, 'weather_hourly', scraping_tabuademares.parse_weather_hourly, engine)
+        elif page == 'vento':
+            # Mesmo HTML para o CSV (WeatherData) e para o JSON (vetores horários)
+            result.wind = weather.parse_wind_page(url, html)
+            result.wind_hourly = scraping_tabuademares.parse_cached(
+                url, html, 'wind_hourly', scraping_tabuademares.parse_wind_hourly, engine)
+
+    # Sanidade mínima (mesma regra do JSON original)
+    if 'mares' in pages and len(result.tides_7d) < 4:
+        result.errors.append({'stage': 'sanity', 'err': 'Poucos eventos de maré extraídos (<4). HTML pode ter mudado.'})
+    return result
+
+
+# ---------------------------
+# Writers
+# ---------------------------
+def _station_order(station_id: str) -> int:
+    """Posição no cadastro (estações desconhecidas vão para o fim)"""
+    for i, st in enumerate(STATIONS):
+        if st.id == station_id:
+            return i
+    return len(STATIONS)
+
+
+def _minutes(hhmm: str) -> int:
+    try:
+        h, m = hhmm.split(':')
+        return int(h) * 60 + int(m)
+    except (AttributeError, ValueError):
+        return 0
+
+
+class DatasetWriter(abc.ABC):
+    """
+    Base dos writers: cada um declara as páginas que consome e grava um arquivo
+
+    O arquivo existente é mesclado com a coleta nova (ver merge), então uma
+    estação que falhou mantém os dados anteriores. A gravação é atômica
+    (arquivo temporário + replace): o frontend nunca lê um arquivo pela metade.
+    """
+    name = ''
+    filename = ''
+    pages: Sequence[str] = ()
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(SCRIPT_DIR, self.filename)
+
+    @abc.abstractmethod
+    def load(self) -> Any:
+        """Conteúdo atual do arquivo (None se ausente ou ilegível)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def last_dates(self, existing: Any) -> Dict[str, date]:
+        """Último dia de previsão de cada estação no conteúdo atual"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def render(self, results: List[StationResult], existing: Any = None,
+               today: date = None) -> Tuple[str, int]:
+        """Conteúdo do arquivo (atual mesclado com a coleta) e quantidade de registros"""
+        raise NotImplementedError
+
+    def write(self, results: List[StationResult], existing: Any = None, today: date = None) -> int:
+        text, count = self.render(results, existing, today or date.today())
+        atomic_write(self.path, text.encode('utf-8'))
+        logger.info(f"{count} registros salvos em {os.path.basename(self.path)}")
+        return count
+
+    # Base SQLite (metocean_db.py): store grava a coleta, export gera o arquivo a partir da base
+    @abc.abstractmethod
+    def store(self, db: MetoceanDB, results: List[StationResult], existing: Any = None) -> None:
+        """Upsert da coleta na base (base vazia é semeada antes com o arquivo atual)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def export(self, db: MetoceanDB, today: date = None) -> int:
+        """Regrava o arquivo com o conteúdo da base a partir de hoje"""
+        raise NotImplementedError
+
+
+class _CSVWriter(DatasetWriter):
+    """
+    CSV com uma linha por (station_id, date, time), date em DD/MM/YYYY
+
+    Mesclagem (upsert): as linhas novas substituem as de mesma chave, e um dia
+    presente na coleta nova substitui o dia inteiro da mesma estação (um horário
+    que mudou de 4:00 para 4:02 não deixa a linha antiga para trás). Dias
+    anteriores a hoje são descartados.
+
+    Junto com o CSV é gravada a cópia colunar das mesmas linhas
+    (columnar_store.py), em <diretório do CSV>/data/columnar.
+    """
+    fieldnames: Sequence[str] = ()
+    columnar = ''    # dataset em columnar_store.SCHEMAS ('' = sem cópia colunar)
+    table = ''       # tabela em metocean_db.TABLES
+
+    def __init__(self, path: str = None, columnar_dir: str = None):
+        super().__init__(path)
+        self.columnar_dir = columnar_dir or os.path.join(os.path.dirname(self.path), 'data', 'columnar')
+
+    @abc.abstractmethod
+    def rows(self, result: StationResult) -> Iterable[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _day(value: str) -> Optional[date]:
+        try:
+            return datetime.strptime(value, "%d/%m/%Y").date()
+        except (TypeError, ValueError):
+            return None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                return list(csv.DictReader(f))
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            logger.warning(f"{self.filename} ilegível, será reescrito: {e}")
+            return None
+
+    def last_dates(self, existing):
+        last: Dict[str, date] = {}
+        for row in existing or []:
+            day = self._day(row.get('date'))
+            sid = row.get('station_id')
+            if day and sid and (sid not in last or day > last[sid]):
+                last[sid] = day
+        return last
+
+    def _fresh(self, results: List[StationResult]) -> List[Dict[str, Any]]:
+        fresh = []
+        for result in results:
+            rows = list(self.rows(result))
+            if not rows and result.fetched:
+                logger.warning(f"  > Sem dados para {result.station.name} ({self.filename}), mantendo os anteriores")
+            fresh.extend(rows)
+        return fresh
+
+    def merge(self, results: List[StationResult], existing: Any = None,
+              today: date = None) -> List[Dict[str, Any]]:
+        """Linhas atuais mescladas com a coleta, ordenadas por estação, data e hora"""
+        today = today or date.today()
+        fresh = self._fresh(results)
+
+        fresh_days = {(r['station_id'], r['date']) for r in fresh}
+        merged: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for row in existing or []:
+            day = self._day(row.get('date'))
+            if day is None or day < today or (row['station_id'], row['date']) in fresh_days:
+                continue
+            merged[(row['station_id'], row['date'], row['time'])] = row
+        for row in fresh:
+            merged[(row['station_id'], row['date'], row['time'])] = row
+
+        # station_id desempata as estações fora do cadastro (mesma posição): as linhas
+        # de cada estação ficam contíguas, como o store colunar exige
+        return sorted(merged.values(), key=lambda r: (
+            _station_order(r['station_id']), r['station_id'], self._day(r['date']), _minutes(r['time'])))
+
+    def _csv_text(self, rows: List[Dict[str, Any]]) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue()
+
+    def render(self, results, existing=None, today=None):
+        rows = self.merge(results, existing, today)
+        return self._csv_text(rows), len(rows)
+
+    def write(self, results, existing=None, today=None):
+        return self._save(self.merge(results, existing, today or date.today()))
+
+    def _save(self, rows: List[Dict[str, Any]]) -> int:
+        # Codifica a cópia colunar antes de gravar qualquer arquivo: se falhar,
+        # CSV e cópia colunar continuam na versão anterior, iguais entre si
+        encoded = columnar_store.encode(self.columnar, rows) if self.columnar else None
+        atomic_write(self.path, self._csv_text(rows).encode('utf-8'))
+        logger.info(f"{len(rows)} registros salvos em {os.path.basename(self.path)}")
+        if encoded is not None:
+            path = columnar_store.write_encoded(self.columnar, encoded, self.columnar_dir)
+            logger.info(f"  > cópia colunar: {os.path.relpath(path, os.path.dirname(self.path))}")
+        return len(rows)
+
+    def store(self, db, results, existing=None):
+        if existing and db.is_empty(self.table):
+            db.replace_days(self.table, existing)
+        db.replace_days(self.table, self._fresh(results))
+
+    def export(self, db, today=None):
+        rows = db.rows(self.table, since=today or date.today())
+        rows.sort(key=lambda r: (_station_order(r['station_id']), r['station_id'], r['ts']))
+        return self._save(rows)
+
+
+class TideCSVWriter(_CSVWriter):
+    """tides_scraped.csv: uma linha por preia-mar / baixa-mar"""
+    name = 'tides_csv'
+    filename = 'tides_scraped.csv'
+    pages = ('tabua',)
+    fieldnames = ['station_id', 'station_name', 'date', 'time', 'height', 'type']
+    columnar = 'tides'
+    table = 'tide_events'
+
+    def rows(self, result):
+        for tide_info in result.tide_days:
+            for tide in tide_info.tides:
+                yield {
+                    'station_id': result.station.id,
+                    'station_name': result.station.name,
+                    'date': tide_info.date,  # DD/MM/YYYY do scraper
+                    'time': tide.time,
+                    'height': tide.height,
+                    'type': tide.type,
+                }
+
+
+class WeatherCSVWriter(_CSVWriter):
+    """weather_scraped.csv: vento hora a hora"""
+    name = 'weather_csv'
+    filename = 'weather_scraped.csv'
+    pages = ('vento',)
+    fieldnames = ['station_id', 'station_name', 'date', 'time', 'wind_speed', 'wind_dir',
+                  'wave_height', 'wave_dir', 'temp']
+    columnar = 'weather'
+    table = 'weather_hourly'
+
+    def rows(self, result):
+        for item in result.wind:
+            yield {
+                'station_id': result.station.id,
+                'station_name': result.station.name,
+                'date': item.date,
+                'time': item.time,
+                'wind_speed': item.wind_speed,
+                'wind_dir': item.wind_dir,
+                'wave_height': item.wave_height,
+                'wave_dir': item.wave_dir,
+                'temp': item.temp,
+            }
+
+
+class PortJSONWriter(DatasetWriter):
+    """
+    maritimo_mare_meteo.json: um objeto por porto (chave port_key)
+
+    Cada lista do porto é mesclada como nos CSVs, pela chave (date_iso, hora).
+    Porto sem nenhum dado novo mantém as listas anteriores e recebe os erros.
+    Séries hora a hora de arquivos antigos, com todos os dias na mesma data, são
+    redatadas antes da mescla (scraping_tabuademares.redate_hourly).
+    """
+    name = 'ports_json'
+    filename = 'maritimo_mare_meteo.json'
+    pages = ('mares', 'tempo', 'vento')
+    LISTS = {'tides_7d': 'time_local', 'weather_hourly': 'hour_local', 'wind_hourly': 'hour_local'}
+    HOURLY = ('weather_hourly', 'wind_hourly')
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                db = json.load(f)
+            return db if isinstance(db.get('ports'), dict) else None
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"{self.filename} ilegível, será reescrito: {e}")
+            return None
+
+    def last_dates(self, existing):
+        by_key = {st.port_key: st.id for st in STATIONS}
+        last: Dict[str, date] = {}
+        for key, port in ((existing or {}).get('ports') or {}).items():
+            days = [e.get('date_iso') for e in port.get('tides_7d') or []]
+            days = [date.fromisoformat(d) for d in days if d]
+            if key in by_key and days:
+                last[by_key[key]] = max(days)
+        return last
+
+    @classmethod
+    def _stored(cls, port: Dict[str, Any], name: str) -> List[Dict[str, Any]]:
+        """Lista gravada no arquivo, com as séries hora a hora datadas dia a dia"""
+        entries = port.get(name) or []
+        return scraping_tabuademares.redate_hourly(entries) if name in cls.HOURLY else entries
+
+    @staticmethod
+    def _merge_list(old: List[Dict[str, Any]], new: List[Dict[str, Any]], time_key: str,
+                    today: date) -> List[Dict[str, Any]]:
+        new_days = {e['date_iso'] for e in new}
+        merged = {}
+        for e in old:
+            if e.get('date_iso') in new_days or e.get('date_iso', '') < today.isoformat():
+                continue
+            merged[(e['date_iso'], e.get(time_key))] = e
+        for e in new:
+            merged[(e['date_iso'], e.get(time_key))] = e
+        return sorted(merged.values(), key=lambda e: (e['date_iso'], _minutes(e.get(time_key))))
+
+    def render(self, results, existing=None, today=None):
+        today = today or date.today()
+        ports: Dict[str, Any] = dict((existing or {}).get('ports') or {})
+        for result in results:
+            key = result.station.port_key
+            old = ports.get(key) or {}
+            has_data = any(getattr(result, name) for name in self.LISTS)
+            port = {
+                "base_url": result.station.url(),
+                "fetched_at_utc": result.fetched_at_utc if has_data else old.get('fetched_at_utc', result.fetched_at_utc),
+            }
+            for name, time_key in self.LISTS.items():
+                port[name] = self._merge_list(self._stored(old, name), getattr(result, name), time_key, today)
+            port["errors"] = result.errors
+            ports[key] = port
+
+        return self._json_text(ports)
+
+    @staticmethod
+    def _json_text(ports: Dict[str, Any]) -> Tuple[str, int]:
+        # Ordem do cadastro; portos fora dele (antigos) ficam no fim
+        order = {st.port_key: i for i, st in enumerate(STATIONS)}
+        db = {"ports": {k: ports[k] for k in sorted(ports, key=lambda k: order.get(k, len(order)))}}
+        return json.dumps(db, ensure_ascii=False, indent=2), len(db["ports"])
+
+    def store(self, db, results, existing=None):
+        by_key = {st.port_key: st for st in STATIONS}
+        if existing and db.is_empty('port_series'):
+            for key, port in (existing.get('ports') or {}).items():
+                st = by_key.get(key)
+                sid = st.id if st else key
+                db.set_port(sid, st.name if st else None, key, port.get('base_url'),
+                            port.get('fetched_at_utc'), port.get('errors') or [])
+                for name, time_key in self.LISTS.items():
+                    db.replace_series_days(sid, name, self._stored(port, name), time_key)
+        for result in results:
+            has_data = any(getattr(result, name) for name in self.LISTS)
+            db.set_port(result.station.id, result.station.name, result.station.port_key, result.station.url(),
+                        result.fetched_at_utc, result.errors, keep_fetched_at=not has_data)
+            for name, time_key in self.LISTS.items():
+                db.replace_series_days(result.station.id, name, getattr(result, name), time_key)
+
+    def export(self, db, today=None):
+        text, count = self._json_text(db.ports(since=today or date.today(), series=list(self.LISTS)))
+        atomic_write(self.path, text.encode('utf-8'))
+        logger.info(f"{count} registros salvos em {os.path.basename(self.path)}")
+        return count
+
+
+WRITERS = {cls.name: cls for cls in (TideCSVWriter, WeatherCSVWriter, PortJSONWriter)}
+
+
+def _resolve_writers(writers: Optional[Iterable[Union[str, DatasetWriter]]]) -> List[DatasetWriter]:
+    if writers is None:
+        return [cls() for cls in WRITERS.values()]
+    resolved = []
+    for w in writers:
+        if isinstance(w, str):
+            if w not in WRITERS:
+                raise ValueError(f"Writer desconhecido: {w} (opções: {', '.join(WRITERS)})")
+            w = WRITERS[w]()
+        resolved.append(w)
+    return resolved
+
+
+# ---------------------------
+# Atualização incremental
+# ---------------------------
+def load_state(path: str = STATE_FILE) -> Dict[str, Any]:
+    """Estado persistido das coletas: {station_id: {"fetched_at": epoch, "ok": bool}}"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: Dict[str, Any], path: str = STATE_FILE) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, json.dumps(state, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def horizon_days(last_dates: Iterable[Optional[date]], today: date) -> Optional[int]:
+    """Dias de previsão restantes além de hoje (o menor entre os datasets; None se faltar algum)"""
+    last_dates = list(last_dates)
+    if not last_dates or any(d is None for d in last_dates):
+        return None
+    return (min(last_dates) - today).days
+
+
+@dataclass
+class StationStatus:
+    """Situação de uma estação nos datasets atuais"""
+    station: Station
+    horizon_days: Optional[int]    # dias de previsão restantes (None = falta em algum dataset)
+    age_s: Optional[float]         # idade da última coleta bem-sucedida (None = desconhecida)
+    reason: str = ''               # motivo para recoletar ('' = em dia)
+
+
+def station_status(writers: Sequence[DatasetWriter], stations: Sequence[Station], existing: Dict[str, Any],
+                   state: Dict[str, Any], now: float = None, min_horizon_days: int = MIN_HORIZON_DAYS,
+                   ttl_s: float = STATION_TTL_S) -> List[StationStatus]:
+    """
+    Horizonte, idade e motivo de recoleta de cada estação
+
+    Uma estação deve ser recoletada se faltar em algum dataset, se a previsão
+    restante for menor que min_horizon_days ou se a última coleta bem-sucedida
+    for mais antiga que ttl_s.
+    """
+    now = now if now is not None else time.time()
+    today = date.fromtimestamp(now)
+    last_by_writer = [w.last_dates(existing.get(w.name)) for w in writers]
+
+    statuses = []
+    for st in stations:
+        horizon = horizon_days((last.get(st.id) for last in last_by_writer), today)
+        fetched_at = (state.get(st.id) or {}).get('fetched_at')
+        age = now - fetched_at if fetched_at is not None else None
+        reason = ''
+        if horizon is None:
+            reason = 'sem dados'
+        elif horizon < min_horizon_days:
+            reason = f'horizonte de {horizon} dia(s)'
+        elif age is None or age > ttl_s:
+            reason = f'idade {age / 3600:.1f} h' if age is not None else 'idade desconhecida'
+        statuses.append(StationStatus(st, horizon, age, reason))
+    return statuses
+
+
+def plan_refresh(writers: Sequence[DatasetWriter], stations: Sequence[Station], existing: Dict[str, Any],
+                 state: Dict[str, Any], now: float = None, min_horizon_days: int = MIN_HORIZON_DAYS,
+                 ttl_s: float = STATION_TTL_S) -> List[Tuple[Station, str]]:
+    """Estações que precisam de coleta e o motivo (ver station_status)"""
+    return [(s.station, s.reason)
+            for s in station_status(writers, stations, existing, state, now, min_horizon_days, ttl_s)
+            if s.reason]
+
+
+def refresh_status(writers: Iterable[Union[str, DatasetWriter]] = None, stations: Sequence[Station] = None,
+                   state_file: str = STATE_FILE, now: float = None,
+                   min_horizon_days: int = MIN_HORIZON_DAYS, ttl_s: float = STATION_TTL_S) -> List[StationStatus]:
+    """station_status() lendo os arquivos atuais e o estado persistido"""
+    writers = _resolve_writers(writers)
+    existing = {w.name: w.load() for w in writers}
+    return station_status(writers, list(stations if stations is not None else STATIONS), existing,
+                          load_state(state_file), now, min_horizon_days, ttl_s)
+
+
+# ---------------------------
+# Orquestração
+# ---------------------------
+def run(writers: Iterable[Union[str, DatasetWriter]] = None, stations: Sequence[Station] = None,
+        engine: FetchEngine = None, base_url: str = BASE_URL, start: datetime = None,
+        days: int = DAYS_TO_SCRAPE, incremental: bool = False,
+        min_horizon_days: int = MIN_HORIZON_DAYS, ttl_s: float = STATION_TTL_S,
+        state_file: str = STATE_FILE, cancel: threading.Event = None,
+        archive: PageArchive = None, db: MetoceanDB = None,
+        on_plan: Callable[[List[Station]], None] = None,
+        on_station: Callable[[Station, Optional[StationResult], int, int], None] = None) -> List[StationResult]:
+    """
+    Atualiza os datasets numa única passada pelas estações
+
+    Args:
+        writers: Nomes em WRITERS ou instâncias de DatasetWriter (padrão: todos)
+        stations: Estações candidatas (padrão: stations.STATIONS)
+        engine: Motor de coleta (padrão: FetchEngine com cache em disco)
+        base_url: Raiz do site (trocada pelas bancadas de teste)
+        start / days: Janela da tábua de marés (em replay, start padrão é o
+                      horário da captura mais recente do arquivo)
+        incremental: Coleta só as estações apontadas por plan_refresh
+        min_horizon_days / ttl_s: Limites do modo incremental
+        state_file: Onde guardar o horário da última coleta de cada estação
+        cancel: Quando sinalizado, estações ainda não iniciadas são puladas
+                (as já coletadas são gravadas normalmente)
+        archive: Arquivo de páginas: 'record' grava o que for baixado; 'replay'
+                 serve tudo dele, sem rede e sem mexer no estado da coleta
+        db: Base SQLite: a coleta é gravada nela numa única transação e os
+            arquivos dos writers são exportados dela (padrão: SISNAV_DB)
+        on_plan: Recebe a lista de estações que serão coletadas
+        on_station: Chamado ao fim de cada estação com (estação, resultado ou
+                    None se falhou, concluídas, total)
+
+    Returns:
+        Resultado de cada estação coletada, na ordem de `stations`
+    """
+    writers = _resolve_writers(writers)
+    stations = list(stations if stations is not None else STATIONS)
+    replay = archive is not None and archive.replaying
+    if start is None and replay and archive.reference_time() is not None:
+        start = datetime.fromtimestamp(archive.reference_time())
+    start = start or datetime.now()
+    existing = {w.name: w.load() for w in writers}
+    state = load_state(state_file)
+
+    if incremental:
+        plan = plan_refresh(writers, stations, existing, state, min_horizon_days=min_horizon_days, ttl_s=ttl_s)
+        for st, reason in plan:
+            logger.info(f"  {st.name}: coletar ({reason})")
+        logger.info(f"Atualização incremental: {len(plan)}/{len(stations)} estações a coletar")
+        stations = [st for st, _ in plan]
+    if on_plan is not None:
+        on_plan(stations)
+    if not stations:
+        return []
+
+    # Replay dispensa o cache: as páginas vêm do arquivo e os parsers rodam de verdade
+    engine = engine or FetchEngine(cache=None if replay else ResponseCache())
+    if archive is not None:
+        engine.archive = archive
+
+    # Só baixa as páginas que algum writer consome, cada uma uma vez
+    needed = {page for w in writers for page in w.pages}
+    pages = [page for page in PAGES if page in needed]
+
+    tide = TideDataCollector(engine=engine)
+    weather = WeatherCollector(engine=engine)
+
+    done = []
+    done_lock = threading.Lock()
+    skipped = set()
+
+    def report(station: Station, result: Optional[StationResult]) -> None:
+        if on_station is None:
+            return
+        with done_lock:
+            done.append(station.id)
+            count = len(done)
+        on_station(station, result, count, len(stations))
+
+    def collect(station: Station) -> Optional[StationResult]:
+        if cancel is not None and cancel.is_set():
+            skipped.add(station.id)
+            return None
+        logger.info(f"Processando Estação: {station.name} ({station.url(base_url=base_url)})...")
+        try:
+            result = collect_station(station, pages, engine, tide, weather, start, days, base_url)
+        except Exception:
+            report(station, None)
+            raise
+        report(station, result)
+        return result
+
+    results = engine.run(stations, collect, key=lambda st: st.id)
+    if skipped:
+        logger.info(f"Cancelado: {len(skipped)} estações não coletadas")
+    # Estação que falhou por inteiro continua no JSON, com o erro registrado
+    results = [
+        r if r is not None else StationResult(
+            station=st, fetched_at_utc=datetime.now(timezone.utc).isoformat(), fetched=False,
+            errors=[{'stage': 'collect', 'err': engine.stats[st.id].error}])
+        for st, r in zip(stations, results) if st.id not in skipped
+    ]
+
+    db = db if db is not None else from_env()
+    if db is None:
+        for writer in writers:
+            writer.write(results, existing.get(writer.name), start.date())
+    else:
+        with db.transaction():
+            for writer in writers:
+                writer.store(db, results, existing.get(writer.name))
+        for writer in writers:
+            writer.export(db, start.date())
+
+    engine.log_stats()
+    if replay:
+        # Reconstrução offline: os dados não são mais novos do que já eram
+        return results
+
+    # Só conta como coletada a estação cujas páginas vieram todas
+    now = time.time()
+    for r in results:
+        ok = r.fetched and not any(e['stage'] in pages or e['stage'] == 'collect' for e in r.errors)
+        entry = state.setdefault(r.station.id, {})
+        entry['ok'] = ok
+        if ok:
+            entry['fetched_at'] = now
+    save_state(state, state_file)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Uso: python ingest.py [--incremental] [--record | --replay [--as-of=AAAA-MM-DD]]
+    #                       [--db[=caminho]] [tides_csv] [weather_csv] [ports_json]
+    archive, args = archive_from_args(sys.argv[1:])
+    db, args = db_from_args(args)
+    incremental = '--incremental' in args
+    names = [a for a in args if a != '--incremental']
+    run(writers=names or None, incremental=incremental, archive=archive, db=db)
@@ -0,0 +1,307 @@
+"""
+Executor de Tarefas em Segundo Plano
+Roda a atualização de dados (ingest.py) fora da thread da requisição HTTP:
+cada pedido recebe um job id, pedidos simultâneos do mesmo tipo são agrupados
+no job ativo que já os cobre (senão entram na fila, um job por tipo rodando
+por vez), o progresso é reportado estação a estação e o job pode ser
+cancelado.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_FINISHED_JOBS = 20   # jobs encerrados mantidos para consulta de status
+
+# Estados de um job
+QUEUED, RUNNING, CANCELLING = 'queued', 'running', 'cancelling'
+DONE, FAILED, CANCELLED = 'done', 'failed', 'cancelled'
+ACTIVE = (QUEUED, RUNNING, CANCELLING)
+
+
+@dataclass
+class Job:
+    """Um job e seu progresso (o dicionário de to_dict() é o que a API devolve)"""
+    id: str
+    kind: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = QUEUED
+    progress: int = 0
+    message: str = 'Na fila...'
+    stations: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    error: str = ''
+    requests: int = 1                 # pedidos agrupados neste job
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'stations': self.stations,
+            'error': self.error,
+            'requests': self.requests,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobCancelled(Exception):
+    """Levantada pela tarefa ao perceber o pedido de cancelamento"""
+
+
+class JobRunner:
+    """
+    Executa jobs numa thread própria por job, com no máximo um job rodando por tipo
+
+    A tarefa recebe o Job e reporta o andamento por runner.update(job, ...);
+    deve consultar job.cancel_event entre etapas.
+    """
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._cond = threading.Condition()
+
+    # ---------------------------
+    # Consulta
+    # ---------------------------
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def active(self, kind: str) -> Optional[Job]:
+        """Job ativo do tipo (ou None)"""
+        with self._cond:
+            return next((j for j in self._jobs.values() if j.kind == kind and j.active), None)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [j.to_dict() for j in reversed(self._jobs.values())]
+
+    def wait_events(self, job: Job, since: int, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        """Eventos do job a partir do índice `since`, aguardando até `timeout` por novidades"""
+        with self._cond:
+            if len(job.events) <= since and job.active:
+                self._cond.wait(timeout)
+            return job.events[since:]
+
+    # ---------------------------
+    # Execução
+    # ---------------------------
+    def submit(self, kind: str, task: Callable[[Job], Any], params: Dict[str, Any] = None,
+               covers: Callable[[Dict[str, Any], Dict[str, Any]], bool] = None,
+               merge: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]] = None) -> Job:
+        """
+        Agenda a tarefa; pedido coberto por um job ativo do mesmo tipo é agrupado nele
+
+        Args:
+            covers: covers(params do job, params do pedido) -> o job já faz o
+                    pedido (padrão: params iguais)
+            merge: merge(params do job na fila, params do pedido) -> params
+                   ampliados; sem merge, pedido não coberto vira job novo na fila
+
+        Returns:
+            Job novo (roda depois dos ativos do mesmo tipo) ou o job ao qual o pedido foi agrupado
+        """
+        params = dict(params or {})
+        covers = covers or (lambda current, new: current == new)
+        with self._cond:
+            active = [j for j in self._jobs.values() if j.kind == kind and j.active and not j.cancel_event.is_set()]
+            current = next((j for j in active if covers(j.params, params)), None)
+            if current is None and merge is not None:
+                current = next((j for j in active if j.status == QUEUED), None)
+                if current is not None:
+                    current.params = merge(current.params, params)
+            if current is not None:
+                current.requests += 1
+                logger.info(f"Job {current.id} ({kind}) ativo: pedido agrupado ({current.requests})")
+                return current
+
+            job = Job(id=uuid.uuid4().hex[:12], kind=kind, params=params)
+            self._jobs[job.id] = job
+            self._prune()
+            self._emit(job)
+
+        threading.Thread(target=self._execute, args=(job, task), name=f"job-{kind}-{job.id}",
+                         daemon=True).start()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Pede o cancelamento (a tarefa para na próxima verificação)"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return job
+            job.cancel_event.set()
+            job.status = CANCELLING
+            job.message = 'Cancelando...'
+            self._emit(job)
+            return job
+
+    def update(self, job: Job, progress: int = None, message: str = None,
+               station: str = None, **station_info) -> None:
+        """Atualiza progresso / mensagem e, opcionalmente, o estado de uma estação"""
+        with self._cond:
+            if progress is not None:
+                job.progress = max(job.progress, min(100, int(progress)))
+            if message is not None and job.status != CANCELLING:
+                job.message = message
+            if station is not None:
+                job.stations.setdefault(station, {}).update(station_info)
+            self._emit(job, station=station)
+
+    def _ahead(self, job: Job) -> bool:
+        # Chamado com self._cond adquirido: há job ativo do mesmo tipo criado antes deste
+        for other in self._jobs.values():
+            if other is job:
+                return False
+            if other.kind == job.kind and other.active:
+                return True
+        return False
+
+    def _execute(self, job: Job, task: Callable[[Job], Any]) -> None:
+        with self._cond:
+            while self._ahead(job) and not job.cancel_event.is_set():
+                self._cond.wait()
+            job.started_at = time.time()
+            if job.status == QUEUED:
+                job.status = RUNNING
+                job.message = 'Iniciando...'
+            self._emit(job)
+        try:
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+            task(job)
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+            final = {'status': DONE, 'progress': 100, 'message': 'Concluído!'}
+        except JobCancelled:
+            final = {'status': CANCELLED, 'message': 'Cancelado.'}
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) falhou: {e}")
+            final = {'status': FAILED, 'error': str(e), 'message': f'Erro: {e}'}
+
+        with self._cond:
+            for name, value in final.items():
+                setattr(job, name, value)
+            job.finished_at = time.time()
+            self._emit(job)
+        logger.info(f"Job {job.id} ({job.kind}): {job.status} em {job.finished_at - job.started_at:.1f}s")
+
+    def _emit(self, job: Job, station: str = None) -> None:
+        # Chamado com self._cond adquirido
+        event = {'job_id': job.id, 'status': job.status, 'progress': job.progress, 'message': job.message}
+        if station is not None:
+            event['station'] = {'id': station, **job.stations[station]}
+        if job.error:
+            event['error'] = job.error
+        job.events.append(event)
+        self._cond.notify_all()
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if not j.active]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+# ---------------------------
+# Atualização de dados
+# ---------------------------
+UPDATE_JOB = 'update-data'
+
+runner = JobRunner()
+
+
+def update_task(job: Job) -> None:
+    """Tarefa do job de atualização: ingest.run() com progresso por estação"""
+    import ingest
+
+    incremental = job.params.get('mode') == 'incremental'
+
+    def on_station(station, result, done, total):
+        if result is None:
+            info = {'name': station.name, 'status': 'erro'}
+        else:
+            failed = [e['stage'] for e in result.errors if e['stage'] != 'sanity']
+            info = {'name': station.name, 'status': 'erro' if failed else 'ok'}
+            if failed:
+                info['error'] = '; '.join(failed)
+        # Coleta ocupa 5%..90%; o restante é a gravação dos arquivos
+        runner.update(job, progress=5 + 85 * done / max(total, 1),
+                      message=f"{station.name} ({done}/{total})", station=station.id, **info)
+
+    def on_plan(stations):
+        for st in stations:
+            runner.update(job, station=st.id, name=st.name, status='pendente')
+        runner.update(job, progress=5, message=f"Coletando {len(stations)} estações...")
+
+    stations = None
+    if job.params.get('stations'):
+        from stations import get_station
+        stations = [st for st in map(get_station, job.params['stations']) if st is not None]
+
+    ingest.run(stations=stations, incremental=incremental, cancel=job.cancel_event,
+               on_plan=on_plan, on_station=on_station)
+    if job.cancel_event.is_set():
+        raise JobCancelled()
+    runner.update(job, progress=95, message='Arquivos gravados.')
+
+
+def submit_update(mode: str = 'full', stations: List[str] = None, origin: str = 'manual') -> Job:
+    """
+    Agenda a atualização de marés e meteorologia
+
+    Agrupa no job ativo que já cobre o pedido; senão amplia o job na fila ou
+    cria um, que roda depois do job em andamento.
+
+    Args:
+        mode: 'full' (todas as estações) ou 'incremental' (só as vencidas)
+        stations: IDs a considerar, na ordem de prioridade (padrão: todas)
+        origin: Quem pediu ('manual' ou 'scheduler'), para o status
+    """
+    mode = mode if mode in ('full', 'incremental') else 'full'
+    params = {'mode': mode, 'origin': origin}
+    if stations:
+        params['stations'] = list(stations)
+    return runner.submit(UPDATE_JOB, update_task, params=params, covers=_update_covers, merge=_update_merge)
+
+
+def _update_covers(current: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    """O job já faz o pedido: modo igual ou 'full', e as mesmas estações ou mais"""
+    if current['mode'] == 'incremental' and new['mode'] == 'full':
+        return False
+    if 'stations' not in current:
+        return True
+    return 'stations' in new and set(new['stations']) <= set(current['stations'])
+
+
+def _update_merge(queued: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Amplia o job na fila: 'full' se algum pedido for 'full', união das estações (ou todas)"""
+    merged = {
+        'mode': 'full' if 'full' in (queued['mode'], new['mode']) else 'incremental',
+        'origin': queued['origin'] if queued['origin'] == new['origin'] else 'manual',
+    }
+    if 'stations' in queued and 'stations' in new:
+        merged['stations'] = queued['stations'] + [s for s in new['stations'] if s not in queued['stations']]
+    return merged
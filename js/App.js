@@ -9,15 +9,16 @@
 import State from './core/State.js?v=7';
 import NavMath from './core/NavMath.js?v=7';
 import MapService from './services/MapService.js?v=7';
-import WeatherAPI from './services/WeatherAPI.js?v=7';
+import WeatherAPI from './services/WeatherAPI.js?v=10';
 import GPXParser from './utils/GPXParser.js?v=7';
-import UIManager from './utils/UIManager.js?v=7';
+import UIManager from './utils/UIManager.js?v=8';
 import PortDatabase from './services/PortDatabase.js?v=7';
 import PersistenceService from './services/PersistenceService.js?v=1';
 import UpdateService from './services/UpdateService.js?v=1';
+import RouteService from './services/RouteService.js?v=2';
 import { tideJSONService } from './services/TideJSONService.js'; // NEW
-import TideCSVService from './services/TideCSVService.js?v=7';
-import ReportService from './services/ReportService.js?v=7';
+import TideCSVService from './services/TideCSVService.js?v=8';
+import ReportService from './services/ReportService.js?v=8';
 
 const App = {
     init: function () {
@@ -252,6 +253,12 @@ const App = {
 
         if (selArr) selArr.addEventListener('change', () => this.handlePortSelection());
 
+        // JANELAS DE SAÍDA (/api/voyage/departure-windows)
+        const btnWindows = document.getElementById('btn-departure-windows');
+        if (btnWindows) {
+            btnWindows.addEventListener('click', () => this.findDepartureWindows());
+        }
+
         // PERSISTENCE (SALVAR/CARREGAR)
         const btnSavePlan = document.getElementById('btn-save-plan');
         const btnLoadPlan = document.getElementById('btn-load-plan');
@@ -400,9 +407,9 @@ const App = {
     startVisualPlanningMode: function () {
         alert("Modo Visual Ativado! Carregando rotas...");
 
-        // Carrega dados REAIS do backend (gerado pelo build_route_index.py)
-        fetch('js/data/known_routes.json')
-            .then(res => res.json())
+        // Carrega dados REAIS do backend (gerado pelo build_route_index.py); só desenho e
+        // snapping, então basta a geometria simplificada (nível 2: erro <= 100 m)
+        RouteService.loadRoutes(2)
             .then(data => {
                 console.log(`App: ${data.length} rotas carregadas para Snapping.`);
 
@@ -754,6 +761,53 @@ const App = {
                 }
             });
         }
+
+        const btnAuto = document.getElementById('btn-auto-corridor');
+        if (btnAuto) {
+            const newAuto = btnAuto.cloneNode(true);
+            btnAuto.parentNode.replaceChild(newAuto, btnAuto);
+            newAuto.addEventListener('click', () => this.autoFillAppraisalFromRoute());
+        }
+    },
+
+    /**
+     * Preenche faróis e abrigos da avaliação com tudo o que fica no corredor da rota
+     * (servidor: /api/route/corridor, em ordem ao longo da derrota)
+     */
+    autoFillAppraisalFromRoute: async function () {
+        if (!State.routePoints || State.routePoints.length < 2) {
+            alert("Defina a rota primeiro (Origem/Destino).");
+            return;
+        }
+        if (!State.appraisal) return;
+
+        try {
+            const res = await fetch('/api/route/corridor', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ points: State.routePoints.map(p => ({ lat: p.lat, lon: p.lon })) })
+            });
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            const data = await res.json();
+
+            State.appraisal.lighthouses = State.appraisal.lighthouses || [];
+            State.appraisal.shelters = State.appraisal.shelters || [];
+            data.matches.forEach(m => {
+                if (m.layer === 'lighthouses' && !State.appraisal.lighthouses.some(x => x.name === m.name)) {
+                    State.appraisal.lighthouses.push({
+                        name: m.name, lat: m.lat_dms, lon: m.lon_dms, char: m.char, desc: m.desc,
+                        latDec: m.lat, lonDec: m.lon, alongNm: m.along_nm, distNm: m.distance_nm, side: m.side
+                    });
+                } else if (m.layer === 'shelters' && !State.appraisal.shelters.some(x => x.name === m.name)) {
+                    State.appraisal.shelters.push({ name: m.name, type: m.type, details: m.details });
+                }
+            });
+            this.renderLighthousesTable();
+            this.renderSheltersTable();
+        } catch (e) {
+            console.error("App: /api/route/corridor indisponível", e);
+            alert("Erro ao buscar auxílios da rota: " + e.message);
+        }
     },
 
     renderLighthousesTable: function () {
@@ -1499,11 +1553,41 @@ const App = {
             }
 
             // Atualiza dados ambientais
-            this.updateEnviroData(etdDate, etaDate);
+            this.updateEnviroData(etdDate, etaDate, speed);
         }
     },
 
-    updateEnviroData: async function (etd, eta) {
+    /**
+     * Varre ETDs no horizonte dos dados (servidor) com os limites do painel e lista as janelas;
+     * clicar numa janela usa a saída sugerida como ETD e recalcula a viagem.
+     */
+    findDepartureWindows: async function () {
+        if (!State.routePoints || State.routePoints.length < 2) {
+            alert("Defina a rota primeiro (Origem/Destino)");
+            return;
+        }
+        const limit = (id) => {
+            const el = document.getElementById(id);
+            const v = el ? parseFloat(el.value) : NaN;
+            return isNaN(v) ? undefined : v;
+        };
+        let speed = parseFloat(State.shipProfile?.speed);
+        if (isNaN(speed) || speed <= 0) speed = 10.0;
+
+        UIManager.renderDepartureWindows(undefined);
+        const result = await WeatherAPI.fetchDepartureWindows(State.routePoints, speed, {
+            minTideM: limit('inp-window-tide'),
+            maxWindKn: limit('inp-window-wind'),
+            maxWaveM: limit('inp-window-wave')
+        });
+        UIManager.renderDepartureWindows(result, (bestEtd) => {
+            const el = document.getElementById('input-etd');
+            if (el) el.value = bestEtd;
+            this.recalculateVoyage();
+        });
+    },
+
+    updateEnviroData: async function (etd, eta, speed) {
         if (!State.routePoints.length) return;
 
         UIManager.renderWeatherCard('dep', null);
@@ -1534,7 +1618,19 @@ const App = {
                     if (pArr) { lat2 = pArr.lat; lon2 = pArr.lon; }
                 }
 
-                // Busca dados
+                // Travessia inteira numa chamada ao servidor (/api/voyage/metocean):
+                // partida = primeiro waypoint, chegada = último (ETA calculado lá)
+                const points = State.routePoints.map(p => ({ lat: p.lat, lon: p.lon }));
+                points[0] = { lat: lat1, lon: lon1 };
+                points[points.length - 1] = { lat: lat2, lon: lon2 };
+                const voyage = points.length > 1 ? await WeatherAPI.fetchVoyageMetOcean(points, etd, speed) : null;
+                if (voyage && voyage.waypoints && voyage.waypoints.length) {
+                    UIManager.renderWeatherCard('dep', WeatherAPI.fromVoyageWaypoint(voyage.waypoints[0]));
+                    UIManager.renderWeatherCard('arr', WeatherAPI.fromVoyageWaypoint(voyage.waypoints[voyage.waypoints.length - 1]));
+                    return;
+                }
+
+                // Sem servidor (arquivos estáticos): cálculo local ponto a ponto
                 const depPromise = WeatherAPI.fetchMetOcean(lat1, lon1, etd);
                 const arrPromise = WeatherAPI.fetchMetOcean(lat2, lon2, eta);
 
@@ -1696,143 +1792,46 @@ const App = {
         setTxt(`disp-wx-${type}`, wxTxt);
     },
 
-    autoFindRoute: function (depId, arrId) {
+    autoFindRoute: async function (depId, arrId) {
         const pDep = PortDatabase.find(p => p.id === depId);
         const pArr = PortDatabase.find(p => p.id === arrId);
 
         if (!pDep || !pArr) return;
 
-        // Normaliza nomes para busca: "rio grande rs"
-        const cleanName = (name) => name.toLowerCase().replace(/-..$/, '').replace(/[\u0300-\u036f]/g, "").trim();
-        const originKey = cleanName(pDep.name);
-        const destKey = cleanName(pArr.name);
-
-        console.log(`App: Buscando rota auto de '${originKey}' para '${destKey}'...`);
-
-        // Cache-busting para garantir carregamento de rotas novas/patchs
-        fetch(`js/data/known_routes.json?v=${new Date().getTime()}`)
-            .then(r => r.json())
-            .then(routes => {
-                // 1. Construir o Grafo
-                const graph = {};
-                const THRESHOLD_NM = 30; // Tolerância Geo-Spatial
-
-                // Helper para achar qual porto está perto de uma coordenada
-                const findClosestPortId = (lat, lon) => {
-                    let closestId = null;
-                    let minD = 9999;
-                    PortDatabase.forEach(p => {
-                        const d = NavMath.calcLeg(lat, lon, p.lat, p.lon).dist;
-                        if (d < minD) { minD = d; closestId = p.id; }
-                    });
-                    return minD < THRESHOLD_NM ? closestId : null;
-                };
+        console.log(`App: Buscando rota auto de '${pDep.name}' para '${pArr.name}'...`);
 
-                routes.forEach(r => {
-                    const startP = r.points[0];
-                    const endP = r.points[r.points.length - 1];
-
-                    const startNode = findClosestPortId(startP.lat, startP.lon);
-                    const endNode = findClosestPortId(endP.lat, endP.lon);
-
-                    if (startNode && endNode && startNode !== endNode) {
-                        if (!graph[startNode]) graph[startNode] = [];
-                        if (!graph[endNode]) graph[endNode] = [];
-
-                        // Adiciona aresta direta
-                        graph[startNode].push({ target: endNode, route: r, reverse: false, id: r.id });
-                        // Adiciona aresta reversa
-                        graph[endNode].push({ target: startNode, route: r, reverse: true, id: r.id });
-                    }
-                });
-
-                // 2. Busca em Largura (BFS)
-                const queue = [[depId]];
-                const visited = new Set();
-                const pathMap = {}; // { Node: { parent, edge } }
-
-                let found = false;
-
-                while (queue.length > 0) {
-                    const path = queue.shift();
-                    const node = path[path.length - 1];
-
-                    if (node === arrId) {
-                        found = true;
-                        break;
-                    }
-
-                    if (visited.has(node)) continue;
-                    visited.add(node);
-
-                    const neighbors = graph[node] || [];
-                    for (const edge of neighbors) {
-                        if (!visited.has(edge.target)) {
-                            if (!pathMap[edge.target]) {
-                                pathMap[edge.target] = { parent: node, edge: edge };
-                                queue.push([...path, edge.target]);
-                            }
-                        }
-                    }
-                }
-
-                if (found) {
-                    try {
-                        // 3. Reconstrói caminho
-                        let curr = arrId;
-                        const segments = [];
-                        const routeNames = [];
-
-                        while (curr !== depId) {
-                            const info = pathMap[curr];
-                            if (!info) throw new Error(`PathMap broken for ${curr}`);
-                            segments.unshift(info.edge);
-                            routeNames.unshift(info.edge.id);
-                            curr = info.parent;
-                        }
-
-                        console.log("App: Caminho reconstruído:", routeNames.join(' -> '));
-
-                        // AUTO-ACCEPT (Confirm removido)
-                        console.log("App: Costurando rotas (AUTO)...");
-
-                        let finalPoints = [];
-                        let seq = 1;
+        // Menor distância pelo grafo pré-calculado (RouteService: /api/route ou grafo estático)
+        let result;
+        try {
+            result = await RouteService.findRoute(depId, arrId);
+        } catch (e) {
+            console.error("App: Erro no auto-route", e);
+            return;
+        }
 
-                        segments.forEach((seg) => {
-                            let pts = JSON.parse(JSON.stringify(seg.route.points));
-                            if (seg.reverse) pts.reverse();
+        if (result) {
+            try {
+                const finalPoints = result.points;
+                console.log("App: Caminho:", result.segments.map(s => s.route_id).join(' -> '),
+                    `(${result.dist_nm.toFixed(1)} NM)`);
 
-                            pts.forEach(p => {
-                                finalPoints.push({
-                                    sequence: seq++,
-                                    lat: p.lat,
-                                    lon: p.lon,
-                                    name: `WPT ${seq - 1}`,
-                                    chart: ""
-                                });
-                            });
-                        });
+                State.routePoints = finalPoints;
+                this.recalculateVoyage();
+                MapService.plotRoute(finalPoints);
+                UIManager.renderRouteTable(finalPoints);
+                UIManager.unlockPlanningDashboard();
+                console.log(`App: Rota carregada: ${finalPoints.length} WPs via ${result.segments.length} arquivo(s).`);
 
-                        State.routePoints = finalPoints;
-                        this.recalculateVoyage();
-                        MapService.plotRoute(finalPoints);
-                        UIManager.renderRouteTable(finalPoints);
-                        UIManager.unlockPlanningDashboard();
-                        console.log(`App: Rota carregada: ${finalPoints.length} WPs via ${segments.length} arquivo(s).`);
-
-                    } catch (err) {
-                        console.error("App: Erro CRÍTICO na reconstrução da rota:", err);
-                        alert("Erro interno ao construir a rota. Verifique o console.");
-                    }
+            } catch (err) {
+                console.error("App: Erro CRÍTICO na reconstrução da rota:", err);
+                alert("Erro interno ao construir a rota. Verifique o console.");
+            }
 
-                } else {
-                    console.log("App: Nenhuma conexão encontrada no Grafo.");
-                    // Feedback visual solicitado pelo usuário
-                    alert(`Não foi possível calcular uma rota automática entre ${pDep.name} e ${pArr.name}.\n\nPossíveis causas:\n1. Não há arquivos GPX cobrindo este trecho.\n2. Os arquivos existentes não conectam os portos (distância > 30NM).`);
-                }
-            })
-            .catch(e => console.error("App: Erro no auto-route", e));
+        } else {
+            console.log("App: Nenhuma conexão encontrada no Grafo.");
+            // Feedback visual solicitado pelo usuário
+            alert(`Não foi possível calcular uma rota automática entre ${pDep.name} e ${pArr.name}.\n\nPossíveis causas:\n1. Não há arquivos GPX cobrindo este trecho.\n2. Os arquivos existentes não conectam os portos (distância > 30NM).`);
+        }
     },
 
     autoSelectPortsFromGPX: function (points) {
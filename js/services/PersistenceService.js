@@ -7,7 +7,7 @@
  */
 
 import State from '../core/State.js?v=7';
-import UIManager from '../utils/UIManager.js?v=7';
+import UIManager from '../utils/UIManager.js?v=8';
 import MapService from './MapService.js?v=7';
 
 const PersistenceService = {
@@ -629,6 +629,42 @@ const parseNavareaText_OLD = (text) => {
     return entries;
 };
 */
+// Luz no ETA de cada waypoint e na passagem pelos faróis do corredor
+// (servidor: /api/voyage/astro, efemérides locais do Sol e da Lua)
+const LIGHT_LABELS = { DAY: 'Dia', CIVIL: 'Crep. civil', NAUTICAL: 'Crep. náutico', NIGHT: 'Noite' };
+
+const fetchRouteAstro = async (state) => {
+    const points = state.routePoints || [];
+    const voyage = state.voyage || {};
+    if (points.length < 2 || !voyage.depTime) return null;
+    const lighthouses = ((state.appraisal && state.appraisal.lighthouses) || [])
+        .filter(lh => typeof lh.latDec === 'number' && typeof lh.lonDec === 'number');
+    try {
+        const res = await fetch('/api/voyage/astro', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                points: points.map(p => ({ lat: p.lat, lon: p.lon })),
+                etd: voyage.depTime,
+                speed_kn: (state.shipProfile || {}).speed,
+                passages: lighthouses.map(lh => ({ lat: lh.latDec, lon: lh.lonDec, name: lh.name }))
+            })
+        });
+        return res.ok ? await res.json() : null;
+    } catch (error) {
+        console.warn("ReportService: /api/voyage/astro indisponível", error);
+        return null;
+    }
+};
+
+// "DD/MM HH:MM\nNoite"
+const formatAstro = (row) => {
+    if (!row || !row.eta) return '-';
+    const [d, t] = row.eta.split('T');
+    const [, mm, dd] = d.split('-');
+    return `${dd}/${mm} ${t}\n${LIGHT_LABELS[row.light] || row.light}`;
+};
+
 const ReportService = {
     generatePDF: async function (state) {
         if (!state) {
@@ -1068,6 +1104,7 @@ const ReportService = {
             doc.text(`Distância Total: ${totalDistNm} NM  |  Pernas: ${(state.routePoints.length > 0 ? state.routePoints.length - 1 : 0)}`, 14, currentY + 5);
 
             // Build Route Data matching Plan Screen (Legs)
+            const astro = await fetchRouteAstro(state);
             const routeData = [];
             if (state.routePoints && state.routePoints.length > 1) {
                 for (let i = 0; i < state.routePoints.length - 1; i++) {
@@ -1097,21 +1134,23 @@ const ReportService = {
                         `${p1.lat.toFixed(4)}\n${p1.lon.toFixed(4)}`, // Lat/Long stacked
                         `${crs.toFixed(1)}°`,
                         legDist.toFixed(1),
-                        farolTxt
+                        farolTxt,
+                        formatAstro(astro && astro.waypoints[i + 1])
                     ]);
                 }
             }
 
             doc.autoTable({
                 startY: currentY + 8,
-                head: [['#', 'Waypoint', 'Lat / Long', 'Rumo', 'Dist.', 'Farol']],
+                head: [['#', 'Waypoint', 'Lat / Long', 'Rumo', 'Dist.', 'Farol', 'ETA / Luz']],
                 body: routeData,
                 theme: 'grid',
                 headStyles: { fillColor: [52, 152, 219], halign: 'center' },
                 styles: { fontSize: 8, valign: 'middle', halign: 'center' },
                 columnStyles: {
                     1: { halign: 'left' }, // Waypoint name left aligned
-                    5: { fontSize: 7 }     // Lighthouse smaller
+                    5: { fontSize: 7 },    // Lighthouse smaller
+                    6: { fontSize: 7 }     // ETA at p2 + daylight
                 }
             });
 
@@ -1120,21 +1159,24 @@ const ReportService = {
                 doc.addPage();
                 addSectionTitle("5. FARÓIS E AUXÍLIOS VISUAIS", 20);
 
+                // Passagem pelo través (só faróis do corredor, com coordenadas decimais)
+                const passages = new Map(((astro && astro.passages) || []).map(p => [p.name, p]));
                 const lhData = state.appraisal.lighthouses.map(lh => [
                     lh.name,
                     lh.lat + '\n' + lh.lon,
                     lh.char,
-                    doc.splitTextToSize(lh.desc || '-', 90)
+                    doc.splitTextToSize(lh.desc || '-', 75),
+                    formatAstro(passages.get(lh.name))
                 ]);
 
                 doc.autoTable({
                     startY: 30,
-                    head: [['Nome', 'Coord', 'Carac.', 'Descrição Visual']],
+                    head: [['Nome', 'Coord', 'Carac.', 'Descrição Visual', 'Passagem']],
                     body: lhData,
                     theme: 'grid',
                     headStyles: { fillColor: [230, 126, 34] },
                     styles: { fontSize: 8, valign: 'middle' },
-                    columnStyles: { 3: { fontSize: 7 } } // Smaller font for desc
+                    columnStyles: { 3: { fontSize: 7 }, 4: { fontSize: 7 } } // Smaller font for desc / passage
                 });
             }
             if (state.appraisal.meteoText || state.appraisal.navareaText) {
@@ -0,0 +1,144 @@
+/**
+ * ARQUIVO: RouteService.js
+ * MÓDULO: Rota Automática entre Portos
+ * DESCRIÇÃO: Menor caminho pelas rotas conhecidas. Usa /api/route (servidor: Dijkstra
+ * sobre o grafo pré-calculado pelo build_route_index.py, em cache por par de portos);
+ * sem o servidor Flask (python -m http.server), roda o mesmo Dijkstra sobre
+ * js/data/route_graph.json, carregado uma vez.
+ * Nível de detalhe (level): 0 = todos os pontos do GPX; 1..3 = geometria simplificada
+ * (known_routes_lod<n>.json, erro transversal de 25/100/500 m); a distância é sempre a exata.
+ * fetchTimeline: posição num horário e horário numa distância ou no través de um ponto (/api/voyage/timeline).
+ */
+
+const RouteService = {
+
+    graph: null,
+    routes: {},
+
+    /**
+     * @param {string} depId - ID do PortDatabase
+     * @param {string} arrId - ID do PortDatabase
+     * @param {number} level - Nível de detalhe da geometria (0 = completa)
+     * @returns {Promise<object|null>} { dist_nm, segments, points } ou null sem caminho
+     */
+    findRoute: async function (depId, arrId, level = 0) {
+        try {
+            const res = await fetch(`/api/route?from=${encodeURIComponent(depId)}&to=${encodeURIComponent(arrId)}&level=${level}`);
+            const isJson = (res.headers.get('content-type') || '').includes('application/json');
+            if (isJson && res.ok) return await res.json();
+            if (isJson && res.status === 404) return null;
+        } catch (e) {
+            console.warn("RouteService: /api/route indisponível, usando grafo estático", e);
+        }
+        return this.findRouteStatic(depId, arrId, level);
+    },
+
+    /**
+     * Rotas conhecidas num nível de detalhe (arquivo estático, carregado uma vez)
+     * @param {number} level
+     * @returns {Promise<Array>} [{ id, origin, destination, points }]
+     */
+    loadRoutes: async function (level = 0) {
+        if (!this.routes[level]) {
+            const file = level ? `js/data/known_routes_lod${level}.json` : 'js/data/known_routes.json';
+            this.routes[level] = await fetch(file).then(r => r.json());
+        }
+        return this.routes[level];
+    },
+
+    loadStatic: async function (level) {
+        const routes = {};
+        (await this.loadRoutes(level)).forEach(r => { routes[r.id] = r.points; });
+        if (!this.graph) {
+            const graph = await fetch('js/data/route_graph.json').then(r => r.json());
+            this.graph = {};
+            graph.edges.forEach(e => {
+                if (!routes[e.route_id]) return;
+                (this.graph[e.from] = this.graph[e.from] || []).push(e);
+            });
+        }
+        return routes;
+    },
+
+    /**
+     * Horários e posições ao longo da rota planejada (servidor: /api/voyage/timeline)
+     * @param {Array<{lat:number, lon:number}>} points - Pontos da rota
+     * @param {Date} etd - Saída (horário local)
+     * @param {object} speeds - { speedKn, towSpeedKn, towing } (towing: true ou índices das pernas rebocando)
+     * @param {object} queries - { at: [Date], distancesNm: [number], passages: [{ lat, lon, name }] }
+     * @returns {Promise<object|null>} { eta, total_nm, waypoints, positions, times, passages }
+     */
+    fetchTimeline: async function (points, etd, speeds = {}, queries = {}) {
+        const pad = (n) => n.toString().padStart(2, '0');
+        const local = (d) => `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}T${pad(d.getHours())}:${pad(d.getMinutes())}`;
+        try {
+            const res = await fetch('/api/voyage/timeline', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    points: points.map(p => ({ lat: p.lat, lon: p.lon })),
+                    etd: local(etd),
+                    speed_kn: speeds.speedKn,
+                    tow_speed_kn: speeds.towSpeedKn,
+                    towing: speeds.towing,
+                    at: (queries.at || []).map(local),
+                    distances_nm: queries.distancesNm || [],
+                    passages: queries.passages || []
+                })
+            });
+            return res.ok ? await res.json() : null;
+        } catch (e) {
+            console.error("RouteService: /api/voyage/timeline indisponível", e);
+            return null;
+        }
+    },
+
+    findRouteStatic: async function (depId, arrId, level = 0) {
+        const routes = await this.loadStatic(level);
+
+        // Dijkstra (grafo pequeno: fila ordenada simples)
+        const dist = { [depId]: 0 };
+        const parent = {};
+        const done = new Set();
+        const queue = [[0, depId]];
+        while (queue.length > 0) {
+            queue.sort((a, b) => a[0] - b[0]);
+            const [d, node] = queue.shift();
+            if (done.has(node)) continue;
+            if (node === arrId) break;
+            done.add(node);
+            (this.graph[node] || []).forEach(edge => {
+                const nd = d + edge.dist_nm;
+                if (dist[edge.to] === undefined || nd < dist[edge.to]) {
+                    dist[edge.to] = nd;
+                    parent[edge.to] = edge;
+                    queue.push([nd, edge.to]);
+                }
+            });
+        }
+        if (depId === arrId || !parent[arrId]) return null;
+
+        const segments = [];
+        for (let node = arrId; node !== depId; node = parent[node].from) segments.unshift(parent[node]);
+
+        const points = [];
+        segments.forEach(seg => {
+            const pts = routes[seg.route_id].slice();
+            if (seg.reverse) pts.reverse();
+            pts.forEach(p => {
+                const seq = points.length + 1;
+                points.push({ sequence: seq, lat: p.lat, lon: p.lon, name: `WPT ${seq}`, chart: "" });
+            });
+        });
+        return {
+            from: depId,
+            to: arrId,
+            level: level,
+            dist_nm: segments.reduce((s, e) => s + e.dist_nm, 0),
+            segments: segments.map(e => ({ route_id: e.route_id, reverse: e.reverse, dist_nm: e.dist_nm })),
+            points: points
+        };
+    }
+};
+
+export default RouteService;
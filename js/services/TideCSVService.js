@@ -2,12 +2,16 @@
  * ARQUIVO: TideCSVService.js
  * MÓDULO: Leitor de Tábua de Marés (CSV Local)
  * DESCRIÇÃO: Processa o arquivo consolidado de marés da Marinha/DHN convertido de PDF.
+ * Além do último dia coletado, usa a previsão harmônica do servidor (/api/tide/harmonic,
+ * constantes ajustadas às próprias preia-mares e baixa-mares coletadas).
  */
 
 const TideCSVService = {
 
     csvPath: './tides_scraped.csv',
     weatherCsvPath: './weather_scraped.csv',
+    harmonicPath: '/api/tide/harmonic',
+    harmonicDays: 30,
 
     // Cache: Map<StationName, Map<DateString, tideObject>>
     tideCache: new Map(),
@@ -44,6 +48,9 @@ const TideCSVService = {
                 console.warn("TideCSV: tides_scraped.csv não encontrado.");
             }
 
+            // Previsão harmônica para os dias além da coleta (só com o servidor Flask)
+            await this.loadHarmonicForecast();
+
             // Load Weather
             const weatherRes = await fetch(this.weatherCsvPath);
             if (weatherRes.ok) {
@@ -89,6 +96,36 @@ const TideCSVService = {
         }
     },
 
+    loadHarmonicForecast: async function () {
+        try {
+            const res = await fetch(`${this.harmonicPath}?days=${this.harmonicDays}`);
+            if (!res.ok || !(res.headers.get('content-type') || '').includes('application/json')) return;
+            const data = await res.json();
+            let days = 0;
+            for (const st of Object.values(data.stations || {})) {
+                if (!this.tideCache.has(st.station_name)) this.tideCache.set(st.station_name, new Map());
+                const stationMap = this.tideCache.get(st.station_name);
+                const predicted = new Map();
+                for (const ev of st.events) {
+                    const [dateISO, timeStr] = ev.time.split('T');
+                    if (stationMap.has(dateISO)) continue; // dia coletado prevalece
+                    if (!predicted.has(dateISO)) predicted.set(dateISO, []);
+                    predicted.get(dateISO).push({
+                        time: timeStr,
+                        height: ev.height,
+                        type: ev.type.includes('preia') ? 'HIGH' : 'LOW',
+                        predicted: true
+                    });
+                }
+                predicted.forEach((events, dateISO) => stationMap.set(dateISO, events));
+                days += predicted.size;
+            }
+            console.log(`TideCSV: Previsão harmônica para ${days} dia(s)-estação além da coleta.`);
+        } catch (error) {
+            console.warn("TideCSV: previsão harmônica indisponível.", error);
+        }
+    },
+
     parseWeatherCSV: function (csvText) {
         const lines = csvText.split('\n');
         // header: station_id, station_name, date, time, wind_speed, wind_dir, wave_height, wave_dir, temp
@@ -165,7 +202,7 @@ const TideCSVService = {
         if (!tides) return null;
 
         return {
-            source: 'TabuaDeMares/Scraped',
+            source: tides.some(ev => ev.predicted) ? 'Harmônica (previsão local)' : 'TabuaDeMares/Scraped',
             date: dateStr,
             events: tides.sort((a, b) => a.time.localeCompare(b.time))
         };
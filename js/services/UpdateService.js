@@ -1,83 +1,81 @@
 /**
  * ARQUIVO: UpdateService.js
  * MÓDULO: Serviço de Atualização On-Demand
- * DESCRIÇÃO: Comunica com backend Python (Flask) para renovar dados CSV.
+ * DESCRIÇÃO: Comunica com backend Python (Flask) para renovar dados CSV (job em segundo plano).
  */
 
 const UpdateService = {
 
     isUpdating: false,
+    jobId: null,
+    pollIntervalMs: 1000,
 
     /**
      * Inicia o processo de atualização
+     * O servidor roda a atualização em segundo plano (job) e devolve o id;
+     * o progresso é acompanhado consultando /api/jobs/<id>.
      * @param {Function} onProgress - Callback (text, percent)
      * @param {Function} onComplete - Callback (success)
+     * @param {string} mode - 'full' (todas as estações) ou 'incremental'
      */
-    triggerUpdate: function (onProgress, onComplete) {
+    triggerUpdate: function (onProgress, onComplete, mode = 'full') {
         if (this.isUpdating) return;
         this.isUpdating = true;
 
         console.log("UpdateService: Conectando ao servidor...");
         onProgress("Conectando...", 0);
 
-        const eventSource = new EventSource('/api/update-data', {
-            method: 'POST' // EventSource is usually GET, check browser support. 
-            // Native EventSource is GET only. 
-            // For POST, we might need 'fetch' with reader, 
-            // BUT server.py implements GET for SSE usually? 
-            // Flask route is POST. Wait. EventSource doesn't support POST.
-            // I will change server.py to GET or use fetch stream.
-        });
-
-        // ERROR: EventSource DOES NOT support POST args in standard API.
-        // Changing strategy: Use FETCH with ReadableStream
-
-        this.runFetchStream(onProgress, onComplete);
+        this.runJob(mode, onProgress, onComplete);
     },
 
-    runFetchStream: async function (onProgress, onComplete) {
+    runJob: async function (mode, onProgress, onComplete) {
         try {
             const response = await fetch('/api/update-data', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ mode: 'full' })
+                body: JSON.stringify({ mode: mode })
             });
 
             if (!response.ok) throw new Error("Erro na conexão com servidor");
 
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
+            // Se já havia atualização em andamento, o servidor devolve o mesmo job
+            let job = await response.json();
+            this.jobId = job.job_id;
 
-            while (true) {
-                const { value, done } = await reader.read();
-                if (done) break;
+            while (['queued', 'running', 'cancelling'].includes(job.status)) {
+                onProgress(job.message, job.progress);
+                await new Promise(resolve => setTimeout(resolve, this.pollIntervalMs));
 
-                const chunk = decoder.decode(value, { stream: true });
-                // Parse "data: {...}" lines
-                const lines = chunk.split('\n\n');
-                for (const line of lines) {
-                    if (line.startsWith('data: ')) {
-                        try {
-                            const json = JSON.parse(line.replace('data: ', ''));
-                            if (json.status) onProgress(json.status, json.progress);
-                            if (json.error) throw new Error(json.status);
-                            if (json.progress === 100) {
-                                this.isUpdating = false;
-                                onComplete(true);
-                                return;
-                            }
-                        } catch (e) {
-                            // Ignore parse errors on partial chunks
-                        }
-                    }
-                }
+                const res = await fetch(`/api/jobs/${this.jobId}`);
+                if (!res.ok) throw new Error("Job de atualização não encontrado");
+                job = await res.json();
             }
+
+            onProgress(job.message, job.progress);
+            this.isUpdating = false;
+            this.jobId = null;
+            if (job.status === 'failed') throw new Error(job.error);
+            onComplete(job.status === 'done');
         } catch (error) {
             console.error("Update Failed:", error);
             onProgress(`Erro: ${error.message}`, 0);
             this.isUpdating = false;
+            this.jobId = null;
             onComplete(false);
         }
+    },
+
+    /**
+     * Pede o cancelamento da atualização em andamento
+     * As estações já coletadas são gravadas; as demais ficam com os dados anteriores.
+     */
+    cancel: async function () {
+        if (!this.jobId) return;
+        try {
+            await fetch(`/api/jobs/${this.jobId}/cancel`, { method: 'POST' });
+        } catch (error) {
+            console.error("Cancel Failed:", error);
+        }
     }
 };
 
@@ -3,11 +3,11 @@
  * MÓDULO: Cliente de Dados Ambientais
  * AUTOR: Jossian Brito
  * DATA: 2025-12-16
- * VERSÃO: 3.2.0 (Error Handling 400)
+ * VERSÃO: 3.3.0 (Travessia numa chamada: /api/voyage/metocean)
  */
 
 import TideLocator from './TideLocator.js?v=6';
-import TideCSVService from './TideCSVService.js?v=7';
+import TideCSVService from './TideCSVService.js?v=8';
 
 const WeatherAPI = {
 
@@ -27,6 +27,94 @@ const WeatherAPI = {
         return parseFloat(val.toString().replace(/[^\d.-]/g, ''));
     },
 
+    /**
+     * Linha do tempo da travessia inteira numa chamada (servidor: /api/voyage/metocean).
+     * @param {Array<{lat:number, lon:number}>} points - Pontos da rota
+     * @param {Date} etd - Saída (horário local)
+     * @param {number} speedKn - Velocidade de cruzeiro
+     * @returns {Promise<Object|null>} { eta, total_nm, waypoints: [{ eta, ref_station, tide_height, tide_trend, wind_kn, ... }] }
+     */
+    fetchVoyageMetOcean: async function (points, etd, speedKn) {
+        const pad = (n) => n.toString().padStart(2, '0');
+        const etdLocal = `${etd.getFullYear()}-${pad(etd.getMonth() + 1)}-${pad(etd.getDate())}T${pad(etd.getHours())}:${pad(etd.getMinutes())}`;
+        try {
+            const res = await fetch('/api/voyage/metocean', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ points: points.map(p => ({ lat: p.lat, lon: p.lon })), etd: etdLocal, speed_kn: speedKn })
+            });
+            return res.ok ? await res.json() : null;
+        } catch (error) {
+            console.error("WeatherAPI: /api/voyage/metocean indisponível", error);
+            return null;
+        }
+    },
+
+    /**
+     * Converte um waypoint de /api/voyage/metocean no formato de fetchMetOcean (cards de partida/chegada).
+     * @param {Object} wp - Waypoint da resposta ({ eta, location_type, ref_station, tide_height, wind_kn, ... })
+     * @returns {Object} Mesmo formato de fetchMetOcean
+     */
+    fromVoyageWaypoint: function (wp) {
+        const eta = new Date(wp.eta);
+        return {
+            status: 'OK',
+            timestamp: eta,
+            locationType: wp.location_type,
+            refStation: wp.ref_station ? `${wp.ref_station.name} (TabuaDeMares)` : 'Desconhecido',
+            exactTime: eta.toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' }),
+            atmosphere: {
+                temp: wp.temp,
+                windSpd: wp.wind_kn !== null ? wp.wind_kn.toFixed(1) : null,
+                windDir: wp.wind_dir,
+                windCard: wp.wind_dir || "-"
+            },
+            marine: {
+                waveHeight: wp.wave_height,
+                waveDir: wp.wave_dir,
+                tideHeight: wp.tide_height,
+                exactTideHeight: wp.tide_height,
+                tideTrend: wp.tide_trend,
+                tideEvents: [],
+                isTideReliable: wp.tide_height !== null
+            }
+        };
+    },
+
+    /**
+     * Janelas de saída: ETDs a cada stepMin minutos com maré no destino e vento/ondas na rota
+     * dentro dos limites (servidor: /api/voyage/departure-windows).
+     * @param {Array<{lat:number, lon:number}>} points - Pontos da rota
+     * @param {number} speedKn - Velocidade de cruzeiro
+     * @param {Object} limits - { minTideM, maxWindKn, maxWaveM } (ausente = sem limite)
+     * @param {Object} options - { start: Date, end: Date, stepMin: number } (padrão: horizonte dos dados, 15 min)
+     * @returns {Promise<Object|null>} { windows: [{ start, end, duration_h, best_etd, best_eta, ... }], n_candidates, ... }
+     */
+    fetchDepartureWindows: async function (points, speedKn, limits = {}, options = {}) {
+        const pad = (n) => n.toString().padStart(2, '0');
+        const local = (d) => (d ? `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}T${pad(d.getHours())}:${pad(d.getMinutes())}` : null);
+        try {
+            const res = await fetch('/api/voyage/departure-windows', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    points: points.map(p => ({ lat: p.lat, lon: p.lon })),
+                    speed_kn: speedKn,
+                    start: local(options.start),
+                    end: local(options.end),
+                    step_min: options.stepMin,
+                    min_tide_m: limits.minTideM,
+                    max_wind_kn: limits.maxWindKn,
+                    max_wave_m: limits.maxWaveM
+                })
+            });
+            return res.ok ? await res.json() : null;
+        } catch (error) {
+            console.error("WeatherAPI: /api/voyage/departure-windows indisponível", error);
+            return null;
+        }
+    },
+
     fetchMetOcean: async function (lat, lon, dateObj) {
 
         // 0. Init CSV Service
@@ -28,6 +28,7 @@ const UIManager = {
         weatherDep: document.getElementById('card-weather-dep'),
         weatherArr: document.getElementById('card-weather-arr'),
         weatherArr: document.getElementById('card-weather-arr'),
+        departureWindows: document.getElementById('departure-windows-results'),
         planningDashboard: document.getElementById('planning-dashboard'),
         coverScreen: document.getElementById('view-cover'),
         btnStart: document.getElementById('btn-start-app')
@@ -313,6 +314,59 @@ const UIManager = {
         `;
     },
 
+    /**
+     * Lista as janelas de saída (/api/voyage/departure-windows), da mais longa para a mais curta
+     * @param {object|null|undefined} result - Resposta do servidor; undefined = buscando, null = falha
+     * @param {function} onPick - Chamada com o best_etd ("AAAA-MM-DDTHH:MM") da janela clicada
+     */
+    renderDepartureWindows: function (result, onPick) {
+        const container = this.elements.departureWindows;
+        if (!container) return;
+
+        if (result === undefined) {
+            container.innerHTML = `<span class="text-xs text-emerald-600 animate-pulse"><i class="fas fa-spinner fa-spin mr-1"></i> Varrendo saídas...</span>`;
+            return;
+        }
+        if (!result) {
+            container.innerHTML = `<span class="text-xs text-red-500 font-bold"><i class="fas fa-exclamation-triangle"></i> Servidor indisponível</span>`;
+            return;
+        }
+
+        const fmt = (iso) => {
+            const d = new Date(iso);
+            const pad = n => n.toString().padStart(2, '0');
+            return `${pad(d.getDate())}/${pad(d.getMonth() + 1)} ${pad(d.getHours())}:${pad(d.getMinutes())}`;
+        };
+        const val = (v, unit) => (v !== null && v !== undefined ? `${v.toFixed(1)} ${unit}` : '--');
+
+        if (!result.n_candidates) {
+            container.innerHTML = `<span class="text-xs text-gray-500">Sem previsão de maré e tempo à frente (atualize os dados).</span>`;
+            return;
+        }
+        if (!result.windows.length) {
+            const span = result.start ? ` entre ${fmt(result.start)} e ${fmt(result.end)}` : '';
+            container.innerHTML = `<span class="text-xs text-gray-500">Nenhuma saída dentro dos limites${span}.</span>`;
+            return;
+        }
+
+        container.innerHTML = result.windows.slice(0, 5).map((w, i) => `
+            <button data-window="${i}" title="Usar a saída sugerida como ETD"
+                class="w-full text-left bg-white hover:bg-emerald-100 border border-emerald-100 rounded px-2 py-1 text-[10px] text-slate-700">
+                <div class="flex justify-between font-bold">
+                    <span>#${w.rank} ${fmt(w.start)} – ${fmt(w.end)}</span>
+                    <span class="text-emerald-700">${w.duration_h.toFixed(1)} h</span>
+                </div>
+                <div class="text-gray-500">
+                    Saída ${fmt(w.best_etd)} · chegada ${fmt(w.best_eta)} ·
+                    maré ${val(w.arrival_tide_m, 'm')} · vento ${val(w.max_wind_kn, 'kn')} · onda ${val(w.max_wave_m, 'm')}
+                </div>
+            </button>`).join('');
+
+        container.querySelectorAll('button[data-window]').forEach(btn => {
+            btn.addEventListener('click', () => onPick(result.windows[parseInt(btn.dataset.window, 10)].best_etd));
+        });
+    },
+
     renderTideInfo: function (marineData, minimized = false) {
         if (marineData.tideEvents && marineData.tideEvents.length > 0) {
 
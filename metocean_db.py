@@ -0,0 +1,355 @@
+"""
+Base SQLite de Marés e Meteorologia (backend opcional)
+Com SISNAV_DB ligado (ou `python ingest.py --db`), a ingestão grava cada
+coleta numa base SQLite, com upserts em lote numa única transação, e os
+arquivos consumidos pelo frontend (tides_scraped.csv, weather_scraped.csv,
+maritimo_mare_meteo.json) passam a ser exportações geradas a partir dela.
+As séries ficam indexadas por (station_id, ts), com ts em minutos desde
+1970-01-01 no horário local da estação (mesma convenção do columnar_store.py),
+e este módulo também atende as consultas do servidor Flask:
+- eventos de maré de um dia
+- vento/ondas da hora mais próxima
+- marés e tempo de várias estações na janela da travessia
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from columnar_store import _row_minutes, from_epoch_minutes, to_epoch_minutes
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, 'data', 'sisnav.db')
+
+# SISNAV_DB: vazio/0 = desligado; 1 = data/sisnav.db; qualquer outro valor = caminho da base
+DB_ENV = os.environ.get('SISNAV_DB', '').strip()
+
+NEAREST_MAX_GAP_MIN = 180    # nearest_weather não aceita amostra mais distante que isso
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    station_id     TEXT PRIMARY KEY,
+    name           TEXT,
+    port_key       TEXT,
+    base_url       TEXT,
+    fetched_at_utc TEXT,
+    errors         TEXT              -- JSON da última coleta
+);
+CREATE TABLE IF NOT EXISTS tide_events (
+    station_id TEXT    NOT NULL,
+    ts         INTEGER NOT NULL,
+    date       TEXT,                 -- DD/MM/YYYY, como no CSV
+    time       TEXT,                 -- H:MM, como no CSV
+    height     REAL,
+    type       TEXT,
+    PRIMARY KEY (station_id, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS weather_hourly (
+    station_id  TEXT    NOT NULL,
+    ts          INTEGER NOT NULL,
+    date        TEXT,
+    time        TEXT,
+    wind_speed  REAL,
+    wind_dir    TEXT,
+    wave_height REAL,
+    wave_dir    TEXT,
+    temp        REAL,
+    PRIMARY KEY (station_id, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS port_series (
+    station_id TEXT    NOT NULL,
+    series     TEXT    NOT NULL,     -- tides_7d / weather_hourly / wind_hourly (JSON dos portos)
+    ts         INTEGER NOT NULL,
+    payload    TEXT    NOT NULL,     -- item da lista, em JSON
+    PRIMARY KEY (station_id, series, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS port_series_station_ts ON port_series (station_id, ts);
+"""
+
+# Colunas de valor das tabelas vindas dos CSVs (além de station_id, ts, date, time)
+TABLES: Dict[str, Sequence[str]] = {
+    'tide_events': ('height', 'type'),
+    'weather_hourly': ('wind_speed', 'wind_dir', 'wave_height', 'wave_dir', 'temp'),
+}
+REAL_COLUMNS = {'height', 'wind_speed', 'wave_height', 'temp'}
+
+
+def _iso_ts(day_iso: str, hhmm: Optional[str]) -> Optional[int]:
+    """'YYYY-MM-DD' + 'H:MM' (hora ausente = início do dia) -> ts"""
+    try:
+        minutes = to_epoch_minutes(date.fromisoformat(day_iso))
+    except (TypeError, ValueError):
+        return None
+    try:
+        h, mi = hhmm.split(':')
+        minutes += int(h) * 60 + int(mi)
+    except (AttributeError, ValueError):
+        pass
+    return minutes
+
+
+def _real(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _day_bounds(ts: int) -> Tuple[int, int]:
+    start = ts - ts % 1440
+    return start, start + 1440
+
+
+class MetoceanDB:
+    """
+    Acesso à base SQLite (uma conexão por thread; WAL para leitura durante a gravação)
+
+    Gravação (ingest.py), sempre dentro de `with db.transaction():`
+        db.replace_days('tide_events', linhas_do_csv)
+        db.replace_series_days(station_id, 'tides_7d', itens, 'time_local')
+        db.set_port(...)
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: transações explícitas em transaction()
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Uma transação (BEGIN IMMEDIATE ... COMMIT; ROLLBACK em exceção), reentrante na thread"""
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def is_empty(self, table: str) -> bool:
+        return self.conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() is None
+
+    # ---------------------------
+    # Gravação
+    # ---------------------------
+    def replace_days(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upsert das linhas (formato dos CSVs); cada (estação, dia) presente substitui o dia inteiro
+
+        Mesma regra da mesclagem dos CSVs: um horário que mudou de 4:00 para
+        4:02 não deixa a linha antiga para trás.
+        """
+        values = TABLES[table]
+        batch, days, names = [], set(), {}
+        for row in rows:
+            ts = _row_minutes(row.get('date'), row.get('time'))
+            if ts is None:
+                continue
+            names[row['station_id']] = row.get('station_name') or row['station_id']
+            days.add((row['station_id'], _day_bounds(ts)))
+            batch.append((row['station_id'], ts, row['date'], row['time'],
+                          *(_real(row.get(c)) if c in REAL_COLUMNS else row.get(c) for c in values)))
+        columns = ('station_id', 'ts', 'date', 'time') + tuple(values)
+        updates = ', '.join(f'{c} = excluded.{c}' for c in columns[2:])
+        with self.transaction() as conn:
+            conn.executemany('INSERT INTO stations (station_id, name) VALUES (?, ?) '
+                             'ON CONFLICT (station_id) DO UPDATE SET name = excluded.name', names.items())
+            conn.executemany(f'DELETE FROM {table} WHERE station_id = ? AND ts >= ? AND ts < ?',
+                             [(sid, lo, hi) for sid, (lo, hi) in days])
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (station_id, ts) DO UPDATE SET {updates}", batch)
+        return len(batch)
+
+    def replace_series_days(self, station_id: str, series: str, items: Iterable[Dict[str, Any]],
+                            time_key: str) -> int:
+        """
+        Upsert dos itens de uma lista do JSON dos portos; dias presentes substituem os antigos
+
+        Cada item precisa de data e hora próprias: itens com o mesmo horário se
+        sobrescrevem (o último fica) e isso é registrado como aviso.
+        """
+        batch, days, seen = [], set(), set()
+        repeated = 0
+        for item in items:
+            ts = _iso_ts(item.get('date_iso'), item.get(time_key))
+            if ts is None:
+                continue
+            repeated += ts in seen
+            seen.add(ts)
+            days.add(_day_bounds(ts))
+            batch.append((station_id, series, ts, json.dumps(item, ensure_ascii=False)))
+        if repeated:
+            logger.warning(f"{station_id}/{series}: {repeated} itens com data e hora repetidas foram sobrescritos")
+        with self.transaction() as conn:
+            conn.executemany('DELETE FROM port_series WHERE station_id = ? AND series = ? AND ts >= ? AND ts < ?',
+                             [(station_id, series, lo, hi) for lo, hi in days])
+            conn.executemany(
+                'INSERT INTO port_series (station_id, series, ts, payload) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (station_id, series, ts) DO UPDATE SET payload = excluded.payload', batch)
+        return len(seen)
+
+    def set_port(self, station_id: str, name: str, port_key: str, base_url: str,
+                 fetched_at_utc: Optional[str], errors: List[Dict[str, Any]], keep_fetched_at: bool = False) -> None:
+        """Metadados do porto (keep_fetched_at: mantém o horário anterior, se houver)"""
+        with self.transaction() as conn:
+            conn.execute(
+                'INSERT INTO stations (station_id, name, port_key, base_url, fetched_at_utc, errors) '
+                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (station_id) DO UPDATE SET '
+                'name = COALESCE(excluded.name, stations.name), port_key = excluded.port_key, '
+                'base_url = excluded.base_url, errors = excluded.errors, fetched_at_utc = CASE '
+                'WHEN ? AND stations.fetched_at_utc IS NOT NULL THEN stations.fetched_at_utc '
+                'ELSE excluded.fetched_at_utc END',
+                (station_id, name, port_key, base_url, fetched_at_utc, json.dumps(errors, ensure_ascii=False),
+                 keep_fetched_at))
+
+    # ---------------------------
+    # Exportação (arquivos do frontend)
+    # ---------------------------
+    def rows(self, table: str, since: date = None, station_id: str = None) -> List[Dict[str, Any]]:
+        """Linhas no formato do CSV (station_name vem da tabela stations ou do próprio id)"""
+        where, params = [], []
+        if since is not None:
+            where.append('t.ts >= ?')
+            params.append(to_epoch_minutes(since))
+        if station_id is not None:
+            where.append('t.station_id = ?')
+            params.append(station_id)
+        sql = (f"SELECT t.*, COALESCE(s.name, t.station_id) AS station_name FROM {table} t "
+               f"LEFT JOIN stations s ON s.station_id = t.station_id "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY t.station_id, t.ts")
+        return [dict(r) for r in self.conn.execute(sql, params)]
+
+    def ports(self, since: date = None, series: Sequence[str] = ()) -> Dict[str, Dict[str, Any]]:
+        """Objetos do JSON dos portos, por port_key (listas a partir de `since`)"""
+        ports: Dict[str, Dict[str, Any]] = {}
+        by_station: Dict[str, Dict[str, Any]] = {}
+        for r in self.conn.execute('SELECT * FROM stations WHERE port_key IS NOT NULL'):
+            port = {'base_url': r['base_url'], 'fetched_at_utc': r['fetched_at_utc']}
+            port.update({name: [] for name in series})
+            port['errors'] = json.loads(r['errors'] or '[]')
+            ports[r['port_key']] = by_station[r['station_id']] = port
+        start = to_epoch_minutes(since) if since is not None else -2 ** 31
+        for r in self.conn.execute('SELECT station_id, series, payload FROM port_series WHERE ts >= ? '
+                                   'ORDER BY station_id, series, ts', (start,)):
+            port = by_station.get(r['station_id'])
+            if port is not None and r['series'] in port:
+                port[r['series']].append(json.loads(r['payload']))
+        return ports
+
+    # ---------------------------
+    # Consultas (servidor)
+    # ---------------------------
+    def tide_events_for_day(self, station_id: str, day: date) -> List[Dict[str, Any]]:
+        """Preia-mares e baixa-mares da estação no dia"""
+        lo = to_epoch_minutes(day)
+        cur = self.conn.execute('SELECT ts, height, type FROM tide_events WHERE station_id = ? AND ts >= ? AND ts < ? '
+                                'ORDER BY ts', (station_id, lo, lo + 1440))
+        return [self._event(r) for r in cur]
+
+    def nearest_weather(self, station_id: str, when: datetime,
+                        max_gap_min: int = NEAREST_MAX_GAP_MIN) -> Optional[Dict[str, Any]]:
+        """Amostra horária de vento/ondas mais próxima de `when` (None se nenhuma a até max_gap_min)"""
+        ts = to_epoch_minutes(when)
+        before = self.conn.execute('SELECT * FROM weather_hourly WHERE station_id = ? AND ts <= ? '
+                                   'ORDER BY ts DESC LIMIT 1', (station_id, ts)).fetchone()
+        after = self.conn.execute('SELECT * FROM weather_hourly WHERE station_id = ? AND ts > ? '
+                                  'ORDER BY ts LIMIT 1', (station_id, ts)).fetchone()
+        candidates = [r for r in (before, after) if r is not None and abs(r['ts'] - ts) <= max_gap_min]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda r: abs(r['ts'] - ts))
+        return self._weather(best, gap_min=best['ts'] - ts)
+
+    def window(self, station_ids: Sequence[str], start: datetime, end: datetime) -> Dict[str, Dict[str, Any]]:
+        """Marés e tempo de cada estação entre start e end (janela da travessia)"""
+        lo, hi = to_epoch_minutes(start), to_epoch_minutes(end)
+        out = {}
+        for sid in station_ids:
+            tides = self.conn.execute('SELECT ts, height, type FROM tide_events WHERE station_id = ? '
+                                      'AND ts >= ? AND ts <= ? ORDER BY ts', (sid, lo, hi))
+            weather = self.conn.execute('SELECT * FROM weather_hourly WHERE station_id = ? '
+                                        'AND ts >= ? AND ts <= ? ORDER BY ts', (sid, lo, hi))
+            out[sid] = {'tides': [self._event(r) for r in tides], 'weather': [self._weather(r) for r in weather]}
+        return out
+
+    @staticmethod
+    def _event(r: sqlite3.Row) -> Dict[str, Any]:
+        return {'time': from_epoch_minutes(r['ts']).isoformat(timespec='minutes'),
+                'height': r['height'], 'type': r['type']}
+
+    @staticmethod
+    def _weather(r: sqlite3.Row, **extra) -> Dict[str, Any]:
+        return {'time': from_epoch_minutes(r['ts']).isoformat(timespec='minutes'),
+                'wind_speed': r['wind_speed'], 'wind_dir': r['wind_dir'],
+                'wave_height': r['wave_height'], 'wave_dir': r['wave_dir'], 'temp': r['temp'], **extra}
+
+
+def from_env(value: str = None) -> Optional[MetoceanDB]:
+    """Base configurada por SISNAV_DB (None se desligada)"""
+    value = DB_ENV if value is None else value
+    if value in ('', '0'):
+        return None
+    return MetoceanDB(DB_PATH if value == '1' else value)
+
+
+def db_from_args(args: Sequence[str]) -> Tuple[Optional[MetoceanDB], List[str]]:
+    """
+    Lê a opção --db da linha de comando e devolve (base ou None, demais argumentos)
+
+    --db             grava em data/sisnav.db
+    --db=CAMINHO     grava na base indicada
+    sem a opção      vale SISNAV_DB
+    """
+    value, rest = None, []
+    for arg in args:
+        if arg == '--db' or arg.startswith('--db='):
+            value = arg.partition('=')[2] or '1'
+        else:
+            rest.append(arg)
+    return from_env(value), rest
+
+
+_shared: Optional[MetoceanDB] = None
+_shared_lock = threading.Lock()
+
+
+def get_db() -> Optional[MetoceanDB]:
+    """Base do processo para as rotas do servidor (None se SISNAV_DB desligada)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = from_env()
+        return _shared
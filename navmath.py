@@ -0,0 +1,148 @@
+"""
+Núcleo Matemático de Navegação (porte do js/core/NavMath.js)
+Loxodromia como no navegador: calc_leg, parse_dms e format_pos com os mesmos
+resultados do NavMath.js (mesma ordem das operações; check_navmath.py compara
+com o próprio JS), e versões vetorizadas (NumPy) sobre a rota inteira: rumo e
+distância de cada perna, distância acumulada e ETA de cada ponto.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import math
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, laços em Python puro
+    np = None
+
+EARTH_RADIUS_NM = 3440.065
+_FLOAT_PREFIX = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
+
+
+class Leg(NamedTuple):
+    crs: float       # rumo verdadeiro (graus, 0-360)
+    dist: float      # distância loxodrômica (NM)
+
+
+class LegTable(NamedTuple):
+    crs: List[float]                 # rumo de cada perna (n - 1)
+    dist: List[float]                # distância de cada perna (n - 1)
+    along: List[float]               # distância acumulada até cada ponto (n, começa em 0)
+    eta_h: Optional[List[float]]     # horas desde a saída até cada ponto (n); None sem velocidade
+
+
+def to_rad(deg: float) -> float:
+    return deg * math.pi / 180
+
+
+def format_pos(val: float, type: str) -> str:
+    """Coordenada decimal em texto (ex: "23° 07.358' S"), como o NavMath.formatPos"""
+    abs_val = abs(val)
+    deg = math.floor(abs_val)
+    # toFixed(3) do JS: arredonda o valor binário exato, empate para cima
+    minutes = Decimal((abs_val - deg) * 60).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP)
+    if type == 'lat':
+        suffix = 'N' if val >= 0 else 'S'
+    else:
+        suffix = 'E' if val >= 0 else 'W'
+    return f"{deg}° {minutes}' {suffix}"
+
+
+def _parse_float(text: str) -> float:
+    """parseFloat do JS: prefixo numérico, NaN se não houver"""
+    match = _FLOAT_PREFIX.match(text.strip())
+    return float(match.group(0)) if match else math.nan
+
+
+def parse_dms(dms_str: str) -> float:
+    """Texto DMS (ex: "04°25.86' N") em graus decimais, como o NavMath.parseDMS"""
+    if not dms_str or not isinstance(dms_str, str):
+        return 0
+    clean = re.sub(r'°|\'|"', ' ', dms_str).strip().upper()
+    factor = -1 if 'S' in clean or 'W' in clean else 1
+    parts = re.split(r'\s+', re.sub(r'[NSEW]', '', clean).strip())
+    deg = _parse_float(parts[0])
+    minutes = _parse_float(parts[1]) if len(parts) >= 2 else 0
+    sec = _parse_float(parts[2]) if len(parts) >= 3 else 0
+    return factor * (deg + minutes / 60 + sec / 3600)
+
+
+def calc_leg(lat1: float, lon1: float, lat2: float, lon2: float) -> Leg:
+    """Rumo e distância loxodrômicos entre dois pontos (NavMath.calcLeg)"""
+    d_lon = (lon2 - lon1) * math.pi / 180
+    phi1 = lat1 * math.pi / 180
+    phi2 = lat2 * math.pi / 180
+    d_phi = math.log(math.tan(math.pi / 4 + phi2 / 2) / math.tan(math.pi / 4 + phi1 / 2))
+    q = math.atan2(d_lon, d_phi) * 180 / math.pi
+    if q < 0:
+        q += 360
+    d_lat = (lat2 - lat1) * math.pi / 180
+    if abs(d_lat) < 1e-10:
+        # Rumos E/W: distância no paralelo
+        dist = abs(d_lon) * math.cos(phi1) * EARTH_RADIUS_NM
+    else:
+        dist = abs(d_lat / math.cos(q * math.pi / 180)) * EARTH_RADIUS_NM
+    return Leg(q, dist)
+
+
+def _legs_np(lats, lons):
+    lat, lon = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    d_lon = np.diff(lon) * np.pi / 180
+    phi = lat * np.pi / 180
+    d_phi = np.log(np.tan(np.pi / 4 + phi[1:] / 2) / np.tan(np.pi / 4 + phi[:-1] / 2))
+    q = np.arctan2(d_lon, d_phi) * 180 / np.pi
+    q = np.where(q < 0, q + 360, q)
+    d_lat = np.diff(lat) * np.pi / 180
+    with np.errstate(divide='ignore', invalid='ignore'):
+        general = np.abs(d_lat / np.cos(q * np.pi / 180)) * EARTH_RADIUS_NM
+    dist = np.where(np.abs(d_lat) < 1e-10, np.abs(d_lon) * np.cos(phi[:-1]) * EARTH_RADIUS_NM, general)
+    return q, dist
+
+
+def rhumb_legs(lats: Sequence[float], lons: Sequence[float]) -> List[float]:
+    """Distância (NM) de cada perna consecutiva, loxodrômica como o NavMath.calcLeg"""
+    if np is not None and len(lats) > 1:
+        return _legs_np(lats, lons)[1].tolist()
+    return [calc_leg(lats[i], lons[i], lats[i + 1], lons[i + 1]).dist for i in range(len(lats) - 1)]
+
+
+def leg_table(lats: Sequence[float], lons: Sequence[float],
+              speed_kn: Union[float, Sequence[float], None] = None) -> LegTable:
+    """
+    Tabela de pernas da rota inteira numa passada
+
+    Args:
+        lats / lons: Pontos da rota, em ordem
+        speed_kn: Velocidade constante ou uma por perna (n - 1); None não calcula ETA
+
+    Raises:
+        ValueError: speed_kn <= 0 ou com tamanho diferente do número de pernas
+    """
+    n = len(lats)
+    per_leg = speed_kn is not None and not isinstance(speed_kn, (int, float))
+    if per_leg and len(speed_kn) != max(n - 1, 0):
+        raise ValueError(f"speed_kn com {len(speed_kn)} valores para {max(n - 1, 0)} pernas")
+    if speed_kn is not None and min(speed_kn if per_leg else [speed_kn], default=1) <= 0:
+        raise ValueError("speed_kn deve ser > 0")
+
+    if np is not None and n > 1:
+        crs, dist = _legs_np(lats, lons)
+        along = np.concatenate(([0.0], np.cumsum(dist)))
+        eta_h = None
+        if per_leg:
+            eta_h = np.concatenate(([0.0], np.cumsum(dist / np.asarray(speed_kn, dtype=float)))).tolist()
+        elif speed_kn is not None:
+            eta_h = (along / speed_kn).tolist()
+        return LegTable(crs.tolist(), dist.tolist(), along.tolist(), eta_h)
+
+    legs = [calc_leg(lats[i], lons[i], lats[i + 1], lons[i + 1]) for i in range(n - 1)]
+    along = [0.0] * min(n, 1)
+    eta_h = None if speed_kn is None else [0.0] * min(n, 1)
+    for i, leg in enumerate(legs):
+        along.append(along[-1] + leg.dist)
+        if eta_h is not None:
+            eta_h.append(eta_h[-1] + leg.dist / speed_kn[i] if per_leg else along[-1] / speed_kn)
+    return LegTable([leg.crs for leg in legs], [leg.dist for leg in legs], along, eta_h)
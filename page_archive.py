@@ -0,0 +1,181 @@
+"""
+Arquivo de Páginas para Gravação e Reprodução (record / replay)
+Guarda cada página baixada pelos coletores, comprimida, chaveada pela URL e
+pelo horário da coleta. No modo replay o FetchEngine serve as páginas daqui,
+sem rede: rebuild_csv.py, update_weather_batch.py, scripts/scraping_tabuademares.py
+e ingest.py reconstroem os datasets offline, e as bancadas medem os parsers
+sobre páginas reais.
+Layout: <diretório>/<sha1 da URL>/<horário em ms>.json.gz
+(JSON com url, horário, status, cabeçalhos e corpo)
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+
+from http_cache import CachedResponse, atomic_write
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.join(SCRIPT_DIR, 'data', 'page_archive')
+
+RECORD, REPLAY = 'record', 'replay'
+
+# Cabeçalhos guardados junto com o corpo
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Date')
+
+
+class ArchiveMiss(requests.ConnectionError):
+    """Modo replay: a URL não está no arquivo (equivale a estar sem rede)"""
+
+
+class PageArchive:
+    """
+    Arquivo de páginas em disco
+
+    - mode='record': FetchEngine grava cada resposta 200 que entrega aos coletores
+    - mode='replay': FetchEngine responde só daqui; `as_of` escolhe a captura
+      mais recente até aquele horário (padrão: a mais recente de todas)
+    """
+
+    def __init__(self, directory: str = ARCHIVE_DIR, mode: str = RECORD, as_of: float = None):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"modo de arquivo inválido: {mode!r} (use '{RECORD}' ou '{REPLAY}')")
+        self.directory = directory
+        self.mode = mode
+        self.as_of = as_of
+        if mode == RECORD:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    # ---------------------------
+    # Arquivos
+    # ---------------------------
+    def _url_dir(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def _captures(self, url_dir: str) -> List[Tuple[float, str]]:
+        """[(horário, caminho)] das capturas de uma URL, da mais antiga para a mais recente"""
+        captures = []
+        for path in glob.glob(os.path.join(url_dir, '*.json.gz')):
+            try:
+                captures.append((int(os.path.basename(path).split('.')[0]) / 1000.0, path))
+            except ValueError:
+                continue
+        captures.sort()
+        return captures
+
+    def _pick(self, captures: List[Tuple[float, str]]) -> Optional[Tuple[float, str]]:
+        if self.as_of is not None:
+            captures = [c for c in captures if c[0] <= self.as_of]
+        return captures[-1] if captures else None
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(path, 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+        except (OSError, EOFError, ValueError):
+            return None
+
+    # ---------------------------
+    # Gravação / consulta
+    # ---------------------------
+    def record(self, url: str, response, fetched_at: float = None) -> Optional[str]:
+        """
+        Grava uma resposta 200 (a mesma captura não é duplicada)
+
+        Args:
+            fetched_at: Horário em que o corpo foi obtido/confirmado
+                        (padrão: response.fetched_at, se houver, ou agora)
+        """
+        if response.status_code != 200:
+            return None
+        fetched_at = fetched_at or getattr(response, 'fetched_at', None) or time.time()
+        url_dir = self._url_dir(url)
+        path = os.path.join(url_dir, f"{int(fetched_at * 1000)}.json.gz")
+        if os.path.exists(path):
+            return path
+        entry = {
+            'url': url,
+            'fetched_at': fetched_at,
+            'status': response.status_code,
+            'headers': {k: response.headers[k] for k in KEPT_HEADERS if response.headers.get(k)},
+            'text': response.text,
+        }
+        os.makedirs(url_dir, exist_ok=True)
+        atomic_write(path, gzip.compress(json.dumps(entry, ensure_ascii=False).encode('utf-8'), compresslevel=6))
+        return path
+
+    def respond(self, url: str) -> CachedResponse:
+        """
+        Resposta gravada para a URL (captura escolhida por as_of)
+
+        Raises:
+            ArchiveMiss: URL sem captura no arquivo
+        """
+        picked = self._pick(self._captures(self._url_dir(url)))
+        entry = self._read(picked[1]) if picked else None
+        if entry is None or entry.get('url') != url:
+            raise ArchiveMiss(f"Página fora do arquivo ({self.directory}): {url}")
+        return CachedResponse(url, entry['text'], status_code=entry.get('status', 200),
+                              headers=entry.get('headers'), fetched_at=entry['fetched_at'])
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Captura escolhida (as_of) de cada URL gravada, com o corpo"""
+        for url_dir in sorted(glob.glob(os.path.join(self.directory, '*'))):
+            picked = self._pick(self._captures(url_dir))
+            entry = self._read(picked[1]) if picked else None
+            if entry is not None:
+                yield entry
+
+    def reference_time(self) -> Optional[float]:
+        """Horário da captura mais recente até as_of (a "data" de uma reconstrução offline)"""
+        latest = None
+        for url_dir in glob.glob(os.path.join(self.directory, '*')):
+            picked = self._pick(self._captures(url_dir))
+            if picked and (latest is None or picked[0] > latest):
+                latest = picked[0]
+        return latest
+
+
+def archive_from_args(args: Sequence[str], directory: str = ARCHIVE_DIR) -> Tuple[Optional[PageArchive], List[str]]:
+    """
+    Lê as opções de linha de comando do arquivo e devolve (arquivo ou None, demais argumentos)
+
+    --record            grava as páginas baixadas
+    --replay            reconstrói só a partir do arquivo, sem rede
+    --as-of=AAAA-MM-DD[THH:MM]  (com --replay) usa as capturas até esse horário
+    --archive-dir=DIR   diretório do arquivo (padrão data/page_archive)
+    """
+    mode, as_of, rest = None, None, []
+    for arg in args:
+        if arg in ('--record', '--replay'):
+            mode = arg[2:]
+        elif arg.startswith('--as-of='):
+            as_of = datetime.fromisoformat(arg.split('=', 1)[1]).timestamp()
+        elif arg.startswith('--archive-dir='):
+            directory = arg.split('=', 1)[1]
+        else:
+            rest.append(arg)
+    if mode is None:
+        return None, rest
+    return PageArchive(directory, mode=mode, as_of=as_of), rest
@@ -1,78 +1,195 @@
-
 import xml.etree.ElementTree as ET
 import sys
 import os
 import json
+import math
+from array import array
+from datetime import datetime
+from typing import Iterator, NamedTuple, Optional
+
+# Elementos que só agrupam pontos: ao fim de cada filho, os filhos já lidos são
+# descartados (memória constante, qualquer que seja o tamanho do arquivo)
+CONTAINERS = ('gpx', 'rte', 'trk', 'trkseg')
+M_PER_DEG_LAT = 1852.0 * 60
+
+
+class GpxPoint(NamedTuple):
+    kind: str                      # 'rte' (rtept) ou 'trk' (trkpt)
+    lat: float
+    lon: float
+    name: Optional[str] = None     # <name> do ponto, se houver
+    time: Optional[float] = None   # <time> em segundos (epoch)
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_time(text):
+    """<time> ISO 8601 (GPX) ou epoch em segundos (Navionics)"""
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _flat_m(lat1, lon1, lat2, lon2):
+    """Distância aproximada em metros (plano local; suficiente para decimação)"""
+    dy = (lat2 - lat1) * M_PER_DEG_LAT
+    dx = (lon2 - lon1) * M_PER_DEG_LAT * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(dx, dy)
+
+
+def iter_points(file_path, min_dist_m=0.0, min_interval_s=0.0) -> Iterator[GpxPoint]:
+    """
+    Pontos do GPX na ordem do arquivo, lidos em streaming (iterparse)
+
+    Decimação dos trkpt (os rtept são waypoints e vêm todos): descarta o ponto
+    a menos de min_dist_m metros ou de min_interval_s segundos do último
+    mantido; o último ponto de cada <trkseg> é sempre mantido.
+
+    Raises:
+        ET.ParseError: XML inválido
+    """
+    decimate = min_dist_m > 0 or min_interval_s > 0
+    stack = []
+    last = held = None
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+        stack.pop()
+        tag = _local(elem.tag)
+        parent = _local(stack[-1].tag) if stack else None
 
-def parse_gpx(file_path):
+        if (tag == 'rtept' and parent == 'rte') or (tag == 'trkpt' and parent == 'trkseg'):
+            name = time = None
+            for child in elem:
+                child_tag = _local(child.tag)
+                if child_tag == 'name':
+                    name = child.text
+                elif child_tag == 'time':
+                    time = _parse_time(child.text)
+            point = GpxPoint('rte' if tag == 'rtept' else 'trk',
+                             float(elem.get('lat')), float(elem.get('lon')), name, time)
+            if point.kind == 'trk' and decimate and last is not None:
+                near = _flat_m(last.lat, last.lon, point.lat, point.lon) < min_dist_m
+                soon = (min_interval_s > 0 and point.time is not None and last.time is not None
+                        and point.time - last.time < min_interval_s)
+                if near or soon:
+                    held = point
+                    point = None
+            if point is not None:
+                if point.kind == 'trk':
+                    last, held = point, None
+                yield point
+        elif tag == 'trkseg':
+            if held is not None:
+                yield held
+            last = held = None
+
+        if parent in CONTAINERS:
+            del stack[-1][:]
+
+
+class PointBuffer:
+    """
+    Pontos de um GPX em arrays (16 bytes por ponto em vez de um dict com
+    textos formatados); nomes e textos de exibição só sob demanda
+    """
+    __slots__ = ('kind', 'lats', 'lons', 'times', 'names')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.lats = array('d')
+        self.lons = array('d')
+        self.times = None       # array('d') (nan sem <time>) a partir do primeiro <time>
+        self.names = {}         # índice -> <name> (só os pontos com nome)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def append(self, point):
+        i = len(self.lats)
+        self.lats.append(point.lat)
+        self.lons.append(point.lon)
+        if point.time is not None and self.times is None:
+            self.times = array('d', [math.nan]) * i
+        if self.times is not None:
+            self.times.append(math.nan if point.time is None else point.time)
+        if point.name is not None:
+            self.names[i] = point.name
+
+    def coords(self):
+        return zip(self.lats, self.lons)
+
+    def name(self, i):
+        if self.kind == 'rte':
+            return self.names.get(i, f"WPT {i + 1}")
+        return f"TRK {i + 1}"
+
+    def raw(self, i):
+        """Textos de exibição (lat_raw, lon_raw) do formato antigo"""
+        lat, lon = self.lats[i], self.lons[i]
+        if self.kind == 'rte':
+            return f"{abs(lat):.4f} {'N' if lat>=0 else 'S'}", f"{abs(lon):.4f} {'E' if lon>=0 else 'W'}"
+        return f"{lat:.4f}", f"{lon:.4f}"
+
+    def point(self, i):
+        """Ponto no formato do parse_gpx (dict)"""
+        lat_raw, lon_raw = self.raw(i)
+        return {
+            "sequence": i + 1,
+            "lat_dec": self.lats[i],
+            "lon_dec": self.lons[i],
+            "lat_raw": lat_raw,
+            "lon_raw": lon_raw,
+            "name": self.name(i),
+            "chart": ""  # GPX usually doesn't have chart info
+        }
+
+
+def read_points(file_path, min_dist_m=0.0, min_interval_s=0.0) -> PointBuffer:
+    """
+    Pontos da rota do GPX: os <rte> se houver, senão os <trk> (como o parse_gpx)
+
+    Raises:
+        ET.ParseError: XML inválido
+    """
+    routes, tracks = PointBuffer('rte'), PointBuffer('trk')
+    for point in iter_points(file_path, min_dist_m, min_interval_s):
+        if point.kind == 'rte':
+            routes.append(point)
+            tracks = None       # <rte> tem precedência: trilho descartado
+        elif tracks is not None:
+            tracks.append(point)
+    return routes if len(routes) or tracks is None else tracks
+
+
+def parse_gpx(file_path, min_dist_m=0.0, min_interval_s=0.0):
     if not os.path.exists(file_path):
         print(f"File not found: {file_path}")
         return None
 
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        
-        # GPX Namespace handling
-        # Usually {http://www.topografix.com/GPX/1/1}
-        ns = {'gpx': 'http://www.topografix.com/GPX/1/1'}
-        
-        # Try to find namespace if strict matching fails
-        if not root.tag.startswith('{http'):
-             # No namespace or different version
-             ns = {} 
-             prefix = ""
-        else:
-             prefix = "gpx:"
-
-        route_points = []
-        
-        # 1. Look for <rte> (Routes)
-        routes = root.findall(f'.//{prefix}rte', ns)
-        for rte in routes:
-            for pt in rte.findall(f'{prefix}rtept', ns):
-                lat = float(pt.get('lat'))
-                lon = float(pt.get('lon'))
-                name_el = pt.find(f'{prefix}name', ns)
-                name = name_el.text if name_el is not None else f"WPT {len(route_points)+1}"
-                
-                route_points.append({
-                    "sequence": len(route_points) + 1,
-                    "lat_dec": lat,
-                    "lon_dec": lon,
-                    "lat_raw": f"{abs(lat):.4f} {'N' if lat>=0 else 'S'}", # Mock raw for consistency
-                    "lon_raw": f"{abs(lon):.4f} {'E' if lon>=0 else 'W'}",
-                    "name": name,
-                    "chart": "" # GPX usually doesn't have chart info
-                })
-
-        # 2. Look for <trk> (Tracks) if no route found
-        if not route_points:
-             tracks = root.findall(f'.//{prefix}trk', ns)
-             for trk in tracks:
-                 for trkseg in trk.findall(f'{prefix}trkseg', ns):
-                     for pt in trkseg.findall(f'{prefix}trkpt', ns):
-                        lat = float(pt.get('lat'))
-                        lon = float(pt.get('lon'))
-                        # Track points might be too many, but let's take them all for now
-                        route_points.append({
-                            "sequence": len(route_points) + 1,
-                            "lat_dec": lat,
-                            "lon_dec": lon,
-                            "lat_raw": f"{lat:.4f}",
-                            "lon_raw": f"{lon:.4f}",
-                            "name": f"TRK {len(route_points)+1}",
-                            "chart": ""
-                        })
+        # 1. <rte> (Routes); 2. <trk> (Tracks) se não houver rota
+        points = read_points(file_path, min_dist_m, min_interval_s)
 
         output = {
             "source_type": "GPX",
             "metadata": {
                 "filename": os.path.basename(file_path)
             },
-            "route": route_points
+            "route": [points.point(i) for i in range(len(points))]
         }
-        
+
         return output
 
     except Exception as e:
@@ -83,7 +200,7 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python parse_gpx.py <path_to_gpx>")
         sys.exit(1)
-        
+
     result = parse_gpx(sys.argv[1])
     if result:
         print(json.dumps(result, indent=2, ensure_ascii=False))
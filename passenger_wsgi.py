@@ -14,6 +14,12 @@ except ImportError:
     WeatherCollector = None
     TideDataCollector = None
 
+# Agendador de atualização (ingestão incremental em segundo plano)
+try:
+    import scheduler
+except ImportError:
+    scheduler = None
+
 app = Flask(__name__)
 
 @app.route('/')
@@ -39,4 +45,14 @@ def status():
         "script_dir": SCRIPT_DIR
     })
 
+@app.route('/api/scheduler')
+def scheduler_status():
+    if scheduler is None:
+        return jsonify({"enabled": False, "error": "Agendador indisponível"}), 503
+    return jsonify(scheduler.scheduler.status())
+
+# Um agendador por processo; a trava em arquivo impede ciclos simultâneos entre workers
+if scheduler is not None:
+    scheduler.start_background()
+
 application = app
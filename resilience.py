@@ -0,0 +1,245 @@
+"""
+Resiliência das Requisições HTTP dos Coletores
+Timeouts de conexão e leitura, novas tentativas com backoff exponencial
+limitado (com jitter) e disjuntor (circuit breaker) por host, compartilhados
+pelo FetchEngine e pelos coletores usados sem motor (TideDataCollector,
+WeatherCollector e scraping_tabuademares._get).
+Com isso o pior caso de uma requisição fica limitado (RetryPolicy.worst_case_s)
+e, com a fonte fora do ar, as demais estações falham na hora em vez de esperar.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT_S = 5.0     # abrir a conexão
+READ_TIMEOUT_S = 20.0       # entre pacotes da resposta
+MAX_ATTEMPTS = 3            # tentativas por requisição (1 + 2 novas)
+BACKOFF_BASE_S = 0.5        # espera base antes da 2ª tentativa
+BACKOFF_CAP_S = 8.0         # teto de cada espera
+BREAKER_THRESHOLD = 5       # falhas seguidas que abrem o disjuntor do host
+BREAKER_COOLDOWN_S = 60.0   # tempo aberto antes de deixar passar uma tentativa de teste
+
+# Respostas que valem nova tentativa (sobrecarga / falha temporária do servidor)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Falhas de rede que valem nova tentativa (inclui conexão derrubada no meio do corpo)
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+Timeout = Union[None, float, Tuple[float, float]]
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Host com disjuntor aberto: a requisição nem foi feita"""
+
+
+class RetryPolicy:
+    """Timeouts e esperas entre tentativas"""
+
+    def __init__(self, attempts: int = MAX_ATTEMPTS, base_s: float = BACKOFF_BASE_S,
+                 cap_s: float = BACKOFF_CAP_S, connect_timeout_s: float = CONNECT_TIMEOUT_S,
+                 read_timeout_s: float = READ_TIMEOUT_S):
+        self.attempts = max(1, attempts)
+        self.base_s = base_s
+        self.cap_s = cap_s
+        self.connect_timeout_s = connect_timeout_s
+        self.read_timeout_s = read_timeout_s
+
+    def timeout(self, override: Timeout = None) -> Tuple[float, float]:
+        """(conexão, leitura); um número avulso vale como timeout de leitura"""
+        if isinstance(override, tuple):
+            return override
+        read = float(override) if override is not None else self.read_timeout_s
+        return min(self.connect_timeout_s, read), read
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes da tentativa attempt+1 ("full jitter": uniforme entre 0 e o teto exponencial)"""
+        return random.uniform(0, min(self.cap_s, self.base_s * (2 ** attempt)))
+
+    def worst_case_s(self, override: Timeout = None) -> float:
+        """Limite de tempo de uma requisição com todas as tentativas esgotadas"""
+        connect, read = self.timeout(override)
+        waits = sum(min(self.cap_s, self.base_s * (2 ** i)) for i in range(self.attempts - 1))
+        return self.attempts * (connect + read) + waits
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um host
+
+    - fechado: requisições passam; BREAKER_THRESHOLD falhas seguidas o abrem
+    - aberto: requisições falham na hora (CircuitOpenError) durante cooldown_s
+    - meio-aberto: passa uma única tentativa de teste; sucesso fecha, falha reabre
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown_s: float = BREAKER_COOLDOWN_S,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown_s:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.cooldown_s:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Libera a tentativa de teste sem contá-la (erro que não é do host)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Disjuntor aberto após {self._failures} falha(s) seguidas")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class BreakerRegistry:
+    """Um disjuntor por host"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown_s: float = BREAKER_COOLDOWN_S):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.threshold, self.cooldown_s)
+            return self._breakers[host]
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: b.state for host, b in breakers.items()}
+
+
+def _retry_after(response, cap_s: float) -> Optional[float]:
+    """Espera pedida pelo servidor (Retry-After em segundos ou data), limitada a cap_s"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, min(cap_s, delay))
+
+
+def send_with_retries(url: str, send: Callable[[Tuple[float, float]], requests.Response],
+                      policy: 'RetryPolicy' = None, breakers: BreakerRegistry = None,
+                      timeout: Timeout = None,
+                      on_retry: Callable[[int, str], None] = None) -> requests.Response:
+    """
+    Executa send(timeout) com novas tentativas e disjuntor do host da URL
+
+    Falhas de rede (RETRY_EXCEPTIONS) e respostas em RETRY_STATUS são repetidas
+    após backoff; esgotadas as tentativas, a exceção sobe ou a última resposta
+    é devolvida (o chamador decide sobre raise_for_status). Qualquer outra
+    RequestException conta como falha do host e sobe sem nova tentativa.
+
+    Args:
+        send: Faz uma tentativa (recebe o timeout (conexão, leitura))
+        on_retry: Chamado antes de cada nova tentativa com (tentativa, motivo)
+
+    Raises:
+        CircuitOpenError: disjuntor do host aberto
+    """
+    policy = policy or DEFAULT_POLICY
+    breakers = breakers or DEFAULT_BREAKERS
+    host = urlsplit(url).netloc
+    breaker = breakers.get(host)
+    timeouts = policy.timeout(timeout)
+
+    for attempt in range(policy.attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"Disjuntor aberto para {host}: requisição não enviada ({url})")
+        last = attempt + 1 == policy.attempts
+        try:
+            response = send(timeouts)
+        except RETRY_EXCEPTIONS as e:
+            breaker.record_failure()
+            if last:
+                raise
+            reason, delay = type(e).__name__, policy.backoff(attempt)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()       # não prende o disjuntor em meio-aberto
+            raise
+        else:
+            if response.status_code not in RETRY_STATUS:
+                breaker.record_success()
+                return response
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()   # 429: o host está de pé, só pede calma
+            if last:
+                return response
+            reason = f"HTTP {response.status_code}"
+            delay = _retry_after(response, policy.cap_s)
+            delay = delay if delay is not None else policy.backoff(attempt)
+
+        logger.info(f"Nova tentativa {attempt + 2}/{policy.attempts} para {url} em {delay:.2f}s ({reason})")
+        if on_retry is not None:
+            on_retry(attempt + 1, reason)
+        time.sleep(delay)
+
+
+DEFAULT_POLICY = RetryPolicy()
+# Disjuntores dos coletores usados sem FetchEngine (o motor tem os seus)
+DEFAULT_BREAKERS = BreakerRegistry()
+
+
+def resilient_get(session, url: str, headers: Dict[str, str] = None, timeout: Timeout = None,
+                  policy: RetryPolicy = None, breakers: BreakerRegistry = None) -> requests.Response:
+    """session.get com timeouts, novas tentativas e disjuntor (session pode ser o módulo requests)"""
+    return send_with_retries(url, lambda t: session.get(url, headers=headers, timeout=t),
+                             policy=policy, breakers=breakers, timeout=timeout)
@@ -0,0 +1,142 @@
+"""
+Corredor da Rota: Faróis e Abrigos ao Longo da Derrota
+Para uma rota (lista de waypoints), encontra todos os faróis e abrigos da
+biblioteca a até uma largura de corredor de qualquer perna, com a distância
+ponto-perna (não só ponto-waypoint, como o App.getNearestLighthouse), o bordo
+(BB/BE) e a distância percorrida desde a partida, em ordem ao longo da
+derrota. Preenche de uma vez as tabelas de faróis e abrigos da avaliação
+(/api/route/corridor).
+Pré-filtro por grade regular de células em graus: cada perna só testa as
+features das células que o corredor cruza, então o custo cresce com o
+comprimento da rota e não com pernas x features.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import math
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+import geo_index
+from navmath import rhumb_legs
+
+CELL_DEG = 0.1                 # ~6 NM de lado
+DEFAULT_WIDTHS = {             # meia-largura do corredor por camada (NM)
+    'lighthouses': 15.0,       # alcance luminoso típico dos faróis costeiros
+    'shelters': 30.0,          # mesmo raio do TideLocator
+}
+LAYERS = tuple(DEFAULT_WIDTHS)
+MAX_POINTS = 5000
+
+Cell = Tuple[int, int]
+
+
+def cell_of(lat: float, lon: float) -> Cell:
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+class FeatureGrid:
+    """Features de uma camada distribuídas em células de CELL_DEG graus"""
+
+    def __init__(self, features: Sequence[Dict[str, Any]]):
+        self.features = list(features)
+        self.cells: Dict[Cell, List[int]] = {}
+        for n, f in enumerate(self.features):
+            self.cells.setdefault(cell_of(f['lat'], f['lon']), []).append(n)
+
+    def leg_candidates(self, lat1: float, lon1: float, lat2: float, lon2: float, width_nm: float) -> List[int]:
+        """
+        Features das células cruzadas pela perna alargada de width_nm
+
+        A perna é amostrada a cada CELL_DEG no máximo; entre duas amostras
+        qualquer ponto da perna fica a até meia célula de uma delas, daí a
+        margem extra de meia célula na janela.
+        """
+        steps = max(1, math.ceil(max(abs(lat2 - lat1), abs(lon2 - lon1)) / CELL_DEG))
+        w_lat = width_nm / 60 + CELL_DEG / 2
+        cos_lat = max(math.cos(math.radians(max(abs(lat1), abs(lat2)) + w_lat)), 0.01)
+        w_lon = width_nm / (60 * cos_lat) + CELL_DEG / 2
+        seen = set()
+        for s in range(steps + 1):
+            lat = lat1 + (lat2 - lat1) * s / steps
+            lon = lon1 + (lon2 - lon1) * s / steps
+            y0, x0 = cell_of(lat - w_lat, lon - w_lon)
+            y1, x1 = cell_of(lat + w_lat, lon + w_lon)
+            seen.update((y, x) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1))
+        return sorted(n for c in seen for n in self.cells.get(c, ()))
+
+
+def point_to_leg(lat: float, lon: float, lat1: float, lon1: float, lat2: float, lon2: float) -> Tuple[float, float, float]:
+    """
+    (distância em NM, fração da perna no pé da perpendicular, produto vetorial)
+
+    Plano local da perna (milhas de latitude x milhas de longitude na latitude
+    média), suficiente para pernas costeiras; produto vetorial > 0 = bombordo.
+    """
+    k = math.cos(math.radians((lat1 + lat2) / 2)) * 60
+    dx, dy = (lon2 - lon1) * k, (lat2 - lat1) * 60
+    px, py = (lon - lon1) * k, (lat - lat1) * 60
+    length2 = dx * dx + dy * dy
+    t = 0.0 if length2 == 0 else min(1.0, max(0.0, (px * dx + py * dy) / length2))
+    ex, ey = px - t * dx, py - t * dy
+    return math.hypot(ex, ey), t, dx * py - dy * px
+
+
+_grids: Dict[str, Tuple[geo_index.GeoIndex, FeatureGrid]] = {}
+_lock = threading.Lock()
+
+
+def get_grid(layer: str) -> FeatureGrid:
+    """Grade da camada, refeita quando o índice do geo_index é recarregado"""
+    index = geo_index.get_index(layer)
+    with _lock:
+        cached = _grids.get(layer)
+        if cached is None or cached[0] is not index:
+            cached = _grids[layer] = (index, FeatureGrid(index.features))
+        return cached[1]
+
+
+def corridor(points: Sequence[Dict[str, float]], layers: Sequence[str] = LAYERS, width_nm: float = None,
+             grids: Dict[str, FeatureGrid] = None) -> Dict[str, Any]:
+    """
+    Features a até a largura do corredor de qualquer perna, em ordem ao longo da derrota
+
+    Cada feature aparece uma vez, na perna em que passa mais perto (empate:
+    a primeira). width_nm substitui a largura padrão de todas as camadas.
+
+    Returns:
+        {'total_nm', 'widths_nm', 'matches': [{layer, id, name, lat, lon, ..., leg,
+         distance_nm, along_nm, side}]}
+
+    Raises:
+        ValueError: Rota com menos de dois pontos
+    """
+    if len(points) < 2:
+        raise ValueError("Rota precisa de pelo menos dois pontos")
+    lats = [float(p['lat']) for p in points]
+    lons = [float(p['lon']) for p in points]
+    legs = rhumb_legs(lats, lons)
+    starts = [0.0]
+    for d in legs:
+        starts.append(starts[-1] + d)
+
+    widths = {layer: float(width_nm) if width_nm is not None else DEFAULT_WIDTHS.get(layer, 15.0)
+              for layer in layers}
+    matches = []
+    for layer in layers:
+        grid = grids[layer] if grids else get_grid(layer)
+        width = widths[layer]
+        best: Dict[int, Tuple[float, int, float, float]] = {}
+        for i in range(len(legs)):
+            for n in grid.leg_candidates(lats[i], lons[i], lats[i + 1], lons[i + 1], width):
+                f = grid.features[n]
+                dist, t, cross = point_to_leg(f['lat'], f['lon'], lats[i], lons[i], lats[i + 1], lons[i + 1])
+                if dist <= width and (n not in best or dist < best[n][0]):
+                    best[n] = (dist, i, t, cross)
+        for n, (dist, i, t, cross) in best.items():
+            matches.append({**grid.features[n], 'layer': layer, 'leg': i,
+                            'distance_nm': round(dist, 2),
+                            'along_nm': round(starts[i] + t * legs[i], 2),
+                            'side': 'BB' if cross > 0 else 'BE'})
+    matches.sort(key=lambda m: (m['along_nm'], m['distance_nm']))
+    return {'total_nm': round(starts[-1], 2), 'widths_nm': widths, 'matches': matches}
@@ -0,0 +1,227 @@
+"""
+Grafo de Rotas Conhecidas e Menor Caminho entre Portos
+O build_route_index.py grava, ao lado do known_routes.json, o grafo já
+montado (route_graph.json): extremidades de cada GPX ajustadas ao porto mais
+próximo do PortDatabase.js (até SNAP_THRESHOLD_NM, loxodrômica como o
+NavMath.calcLeg), comprimento de cada aresta pela soma das pernas da rota e
+as duas direções. A rota /api/route?from=&to= roda Dijkstra sobre o grafo
+(menor distância, não o menor número de trechos do antigo BFS do
+App.autoFindRoute), guarda o resultado por par de portos e devolve os
+waypoints costurados.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import geo_index
+import route_lod
+from http_cache import atomic_write
+from navmath import rhumb_legs
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROUTES_FILE = os.path.join(SCRIPT_DIR, 'js', 'data', 'known_routes.json')
+GRAPH_NAME = 'route_graph.json'
+GRAPH_FILE = os.path.join(SCRIPT_DIR, 'js', 'data', GRAPH_NAME)
+
+SNAP_THRESHOLD_NM = 30.0       # mesma tolerância do App.autoFindRoute
+
+
+def snap(lat: float, lon: float, ports: Sequence[Dict[str, Any]]) -> Optional[str]:
+    """Porto mais próximo (loxodrômica; empate: o primeiro da lista) ou None além da tolerância"""
+    best, best_dist = None, float('inf')
+    for port in ports:
+        dist = rhumb_legs([lat, port['lat']], [lon, port['lon']])[0]
+        if dist < best_dist:
+            best, best_dist = port['id'], dist
+    return best if best_dist < SNAP_THRESHOLD_NM else None
+
+
+def summarize(route: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """O que o grafo usa de uma rota: extremidades e comprimento (None se menos de dois pontos)"""
+    points = route.get('points') or []
+    if len(points) < 2:
+        return None
+    return {
+        'id': route['id'],
+        'start': [points[0]['lat'], points[0]['lon']],
+        'end': [points[-1]['lat'], points[-1]['lon']],
+        'dist_nm': round(sum(rhumb_legs([p['lat'] for p in points], [p['lon'] for p in points])), 3),
+    }
+
+
+def build_graph(routes: Sequence[Dict[str, Any]], ports: Sequence[Dict[str, Any]],
+                summaries: Sequence[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Grafo serializável das rotas conhecidas
+
+    summaries (de summarize) dispensa reler os pontos das rotas (índice incremental).
+
+    Returns:
+        {'generated_at', 'threshold_nm', 'nodes': {id: {name, lat, lon}},
+         'edges': [{from, to, route_id, reverse, dist_nm}], 'unsnapped': [route_id]}
+        Cada rota ajustada gera duas arestas (ida e volta com reverse=True).
+    """
+    if summaries is None:
+        summaries = [summarize(route) for route in routes]
+    edges, unsnapped, used = [], [], set()
+    for summary in summaries:
+        if summary is None:
+            continue
+        start = snap(*summary['start'], ports)
+        end = snap(*summary['end'], ports)
+        if not start or not end or start == end:
+            unsnapped.append(summary['id'])
+            continue
+        dist = summary['dist_nm']
+        edges.append({'from': start, 'to': end, 'route_id': summary['id'], 'reverse': False, 'dist_nm': dist})
+        edges.append({'from': end, 'to': start, 'route_id': summary['id'], 'reverse': True, 'dist_nm': dist})
+        used.update((start, end))
+    nodes = {p['id']: {'name': p['name'], 'lat': p['lat'], 'lon': p['lon']} for p in ports if p['id'] in used}
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'threshold_nm': SNAP_THRESHOLD_NM,
+        'nodes': nodes,
+        'edges': edges,
+        'unsnapped': unsnapped,
+    }
+
+
+def graph_path(routes_file: str) -> str:
+    """route_graph.json fica na mesma pasta do known_routes.json"""
+    return os.path.join(os.path.dirname(os.path.abspath(routes_file)), GRAPH_NAME)
+
+
+class RouteGraph:
+    """Grafo carregado com as rotas (para costurar os pontos) e cache por par de portos"""
+
+    def __init__(self, graph: Dict[str, Any], routes: Sequence[Dict[str, Any]], routes_file: str = ROUTES_FILE):
+        self.nodes = graph.get('nodes', {})
+        self.routes = {r['id']: r['points'] for r in routes}
+        self.routes_file = routes_file
+        self._levels: Dict[int, Dict[str, List[Dict[str, Any]]]] = {0: self.routes}
+        self.adjacency: Dict[str, List[Dict[str, Any]]] = {}
+        for edge in graph.get('edges', []):
+            if edge['route_id'] in self.routes:
+                self.adjacency.setdefault(edge['from'], []).append(edge)
+        self._cache: Dict[Tuple[str, str, int], Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, graph_file: str = GRAPH_FILE, routes_file: str = ROUTES_FILE) -> 'RouteGraph':
+        """
+        Raises:
+            FileNotFoundError: Índice ainda não gerado (rodar build_route_index.py)
+        """
+        with open(routes_file, encoding='utf-8') as f:
+            routes = json.load(f)
+        with open(graph_file, encoding='utf-8') as f:
+            graph = json.load(f)
+        return cls(graph, routes, routes_file)
+
+    def points(self, route_id: str, level: int = 0) -> List[Dict[str, Any]]:
+        """Pontos da rota no nível de detalhe pedido (route_lod; carregado na primeira vez)"""
+        if level not in self._levels:
+            data = route_lod.load_level(self.routes_file, level)
+            with self._lock:
+                self._levels[level] = {r['id']: r['points'] for r in data}
+        return self._levels[level][route_id]
+
+    def shortest_path(self, dep: str, arr: str) -> Optional[List[Dict[str, Any]]]:
+        """Arestas do menor caminho (Dijkstra) de dep até arr; [] se dep == arr, None se não há"""
+        if dep == arr:
+            return []
+        dist = {dep: 0.0}
+        parent: Dict[str, Dict[str, Any]] = {}
+        heap = [(0.0, dep)]
+        done = set()
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            if node == arr:
+                break
+            done.add(node)
+            for edge in self.adjacency.get(node, ()):
+                nd = d + edge['dist_nm']
+                if nd < dist.get(edge['to'], float('inf')):
+                    dist[edge['to']] = nd
+                    parent[edge['to']] = edge
+                    heapq.heappush(heap, (nd, edge['to']))
+        if arr not in parent:
+            return None
+        path, node = [], arr
+        while node != dep:
+            path.append(parent[node])
+            node = parent[node]['from']
+        return path[::-1]
+
+    def route(self, dep: str, arr: str, level: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Rota costurada de dep até arr (em cache por par e nível), no formato do App.autoFindRoute
+
+        level > 0 devolve a geometria simplificada (route_lod); dist_nm e as
+        distâncias dos trechos continuam as exatas.
+
+        Returns:
+            {'from', 'to', 'level', 'dist_nm', 'segments': [{route_id, reverse, dist_nm}],
+             'points': [{sequence, lat, lon, name, chart}]} ou None sem caminho
+        """
+        key = (dep, arr, level)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        path = self.shortest_path(dep, arr)
+        result = None
+        if path:
+            points = []
+            for edge in path:
+                pts = self.points(edge['route_id'], level)
+                for p in (reversed(pts) if edge['reverse'] else pts):
+                    seq = len(points) + 1
+                    points.append({'sequence': seq, 'lat': p['lat'], 'lon': p['lon'], 'name': f"WPT {seq}", 'chart': ""})
+            result = {
+                'from': dep,
+                'to': arr,
+                'level': level,
+                'dist_nm': round(sum(e['dist_nm'] for e in path), 2),
+                'segments': [{'route_id': e['route_id'], 'reverse': e['reverse'], 'dist_nm': e['dist_nm']} for e in path],
+                'points': points,
+            }
+        with self._lock:
+            self._cache[key] = result
+        return result
+
+
+def write_graph(routes: Sequence[Dict[str, Any]], routes_file: str,
+                summaries: Sequence[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Monta o grafo com os portos do PortDatabase.js e grava ao lado do known_routes.json"""
+    graph = build_graph(routes, geo_index.load_ports(), summaries)
+    atomic_write(graph_path(routes_file), json.dumps(graph, ensure_ascii=False).encode('utf-8'))
+    return graph
+
+
+_graph: Optional[RouteGraph] = None
+_stamp: Optional[Tuple] = None
+_graph_lock = threading.Lock()
+
+
+def get_graph(graph_file: str = GRAPH_FILE, routes_file: str = ROUTES_FILE) -> RouteGraph:
+    """Grafo compartilhado, recarregado (com cache limpo) quando o índice é regerado"""
+    global _graph, _stamp
+    stamp = (graph_file, os.path.getmtime(graph_file), os.path.getmtime(routes_file))
+    with _graph_lock:
+        if _graph is None or _stamp != stamp:
+            _graph = RouteGraph.load(graph_file, routes_file)
+            _stamp = stamp
+            logger.info(f"Grafo de rotas: {len(_graph.nodes)} portos, "
+                        f"{sum(len(e) for e in _graph.adjacency.values())} arestas")
+        return _graph
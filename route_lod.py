@@ -0,0 +1,130 @@
+"""
+Níveis de Detalhe da Geometria das Rotas (Douglas-Peucker)
+O build_route_index.py grava, ao lado do known_routes.json (nível 0, todos os
+pontos do GPX), uma cópia simplificada por nível (known_routes_lod1.json ...)
+com erro transversal limitado em metros (LOD_TOLERANCES_M). Cada ponto
+mantido leva a distância percorrida exata (along_nm, medida sobre todos os
+pontos) e cada rota a distância total exata, de modo que distância e pernas
+exibidas não dependem do nível; o erro de cada nível vem declarado na
+própria rota (max_error_m, dist_error_nm).
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Sequence
+
+from http_cache import atomic_write
+from route_corridor import point_to_leg
+from navmath import rhumb_legs
+
+M_PER_NM = 1852.0
+LOD_TOLERANCES_M = {1: 25.0, 2: 100.0, 3: 500.0}   # nível -> erro transversal máximo
+LEVELS = (0,) + tuple(LOD_TOLERANCES_M)
+
+
+def simplify(points: Sequence[Dict[str, float]], tolerance_m: float) -> List[int]:
+    """
+    Índices mantidos pelo Douglas-Peucker (sempre o primeiro e o último)
+
+    Todo ponto descartado fica a até tolerance_m do trecho simplificado que o
+    substitui (distância ponto-perna do route_corridor).
+    """
+    n = len(points)
+    if n <= 2:
+        return list(range(n))
+    tol_nm = tolerance_m / M_PER_NM
+    lats = [p['lat'] for p in points]
+    lons = [p['lon'] for p in points]
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        worst, worst_i = -1.0, -1
+        for i in range(a + 1, b):
+            d = point_to_leg(lats[i], lons[i], lats[a], lons[a], lats[b], lons[b])[0]
+            if d > worst:
+                worst, worst_i = d, i
+        if worst_i >= 0 and worst > tol_nm:
+            keep[worst_i] = True
+            stack.append((a, worst_i))
+            stack.append((worst_i, b))
+    return [i for i in range(n) if keep[i]]
+
+
+def cumulative_nm(points: Sequence[Dict[str, float]]) -> List[float]:
+    """Distância percorrida (loxodrômica, como o NavMath.calcLeg) até cada ponto"""
+    along = [0.0]
+    if len(points) > 1:
+        for d in rhumb_legs([p['lat'] for p in points], [p['lon'] for p in points]):
+            along.append(along[-1] + d)
+    return along
+
+
+def max_error_m(points: Sequence[Dict[str, float]], kept: Sequence[int]) -> float:
+    """Maior distância de um ponto descartado ao trecho simplificado correspondente"""
+    worst = 0.0
+    for a, b in zip(kept, kept[1:]):
+        for i in range(a + 1, b):
+            d = point_to_leg(points[i]['lat'], points[i]['lon'], points[a]['lat'], points[a]['lon'],
+                             points[b]['lat'], points[b]['lon'])[0]
+            worst = max(worst, d)
+    return worst * M_PER_NM
+
+
+def simplify_route(route: Dict[str, Any], level: int) -> Dict[str, Any]:
+    """Uma rota do índice no nível pedido (mesmos campos do known_routes.json e mais os de erro)"""
+    tolerance = LOD_TOLERANCES_M[level]
+    points = route.get('points') or []
+    along = cumulative_nm(points)
+    kept = simplify(points, tolerance)
+    simplified = [points[i] for i in kept]
+    return {
+        'id': route['id'],
+        'origin': route.get('origin'),
+        'destination': route.get('destination'),
+        'level': level,
+        'tolerance_m': tolerance,
+        'n_points': len(points),
+        'dist_nm': round(along[-1], 3),
+        'max_error_m': round(max_error_m(points, kept), 1),
+        'dist_error_nm': round(along[-1] - cumulative_nm(simplified)[-1], 3),
+        'points': [{'lat': points[i]['lat'], 'lon': points[i]['lon'], 'along_nm': round(along[i], 3)}
+                   for i in kept],
+    }
+
+
+def build_level(routes: Sequence[Dict[str, Any]], level: int) -> List[Dict[str, Any]]:
+    return [simplify_route(route, level) for route in routes]
+
+
+def level_path(routes_file: str, level: int) -> str:
+    """known_routes.json (nível 0) ou known_routes_lod<n>.json na mesma pasta"""
+    if level == 0:
+        return routes_file
+    base, ext = os.path.splitext(routes_file)
+    return f"{base}_lod{level}{ext}"
+
+
+def write_levels(routes: Sequence[Dict[str, Any]], routes_file: str) -> Dict[int, int]:
+    """Simplifica e grava (de forma atômica) todos os níveis; devolve {nível: total de pontos}"""
+    totals = {}
+    for level in LOD_TOLERANCES_M:
+        data = build_level(routes, level)
+        atomic_write(level_path(routes_file, level), json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        totals[level] = sum(len(r['points']) for r in data)
+    return totals
+
+
+def load_level(routes_file: str, level: int) -> List[Dict[str, Any]]:
+    """
+    Raises:
+        KeyError: Nível desconhecido
+        FileNotFoundError: Índice ainda não gerado (rodar build_route_index.py)
+    """
+    if level not in LEVELS:
+        raise KeyError(level)
+    with open(level_path(routes_file, level), encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,218 @@
+"""
+Linha do Tempo da Rota Planejada (/api/voyage/timeline)
+Distância acumulada e horas desde a saída em cada waypoint (navmath.leg_table,
+com velocidade por perna: rebocando ou sem reboque, como o speed_towing e o
+speed_free do plano de viagem) e consultas por busca binária (bisect) nesses
+arrays, O(log n) cada: posição num horário ("onde estaremos às 03:00") e
+horário numa distância percorrida; a passagem pelo través de um ponto
+("quando passamos o Farol X") projeta o ponto em todas as pernas de uma vez
+(NumPy; sem NumPy, laço por perna) e cai na segunda.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import bisect
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from navmath import leg_table
+from route_corridor import point_to_leg
+from voyage_metocean import DEFAULT_SPEED_KN
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, laço por perna
+    np = None
+
+MAX_QUERIES = 5000
+MAX_PASSAGES = 1000      # cada passagem percorre todas as pernas
+
+
+def parse_speed(text: Any) -> Optional[float]:
+    """Velocidade do plano de viagem ("8,5 NÓS", "10 kn", 9) em nós; None se não houver número"""
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = re.search(r'\d+(?:[.,]\d+)?', str(text or ''))
+    return float(match.group(0).replace(',', '.')) if match else None
+
+
+def leg_speeds(n_legs: int, speed_kn: float, tow_speed_kn: float = None,
+               towing: Union[bool, Sequence[int], None] = None) -> List[float]:
+    """
+    Velocidade de cada perna: tow_speed_kn nas pernas rebocando, speed_kn nas demais
+
+    Args:
+        towing: True (todas as pernas), índices das pernas rebocando, ou None/False
+
+    Raises:
+        ValueError: Velocidade <= 0 ou perna fora da rota
+    """
+    if towing is True:
+        towing = range(n_legs)
+    towed = set(towing or ())
+    if any(not 0 <= i < n_legs for i in towed):
+        raise ValueError(f"pernas rebocando fora da rota (0..{n_legs - 1})")
+    speeds = [speed_kn] * n_legs
+    if towed:
+        if not tow_speed_kn or tow_speed_kn <= 0:
+            raise ValueError("tow_speed_kn é obrigatória (> 0) com pernas rebocando")
+        for i in towed:
+            speeds[i] = tow_speed_kn
+    if any(s is None or s <= 0 for s in speeds):
+        raise ValueError("speed_kn deve ser > 0")
+    return speeds
+
+
+def speeds_from(params: Dict[str, Any], n_legs: int) -> List[float]:
+    """
+    Velocidades por perna de uma requisição: speeds_kn (uma por perna) ou
+    speed_kn / tow_speed_kn / towing (textos do plano de viagem aceitos)
+
+    Raises:
+        ValueError: Velocidades inválidas
+    """
+    if params.get('speeds_kn'):
+        speeds = [float(s) for s in params['speeds_kn']]
+        if len(speeds) != n_legs or min(speeds) <= 0:
+            raise ValueError(f"speeds_kn precisa de {n_legs} velocidades > 0")
+        return speeds
+    return leg_speeds(n_legs, parse_speed(params.get('speed_kn')) or DEFAULT_SPEED_KN,
+                      parse_speed(params.get('tow_speed_kn')), params.get('towing'))
+
+
+class RouteTimeline:
+    """Rota com horário: along[i] (NM) e hours[i] (horas desde o ETD) de cada waypoint"""
+
+    def __init__(self, points: Sequence[Dict[str, float]], etd: datetime,
+                 speeds_kn: Union[float, Sequence[float]] = DEFAULT_SPEED_KN):
+        """
+        Raises:
+            ValueError: Menos de dois pontos ou velocidades inválidas
+        """
+        if len(points) < 2:
+            raise ValueError("a rota precisa de pelo menos dois pontos")
+        self.lats = [float(p['lat']) for p in points]
+        self.lons = [float(p['lon']) for p in points]
+        self.etd = etd
+        table = leg_table(self.lats, self.lons, speeds_kn)
+        self.crs, self.dist, self.along, self.hours = table.crs, table.dist, table.along, table.eta_h
+        n_legs = len(self.dist)
+        self.speeds = list(speeds_kn) if isinstance(speeds_kn, Sequence) else [float(speeds_kn)] * n_legs
+        self._legs = None        # arrays das pernas para _nearest_leg, na primeira passagem
+
+    @property
+    def total_nm(self) -> float:
+        return self.along[-1]
+
+    @property
+    def duration_h(self) -> float:
+        return self.hours[-1]
+
+    @property
+    def eta(self) -> datetime:
+        return self.etd + timedelta(hours=self.duration_h)
+
+    def _time(self, hours: float) -> str:
+        return (self.etd + timedelta(hours=hours)).isoformat(timespec='minutes')
+
+    def _leg(self, values: List[float], x: float) -> int:
+        return min(max(bisect.bisect_right(values, x) - 1, 0), len(self.dist) - 1)
+
+    def _point(self, i: int, f: float):
+        """Ponto a uma fração f da perna i sobre a loxodrômica (latitude linear na distância)"""
+        lat1, lat2, lon1, lon2 = self.lats[i], self.lats[i + 1], self.lons[i], self.lons[i + 1]
+        lat = lat1 + f * (lat2 - lat1)
+
+        def psi(deg):
+            return math.log(math.tan(math.pi / 4 + math.radians(deg) / 2))
+
+        d_psi = psi(lat2) - psi(lat1)
+        if abs(d_psi) < 1e-12:
+            return lat, lon1 + f * (lon2 - lon1)
+        return lat, lon1 + (psi(lat) - psi(lat1)) / d_psi * (lon2 - lon1)
+
+    def position_at(self, when: datetime) -> Dict[str, Any]:
+        """Posição num horário (antes da saída: no ponto inicial; depois da chegada: no final)"""
+        hours = (when - self.etd).total_seconds() / 3600
+        status = 'before' if hours < 0 else 'arrived' if hours >= self.duration_h else 'under_way'
+        hours = min(max(hours, 0.0), self.duration_h)
+        i = self._leg(self.hours, hours)
+        span = self.hours[i + 1] - self.hours[i]
+        f = (hours - self.hours[i]) / span if span > 0 else 0.0
+        lat, lon = self._point(i, f)
+        return {
+            'time': when.isoformat(timespec='minutes'), 'status': status,
+            'lat': round(lat, 6), 'lon': round(lon, 6),
+            'along_nm': round(self.along[i] + f * self.dist[i], 3),
+            'leg': i, 'crs': round(self.crs[i], 1), 'speed_kn': self.speeds[i],
+        }
+
+    def time_at_distance(self, along_nm: float) -> Dict[str, Any]:
+        """Horário ao completar along_nm milhas (eta None fora de 0..total_nm)"""
+        if not 0 <= along_nm <= self.total_nm + 1e-9:
+            return {'along_nm': along_nm, 'eta': None, 'hours': None, 'leg': None}
+        i = self._leg(self.along, along_nm)
+        f = min((along_nm - self.along[i]) / self.dist[i], 1.0) if self.dist[i] > 0 else 0.0
+        hours = self.hours[i] + f * (self.hours[i + 1] - self.hours[i])
+        lat, lon = self._point(i, f)
+        return {'along_nm': along_nm, 'eta': self._time(hours), 'hours': round(hours, 4), 'leg': i,
+                'lat': round(lat, 6), 'lon': round(lon, 6)}
+
+    def passage(self, lat: float, lon: float) -> Dict[str, Any]:
+        """
+        Passagem pelo través de um ponto: pé da perpendicular na perna mais
+        próxima (todas as pernas, O(n) vetorizado), depois time_at_distance
+        """
+        d, i, t, cross = self._nearest_leg(lat, lon)
+        result = self.time_at_distance(min(self.along[i] + t * self.dist[i], self.total_nm))
+        result.update({'off_track_nm': round(d, 2), 'side': 'BB' if cross > 0 else 'BE'})
+        result['along_nm'] = round(result['along_nm'], 3)
+        return result
+
+    def _nearest_leg(self, lat: float, lon: float):
+        """(distância, perna, fração, produto vetorial) da perna mais próxima, como point_to_leg"""
+        if np is None:
+            best = None
+            for i in range(len(self.dist)):
+                d, t, cross = point_to_leg(lat, lon, self.lats[i], self.lons[i], self.lats[i + 1], self.lons[i + 1])
+                if best is None or d < best[0]:
+                    best = (d, i, t, cross)
+            return best
+        if self._legs is None:
+            lats, lons = np.asarray(self.lats), np.asarray(self.lons)
+            k = np.cos(np.radians((lats[:-1] + lats[1:]) / 2)) * 60
+            dx, dy = (lons[1:] - lons[:-1]) * k, (lats[1:] - lats[:-1]) * 60
+            self._legs = (lats[:-1], lons[:-1], k, dx, dy, dx * dx + dy * dy)
+        lat1, lon1, k, dx, dy, length2 = self._legs
+        px, py = (lon - lon1) * k, (lat - lat1) * 60
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(length2 == 0, 0.0, np.clip((px * dx + py * dy) / length2, 0.0, 1.0))
+        d = np.hypot(px - t * dx, py - t * dy)
+        i = int(np.argmin(d))
+        return float(d[i]), i, float(t[i]), float(dx[i] * py[i] - dy[i] * px[i])
+
+    def positions_at(self, times: Sequence[datetime]) -> List[Dict[str, Any]]:
+        return [self.position_at(t) for t in times]
+
+    def times_at(self, distances: Sequence[float]) -> List[Dict[str, Any]]:
+        return [self.time_at_distance(d) for d in distances]
+
+    def passages(self, points: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Passagem por cada ponto ({'lat', 'lon'[, 'name']}), nome repetido na resposta"""
+        out = []
+        for p in points:
+            result = self.passage(float(p['lat']), float(p['lon']))
+            if p.get('name'):
+                result['name'] = p['name']
+            out.append(result)
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'etd': self.etd.isoformat(timespec='minutes'), 'eta': self.eta.isoformat(timespec='minutes'),
+            'total_nm': round(self.total_nm, 2), 'duration_h': round(self.duration_h, 2),
+            'waypoints': [{'index': i, 'along_nm': round(a, 2), 'eta': self._time(h)}
+                          for i, (a, h) in enumerate(zip(self.along, self.hours))],
+        }
@@ -0,0 +1,248 @@
+"""
+Agendador de Atualização no Próprio Processo
+Roda a ingestão incremental em ciclos (com jitter) dentro do servidor, tanto no
+server.py quanto no passenger_wsgi.py, sem depender de clique no botão nem do
+ATUALIZAR_TUDO.bat.
+- Cada ciclo coleta até `max_stations` estações vencidas, da mais urgente para
+  a menos urgente (sem dados, previsão mais curta, coleta mais antiga).
+- Ciclos nunca se sobrepõem: nem entre si, nem com uma atualização manual em
+  andamento, nem entre processos (trava em arquivo).
+- O horário do último / próximo ciclo fica em disco, então reiniciar o worker
+  não dispara uma coleta completa.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import ingest
+import jobs
+from http_cache import atomic_write
+
+try:
+    import fcntl
+except ImportError:      # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(SCRIPT_DIR, 'data', 'scheduler_state.json')
+LOCK_FILE = os.path.join(SCRIPT_DIR, 'data', 'scheduler.lock')
+
+# Configuração (variáveis de ambiente sobrepõem os padrões)
+ENABLED = os.environ.get('SISNAV_SCHEDULER', '1') != '0'
+INTERVAL_S = float(os.environ.get('SISNAV_REFRESH_INTERVAL_MIN', '60')) * 60    # cadência dos ciclos
+JITTER_S = float(os.environ.get('SISNAV_REFRESH_JITTER_MIN', '10')) * 60        # +/- aleatório por ciclo
+MAX_STATIONS = int(os.environ.get('SISNAV_REFRESH_MAX_STATIONS', '8'))          # estações por ciclo
+STARTUP_DELAY_S = 60     # espera mínima após subir o processo
+BUSY_RETRY_S = 5 * 60    # nova tentativa quando outra atualização está rodando
+
+
+def priority_key(status: ingest.StationStatus):
+    """Ordem de urgência: sem dados, previsão mais curta, coleta mais antiga"""
+    horizon = status.horizon_days if status.horizon_days is not None else -1
+    age = status.age_s if status.age_s is not None else float('inf')
+    return (horizon, -age)
+
+
+class _FileLock:
+    """Trava exclusiva entre processos (não bloqueante)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class RefreshScheduler:
+    """
+    Dispara ciclos de atualização incremental pelo executor de jobs
+
+    Uso típico (uma vez por processo):
+        scheduler.start_background()
+    """
+
+    def __init__(self, interval_s: float = INTERVAL_S, jitter_s: float = JITTER_S,
+                 max_stations: int = MAX_STATIONS, state_file: str = STATE_FILE,
+                 lock_file: str = LOCK_FILE, startup_delay_s: float = STARTUP_DELAY_S,
+                 ingest_state_file: str = ingest.STATE_FILE):
+        self.interval_s = interval_s
+        self.jitter_s = jitter_s
+        self.max_stations = max_stations
+        self.state_file = state_file
+        self.startup_delay_s = startup_delay_s
+        self.ingest_state_file = ingest_state_file
+        self._lock = _FileLock(lock_file)
+        self._cycle_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------------------
+    # Estado persistido
+    # ---------------------------
+    def load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, **changes) -> Dict[str, Any]:
+        state = {**self.load_state(), **changes}
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        atomic_write(self.state_file, json.dumps(state, ensure_ascii=False, indent=2).encode('utf-8'))
+        return state
+
+    def _next_run_after(self, base: float) -> float:
+        return base + self.interval_s + random.uniform(-self.jitter_s, self.jitter_s)
+
+    def status(self) -> Dict[str, Any]:
+        """Estado persistido + fila de prioridade atual (para /api/scheduler)"""
+        queue = self.due_stations(limit=None)
+        return {
+            'enabled': self._thread is not None and self._thread.is_alive(),
+            'interval_s': self.interval_s,
+            'jitter_s': self.jitter_s,
+            'max_stations': self.max_stations,
+            **self.load_state(),
+            'due': [{'id': s.station.id, 'name': s.station.name, 'reason': s.reason} for s in queue],
+        }
+
+    # ---------------------------
+    # Ciclo
+    # ---------------------------
+    def due_stations(self, limit: Optional[int] = -1) -> List[ingest.StationStatus]:
+        """Estações vencidas em ordem de urgência (limit=-1: max_stations; None: todas)"""
+        due = [s for s in ingest.refresh_status(state_file=self.ingest_state_file) if s.reason]
+        due.sort(key=priority_key)
+        limit = self.max_stations if limit == -1 else limit
+        return due if limit is None else due[:limit]
+
+    def run_cycle(self, wait: bool = True) -> Optional[jobs.Job]:
+        """
+        Executa um ciclo agora, se nenhuma outra atualização estiver rodando
+
+        Returns:
+            Job disparado (None se o ciclo foi pulado ou nada estava vencido)
+        """
+        if not self._cycle_lock.acquire(blocking=False):
+            return None
+        try:
+            if jobs.runner.active(jobs.UPDATE_JOB) is not None:
+                logger.info("Agendador: atualização em andamento, ciclo adiado")
+                self._save_state(next_run_at=time.time() + BUSY_RETRY_S, last_result='adiado (ocupado)')
+                return None
+            if not self._lock.acquire():
+                logger.info("Agendador: outro processo está atualizando, ciclo adiado")
+                self._save_state(next_run_at=time.time() + BUSY_RETRY_S, last_result='adiado (outro processo)')
+                return None
+            try:
+                return self._cycle(wait)
+            finally:
+                self._lock.release()
+        finally:
+            self._cycle_lock.release()
+
+    def _cycle(self, wait: bool) -> Optional[jobs.Job]:
+        started = time.time()
+        due = self.due_stations()
+        if not due:
+            logger.info("Agendador: todas as estações em dia")
+            self._save_state(last_run_at=started, next_run_at=self._next_run_after(started),
+                             last_result='em dia', last_stations=[])
+            return None
+
+        ids = [s.station.id for s in due]
+        logger.info(f"Agendador: coletando {len(ids)} estações ({', '.join(f'{s.station.id}: {s.reason}' for s in due)})")
+        job = jobs.submit_update('incremental', stations=ids, origin='scheduler')
+        self._save_state(last_run_at=started, next_run_at=self._next_run_after(started),
+                         last_job_id=job.id, last_stations=ids, last_result='em andamento')
+        if wait:
+            while job.active and not self._stop.wait(1.0):
+                pass
+            self._save_state(last_result=job.status, last_finished_at=job.finished_at)
+        return job
+
+    # ---------------------------
+    # Thread de fundo
+    # ---------------------------
+    def _loop(self) -> None:
+        state = self.load_state()
+        first = max(time.time() + self.startup_delay_s + random.uniform(0, self.jitter_s),
+                    state.get('next_run_at') or 0)
+        if not state.get('next_run_at'):
+            self._save_state(next_run_at=first)
+        logger.info(f"Agendador ativo: ciclo a cada {self.interval_s / 60:.0f} min (+/- {self.jitter_s / 60:.0f}), "
+                    f"próximo em {(first - time.time()) / 60:.1f} min")
+
+        while not self._stop.is_set():
+            next_run = max(self.load_state().get('next_run_at') or 0, first)
+            delay = next_run - time.time()
+            if delay > 0:
+                self._stop.wait(min(delay, 300))   # reavalia o estado (outro processo pode ter rodado)
+                continue
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logger.error(f"Agendador: ciclo falhou: {e}")
+                self._save_state(next_run_at=time.time() + BUSY_RETRY_S, last_result=f'erro: {e}')
+            first = 0
+
+    def start(self) -> bool:
+        """Sobe a thread do agendador (idempotente)"""
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='refresh-scheduler', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+scheduler = RefreshScheduler()
+
+
+def start_background() -> bool:
+    """Liga o agendador do processo, salvo SISNAV_SCHEDULER=0"""
+    if not ENABLED:
+        logger.info("Agendador desligado (SISNAV_SCHEDULER=0)")
+        return False
+    return scheduler.start()
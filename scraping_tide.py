@@ -5,15 +5,21 @@ Author: Sistema de Navegação Marítima
 Date: 2025-12-17
 """
 
+import bisect
 import requests
-from bs4 import BeautifulSoup
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Tuple
+from dataclasses import asdict
 from datetime import datetime, timedelta
 import re
 import logging
 from urllib.parse import urljoin
 
+from fetch_engine import FetchEngine
+from http_cache import extract_section
+from html_extract import TableRow, get_backend
+from resilience import resilient_get
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -43,6 +49,19 @@ class DailyTideInfo:
     sunrise: str
     sunset: str
     
+    def __post_init__(self):
+        # Minutos de cada maré (self.tides vem em ordem de horário), calculados uma
+        # vez para a busca binária de get_tide_at_time; fora dos campos, não vai no to_dict
+        self._tide_minutes = [self._time_to_minutes(tide.time) for tide in self.tides]
+    
+    def to_dict(self) -> Dict:
+        """Serialização simples (usada pelo cache de parsing)"""
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DailyTideInfo':
+        return cls(**{**data, 'tides': [TideData(**t) for t in data['tides']]})
+    
     def get_high_tides(self) -> List[TideData]:
         """Retorna apenas as preamares"""
         return [tide for tide in self.tides if tide.type == 'preia-mar']
@@ -63,23 +82,15 @@ class DailyTideInfo:
         """
         target_minutes = self._time_to_minutes(target_time)
         
-        # Encontrar as duas marés mais próximas
-        before_tide = None
-        after_tide = None
-        
-        for i, tide in enumerate(self.tides):
-            tide_minutes = self._time_to_minutes(tide.time)
-            
-            if tide_minutes <= target_minutes:
-                before_tide = tide
-            elif tide_minutes > target_minutes and after_tide is None:
-                after_tide = tide
-                break
+        # Marés vizinhas por busca binária nos minutos pré-calculados
+        after = bisect.bisect_right(self._tide_minutes, target_minutes)
+        before_tide = self.tides[after - 1] if after > 0 else None
+        after_tide = self.tides[after] if after < len(self.tides) else None
         
         if before_tide and after_tide:
             # Interpolação linear
-            before_minutes = self._time_to_minutes(before_tide.time)
-            after_minutes = self._time_to_minutes(after_tide.time)
+            before_minutes = self._tide_minutes[after - 1]
+            after_minutes = self._tide_minutes[after]
             
             time_fraction = (target_minutes - before_minutes) / (after_minutes - before_minutes)
             estimated_height = before_tide.height + (after_tide.height - before_tide.height) * time_fraction
@@ -100,18 +111,31 @@ class TideDataCollector:
     
     BASE_URL = "https://tabuademares.com"
     
-    def __init__(self, user_agent: str = None):
+    def __init__(self, user_agent: str = None, engine: FetchEngine = None, parser_backend: str = None):
         """
         Inicializa o coletor de dados
         
         Args:
             user_agent: User agent customizado para as requisições
+            engine: Motor de coleta compartilhado (limites por host e taxa).
+                    Sem motor, usa uma sessão própria, em série (com os mesmos
+                    timeouts, novas tentativas e disjuntor de resilience.py).
+            parser_backend: 'fast' (streaming, padrão) ou 'bs4' (BeautifulSoup)
         """
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.engine = engine
+        self.backend = get_backend(parser_backend)
+        self.headers = {
             'User-Agent': user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept-Language': 'pt-BR,pt;q=0.9',
-        })
+        }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+    
+    def _http_get(self, url: str) -> requests.Response:
+        """GET pelo motor compartilhado, se houver, ou pela sessão própria (ambos com timeout e novas tentativas)"""
+        if self.engine is not None:
+            return self.engine.get(url, headers=self.headers)
+        return resilient_get(self.session, url)
         
     def get_location_url(self, state: str, city: str) -> str:
         """
@@ -163,126 +187,191 @@ class TideDataCollector:
         if date is None:
             date = datetime.now()
         
+        results = self.collect_tide_range(state, city, start=date, days=1)
+        return results[0] if results else None
+    
+    def collect_tide_range(self, state: str, city: str, start: datetime = None, days: int = 10) -> List[DailyTideInfo]:
+        """
+        Coleta vários dias de marés com um único download da página da estação
+        
+        A tabela do site já traz todos os dias da previsão, então a página é
+        baixada e parseada uma vez e cada linha de dia é extraída numa só passada.
+        
+        Args:
+            state: Estado
+            city: Cidade
+            start: Primeiro dia desejado (padrão: hoje)
+            days: Quantidade de dias a partir de start
+            
+        Returns:
+            Lista de DailyTideInfo, na ordem das datas (dias ausentes na tabela são omitidos)
+        """
+        if start is None:
+            start = datetime.now()
+        
         url = self.get_location_url(state, city)
         
         try:
-            logger.info(f"Coletando dados de {city}/{state} para {date.strftime('%d/%m/%Y')}")
+            logger.info(f"Coletando dados de {city}/{state} a partir de {start.strftime('%d/%m/%Y')} ({days} dias)")
             
-            response = self.session.get(url)
+            response = self._http_get(url)
             response.raise_for_status()
+            html = response.text
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extrair dados da tabela de marés
-            tide_data = self._extract_tide_data(soup, date)
-            
-            if tide_data:
-                logger.info(f"Dados coletados com sucesso: {len(tide_data.tides)} marés encontradas")
-                return tide_data
-            else:
-                logger.warning(f"Nenhum dado encontrado para {city}/{state}")
-                return None
-                
         except requests.RequestException as e:
             logger.error(f"Erro na requisição HTTP: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Erro ao processar dados: {e}")
-            return None
+            return []
+        
+        results = self.parse_tide_page(url, html, start, days)
+        
+        if results:
+            logger.info(f"Dados coletados com sucesso: {len(results)}/{days} dias para {city}/{state}")
+        else:
+            logger.warning(f"Nenhum dado encontrado para {city}/{state}")
+        return results
     
-    def _extract_tide_data(self, soup: BeautifulSoup, date: datetime) -> Optional[DailyTideInfo]:
+    def parse_tide_page(self, url: str, html: str, start: datetime, days: int) -> List[DailyTideInfo]:
+        """
+        Extrai os dias [start, start + days) de uma página de estação já baixada
+        
+        Com motor (e cache), reaproveita o parsing anterior se o título e a
+        tabela da página não mudaram.
+        
+        Args:
+            url: URL da página (entrada do cache)
+            html: HTML da página da estação
+            start: Primeiro dia desejado
+            days: Quantidade de dias
+            
+        Returns:
+            Lista de DailyTideInfo das datas encontradas na tabela
+        """
+        dates = [start + timedelta(days=i) for i in range(days)]
+        
+        def parse():
+            return self._extract_tide_range(html, dates)
+        
+        if self.engine is None:
+            return parse()
+        # Página igual à anterior (mesmo hash do título + tabela): reaproveita o parsing
+        return self.engine.memo_parse(
+            url, extract_section(html, '<h1', '</table>'),
+            f"tide_range:{start.strftime('%Y-%m-%d')}:{days}", parse,
+            dump=lambda infos: [info.to_dict() for info in infos],
+            load=lambda rows: [DailyTideInfo.from_dict(row) for row in rows]
+        )
+    
+    def _extract_tide_data(self, html: str, date: datetime) -> Optional[DailyTideInfo]:
         """
         Extrai dados de marés do HTML parseado
         
         Args:
-            soup: Objeto BeautifulSoup com o HTML
+            html: HTML da página da estação
             date: Data dos dados
             
         Returns:
             DailyTideInfo ou None
         """
+        results = self._extract_tide_range(html, [date])
+        return results[0] if results else None
+    
+    def _extract_tide_range(self, html: str, dates: List[datetime]) -> List[DailyTideInfo]:
+        """
+        Extrai as linhas de vários dias da tabela de marés em uma única passada
+        
+        Args:
+            html: HTML da página da estação
+            dates: Datas desejadas
+            
+        Returns:
+            Lista de DailyTideInfo das datas encontradas na tabela
+        """
         try:
-            # Extrair nome da localização
-            location_element = soup.find('h1')
-            location = location_element.text.strip() if location_element else "Desconhecido"
+            # Título (localização) e linhas da tabela, pelo backend de extração
+            location_text, rows = self.backend.first_table(html)
+            location = location_text.strip() if location_text is not None else "Desconhecido"
             
-            # Extrair dados da tabela
-            table = soup.find('table')
-            if not table:
+            if not rows:
                 logger.warning("Tabela de marés não encontrada")
-                return None
-            
-            # Encontrar a linha correspondente à data
-            # Fix para Windows: %-d não funciona, usar str(date.day) remove zero à esquerda
-            date_str = str(date.day) 
-            rows = table.find_all('tr')
-            
-            logger.info(f"DEBUG: Searching for day '{date_str}' in {len(rows)} rows.")
-
-            target_row = None
-            for row in rows:
-                first_cell = row.find('td')
-                if first_cell:
-                    txt = first_cell.text.strip()
-                    # logger.info(f"DEBUG: Checking cell '{txt}'")
-                    if date_str in txt:
-                        target_row = row
-                        logger.info(f"DEBUG: MATCH! Row found for {date_str}")
-                        break
-            
-            if not target_row:
-                logger.warning(f"Dados não encontrados para a data {date.strftime('%d/%m/%Y')}")
-                return None
-            
-            # Extrair marés
-            tides = []
-            cells = target_row.find_all('td')
-            
-            # Padrão típico: célula com horário e altura
-            # Padrão típico: célula com horário e altura (suporta virgula e ponto)
-            tide_pattern = re.compile(r'(\d{1,2}:\d{2}).*?([\d.,]+)\s*m')
+                return []
             
-            for cell in cells:
-                text = cell.get_text(" ", strip=True) 
-                # logger.info(f"DEBUG: Regex checking text: '{text}'") 
-                matches = tide_pattern.findall(text)
-                if matches:
-                    logger.info(f"DEBUG: Matches found: {matches}")
-                
-                for time, height in matches:
-                    # Determinar tipo de maré baseado no contexto ou altura
-                    tide_type = self._determine_tide_type(cell)
-                    try:
-                        normalized_height = float(height.replace(',', '.'))
-                        tides.append(TideData(
-                            time=time,
-                            height=normalized_height,
-                            type=tide_type
-                        ))
-                    except ValueError:
-                        continue
+            day_rows = self._index_day_rows(rows)
             
-            if not tides:
-                 logger.error(f"DEBUG: Row found but NO tides extracted for {date_str}. Text: {target_row.get_text(strip=True)[:100]}")
-            
-            # Extrair coeficiente
-            coefficient = self._extract_coefficient(target_row)
-            
-            # Extrair horários de nascer/pôr do sol
-            sunrise, sunset = self._extract_sun_times(target_row)
-            
-            return DailyTideInfo(
-                location=location,
-                date=date.strftime("%d/%m/%Y"),
-                tides=tides,
-                coefficient=coefficient,
-                sunrise=sunrise,
-                sunset=sunset
-            )
+            results = []
+            for date in dates:
+                target_row = day_rows.get(date.day)
+                if target_row is None:
+                    logger.warning(f"Dados não encontrados para a data {date.strftime('%d/%m/%Y')}")
+                    continue
+                results.append(self._build_daily_info(location, target_row, date))
+            return results
             
         except Exception as e:
             logger.error(f"Erro ao extrair dados: {e}")
-            return None
+            return []
+    
+    @staticmethod
+    def _index_day_rows(rows: List[TableRow]) -> Dict[int, TableRow]:
+        """
+        Indexa as linhas da tabela pelo dia do mês da primeira célula
+        
+        Fix para Windows: o dia é comparado como inteiro (sem %-d). Vale a
+        primeira linha de cada dia, como na busca linear original.
+        """
+        day_rows = {}
+        for row in rows:
+            first_cell = row.cells[0] if row.cells else None
+            if not first_cell:
+                continue
+            for token in re.findall(r'(?<!\d)\d{1,2}(?!\d)', first_cell.text.strip()):
+                day = int(token)
+                if 1 <= day <= 31 and day not in day_rows:
+                    day_rows[day] = row
+        return day_rows
+    
+    def _build_daily_info(self, location: str, target_row: TableRow, date: datetime) -> DailyTideInfo:
+        """Monta o DailyTideInfo de uma linha de dia da tabela"""
+        # Extrair marés
+        tides = []
+        cells = target_row.cells
+        
+        # Padrão típico: célula com horário e altura (suporta virgula e ponto)
+        tide_pattern = re.compile(r'(\d{1,2}:\d{2}).*?([\d.,]+)\s*m')
+        
+        for cell in cells:
+            text = cell.get_text(" ", strip=True)
+            matches = tide_pattern.findall(text)
+            
+            for time, height in matches:
+                # Determinar tipo de maré baseado no contexto ou altura
+                tide_type = self._determine_tide_type(cell)
+                try:
+                    normalized_height = float(height.replace(',', '.'))
+                    tides.append(TideData(
+                        time=time,
+                        height=normalized_height,
+                        type=tide_type
+                    ))
+                except ValueError:
+                    continue
+        
+        if not tides:
+            logger.error(f"Linha encontrada mas NENHUMA maré extraída para {date.strftime('%d/%m/%Y')}. Texto: {target_row.get_text(strip=True)[:100]}")
+        
+        # Extrair coeficiente
+        coefficient = self._extract_coefficient(target_row)
+        
+        # Extrair horários de nascer/pôr do sol
+        sunrise, sunset = self._extract_sun_times(target_row)
+        
+        return DailyTideInfo(
+            location=location,
+            date=date.strftime("%d/%m/%Y"),
+            tides=tides,
+            coefficient=coefficient,
+            sunrise=sunrise,
+            sunset=sunset
+        )
     
     @staticmethod
     def _determine_tide_type(cell) -> str:
@@ -296,7 +385,7 @@ class TideDataCollector:
             return 'baixa-mar'
         
         # Alternativa: usar classe CSS ou atributo
-        if 'high' in cell.get('class', []) or 'preia' in str(cell):
+        if 'high' in cell.get('class', []) or 'preia' in cell.markup:
             return 'preia-mar'
         return 'baixa-mar'
     
@@ -1,11 +1,15 @@
 import requests
-from bs4 import BeautifulSoup
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from typing import List, Optional
 from datetime import datetime
 import locale
 
+from fetch_engine import FetchEngine
+from http_cache import extract_section
+from html_extract import get_backend
+from resilience import resilient_get
+
 # Tenta configurar locale para PT-BR (Windows)
 try:
     locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
@@ -23,7 +27,12 @@ class WeatherData:
     temp: float        # C (Default 0 if missing)
 
 class WeatherCollector:
-    def __init__(self):
+    def __init__(self, engine: FetchEngine = None, parser_backend: str = None):
+        # engine: motor de coleta compartilhado (opcional). Sem ele, sessão própria
+        #         (com timeouts, novas tentativas e disjuntor de resilience.py).
+        # parser_backend: 'fast' (streaming, padrão) ou 'bs4' (BeautifulSoup)
+        self.engine = engine
+        self.backend = get_backend(parser_backend)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7'
@@ -31,24 +40,48 @@ class WeatherCollector:
         self.session = requests.Session()
         self.session.headers.update(self.headers)
 
+    def _get(self, url: str):
+        if self.engine is not None:
+            return self.engine.get(url, headers=self.headers, timeout=10)
+        return resilient_get(self.session, url, timeout=10)
+
     def scrape_wind(self, url: str) -> List[WeatherData]:
         print(f"Scraping WIND from {url}")
         try:
-            res = self.session.get(url, timeout=10)
+            res = self._get(url)
             if res.status_code != 200:
                 print(f"Error {res.status_code}")
                 return []
         except Exception as e:
             print(f"Request Error: {e}")
             return []
-            
-        soup = BeautifulSoup(res.text, 'html.parser')
+
+        return self.parse_wind_page(url, res.text)
+
+    def parse_wind_page(self, url: str, html: str) -> List[WeatherData]:
+        # Página de vento já baixada; com motor, a mesma seção da última
+        # coleta reaproveita o parsing memorizado
+        if self.engine is None:
+            return self.parse_wind(html)
+        return self.engine.memo_parse(
+            url, extract_section(html), f"wind:{datetime.now().strftime('%Y-%m-%d')}",
+            lambda: self.parse_wind(html),
+            dump=lambda items: [asdict(i) for i in items],
+            load=lambda rows: [WeatherData(**r) for r in rows]
+        )
+
+    def parse_wind(self, html: str) -> List[WeatherData]:
+        # Uma passada só pelos divs que interessam (datas, vento, temperatura)
+        found = self.backend.find_blocks(html, 'div', {
+            # Structure identified: div.fecha_grande or similar containing text
+            'dates': lambda c: 'fecha' in c or 'titulo_grafico' in c,
+            'wind': lambda c: c == 'f_text_tiempo',
+            'temp': lambda c: c == 'f_text_temperatura',
+        })
         
         # 1. Find Dates (Headers)
         # Look for the date headers we saw in debug: "26DEZSexta-feira..."
-        # Structure identified: div.fecha_grande or similar containing text
-        # Let's verify commonly used classes or just search divs with text pattern
-        date_divs = soup.find_all('div', class_=lambda c: c and ('fecha' in c or 'titulo_grafico' in c))
+        date_divs = found['dates']
         
         # Filter valid date strings
         valid_dates = []
@@ -90,7 +123,7 @@ class WeatherCollector:
         print(f"Found {len(valid_dates)} Dates: {valid_dates}")
 
         # 2. Find Data Blocks (f_text_tiempo verified in debug)
-        blocks = soup.find_all('div', class_='f_text_tiempo')
+        blocks = found['wind']
         print(f"Found {len(blocks)} Data Blocks (f_text_tiempo)")
 
         all_data = []
@@ -131,7 +164,7 @@ class WeatherCollector:
         
         # Try to find Temp if possible (Bonus)
         # Attempt to map f_text_temperatura index-wise
-        temp_blocks = soup.find_all('div', class_='f_text_temperatura')
+        temp_blocks = found['temp']
         if len(temp_blocks) >= loop_count:
             print("Found Temp Blocks! Enriching data...")
             idx_global = 0
@@ -7,6 +7,17 @@ Autor: Jossian Brito
 Mudanças (changelog):
 - v1.0.0: Implementa coleta e parsing de marés (7 dias) + tempo/vento (hora a hora),
           normalizando para JSON único por porto.
+- v1.1.0: Portos vêm do cadastro único (stations.py); main() gera o JSON pela
+          ingestão única (ingest.py), que também alimenta os CSVs.
+- v1.1.1: _get() com timeout de conexão/leitura, novas tentativas com backoff
+          e disjuntor por host (resilience.py), também sem engine.
+- v1.2.0: main() aceita --record (grava as páginas em data/page_archive/) e
+          --replay [--as-of=AAAA-MM-DD] (gera o JSON a partir do arquivo, offline).
+- v1.3.0: main() aceita --db[=caminho] (ou SISNAV_DB): grava os portos na base
+          SQLite (metocean_db.py) e exporta o JSON dela.
+- v1.3.1: tempo/vento hora a hora datados dia a dia (hourly_dates); antes todos
+          os dias saíam com a data corrente e a mescla por (data, hora) ficava
+          só com um dia.
 
 Uso típico:
 - Rodar a cada 6h e cachear em disco (offline-friendly).
@@ -15,44 +26,28 @@ Uso típico:
 
 from __future__ import annotations
 
-import json
+import os
 import re
-import time
+import sys
 from dataclasses import dataclass, asdict
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Optional
 
 import requests
-from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fetch_engine import FetchEngine  # noqa: E402
+from http_cache import extract_section  # noqa: E402
+from html_extract import get_backend  # noqa: E402
+from resilience import resilient_get  # noqa: E402
+from stations import STATIONS  # noqa: E402
 
 
 # ---------------------------
 # Configuração (portos)
 # ---------------------------
-PORTS = {
-    # Norte
-    "Vila do Conde-PA (proxy Barcarena)": "https://tabuademares.com/br/para/barcarena",
-    "Belém-PA (Porto)": "https://tabuademares.com/br/para/belem",
-    "Santana-AP (Porto)": "https://tabuademares.com/br/amapa/santana",
-    # Nordeste
-    "Itaqui-MA": "https://tabuademares.com/br/maranhao/itaqui",   # se existir no site, mantém; senão ajustar
-    "Pecém-CE": "https://tabuademares.com/br/ceara/pecem",       # se existir no site, mantém; senão ajustar
-    "Mucuripe-CE (Fortaleza)": "https://tabuademares.com/br/ceara/fortaleza",
-    "Suape-PE": "https://tabuademares.com/br/pernambuco/suape",
-    "Recife-PE (Porto)": "https://tabuademares.com/br/pernambuco/recife",
-    "Salvador-BA": "https://tabuademares.com/br/bahia/salvador",
-    # Sudeste
-    "Vitória-ES": "https://tabuademares.com/br/espirito-santo/vitoria",
-    "Rio de Janeiro-RJ": "https://tabuademares.com/br/rio-de-janeiro/rio-de-janeiro",
-    "Angra dos Reis-RJ": "https://tabuademares.com/br/rio-de-janeiro/angra-dos-reis",
-    "Sepetiba-RJ": "https://tabuademares.com/br/rio-de-janeiro/sepetiba",
-    "Santos-SP (Porto)": "https://tabuademares.com/br/so-paulo/santos",
-    # Sul
-    "Paranaguá-PR": "https://tabuademares.com/br/parana/paranagua",
-    "São Francisco do Sul-SC": "https://tabuademares.com/br/santa-catarina/sao-francisco-do-sul",
-    "Itajaí-SC": "https://tabuademares.com/br/santa-catarina/itajai",
-    "Rio Grande-RS (Porto)": "https://tabuademares.com/br/rio-grande-do-sul/porto-do-rio-grande",
-}
+# Os portos vêm do cadastro único (stations.py), compartilhado com os CSVs
+PORTS = {st.port_key: st.url() for st in STATIONS}
 
 
 HEADERS = {
@@ -82,8 +77,19 @@ class HourlyVector:
     extra: dict[str, Any]
 
 
-def _get(url: str, timeout_s: int = 20) -> str:
-    r = requests.get(url, headers=HEADERS, timeout=timeout_s)
+def _get(url: str, timeout_s: int = 20, engine: Optional[FetchEngine] = None) -> str:
+    """
+    Baixa uma página.
+    Comportamento:
+    - Com engine, passa pelo limite por host e pelo token bucket compartilhados
+    - Sem engine, requisição direta (uso avulso)
+    - Em ambos: falhas temporárias (rede, timeout, 5xx, 429) são repetidas com
+      backoff; com o host fora do ar, o disjuntor faz falhar na hora
+    """
+    if engine is not None:
+        r = engine.get(url, headers=HEADERS, timeout=timeout_s)
+    else:
+        r = resilient_get(requests, url, headers=HEADERS, timeout=timeout_s)
     r.raise_for_status()
     return r.text
 
@@ -106,15 +112,15 @@ def _to_int_maybe(s: str) -> Optional[int]:
     return int(m.group(1)) if m else None
 
 
-def parse_tides_7d(html: str) -> list[TideEvent]:
+def parse_tides_7d(html: str, backend: Optional[str] = None) -> list[TideEvent]:
     """
     Parser da página .../previsao/mares
     Estratégia:
     - A página lista dias e, dentro de cada dia, linhas com: hora, altura, coef.
     - A estrutura é bastante estável no TabuaDeMares.
+    - backend: 'fast' (streaming, padrão) ou 'bs4'; ambos geram o mesmo texto.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text("\n", strip=True)
+    text = get_backend(backend).page_text(html, "\n")
 
     # Padrão visto nas páginas:
     # 27 DEZ ... Marés Altura Coef. 3:14 0,7 m 56 ...
@@ -171,6 +177,52 @@ def parse_hourly_table_like(text: str) -> list[tuple[str, str]]:
     return out
 
 
+def hourly_dates(hours: list[str], first: date) -> list[str]:
+    """
+    Data (ISO) de cada hora de uma série hora a hora de vários dias.
+    As páginas de tempo/vento listam os dias em sequência (0:00 ... 23:00, 0:00 ...)
+    sem repetir a data: o dia avança quando a hora não passa da anterior.
+    """
+    out: list[str] = []
+    day, prev = first, None
+    for hhmm in hours:
+        try:
+            h, m = hhmm.split(":")
+            minutes = int(h) * 60 + int(m)
+        except (AttributeError, ValueError):
+            minutes = None    # hora ilegível fica no dia corrente
+        if minutes is not None:
+            if prev is not None and minutes <= prev:
+                day += timedelta(days=1)
+            prev = minutes
+        out.append(day.isoformat())
+    return out
+
+
+def redate_hourly(entries: list[dict[str, Any]], time_key: str = "hour_local") -> list[dict[str, Any]]:
+    """
+    Corrige séries gravadas antes de hourly_dates, com todos os dias na mesma data:
+    cada sequência de itens com a mesma date_iso é redatada a partir dela.
+    Séries já datadas (horas crescentes dentro do dia) saem iguais.
+    """
+    out: list[dict[str, Any]] = []
+    i = 0
+    while i < len(entries):
+        j = i
+        while j < len(entries) and entries[j].get("date_iso") == entries[i].get("date_iso"):
+            j += 1
+        run = entries[i:j]
+        try:
+            first = date.fromisoformat(run[0].get("date_iso") or "")
+        except ValueError:
+            out.extend(run)
+        else:
+            dates = hourly_dates([e.get(time_key) for e in run], first)
+            out.extend(e if e.get("date_iso") == d else {**e, "date_iso": d} for e, d in zip(run, dates))
+        i = j
+    return out
+
+
 def _kmh_to_knots(s: str) -> str:
     """
     Converte string '14 km/h' para '7.6 kn'
@@ -182,10 +234,16 @@ def _kmh_to_knots(s: str) -> str:
     knots = kmh / 1.852
     return f"{knots:.1f} kn"
 
-def parse_wind_hourly(html: str) -> list[HourlyVector]:
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text("\n", strip=True)
-    today = datetime.now().strftime("%Y-%m-%d")
+def _dated(vectors: list[HourlyVector]) -> list[HourlyVector]:
+    """Data de cada vetor: a série começa hoje e avança um dia a cada virada de hora"""
+    dates = hourly_dates([v.hour_local for v in vectors], datetime.now().date())
+    for v, d in zip(vectors, dates):
+        v.date_iso = d
+    return vectors
+
+
+def parse_wind_hourly(html: str, backend: Optional[str] = None) -> list[HourlyVector]:
+    text = get_backend(backend).page_text(html, "\n")
 
     pairs = parse_hourly_table_like(text)
     vectors: list[HourlyVector] = []
@@ -205,7 +263,7 @@ def parse_wind_hourly(html: str) -> list[HourlyVector]:
             if direction or speed_kmh:
                 val_kn = _kmh_to_knots(speed_kmh) if speed_kmh else ""
                 vectors.append(HourlyVector(
-                    date_iso=today,
+                    date_iso="",
                     hour_local=ln,
                     value=val_kn,
                     extra={"direction": direction}
@@ -216,25 +274,39 @@ def parse_wind_hourly(html: str) -> list[HourlyVector]:
         for hhmm, val in pairs:
             # Tenta converter também no fallback se parecer km/h
             val_final = _kmh_to_knots(val) if "km/h" in val else val
-            vectors.append(HourlyVector(date_iso=today, hour_local=hhmm, value=val_final, extra={}))
+            vectors.append(HourlyVector(date_iso="", hour_local=hhmm, value=val_final, extra={}))
 
-    return vectors
+    return _dated(vectors)
 
 
-def parse_weather_hourly(html: str) -> list[HourlyVector]:
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text("\n", strip=True)
-    today = datetime.now().strftime("%Y-%m-%d")
+def parse_weather_hourly(html: str, backend: Optional[str] = None) -> list[HourlyVector]:
+    text = get_backend(backend).page_text(html, "\n")
 
     pairs = parse_hourly_table_like(text)
     vectors: list[HourlyVector] = []
     for hhmm, cond in pairs:
         # cond costuma ser "Céu limpo", "Nublado", "Aguaceiros isolados", etc.
-        vectors.append(HourlyVector(date_iso=today, hour_local=hhmm, value=cond, extra={}))
-    return vectors
+        vectors.append(HourlyVector(date_iso="", hour_local=hhmm, value=cond, extra={}))
+    return _dated(vectors)
 
 
-def collect_port(base_url: str) -> dict[str, Any]:
+def parse_cached(url: str, html: str, stage: str, parser, engine: Optional[FetchEngine]) -> list[dict[str, Any]]:
+    """
+    Roda o parser e serializa com asdict.
+    Comportamento:
+    - Com engine (e cache), reaproveita o resultado se a seção da página não mudou
+    - A chave inclui o dia, pois os parsers datam os vetores com a data corrente
+    """
+    def parse() -> list[dict[str, Any]]:
+        return [asdict(x) for x in parser(html)]
+
+    if engine is None:
+        return parse()
+    key = f"{stage}:{datetime.now().strftime('%Y-%m-%d')}"
+    return engine.memo_parse(url, extract_section(html), key, parse)
+
+
+def collect_port(base_url: str, engine: Optional[FetchEngine] = None) -> dict[str, Any]:
     tides_url = f"{base_url}/previsao/mares"
     weather_url = f"{base_url}/previsao/tempo"
     wind_url = f"{base_url}/previsao/vento"
@@ -249,20 +321,20 @@ def collect_port(base_url: str) -> dict[str, Any]:
     }
 
     try:
-        tides_html = _get(tides_url)
-        out["tides_7d"] = [asdict(x) for x in parse_tides_7d(tides_html)]
+        tides_html = _get(tides_url, engine=engine)
+        out["tides_7d"] = parse_cached(tides_url, tides_html, "tides_7d", parse_tides_7d, engine)
     except Exception as e:
         out["errors"].append({"stage": "tides_7d", "url": tides_url, "err": str(e)})
 
     try:
-        w_html = _get(weather_url)
-        out["weather_hourly"] = [asdict(x) for x in parse_weather_hourly(w_html)]
+        w_html = _get(weather_url, engine=engine)
+        out["weather_hourly"] = parse_cached(weather_url, w_html, "weather_hourly", parse_weather_hourly, engine)
     except Exception as e:
         out["errors"].append({"stage": "weather_hourly", "url": weather_url, "err": str(e)})
 
     try:
-        wind_html = _get(wind_url)
-        out["wind_hourly"] = [asdict(x) for x in parse_wind_hourly(wind_html)]
+        wind_html = _get(wind_url, engine=engine)
+        out["wind_hourly"] = parse_cached(wind_url, wind_html, "wind_hourly", parse_wind_hourly, engine)
     except Exception as e:
         out["errors"].append({"stage": "wind_hourly", "url": wind_url, "err": str(e)})
 
@@ -274,18 +346,14 @@ def collect_port(base_url: str) -> dict[str, Any]:
 
 
 def main() -> None:
-    db: dict[str, Any] = {"ports": {}}
-
-    for name, url in PORTS.items():
-        print(f"[INFO] Coletando: {name} -> {url}")
-        db["ports"][name] = collect_port(url)
-        time.sleep(0.7)  # respeita o servidor (evita parecer ataque)
-
-    with open("maritimo_mare_meteo.json", "w", encoding="utf-8") as f:
-        json.dump(db, f, ensure_ascii=False, indent=2)
-
+    # Mesma ingestão dos CSVs (ingest.py), só com o writer do JSON
+    from ingest import run
+    from metocean_db import db_from_args
+    from page_archive import archive_from_args
+    archive, args = archive_from_args(sys.argv[1:])
+    db, _ = db_from_args(args)
+    run(writers=["ports_json"], archive=archive, db=db)
     print("[OK] Arquivo gerado: maritimo_mare_meteo.json")
 
-
 if __name__ == "__main__":
     main()
@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory, jsonify, Response, safe_join
+from flask import Flask, send_from_directory, jsonify, Response
 import os
 import sys
 import logging
@@ -7,9 +7,20 @@ import time
 
 # Import scripts (Ensure they are clean/modular)
 try:
-    import rebuild_csv
-    import update_weather_batch
+    import jobs
+    import scheduler
     import build_route_index # New
+    import metocean_db
+    import tide_engine
+    import tide_harmonics
+    import voyage_metocean
+    import geo_index
+    import route_corridor
+    import route_graph
+    import route_lod
+    import route_timeline
+    import departure_window
+    import astro
 except ImportError as e:
     print(f"Warning: Update scripts not found: {e}")
 
@@ -29,30 +40,389 @@ def serve_static(path):
 
 @app.route('/api/update-data', methods=['POST'])
 def update_data():
+    # Runs in the background (jobs.py): the request returns at once with the job id.
+    # Clicks while an update is running join the job already in progress.
+    from flask import request
+
+    body = request.get_json(silent=True) or {}
+    job = jobs.submit_update(body.get('mode', 'full'))
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({'jobs': jobs.runner.list()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = jobs.runner.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = jobs.runner.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    # Optional SSE stream of the same progress events (polling /api/jobs/<id> also works)
+    job = jobs.runner.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
     def generate():
-        yield f"data: {json.dumps({'status': 'Iniciando atualização...', 'progress': 5})}\n\n"
-        
-        try:
-            # 1. Tides
-            yield f"data: {json.dumps({'status': 'Baixando Marés (Base Nacional)...', 'progress': 20})}\n\n"
-            # Redirect stdout to capture logs? Or just run blind?
-            # ideally modify rebuild_csv to yield progress, but for now blocking call
-            rebuild_csv.run() 
-            yield f"data: {json.dumps({'status': 'Marés Atualizadas!', 'progress': 50})}\n\n"
-
-            # 2. Weather
-            yield f"data: {json.dumps({'status': 'Baixando Meteorologia (18 Portos)...', 'progress': 60})}\n\n"
-            update_weather_batch.run()
-            yield f"data: {json.dumps({'status': 'Meteorologia Atualizada!', 'progress': 90})}\n\n"
-
-            yield f"data: {json.dumps({'status': 'Conuído!', 'progress': 100})}\n\n"
-            
-        except Exception as e:
-            logger.error(f"Update Error: {e}")
-            yield f"data: {json.dumps({'status': f'Erro: {str(e)}', 'progress': 0, 'error': True})}\n\n"
+        sent = 0
+        while True:
+            events = jobs.runner.wait_events(job, sent)
+            for event in events:
+                yield f"data: {json.dumps(event)}\n\n"
+            sent += len(events)
+            if not job.active and sent >= len(job.events):
+                break
+            if not events:
+                yield ": keep-alive\n\n"
 
     return Response(generate(), mimetype='text/event-stream')
 
+@app.route('/api/scheduler', methods=['GET'])
+def scheduler_status():
+    # Background refresh cadence, last/next cycle and the current priority queue
+    return jsonify(scheduler.scheduler.status())
+
+def _db_or_503():
+    # SQLite backend is optional (SISNAV_DB, shared with the update jobs); the CSV/JSON files work without it
+    db = metocean_db.get_db()
+    if db is None:
+        return None, (jsonify({'error': 'Database disabled (set SISNAV_DB)'}), 503)
+    return db, None
+
+@app.route('/api/db/tides', methods=['GET'])
+def db_tides():
+    # High/low tide events of one station on one day: ?station=BR_SSZ&date=2026-10-17
+    from flask import request
+    from datetime import date
+    db, error = _db_or_503()
+    if error:
+        return error
+    try:
+        day = date.fromisoformat(request.args.get('date', date.today().isoformat()))
+    except ValueError:
+        return jsonify({'error': 'Invalid date (YYYY-MM-DD)'}), 400
+    station = request.args.get('station', '')
+    return jsonify({'station': station, 'date': day.isoformat(), 'events': db.tide_events_for_day(station, day)})
+
+@app.route('/api/db/weather/nearest', methods=['GET'])
+def db_weather_nearest():
+    # Hourly wind/wave sample closest to a local time: ?station=BR_SSZ&at=2026-10-17T14:20
+    from flask import request
+    from datetime import datetime
+    db, error = _db_or_503()
+    if error:
+        return error
+    try:
+        at = datetime.fromisoformat(request.args['at']) if 'at' in request.args else datetime.now()
+    except ValueError:
+        return jsonify({'error': 'Invalid time (YYYY-MM-DDTHH:MM)'}), 400
+    sample = db.nearest_weather(request.args.get('station', ''), at)
+    if sample is None:
+        return jsonify({'error': 'No weather sample near that time'}), 404
+    return jsonify(sample)
+
+@app.route('/api/db/window', methods=['GET'])
+def db_window():
+    # Tides and weather for several stations over the voyage window:
+    # ?stations=BR_SSZ,BR_RIO&start=2026-10-17T06:00&end=2026-10-18T18:00
+    from flask import request
+    from datetime import datetime
+    db, error = _db_or_503()
+    if error:
+        return error
+    try:
+        start = datetime.fromisoformat(request.args['start'])
+        end = datetime.fromisoformat(request.args['end'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start and end are required (YYYY-MM-DDTHH:MM)'}), 400
+    stations = [s for s in request.args.get('stations', '').split(',') if s]
+    return jsonify({'start': start.isoformat(), 'end': end.isoformat(),
+                    'stations': db.window(stations, start, end)})
+
+@app.route('/api/tide', methods=['GET', 'POST'])
+def tide_api():
+    # Batched tide interpolation for one station (id or CSV name):
+    #   GET  /api/tide?station=Santos&start=2026-10-17T06:00&end=2026-10-22T06:00&step_min=10
+    #   POST /api/tide {"station": "BR_SSZ", "times": ["2026-10-17T06:00", ...]}
+    from flask import request
+    from datetime import datetime
+    params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    try:
+        if params.get('times'):
+            times = [datetime.fromisoformat(t) for t in params['times']]
+        elif params.get('at'):
+            times = [datetime.fromisoformat(params['at'])]
+        else:
+            times = tide_engine.time_range(datetime.fromisoformat(params['start']),
+                                           datetime.fromisoformat(params['end']),
+                                           int(params.get('step_min', 10)))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid times ({e}); use times, at or start/end/step_min'}), 400
+    if len(times) > tide_engine.MAX_TIMES:
+        return jsonify({'error': f'At most {tide_engine.MAX_TIMES} times per call'}), 400
+    try:
+        result = tide_engine.get_engine().interpolate(params.get('station', ''), times)
+    except KeyError:
+        return jsonify({'error': 'Station not found'}), 404
+    except FileNotFoundError:
+        return jsonify({'error': 'No tide data (run rebuild_csv.py)'}), 503
+    if not params.get('times') and not params.get('at'):
+        # Generated series: the lists follow start + i * step_min
+        result['start'] = times[0].isoformat(timespec='minutes') if times else None
+        result['step_min'] = int(params.get('step_min', 10))
+    return jsonify(result)
+
+@app.route('/api/tide/harmonic', methods=['GET'])
+def tide_harmonic_api():
+    # Harmonic forecast past the scrape horizon (constants fitted from the scraped extremes):
+    #   GET /api/tide/harmonic?station=Salvador&start=2026-10-17&days=30&step_min=10
+    # Without station: every fitted station. start defaults to the day after each
+    # station's last scraped event; step_min adds a height series.
+    from flask import request
+    from datetime import datetime
+    try:
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        days = float(request.args.get('days', tide_harmonics.DEFAULT_FORECAST_DAYS))
+        step_min = int(request.args['step_min']) if request.args.get('step_min') else None
+        models = tide_harmonics.get_models()
+        station = request.args.get('station')
+        if station:
+            model = tide_harmonics.model_for(station, models)
+            if model is None:
+                return jsonify({'error': 'Station not fitted'}), 404
+            models = {model.station_id: model}
+        return jsonify({'stations': {sid: tide_harmonics.forecast(m, start, days, step_min)
+                                     for sid, m in models.items()}})
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'No tide data (run rebuild_csv.py)'}), 503
+
+@app.route('/api/voyage/metocean', methods=['POST'])
+def voyage_metocean_api():
+    # Whole-route met-ocean timeline in one call:
+    #   {"points": [{"lat": -23.9, "lon": -46.3}, ...], "etd": "2026-10-17T06:00", "speed_kn": 10}
+    from flask import request
+    from datetime import datetime
+    body = request.get_json(silent=True) or {}
+    points = body.get('points') or []
+    if not isinstance(points, list) or not points:
+        return jsonify({'error': 'points is required'}), 400
+    if len(points) > voyage_metocean.MAX_POINTS:
+        return jsonify({'error': f'At most {voyage_metocean.MAX_POINTS} points per call'}), 400
+    try:
+        etd = datetime.fromisoformat(body['etd']) if body.get('etd') else datetime.now().replace(second=0, microsecond=0)
+        speed = float(body.get('speed_kn') or voyage_metocean.DEFAULT_SPEED_KN)
+        return jsonify(voyage_metocean.voyage_timeline(points, etd, speed))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'No tide/weather data (run ingest.py)'}), 503
+
+@app.route('/api/voyage/timeline', methods=['POST'])
+def voyage_timeline_api():
+    # Position-at-time / time-at-distance along the planned route (binary search):
+    #   {"points": [...], "etd": "2026-10-17T06:00", "speed_kn": 10,
+    #    "tow_speed_kn": 6, "towing": [0, 1] | true,      (or "speeds_kn": [one per leg])
+    #    "at": ["2026-10-18T03:00"], "distances_nm": [120], "passages": [{"lat", "lon", "name"}]}
+    from flask import request
+    from datetime import datetime
+    body = request.get_json(silent=True) or {}
+    points = body.get('points') or []
+    if not isinstance(points, list) or len(points) < 2:
+        return jsonify({'error': 'points needs at least two waypoints'}), 400
+    if len(points) > voyage_metocean.MAX_POINTS:
+        return jsonify({'error': f'At most {voyage_metocean.MAX_POINTS} points per call'}), 400
+    queries = [body.get(k) or [] for k in ('at', 'distances_nm', 'passages')]
+    if sum(len(q) for q in queries) > route_timeline.MAX_QUERIES:
+        return jsonify({'error': f'At most {route_timeline.MAX_QUERIES} queries per call'}), 400
+    if len(queries[2]) > route_timeline.MAX_PASSAGES:
+        return jsonify({'error': f'At most {route_timeline.MAX_PASSAGES} passages per call'}), 400
+    try:
+        etd = datetime.fromisoformat(body['etd']) if body.get('etd') else datetime.now().replace(second=0, microsecond=0)
+        speeds = route_timeline.speeds_from(body, len(points) - 1)
+        timeline = route_timeline.RouteTimeline(points, etd, speeds)
+        at, distances, passages = queries
+        return jsonify({**timeline.summary(),
+                        'positions': timeline.positions_at([datetime.fromisoformat(t) for t in at]),
+                        'times': timeline.times_at([float(d) for d in distances]),
+                        'passages': timeline.passages(passages)})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+
+@app.route('/api/voyage/departure-windows', methods=['POST'])
+def departure_windows_api():
+    # Sweep candidate ETDs against arrival tide and wind/waves along the route:
+    #   {"points": [...], "speed_kn": 10, (tow_speed_kn / towing / speeds_kn as in /api/voyage/timeline)
+    #    "start": "2026-10-17T06:00", "end": "2026-10-24T06:00", "step_min": 15,
+    #    "min_tide_m": 0.8, "max_wind_kn": 20, "max_wave_m": 2.5, "candidates": false}
+    # start/end default to the horizon covered by the tide and weather data
+    from flask import request
+    from datetime import datetime
+    body = request.get_json(silent=True) or {}
+    points = body.get('points') or []
+    if not isinstance(points, list) or len(points) < 2:
+        return jsonify({'error': 'points needs at least two waypoints'}), 400
+    if len(points) > voyage_metocean.MAX_POINTS:
+        return jsonify({'error': f'At most {voyage_metocean.MAX_POINTS} points per call'}), 400
+    try:
+        def optional(key, parse=float):
+            return parse(body[key]) if body.get(key) not in (None, '') else None
+
+        return jsonify(departure_window.sweep(
+            points, route_timeline.speeds_from(body, len(points) - 1),
+            start=optional('start', datetime.fromisoformat), end=optional('end', datetime.fromisoformat),
+            step_min=int(body.get('step_min') or departure_window.DEFAULT_STEP_MIN),
+            min_tide_m=optional('min_tide_m'), max_wind_kn=optional('max_wind_kn'),
+            max_wave_m=optional('max_wave_m'), candidates=bool(body.get('candidates'))))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'No tide/weather data (run ingest.py)'}), 503
+
+@app.route('/api/astro', methods=['GET', 'POST'])
+def astro_api():
+    # Local sun/moon ephemeris (no scraping): sunrise/sunset, civil and nautical twilight, moon phase
+    #   GET  /api/astro?lat=-22.9&lon=-43.17&start=2026-10-17&days=7
+    #   POST /api/astro {"points": [{"lat": ..., "lon": ...}], "start": "2026-10-17", "days": 30}
+    from flask import request
+    from datetime import date
+    if request.method == 'POST':
+        params = request.get_json(silent=True) or {}
+        points = params.get('points') or []
+    else:
+        params = request.args
+        points = [{'lat': params.get('lat'), 'lon': params.get('lon')}]
+    if not isinstance(points, list) or not points:
+        return jsonify({'error': 'points is required'}), 400
+    try:
+        start = date.fromisoformat(params['start']) if params.get('start') else date.today()
+        return jsonify(astro.almanac(points, start, int(params.get('days', 1))))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+
+@app.route('/api/voyage/astro', methods=['POST'])
+def voyage_astro_api():
+    # Daylight at each waypoint ETA and at each abeam passage (e.g. lighthouses):
+    #   {"points": [...], "etd": "2026-10-17T06:00", "speed_kn": 10,
+    #    (tow_speed_kn / towing / speeds_kn as in /api/voyage/timeline)
+    #    "passages": [{"lat", "lon", "name"}]}
+    from flask import request
+    from datetime import datetime
+    body = request.get_json(silent=True) or {}
+    points = body.get('points') or []
+    passages = body.get('passages') or []
+    if not isinstance(points, list) or len(points) < 2:
+        return jsonify({'error': 'points needs at least two waypoints'}), 400
+    if len(points) > voyage_metocean.MAX_POINTS:
+        return jsonify({'error': f'At most {voyage_metocean.MAX_POINTS} points per call'}), 400
+    if len(passages) > route_timeline.MAX_PASSAGES:
+        return jsonify({'error': f'At most {route_timeline.MAX_PASSAGES} passages per call'}), 400
+    try:
+        etd = datetime.fromisoformat(body['etd']) if body.get('etd') else datetime.now().replace(second=0, microsecond=0)
+        speeds = route_timeline.speeds_from(body, len(points) - 1)
+        return jsonify(astro.route_almanac(points, etd, speeds, passages))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+
+@app.route('/api/nearest', methods=['GET', 'POST'])
+def nearest_api():
+    # k-nearest / within-radius over stations, ports, lighthouses and shelters:
+    #   GET  /api/nearest?lat=-23.9&lon=-46.3&layers=ports,lighthouses&k=3&radius_nm=30
+    #   POST /api/nearest {"points": [{"lat": ..., "lon": ...}], "layers": ["stations"], "k": 1, "radius_nm": 30}
+    #   (k=0 with radius_nm returns everything inside the radius)
+    from flask import request
+    if request.method == 'POST':
+        params = request.get_json(silent=True) or {}
+        points = params.get('points') or []
+        layers = params.get('layers') or ['stations']
+    else:
+        params = request.args
+        points = [{'lat': params.get('lat'), 'lon': params.get('lon')}]
+        layers = [l for l in params.get('layers', 'stations').split(',') if l]
+    unknown = [l for l in layers if l not in geo_index.LAYERS]
+    if unknown:
+        return jsonify({'error': f"Unknown layers {unknown} (use {', '.join(geo_index.LAYERS)})"}), 400
+    try:
+        k = int(params.get('k', 1))
+        radius = float(params['radius_nm']) if params.get('radius_nm') not in (None, '') else None
+        results = geo_index.nearest_batch(points, layers, k, radius)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    return jsonify({'results': results})
+
+@app.route('/api/route/corridor', methods=['POST'])
+def route_corridor_api():
+    # Lighthouses/shelters within the corridor of every leg, ordered along track:
+    #   {"points": [{"lat": ..., "lon": ...}, ...], "layers": ["lighthouses", "shelters"], "width_nm": 15}
+    from flask import request
+    body = request.get_json(silent=True) or {}
+    points = body.get('points') or []
+    layers = body.get('layers') or list(route_corridor.LAYERS)
+    if not isinstance(points, list) or len(points) < 2:
+        return jsonify({'error': 'points needs at least two waypoints'}), 400
+    if len(points) > route_corridor.MAX_POINTS:
+        return jsonify({'error': f'At most {route_corridor.MAX_POINTS} points per call'}), 400
+    unknown = [l for l in layers if l not in geo_index.LAYERS]
+    if unknown:
+        return jsonify({'error': f"Unknown layers {unknown} (use {', '.join(geo_index.LAYERS)})"}), 400
+    try:
+        width = float(body['width_nm']) if body.get('width_nm') not in (None, '') else None
+        return jsonify(route_corridor.corridor(points, layers, width))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+
+@app.route('/api/route', methods=['GET'])
+def route_api():
+    # Shortest known route between two PortDatabase ids (Dijkstra over the
+    # precomputed graph, cached per port pair): /api/route?from=BR_RIO&to=BR_SUA
+    # level=1..3 returns the simplified geometry (route_lod); distances stay exact
+    from flask import request
+    dep, arr = request.args.get('from', ''), request.args.get('to', '')
+    if not dep or not arr:
+        return jsonify({'error': 'from and to are required'}), 400
+    ports = {p['id'] for p in geo_index.get_index('ports').features}
+    unknown = [p for p in (dep, arr) if p not in ports]
+    if unknown:
+        return jsonify({'error': f'Unknown ports {unknown}'}), 404
+    try:
+        level = int(request.args.get('level', 0))
+        result = route_graph.get_graph().route(dep, arr, level)
+    except (KeyError, ValueError):
+        return jsonify({'error': f"level must be one of {list(route_lod.LEVELS)}"}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'No route graph (run build_route_index.py)'}), 503
+    if result is None:
+        return jsonify({'error': f'No known route connects {dep} and {arr}', 'found': False}), 404
+    return jsonify({**result, 'found': True})
+
+@app.route('/api/routes', methods=['GET'])
+def routes_api():
+    # Known routes at a level of detail: /api/routes?level=2[&id=...]
+    # (level 0 = every GPX point; same files the browser can fetch directly)
+    from flask import request
+    try:
+        level = int(request.args.get('level', 0))
+        routes = route_lod.load_level(route_graph.ROUTES_FILE, level)
+    except (KeyError, ValueError):
+        return jsonify({'error': f"level must be one of {list(route_lod.LEVELS)}"}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'No route index (run build_route_index.py)'}), 503
+    ids = [i for i in request.args.get('id', '').split(',') if i]
+    if ids:
+        routes = [r for r in routes if r['id'] in ids]
+    return jsonify(routes)
+
 @app.route('/api/upload-gpx', methods=['POST'])
 def upload_gpx():
     from flask import request
@@ -90,4 +460,7 @@ if __name__ == '__main__':
     print(" SISNAV COSTEIRO - SERVIDOR LOCAL")
     print(" Acesso: http://localhost:5000")
     print("="*60)
+    # With debug=True the reloader imports this file twice; only the serving child schedules
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        scheduler.start_background()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,63 @@
+"""
+Cadastro Único de Estações
+Fonte única das estações coletadas no tabuademares.com, usada pela ingestão
+(ingest.py) para gerar tides_scraped.csv, weather_scraped.csv e
+maritimo_mare_meteo.json a partir das mesmas páginas.
+Substitui os mapas que cada coletor mantinha (STATIONS_MAP em rebuild_csv.py
+e update_weather_batch.py, PORTS em scripts/scraping_tabuademares.py).
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+BASE_URL = "https://tabuademares.com/br"
+
+
+@dataclass(frozen=True)
+class Station:
+    """Estação de marés/meteorologia"""
+    id: str         # ID Sisnav (ex: BR_STS)
+    name: str       # Nome nos CSVs (chave do TideCSVService)
+    state: str      # Slug do estado no site
+    city: str       # Slug da cidade no site
+    port_key: str   # Chave do porto no JSON (TideJSONService)
+
+    def url(self, page: str = '', base_url: str = BASE_URL) -> str:
+        """URL da página da estação ('' = tábua de marés, 'previsao/vento' etc.)"""
+        url = f"{base_url}/{self.state}/{self.city}"
+        return f"{url}/{page}" if page else url
+
+
+# Ordem sul -> norte (mesma dos CSVs). Os slugs são os que respondem no site:
+# São Paulo é "so-paulo" e Suape / Vila do Conde usam as páginas "suape" / "barcarena".
+STATIONS: List[Station] = [
+    Station('BR_RIG', 'Rio Grande', 'rio-grande-do-sul', 'porto-do-rio-grande', 'Rio Grande-RS (Porto)'),
+    Station('BR_PNG', 'Paranaguá', 'parana', 'paranagua', 'Paranaguá-PR'),
+    Station('BR_SFS', 'São Francisco do Sul', 'santa-catarina', 'sao-francisco-do-sul', 'São Francisco do Sul-SC'),
+    Station('BR_ITJ', 'Itajaí', 'santa-catarina', 'itajai', 'Itajaí-SC'),
+    Station('BR_IMB', 'Imbituba', 'santa-catarina', 'imbituba', 'Imbituba-SC'),
+    Station('BR_STS', 'Santos', 'so-paulo', 'santos', 'Santos-SP (Porto)'),
+    Station('BR_SSB', 'São Sebastião', 'so-paulo', 'sao-sebastiao', 'São Sebastião-SP'),
+    Station('BR_RIO', 'Rio de Janeiro', 'rio-de-janeiro', 'rio-de-janeiro', 'Rio de Janeiro-RJ'),
+    Station('BR_ANG', 'Angra dos Reis', 'rio-de-janeiro', 'angra-dos-reis', 'Angra dos Reis-RJ'),
+    Station('BR_SEP', 'Sepetiba', 'rio-de-janeiro', 'itaguai', 'Sepetiba-RJ'),
+    Station('BR_VIT', 'Vitória', 'espirito-santo', 'vitoria', 'Vitória-ES'),
+    Station('BR_SAL', 'Salvador', 'bahia', 'salvador', 'Salvador-BA'),
+    Station('BR_SUA', 'Suape', 'pernambuco', 'suape', 'Suape-PE'),
+    Station('BR_REC', 'Recife', 'pernambuco', 'recife', 'Recife-PE (Porto)'),
+    Station('BR_FOR', 'Fortaleza', 'ceara', 'fortaleza', 'Mucuripe-CE (Fortaleza)'),
+    Station('BR_PEC', 'Pecém', 'ceara', 'pecem', 'Pecém-CE'),
+    Station('BR_ITQ', 'Itaqui', 'maranhao', 'porto-do-itaqui', 'Itaqui-MA'),
+    Station('BR_BEL', 'Belém', 'para', 'belem', 'Belém-PA (Porto)'),
+    Station('BR_VDC', 'Vila do Conde', 'para', 'barcarena', 'Vila do Conde-PA (proxy Barcarena)'),
+    Station('BR_STN', 'Santana (Macapá)', 'amapa', 'santana', 'Santana-AP (Porto)'),
+]
+
+STATIONS_BY_ID: Dict[str, Station] = {st.id: st for st in STATIONS}
+
+
+def get_station(station_id: str) -> Optional[Station]:
+    """Estação pelo ID Sisnav (ou None)"""
+    return STATIONS_BY_ID.get(station_id)
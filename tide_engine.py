@@ -0,0 +1,264 @@
+"""
+Motor de Interpolação de Marés (servidor)
+Interpola a altura da maré em lotes de horários a partir das preia-mares e
+baixa-mares do tides_scraped.csv (ou da cópia colunar, se estiver em dia),
+com a mesma curva cosseno do TideCSVService.getInterpolatedTide do frontend.
+Os eventos de cada estação ficam em vetores ordenados (minutos desde 1970,
+horário local); os eventos vizinhos de cada horário saem de uma busca binária
+(np.searchsorted, ou bisect sem NumPy) e a curva é calculada em bloco.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import bisect
+import csv
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import columnar_store
+from columnar_store import ColumnarStore, _row_minutes, from_epoch_minutes, to_epoch_minutes
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, um bisect por horário
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TIDES_CSV = os.path.join(SCRIPT_DIR, 'tides_scraped.csv')
+
+MAX_GAP_MIN = 8 * 60     # intervalo entre eventos acima disso: sem curva, vale a altura anterior
+MAX_TIMES = 20000        # horários por chamada (5 dias a cada 10 min = 720)
+
+RISING, FALLING, STABLE = 'RISING', 'FALLING', 'STABLE'
+
+
+@dataclass
+class StationTides:
+    """Eventos de uma estação em ordem de horário"""
+    station_id: str
+    name: str
+    ts: Sequence[int]          # minutos desde 1970 (horário local)
+    height: Sequence[float]
+    high: Sequence[bool]       # True = preia-mar
+    high_ts: Sequence[int]     # só as preia-mares (para "próxima preia-mar")
+    low_ts: Sequence[int]
+
+    @classmethod
+    def build(cls, station_id: str, name: str, events: List[tuple]) -> 'StationTides':
+        events.sort()
+        ts = [e[0] for e in events]
+        height = [e[1] for e in events]
+        high = [e[2] for e in events]
+        high_ts = [t for t, _, h in events if h]
+        low_ts = [t for t, _, h in events if not h]
+        if np is not None:
+            ts, height, high = np.array(ts, dtype=np.int64), np.array(height), np.array(high, dtype=bool)
+            high_ts, low_ts = np.array(high_ts, dtype=np.int64), np.array(low_ts, dtype=np.int64)
+        return cls(station_id, name, ts, height, high, high_ts, low_ts)
+
+
+class TideEngine:
+    """
+    Eventos de todas as estações, prontos para interpolar
+
+    Uso típico:
+        engine = get_engine()
+        out = engine.interpolate('BR_SSZ', [datetime(2026, 1, 5, h) for h in range(24)])
+        out['height'], out['trend'], out['next_high']
+    """
+
+    def __init__(self, stations: Dict[str, StationTides], source: str = ''):
+        self.stations = stations
+        self.source = source
+        self._by_name = {st.name: st for st in stations.values()}
+
+    # ---------------------------
+    # Carga
+    # ---------------------------
+    @classmethod
+    def from_rows(cls, rows, source: str = '') -> 'TideEngine':
+        """Linhas no formato do CSV (station_id, station_name, date, time, height, type)"""
+        events: Dict[str, List[tuple]] = {}
+        names: Dict[str, str] = {}
+        for row in rows:
+            ts = _row_minutes(row.get('date'), row.get('time'))
+            try:
+                height = float(row.get('height'))
+            except (TypeError, ValueError):
+                continue
+            if ts is None:
+                continue
+            sid = row['station_id']
+            names.setdefault(sid, row.get('station_name') or sid)
+            events.setdefault(sid, []).append((ts, height, 'preia' in (row.get('type') or '').lower()))
+        return cls({sid: StationTides.build(sid, names[sid], ev) for sid, ev in events.items()}, source)
+
+    @classmethod
+    def from_csv(cls, path: str = TIDES_CSV) -> 'TideEngine':
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls.from_rows(csv.DictReader(f), source=path)
+
+    @classmethod
+    def from_store(cls, path: str) -> 'TideEngine':
+        """Cópia colunar (columnar_store.py): sem parse de texto"""
+        with ColumnarStore(path) as store:
+            ts_col, h_col, type_col = store.column('ts'), store.column('height'), store.column('type')
+            highs = {i for i, name in enumerate(store.dicts['type']) if 'preia' in name.lower()}
+            stations = {}
+            for sid in store.stations:
+                lo, hi = store.station_range(sid)
+                # float32 no store: arredonda de volta aos centímetros do CSV
+                events = [(ts_col[i], round(h_col[i], 3), type_col[i] in highs) for i in range(lo, hi)]
+                stations[sid] = StationTides.build(sid, store.station_names.get(sid, sid), events)
+        return cls(stations, source=path)
+
+    @classmethod
+    def load(cls, csv_path: str = TIDES_CSV, columnar_dir: str = columnar_store.STORE_DIR) -> 'TideEngine':
+        """Cópia colunar se for mais nova que o CSV; senão o próprio CSV"""
+        store = columnar_store.latest_path('tides', columnar_dir)
+        if store and (not os.path.exists(csv_path) or os.path.getmtime(store) >= os.path.getmtime(csv_path)):
+            try:
+                return cls.from_store(store)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Store colunar ilegível ({e}); usando {os.path.basename(csv_path)}")
+        return cls.from_csv(csv_path)
+
+    def station(self, key: str) -> Optional[StationTides]:
+        """Por ID Sisnav (BR_SSZ) ou pelo nome usado no CSV / frontend"""
+        return self.stations.get(key) or self._by_name.get(key)
+
+    # ---------------------------
+    # Interpolação
+    # ---------------------------
+    def interpolate(self, station: str, times: Sequence[datetime]) -> Dict[str, Any]:
+        """
+        Altura, tendência e próximas preia-mar / baixa-mar em cada horário
+        (listas na ordem de `times`)
+
+        Mesmas regras do frontend: eventos vizinhos procurados do dia anterior
+        ao seguinte; sem evento posterior, repete a altura anterior (STABLE);
+        sem evento anterior, None.
+
+        Raises:
+            KeyError: Estação sem eventos
+        """
+        st = self.station(station)
+        if st is None:
+            raise KeyError(station)
+        t = [to_epoch_minutes(moment) for moment in times]
+        if np is not None:
+            height, trend, next_high, next_low = self._interpolate_np(st, np.array(t, dtype=np.int64))
+        else:
+            height, trend, next_high, next_low = self._interpolate_py(st, t)
+        return {
+            'station_id': st.station_id,
+            'station_name': st.name,
+            'height': height,
+            'trend': trend,
+            'next_high': next_high,
+            'next_low': next_low,
+        }
+
+    @staticmethod
+    def _event(st: StationTides, ts: int) -> Dict[str, Any]:
+        i = bisect.bisect_left(st.ts, ts)
+        return {'time': from_epoch_minutes(int(ts)).isoformat(timespec='minutes'), 'height': float(st.height[i])}
+
+    def _interpolate_np(self, st: StationTides, t):
+        # Toda estação carregada tem ao menos um evento
+        n = len(st.ts)
+        day = t - t % 1440
+        nxt = np.searchsorted(st.ts, t, side='right')     # primeiro evento > t
+        prv = nxt - 1                                      # último evento <= t
+        prv_c, nxt_c = np.clip(prv, 0, n - 1), np.clip(nxt, 0, n - 1)
+        t1, t2 = st.ts[prv_c], st.ts[nxt_c]
+        h1, h2 = st.height[prv_c], st.height[nxt_c]
+        has_prev = (prv >= 0) & (t1 >= day - 1440)
+        has_next = (nxt < n) & (t2 < day + 2 * 1440)
+
+        mu = (1 - np.cos((t - t1) / np.maximum(t2 - t1, 1) * math.pi)) / 2
+        blend = np.where(t2 - t1 > MAX_GAP_MIN, h1, h1 * (1 - mu) + h2 * mu)
+        value = np.round(np.where(has_next, blend, h1), 2)
+        height = [v if ok else None for v, ok in zip(value.tolist(), has_prev.tolist())]
+        trend = [None if not ok else (RISING if up else FALLING) if nx else STABLE
+                 for ok, nx, up in zip(has_prev.tolist(), has_next.tolist(), st.high[nxt_c].tolist())]
+
+        def upcoming(event_ts):
+            if not len(event_ts):
+                return [None] * len(t)
+            j = np.searchsorted(event_ts, t, side='right')
+            found = (j < len(event_ts)).tolist()
+            ts = event_ts[np.clip(j, 0, len(event_ts) - 1)].tolist()
+            cache: Dict[int, Dict[str, Any]] = {}
+            out = []
+            for ok, m in zip(found, ts):
+                if ok and m not in cache:
+                    cache[m] = self._event(st, m)
+                out.append(cache[m] if ok else None)
+            return out
+
+        return height, trend, upcoming(st.high_ts), upcoming(st.low_ts)
+
+    def _interpolate_py(self, st: StationTides, t: List[int]):
+        height, trend, next_high, next_low = [], [], [], []
+        n = len(st.ts)
+        for m in t:
+            day = m - m % 1440
+            nxt = bisect.bisect_right(st.ts, m)
+            prv = nxt - 1
+            has_prev = prv >= 0 and st.ts[prv] >= day - 1440
+            has_next = nxt < n and st.ts[nxt] < day + 2 * 1440
+            if not has_prev:
+                height.append(None)
+                trend.append(None)
+            elif not has_next:
+                height.append(round(st.height[prv], 2))
+                trend.append(STABLE)
+            else:
+                t1, t2, h1, h2 = st.ts[prv], st.ts[nxt], st.height[prv], st.height[nxt]
+                if t2 - t1 > MAX_GAP_MIN:
+                    value = h1
+                else:
+                    mu = (1 - math.cos((m - t1) / (t2 - t1) * math.pi)) / 2
+                    value = h1 * (1 - mu) + h2 * mu
+                height.append(round(value, 2))
+                trend.append(RISING if st.high[nxt] else FALLING)
+            for event_ts, out in ((st.high_ts, next_high), (st.low_ts, next_low)):
+                j = bisect.bisect_right(event_ts, m)
+                out.append(self._event(st, event_ts[j]) if j < len(event_ts) else None)
+        return height, trend, next_high, next_low
+
+
+def time_range(start: datetime, end: datetime, step_min: int) -> List[datetime]:
+    """Horários de start a end (inclusive) a cada step_min minutos"""
+    if step_min <= 0:
+        raise ValueError("step_min deve ser positivo")
+    count = int((end - start).total_seconds() // 60 // step_min) + 1
+    if count > MAX_TIMES:
+        raise ValueError(f"mais de {MAX_TIMES} horários por chamada")
+    return [start + timedelta(minutes=step_min * i) for i in range(max(count, 0))]
+
+
+_engine: Optional[TideEngine] = None
+_engine_stamp = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(csv_path: str = TIDES_CSV, columnar_dir: str = columnar_store.STORE_DIR) -> TideEngine:
+    """Motor do processo, recarregado quando o CSV ou a cópia colunar mudam"""
+    global _engine, _engine_stamp
+    store = columnar_store.latest_path('tides', columnar_dir)
+    stamp = (os.path.getmtime(csv_path) if os.path.exists(csv_path) else None, store)
+    with _engine_lock:
+        if _engine is None or stamp != _engine_stamp:
+            _engine = TideEngine.load(csv_path, columnar_dir)
+            _engine_stamp = stamp
+            logger.info(f"Marés carregadas de {os.path.basename(_engine.source)}: {len(_engine.stations)} estações")
+        return _engine
@@ -0,0 +1,509 @@
+"""
+Modelo Harmônico de Marés (previsão local além do horizonte da coleta)
+Ajusta, por estação, as constantes harmônicas (M2, S2, N2, K1, O1 e as que o
+registro permitir) às preia-mares e baixa-mares acumuladas, por mínimos
+quadrados: cada evento dá uma equação de altura e uma de derivada nula (é um
+extremo). Argumentos astronômicos pelos números de Doodson e correções
+nodais (f, u) de Schureman; constituintes que o registro não separa (critério
+de Rayleigh) são inferidas da vizinha pela razão de equilíbrio, com a mesma
+fase. As constantes ficam em data/tide_harmonics.json e preveem alturas
+contínuas e extremos para qualquer data, sem coleta. Antes do ajuste final,
+os últimos HOLDOUT_DAYS dias são separados para medir o erro da previsão.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import tide_engine
+from columnar_store import from_epoch_minutes, to_epoch_minutes
+from http_cache import atomic_write
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, equações normais e laços em Python puro
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HARMONICS_FILE = os.path.join(SCRIPT_DIR, 'data', 'tide_harmonics.json')
+
+UTC_OFFSET_H = -3            # horário dos CSVs: hora legal de Brasília (sem horário de verão desde 2019)
+RAYLEIGH = 0.5               # fração do critério de Rayleigh para ajustar duas constituintes vizinhas
+HOLDOUT_DAYS = 2.0           # dias finais separados para validar a previsão
+MIN_EVENTS = 8
+MIN_SPAN_DAYS = 2.0
+SLOPE_WEIGHT = 1.0           # peso das equações de derivada nula (em metros por radiano de M2)
+SCAN_STEP_MIN = 10           # passo da busca de extremos (refinados por Newton)
+MATCH_WINDOW_MIN = 180       # evento coletado sem extremo previsto a até isso: não pareado
+DEFAULT_FORECAST_DAYS = 30
+MAX_PREDICT_DAYS = 400
+
+# nome: (números de Doodson em tau, s, h, p, N', p1), fase (graus), correção nodal,
+#       referência (só é ajustada se ela for) e razão de equilíbrio para inferência
+#       (None: descartada quando não se separa)
+CONSTITUENTS = {
+    'M2': ((2, 0, 0, 0, 0, 0), 0, 'M2', None, None),
+    'K1': ((1, 1, 0, 0, 0, 0), 90, 'K1', None, None),
+    'O1': ((1, -1, 0, 0, 0, 0), 270, 'O1', None, None),
+    'S2': ((2, 2, -2, 0, 0, 0), 0, None, 'M2', 0.4655),
+    'N2': ((2, -1, 0, 1, 0, 0), 0, 'M2', 'M2', 0.1915),
+    'M4': ((4, 0, 0, 0, 0, 0), 0, 'M4', None, None),
+    'K2': ((2, 2, 0, 0, 0, 0), 0, 'K2', 'S2', 0.2718),
+    'P1': ((1, 1, -2, 0, 0, 0), 270, None, 'K1', 0.3309),
+    'Q1': ((1, -2, 0, 1, 0, 0), 270, 'O1', 'O1', 0.1941),
+}
+ORDER = list(CONSTITUENTS)   # prioridade no critério de Rayleigh
+
+# Longitudes médias (Meeus): graus em J2000 e graus por século juliano
+_J2000 = to_epoch_minutes(datetime(2000, 1, 1, 12))
+_MEAN = {'s': (218.3164477, 481267.88123421), 'h': (280.46646, 36000.76983),
+         'p': (83.3532465, 4069.0137287), 'N': (125.04452, -1934.136261), 'p1': (282.94, 1.7192)}
+_HOURS_PER_CENTURY = 36525 * 24
+
+
+def _speed(name: str) -> float:
+    """Velocidade angular da constituinte (graus por hora)"""
+    rate = {k: v[1] / _HOURS_PER_CENTURY for k, v in _MEAN.items()}
+    tau = 15.0 + rate['h'] - rate['s']
+    d = CONSTITUENTS[name][0]
+    return d[0] * tau + d[1] * rate['s'] + d[2] * rate['h'] + d[3] * rate['p'] - d[4] * rate['N'] + d[5] * rate['p1']
+
+
+SPEED = {name: _speed(name) for name in CONSTITUENTS}
+
+
+def _nodal(kind: Optional[str], n_rad) -> tuple:
+    """Fator f e ângulo u (graus) de Schureman, em função da longitude do nó lunar"""
+    cos, sin = (np.cos, np.sin) if np is not None and not isinstance(n_rad, float) else (math.cos, math.sin)
+    if kind is None:
+        return 1.0, 0.0
+    if kind in ('M2', 'M4'):
+        f = 1.0004 - 0.0373 * cos(n_rad) + 0.0002 * cos(2 * n_rad)
+        u = -2.14 * sin(n_rad)
+        return (f * f, 2 * u) if kind == 'M4' else (f, u)
+    if kind == 'K1':
+        return (1.0060 + 0.1150 * cos(n_rad) - 0.0088 * cos(2 * n_rad) + 0.0006 * cos(3 * n_rad),
+                -8.86 * sin(n_rad) + 0.68 * sin(2 * n_rad) - 0.07 * sin(3 * n_rad))
+    if kind == 'O1':
+        return (1.0089 + 0.1871 * cos(n_rad) - 0.0147 * cos(2 * n_rad) + 0.0014 * cos(3 * n_rad),
+                10.80 * sin(n_rad) - 1.34 * sin(2 * n_rad) + 0.19 * sin(3 * n_rad))
+    # K2
+    return (1.0241 + 0.2863 * cos(n_rad) + 0.0083 * cos(2 * n_rad) - 0.0015 * cos(3 * n_rad),
+            -17.74 * sin(n_rad) + 0.68 * sin(2 * n_rad) - 0.04 * sin(3 * n_rad))
+
+
+def _args(names: Sequence[str], minutes) -> tuple:
+    """
+    Argumento V + u (radianos) e fator f de cada constituinte em cada horário
+    (minutos locais desde 1970): listas por constituinte, de arrays ou floats
+    """
+    hours = (minutes - UTC_OFFSET_H * 60 - _J2000) / 60.0
+    cent = hours / _HOURS_PER_CENTURY
+    lon = {k: v[0] + v[1] * cent for k, v in _MEAN.items()}
+    tau = 15.0 * hours + lon['h'] - lon['s']
+    n_rad = lon['N'] * math.pi / 180 if np is None or isinstance(hours, float) else np.radians(lon['N'])
+    basis = (tau, lon['s'], lon['h'], lon['p'], -lon['N'], lon['p1'])
+    arg, fac = [], []
+    for name in names:
+        d, phase, kind = CONSTITUENTS[name][:3]
+        f, u = _nodal(kind, n_rad)
+        v = phase + u + sum(k * b for k, b in zip(d, basis) if k)
+        arg.append(v * (math.pi / 180))
+        fac.append(f)
+    return arg, fac
+
+
+def select(span_h: float, rayleigh: float = RAYLEIGH) -> tuple:
+    """
+    Constituintes ajustadas e inferidas para um registro de span_h horas
+
+    Na ordem de prioridade, ajusta a que se separa de todas as já ajustadas
+    (|Δω| * span >= rayleigh * 360°) e cuja referência foi ajustada; senão
+    infere da referência pela razão de equilíbrio; senão descarta.
+
+    Returns:
+        (ajustadas, {inferida: (referência, razão)})
+    """
+    fitted, inferred = [], {}
+    for name in ORDER:
+        ref, ratio = CONSTITUENTS[name][3:]
+        if (ref is None or ref in fitted) and \
+                all(abs(SPEED[name] - SPEED[other]) * span_h >= rayleigh * 360 for other in fitted):
+            fitted.append(name)
+        elif ratio is not None and (ref in fitted or ref in inferred):
+            inferred[name] = (ref, ratio)
+    return fitted, inferred
+
+
+def _solve(rows: List[List[float]], rhs: List[float]) -> List[float]:
+    """Mínimos quadrados sem NumPy: equações normais por eliminação de Gauss"""
+    n = len(rows[0])
+    ata = [[sum(r[i] * r[j] for r in rows) for j in range(n)] for i in range(n)]
+    atb = [sum(r[i] * b for r, b in zip(rows, rhs)) for i in range(n)]
+    for c in range(n):
+        p = max(range(c, n), key=lambda k: abs(ata[k][c]))
+        ata[c], ata[p], atb[c], atb[p] = ata[p], ata[c], atb[p], atb[c]
+        for k in range(c + 1, n):
+            m = ata[k][c] / ata[c][c]
+            for j in range(c, n):
+                ata[k][j] -= m * ata[c][j]
+            atb[k] -= m * atb[c]
+    x = [0.0] * n
+    for c in range(n - 1, -1, -1):
+        x[c] = (atb[c] - sum(ata[c][j] * x[j] for j in range(c + 1, n))) / ata[c][c]
+    return x
+
+
+@dataclass
+class HarmonicModel:
+    """Constantes de uma estação: nível médio z0 e {constituinte: (amplitude m, fase g graus)}"""
+    station_id: str
+    name: str
+    z0: float
+    constants: Dict[str, tuple]
+    inferred: List[str] = field(default_factory=list)
+    n_events: int = 0
+    span_days: float = 0.0
+    first: str = ''                     # primeiro e último evento do ajuste
+    last: str = ''
+    rms_m: float = 0.0                  # resíduo do ajuste nas alturas dos eventos
+    holdout: Dict[str, Any] = field(default_factory=dict)
+
+    def _terms(self, minutes):
+        names = list(self.constants)
+        arg, fac = _args(names, minutes)
+        return [(f * self.constants[n][0], a - math.radians(self.constants[n][1]), math.radians(SPEED[n]))
+                for n, a, f in zip(names, arg, fac)]
+
+    def heights_minutes(self, minutes) -> Any:
+        """Alturas (m) em minutos locais desde 1970: array NumPy (ou lista) na ordem de entrada"""
+        if np is not None:
+            t = np.asarray(minutes, dtype=float)
+            out = np.full(t.shape, self.z0)
+            for amp, phase, _ in self._terms(t):
+                out += amp * np.cos(phase)
+            return out
+        out = []
+        for m in minutes:
+            out.append(self.z0 + sum(amp * math.cos(phase) for amp, phase, _ in self._terms(float(m))))
+        return out
+
+    def heights(self, times: Sequence[datetime]) -> List[float]:
+        """Alturas (m, 2 casas) em horários locais"""
+        values = self.heights_minutes([to_epoch_minutes(t) + t.second / 60 for t in times])
+        return [round(float(v), 2) for v in values]
+
+    def _slope(self, minutes):
+        """Derivadas primeira e segunda (m/h, m/h²) — f tomado como constante"""
+        if np is not None:
+            t = np.asarray(minutes, dtype=float)
+            d1, d2 = np.zeros(t.shape), np.zeros(t.shape)
+            for amp, phase, w in self._terms(t):
+                d1 -= amp * w * np.sin(phase)
+                d2 -= amp * w * w * np.cos(phase)
+            return d1, d2
+        d1, d2 = [], []
+        for m in minutes:
+            terms = self._terms(float(m))
+            d1.append(-sum(a * w * math.sin(p) for a, p, w in terms))
+            d2.append(-sum(a * w * w * math.cos(p) for a, p, w in terms))
+        return d1, d2
+
+    def extremes_minutes(self, start_m: float, end_m: float) -> List[tuple]:
+        """(minuto, altura, preia-mar?) de cada extremo em [start_m, end_m)"""
+        count = int((end_m - start_m) // SCAN_STEP_MIN) + 2
+        grid = [start_m + k * SCAN_STEP_MIN for k in range(count)]
+        d1 = list(self._slope(grid)[0])
+        roots = [grid[k] - d1[k] * SCAN_STEP_MIN / (d1[k + 1] - d1[k])
+                 for k in range(count - 1) if (d1[k] > 0) != (d1[k + 1] > 0) and d1[k + 1] != d1[k]]
+        for _ in range(3):      # Newton na derivada (minutos)
+            if not roots:
+                break
+            s1, s2 = self._slope(roots)
+            roots = [r - a / b * 60 if b else r for r, a, b in zip(roots, s1, s2)]
+        if not roots:
+            return []
+        _, s2 = self._slope(roots)
+        heights = self.heights_minutes(roots)
+        return [(r, float(h), b < 0) for r, h, b in zip(roots, heights, s2) if start_m <= r < end_m]
+
+    def extremes(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Preia-mares e baixa-mares previstas, no formato dos eventos do tides_scraped.csv"""
+        if (end - start).days > MAX_PREDICT_DAYS:
+            raise ValueError(f"no máximo {MAX_PREDICT_DAYS} dias por previsão")
+        out = []
+        for m, h, high in self.extremes_minutes(to_epoch_minutes(start), to_epoch_minutes(end)):
+            when = from_epoch_minutes(int(round(m)))
+            out.append({'time': when.isoformat(timespec='minutes'), 'height': round(h, 2),
+                        'type': 'preia-mar' if high else 'baixa-mar'})
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name, 'z0': round(self.z0, 4),
+            'constants': {n: [round(a, 4), round(g, 2)] for n, (a, g) in self.constants.items()},
+            'inferred': self.inferred, 'n_events': self.n_events, 'span_days': round(self.span_days, 2),
+            'first': self.first, 'last': self.last, 'rms_m': round(self.rms_m, 4), 'holdout': self.holdout,
+        }
+
+    @classmethod
+    def from_dict(cls, station_id: str, d: Dict[str, Any]) -> 'HarmonicModel':
+        return cls(station_id, d['name'], d['z0'], {n: tuple(v) for n, v in d['constants'].items()},
+                   d.get('inferred', []), d.get('n_events', 0), d.get('span_days', 0.0),
+                   d.get('first', ''), d.get('last', ''), d.get('rms_m', 0.0), d.get('holdout', {}))
+
+
+def fit(station_id: str, name: str, ts: Sequence[int], height: Sequence[float],
+        rayleigh: float = RAYLEIGH) -> HarmonicModel:
+    """
+    Ajusta as constantes aos extremos (ts em minutos locais, height em metros)
+
+    Raises:
+        ValueError: Menos de MIN_EVENTS eventos ou registro mais curto que MIN_SPAN_DAYS
+    """
+    ts = [int(t) for t in ts]
+    height = [float(h) for h in height]
+    span_h = (max(ts) - min(ts)) / 60 if ts else 0.0
+    if len(ts) < MIN_EVENTS or span_h < MIN_SPAN_DAYS * 24:
+        raise ValueError(f"{station_id}: {len(ts)} eventos em {span_h / 24:.1f} dias "
+                         f"(mínimo {MIN_EVENTS} em {MIN_SPAN_DAYS:g})")
+    fitted, inferred = select(span_h, rayleigh)
+    names = fitted + list(inferred)
+    t = np.array(ts, dtype=float) if np is not None else ts
+    if np is None:
+        per_event = [_args(names, float(m)) for m in ts]
+        arg = [[a[k] for a, _ in per_event] for k in range(len(names))]
+        fac = [[f[k] for _, f in per_event] for k in range(len(names))]
+    else:
+        arg, fac = _args(names, t)
+        arg, fac = [np.asarray(a) for a in arg], [np.asarray(f) * np.ones(len(ts)) for f in fac]
+    w_m2 = math.radians(SPEED['M2'])
+
+    def weight(n):
+        """Peso da constituinte na coluna da ajustada (1, ou a razão acumulada das inferidas)"""
+        w = 1.0
+        while n in inferred:
+            n, r = inferred[n]
+            w *= r
+        return w, n
+
+    # Colunas: z0, depois (cos, sen) de cada ajustada, somando as inferidas dela
+    n_cols = 1 + 2 * len(fitted)
+    col_of = {n: fitted.index(weight(n)[1]) for n in names}
+    if np is not None:
+        a_h = np.zeros((len(ts), n_cols))
+        a_d = np.zeros((len(ts), n_cols))
+        a_h[:, 0] = 1.0
+        for k, n in enumerate(names):
+            w, c = weight(n)[0], 1 + 2 * col_of[n]
+            omega = math.radians(SPEED[n]) / w_m2
+            a_h[:, c] += w * fac[k] * np.cos(arg[k])
+            a_h[:, c + 1] += w * fac[k] * np.sin(arg[k])
+            a_d[:, c] -= w * fac[k] * omega * np.sin(arg[k])
+            a_d[:, c + 1] += w * fac[k] * omega * np.cos(arg[k])
+        design = np.vstack([a_h, SLOPE_WEIGHT * a_d])
+        target = np.concatenate([np.array(height), np.zeros(len(ts))])
+        x = np.linalg.lstsq(design, target, rcond=None)[0].tolist()
+        resid = (a_h @ np.array(x) - np.array(height)).tolist()
+    else:
+        rows_h = [[1.0] + [0.0] * (n_cols - 1) for _ in ts]
+        rows_d = [[0.0] * n_cols for _ in ts]
+        for k, n in enumerate(names):
+            w, c = weight(n)[0], 1 + 2 * col_of[n]
+            omega = math.radians(SPEED[n]) / w_m2
+            for i in range(len(ts)):
+                ca, sa = math.cos(arg[k][i]), math.sin(arg[k][i])
+                rows_h[i][c] += w * fac[k][i] * ca
+                rows_h[i][c + 1] += w * fac[k][i] * sa
+                rows_d[i][c] -= w * fac[k][i] * omega * sa
+                rows_d[i][c + 1] += w * fac[k][i] * omega * ca
+        x = _solve(rows_h + [[SLOPE_WEIGHT * v for v in r] for r in rows_d], height + [0.0] * len(ts))
+        resid = [sum(r[j] * x[j] for j in range(n_cols)) - h for r, h in zip(rows_h, height)]
+
+    constants = {}
+    for n in names:
+        w, ref = weight(n)
+        a, b = x[1 + 2 * fitted.index(ref)], x[2 + 2 * fitted.index(ref)]
+        constants[n] = (w * math.hypot(a, b), math.degrees(math.atan2(b, a)) % 360)
+    return HarmonicModel(station_id, name, x[0], constants, sorted(inferred, key=ORDER.index), len(ts),
+                         span_h / 24, from_epoch_minutes(min(ts)).isoformat(timespec='minutes'),
+                         from_epoch_minutes(max(ts)).isoformat(timespec='minutes'),
+                         math.sqrt(sum(r * r for r in resid) / len(resid)))
+
+
+def compare(model: HarmonicModel, ts: Sequence[int], height: Sequence[float]) -> Dict[str, Any]:
+    """
+    Erro da previsão contra eventos coletados: cada evento é pareado com o
+    extremo previsto mais próximo no tempo (até MATCH_WINDOW_MIN)
+    """
+    if not len(ts):
+        return {'n': 0}
+    predicted = model.extremes_minutes(int(min(ts)) - MATCH_WINDOW_MIN, int(max(ts)) + MATCH_WINDOW_MIN)
+    dh, dt = [], []
+    for m, h in zip(ts, height):
+        best = min(predicted, key=lambda p: abs(p[0] - m), default=None)
+        if best is not None and abs(best[0] - m) <= MATCH_WINDOW_MIN:
+            dh.append(best[1] - float(h))
+            dt.append(best[0] - int(m))
+    if not dh:
+        return {'n': len(ts), 'matched': 0}
+    return {
+        'n': len(ts), 'matched': len(dh),
+        'height_rms_m': round(math.sqrt(sum(v * v for v in dh) / len(dh)), 3),
+        'height_max_m': round(max(abs(v) for v in dh), 3),
+        'time_rms_min': round(math.sqrt(sum(v * v for v in dt) / len(dt)), 1),
+        'time_max_min': round(max(abs(v) for v in dt), 1),
+    }
+
+
+def fit_station(st: tide_engine.StationTides, holdout_days: float = HOLDOUT_DAYS,
+                rayleigh: float = RAYLEIGH) -> HarmonicModel:
+    """
+    Ajuste de uma estação do tide_engine, com validação: ajusta sem os
+    últimos holdout_days dias, mede a previsão neles e refaz o ajuste com tudo
+
+    Raises:
+        ValueError: Eventos insuficientes
+    """
+    ts, height = [int(t) for t in st.ts], [float(h) for h in st.height]
+    holdout: Dict[str, Any] = {}
+    cut = ts[-1] - holdout_days * 1440 if ts else 0
+    k = sum(1 for t in ts if t < cut)
+    if holdout_days > 0:
+        try:
+            trial = fit(st.station_id, st.name, ts[:k], height[:k], rayleigh)
+            holdout = {'days': holdout_days, 'fit_days': round(trial.span_days, 2),
+                       **compare(trial, ts[k:], height[k:])}
+        except ValueError as e:
+            holdout = {'days': holdout_days, 'error': str(e)}
+    model = fit(st.station_id, st.name, ts, height, rayleigh)
+    model.holdout = holdout
+    return model
+
+
+def fit_all(engine: tide_engine.TideEngine, holdout_days: float = HOLDOUT_DAYS) -> Dict[str, HarmonicModel]:
+    """Modelos de todas as estações com eventos suficientes (as demais ficam de fora, com aviso)"""
+    models = {}
+    for sid, st in engine.stations.items():
+        try:
+            models[sid] = fit_station(st, holdout_days)
+        except ValueError as e:
+            logger.warning(f"Harmônicas: {e}")
+    return models
+
+
+def save(models: Dict[str, HarmonicModel], path: str = HARMONICS_FILE, source: str = '') -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    doc = {'fitted_at': datetime.now().isoformat(timespec='seconds'), 'source': os.path.basename(source),
+           'utc_offset_h': UTC_OFFSET_H, 'stations': {sid: m.to_dict() for sid, m in models.items()}}
+    atomic_write(path, json.dumps(doc, ensure_ascii=False, indent=1).encode('utf-8'))
+
+
+def load(path: str = HARMONICS_FILE) -> Dict[str, HarmonicModel]:
+    with open(path, encoding='utf-8') as f:
+        doc = json.load(f)
+    return {sid: HarmonicModel.from_dict(sid, d) for sid, d in doc.get('stations', {}).items()}
+
+
+def events_engine() -> tide_engine.TideEngine:
+    """Eventos acumulados: a base SQLite (histórico de todas as coletas) se ligada; senão o CSV"""
+    import metocean_db
+    db = metocean_db.get_db()
+    if db is not None and not db.is_empty('tide_events'):
+        return tide_engine.TideEngine.from_rows(db.rows('tide_events'), source=db.path)
+    return tide_engine.get_engine()
+
+
+_models: Optional[Dict[str, HarmonicModel]] = None
+_models_stamp = None
+_models_lock = threading.Lock()
+
+
+def get_models(path: str = HARMONICS_FILE) -> Dict[str, HarmonicModel]:
+    """
+    Modelos do processo: data/tide_harmonics.json se for mais novo que os
+    eventos (CSV, cópia colunar ou base); senão reajusta e grava
+
+    Raises:
+        FileNotFoundError: Sem eventos de maré
+    """
+    global _models, _models_stamp
+    engine = events_engine()
+    source_mtime = os.path.getmtime(engine.source) if os.path.exists(engine.source) else 0.0
+    stamp = (engine.source, source_mtime)
+    with _models_lock:
+        if _models is None or stamp != _models_stamp:
+            _models = None
+            if os.path.exists(path) and os.path.getmtime(path) >= source_mtime:
+                try:
+                    _models = load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"{os.path.basename(path)} ilegível ({e}); reajustando")
+            if _models is None:
+                _models = fit_all(engine)
+                save(_models, path, engine.source)
+                logger.info(f"Harmônicas ajustadas para {len(_models)} estações "
+                            f"({os.path.basename(engine.source)})")
+            _models_stamp = stamp
+        return _models
+
+
+def model_for(key: str, models: Dict[str, HarmonicModel] = None) -> Optional[HarmonicModel]:
+    """Por ID Sisnav (BR_SSZ) ou pelo nome usado no CSV / frontend"""
+    models = get_models() if models is None else models
+    return models.get(key) or next((m for m in models.values() if m.name == key), None)
+
+
+def forecast(model: HarmonicModel, start: datetime = None, days: float = DEFAULT_FORECAST_DAYS,
+             step_min: int = None) -> Dict[str, Any]:
+    """
+    Previsão de uma estação: extremos de start (padrão: o dia seguinte ao
+    último evento coletado) até start + days, e alturas a cada step_min
+
+    Raises:
+        ValueError: Período ou passo inválidos
+    """
+    if start is None:
+        last = datetime.fromisoformat(model.last)
+        start = datetime(last.year, last.month, last.day) + timedelta(days=1)
+    if not 0 < days <= MAX_PREDICT_DAYS:
+        raise ValueError(f"days deve estar entre 0 e {MAX_PREDICT_DAYS}")
+    end = start + timedelta(days=days)
+    out = {'station_id': model.station_id, 'station_name': model.name,
+           'start': start.isoformat(timespec='minutes'), 'end': end.isoformat(timespec='minutes'),
+           'events': model.extremes(start, end), 'fitted_until': model.last, 'holdout': model.holdout}
+    if step_min is not None:
+        times = tide_engine.time_range(start, end, int(step_min))
+        out['step_min'] = int(step_min)
+        out['height'] = model.heights(times)
+    return out
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    engine = events_engine()
+    models = fit_all(engine)
+    save(models, HARMONICS_FILE, engine.source)
+    print(f"{'estação':<22} {'dias':>5} {'ev':>4} {'M2 m':>6} {'K1 m':>6} {'O1 m':>6} {'rms':>6}  "
+          f"validação ({HOLDOUT_DAYS:g} dias finais)")
+    for sid, m in models.items():
+        c = m.constants
+        h = m.holdout
+        check = (f"altura rms {h['height_rms_m']:.2f} m, horário rms {h['time_rms_min']:.0f} min "
+                 f"({h['matched']}/{h['n']})" if 'height_rms_m' in h else h.get('error', '-'))
+        print(f"{sid + ' ' + m.name:<22} {m.span_days:>5.1f} {m.n_events:>4} {c['M2'][0]:>6.2f} "
+              f"{c.get('K1', (0,))[0]:>6.2f} {c.get('O1', (0,))[0]:>6.2f} {m.rms_m:>6.3f}  {check}")
+    print(f"Constantes gravadas em {HARMONICS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
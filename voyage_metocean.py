@@ -0,0 +1,290 @@
+"""
+Linha do Tempo Meteoceanográfica da Travessia (/api/voyage/metocean)
+Numa chamada, para todos os pontos da rota: ETA de cada waypoint (rumo
+loxodrômico, como o NavMath.calcLeg, e velocidade constante a partir do ETD),
+estação de referência mais próxima (mesma tabela e raio do TideLocator.js),
+maré interpolada com tendência (tide_engine.py) e vento, ondas e temperatura
+da hora mais próxima no mesmo dia (como o TideCSVService.getWeatherAt).
+Substitui o WeatherAPI.fetchMetOcean chamado ponto a ponto no navegador.
+Author: Sistema de Navegação Marítima
+Date: 2026-10-17
+"""
+
+import bisect
+import csv
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import columnar_store
+from columnar_store import ColumnarStore, _row_minutes, to_epoch_minutes
+import tide_engine
+from navmath import EARTH_RADIUS_NM, leg_table
+
+try:
+    import numpy as np
+except ImportError:      # opcional: sem NumPy, laços em Python puro
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+WEATHER_CSV = os.path.join(SCRIPT_DIR, 'weather_scraped.csv')
+
+KMH_TO_KN = 0.539957
+DEFAULT_SPEED_KN = 10.0       # mesmo fallback do App.recalculateVoyage
+MAX_RADIUS_NM = 30.0          # TideLocator.MAX_RADIUS_NM
+MAX_POINTS = 5000
+
+
+@dataclass(frozen=True)
+class ReferenceStation:
+    """Estação de referência do TideLocator.js (coordenada na água)"""
+    id: str
+    name: str
+    lat: float
+    lon: float
+    csv_name: str    # estação cujos dados são usados (algumas são proxy de outra)
+
+
+# Cópia do TideLocator.stationsDB (manter as duas em sincronia)
+REFERENCE_STATIONS: List[ReferenceStation] = [
+    ReferenceStation('BR_RIG', 'Rio Grande (Barra)', -32.180, -52.080, 'Rio Grande'),
+    ReferenceStation('BR_PNG', 'Paranaguá (Galheta)', -25.583, -48.316, 'Paranaguá'),
+    ReferenceStation('BR_SFS', 'São Francisco do Sul', -26.233, -48.633, 'São Francisco do Sul'),
+    ReferenceStation('BR_ITJ', 'Itajaí', -26.916, -48.650, 'Itajaí'),
+    ReferenceStation('BR_IMB', 'Imbituba', -28.233, -48.650, 'Imbituba'),
+    ReferenceStation('BR_STS', 'Santos (Ponta da Praia)', -23.960, -46.310, 'Paranaguá'),
+    ReferenceStation('BR_SSB', 'São Sebastião', -23.816, -45.400, 'Paranaguá'),
+    ReferenceStation('BR_RIO', 'Rio de Janeiro (Ilha Fiscal)', -22.896, -43.165, 'Rio de Janeiro'),
+    ReferenceStation('BR_SEP', 'Sepetiba', -23.016, -44.033, 'Sepetiba'),
+    ReferenceStation('BR_VIT', 'Vitória', -20.316, -40.283, 'Vitória'),
+    ReferenceStation('BR_SAL', 'Salvador', -12.966, -38.516, 'Salvador'),
+    ReferenceStation('BR_REC', 'Recife', -8.050, -34.866, 'Recife'),
+    ReferenceStation('BR_SUA', 'Suape', -8.397, -34.959, 'Recife'),
+    ReferenceStation('BR_FOR', 'Fortaleza (Mucuripe)', -3.716, -38.466, 'Fortaleza'),
+    ReferenceStation('BR_BEL', 'Belém', -1.450, -48.500, 'Belém'),
+    ReferenceStation('BR_VDC', 'Vila do Conde', -1.533, -48.750, 'Belém'),
+    ReferenceStation('BR_ITQ', 'Itaqui', -2.566, -44.366, 'Itaqui'),
+]
+
+
+# ---------------------------
+# Geometria
+# ---------------------------
+def nearest_reference(lats: Sequence[float], lons: Sequence[float],
+                      stations: Sequence[ReferenceStation] = REFERENCE_STATIONS):
+    """(índice da estação mais próxima, distância em NM) por ponto, pela haversine do TideLocator"""
+    if np is not None:
+        phi1 = np.radians(np.asarray(lats, dtype=float))[:, None]
+        lam1 = np.radians(np.asarray(lons, dtype=float))[:, None]
+        phi2 = np.radians([st.lat for st in stations])[None, :]
+        lam2 = np.radians([st.lon for st in stations])[None, :]
+        a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+        dist = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) * EARTH_RADIUS_NM
+        best = dist.argmin(axis=1)
+        return best.tolist(), dist[np.arange(len(best)), best].tolist()
+    best, best_dist = [], []
+    for lat, lon in zip(lats, lons):
+        dists = [haversine_nm(lat, lon, st.lat, st.lon) for st in stations]
+        i = min(range(len(dists)), key=dists.__getitem__)
+        best.append(i)
+        best_dist.append(dists[i])
+    return best, best_dist
+
+
+def haversine_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)) * EARTH_RADIUS_NM
+
+
+# ---------------------------
+# Tempo (weather_scraped.csv)
+# ---------------------------
+class WeatherTable:
+    """Amostras horárias de cada estação (pelo nome do CSV), em ordem de horário"""
+
+    FIELDS = ('wind_speed', 'wind_dir', 'wave_height', 'wave_dir', 'temp')
+
+    def __init__(self, rows, source: str = ''):
+        by_name: Dict[str, List[tuple]] = {}
+        for row in rows:
+            ts = _row_minutes(row.get('date'), row.get('time'))
+            if ts is not None:
+                by_name.setdefault(row.get('station_name'), []).append((ts, tuple(row.get(f) for f in self.FIELDS)))
+        self.ts: Dict[str, List[int]] = {}
+        self.values: Dict[str, List[tuple]] = {}
+        for name, samples in by_name.items():
+            samples.sort(key=lambda s: s[0])
+            self.ts[name] = [s[0] for s in samples]
+            self.values[name] = [s[1] for s in samples]
+        self.source = source
+        self._arrays: Dict[tuple, Any] = {}
+
+    @classmethod
+    def load(cls, csv_path: str = WEATHER_CSV, columnar_dir: str = columnar_store.STORE_DIR) -> 'WeatherTable':
+        """Cópia colunar se for mais nova que o CSV; senão o próprio CSV"""
+        store = columnar_store.latest_path('weather', columnar_dir)
+        if store and (not os.path.exists(csv_path) or os.path.getmtime(store) >= os.path.getmtime(csv_path)):
+            try:
+                with ColumnarStore(store) as s:
+                    return cls([row for sid in s.stations for row in s.rows(sid)], source=store)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Store colunar ilegível ({e}); usando {os.path.basename(csv_path)}")
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            return cls(csv.DictReader(f), source=csv_path)
+
+    def closest(self, name: str, minutes: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        """Amostra mais próxima de cada horário no mesmo dia (empate: a mais cedo), ou None"""
+        ts = self.ts.get(name)
+        if not ts:
+            return [None] * len(minutes)
+        out = []
+        for m in minutes:
+            day = m - m % 1440
+            j = bisect.bisect_right(ts, m)
+            best = None
+            for k in (j - 1, j):
+                if 0 <= k < len(ts) and day <= ts[k] < day + 1440:
+                    if best is None or abs(ts[k] - m) < abs(ts[best] - m):
+                        best = k
+            out.append(dict(zip(self.FIELDS, self.values[name][best])) if best is not None else None)
+        return out
+
+    def series(self, name: str, field: str):
+        """Campo numérico da estação alinhado com ts[name] (NaN onde não é número; array NumPy)"""
+        key = (name, field)
+        if key not in self._arrays:
+            col = self.FIELDS.index(field)
+            values = [_float(v[col]) for v in self.values.get(name, ())]
+            self._arrays[key] = np.array([math.nan if v is None else v for v in values], dtype=float)
+        return self._arrays[key]
+
+    def closest_index(self, name: str, minutes):
+        """
+        Como closest, em bloco (NumPy): índice da amostra de cada horário em
+        ts[name], -1 sem amostra no mesmo dia
+        """
+        t = np.asarray(minutes, dtype=np.int64)
+        if (name, 'ts') not in self._arrays:
+            self._arrays[(name, 'ts')] = np.array(self.ts.get(name, ()), dtype=np.int64)
+        ts = self._arrays[(name, 'ts')]
+        if not len(ts):
+            return np.full(t.shape, -1, dtype=np.int64)
+        day = t - t % 1440
+        j = np.searchsorted(ts, t, side='right')
+        a, b = np.clip(j - 1, 0, len(ts) - 1), np.clip(j, 0, len(ts) - 1)
+        a_ok = (j >= 1) & (ts[a] >= day) & (ts[a] < day + 1440)
+        b_ok = (j < len(ts)) & (ts[b] >= day) & (ts[b] < day + 1440)
+        # Empate: a mais cedo (como closest)
+        take_b = b_ok & (~a_ok | (np.abs(ts[b] - t) < np.abs(ts[a] - t)))
+        return np.where(take_b, b, np.where(a_ok, a, -1))
+
+
+_weather: Optional[WeatherTable] = None
+_weather_stamp = None
+_weather_lock = threading.Lock()
+
+
+def get_weather(csv_path: str = WEATHER_CSV, columnar_dir: str = columnar_store.STORE_DIR) -> WeatherTable:
+    """Tabela do processo, recarregada quando o CSV ou a cópia colunar mudam"""
+    global _weather, _weather_stamp
+    stamp = (os.path.getmtime(csv_path) if os.path.exists(csv_path) else None,
+             columnar_store.latest_path('weather', columnar_dir))
+    with _weather_lock:
+        if _weather is None or stamp != _weather_stamp:
+            _weather = WeatherTable.load(csv_path, columnar_dir)
+            _weather_stamp = stamp
+        return _weather
+
+
+# ---------------------------
+# Linha do tempo
+# ---------------------------
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def voyage_timeline(points: Sequence[Dict[str, float]], etd: datetime, speed_kn: float = DEFAULT_SPEED_KN,
+                    tides: tide_engine.TideEngine = None, weather: WeatherTable = None) -> Dict[str, Any]:
+    """
+    ETA, estação de referência, maré e tempo de cada ponto da rota
+
+    Args:
+        points: [{'lat': ..., 'lon': ...}, ...] na ordem da rota
+        etd: Saída (horário local)
+        speed_kn: Velocidade constante (<= 0 usa DEFAULT_SPEED_KN)
+        tides / weather: Dados (padrão: os do processo, recarregados se mudarem)
+
+    Raises:
+        ValueError: Rota vazia
+    """
+    if not points:
+        raise ValueError("rota sem pontos")
+    if speed_kn is None or speed_kn <= 0:
+        speed_kn = DEFAULT_SPEED_KN
+    tides = tides or tide_engine.get_engine()
+    weather = weather or get_weather()
+    lats = [float(p['lat']) for p in points]
+    lons = [float(p['lon']) for p in points]
+
+    table = leg_table(lats, lons, speed_kn)
+    cumulative = table.along
+    etas = [etd + timedelta(hours=hours) for hours in table.eta_h]
+    minutes = [to_epoch_minutes(eta) for eta in etas]
+    ref_index, ref_dist = nearest_reference(lats, lons)
+
+    waypoints = []
+    for i, eta in enumerate(etas):
+        st = REFERENCE_STATIONS[ref_index[i]]
+        coastal = ref_dist[i] <= MAX_RADIUS_NM
+        waypoints.append({
+            'index': i, 'lat': lats[i], 'lon': lons[i],
+            'eta': eta.isoformat(timespec='minutes'),
+            'dist_nm': round(cumulative[i], 2),
+            'location_type': 'COSTEIRO' if coastal else 'OCEÂNICO',
+            'ref_station': {'id': st.id, 'name': st.name, 'csv_name': st.csv_name,
+                            'distance_nm': round(ref_dist[i], 1)} if coastal else None,
+            'tide_height': None, 'tide_trend': None,
+            'wind_kn': None, 'wind_dir': None, 'wave_height': None, 'wave_dir': None, 'temp': None,
+        })
+
+    # Um lote por estação de dados: maré em bloco e tempo por busca binária
+    groups: Dict[str, List[int]] = {}
+    for i, wp in enumerate(waypoints):
+        if wp['ref_station']:
+            groups.setdefault(wp['ref_station']['csv_name'], []).append(i)
+    for name, idx in groups.items():
+        if tides.station(name) is not None:
+            out = tides.interpolate(name, [etas[i] for i in idx])
+            for k, i in enumerate(idx):
+                waypoints[i]['tide_height'] = out['height'][k]
+                waypoints[i]['tide_trend'] = out['trend'][k]
+        for i, sample in zip(idx, weather.closest(name, [minutes[i] for i in idx])):
+            if sample is None:
+                continue
+            kmh = _float(sample['wind_speed'])
+            waypoints[i].update({
+                'wind_kn': round(kmh * KMH_TO_KN, 1) if kmh is not None else None,
+                'wind_dir': sample['wind_dir'],
+                'wave_height': _float(sample['wave_height']),
+                'wave_dir': sample['wave_dir'],
+                'temp': _float(sample['temp']),
+            })
+
+    return {
+        'etd': etd.isoformat(timespec='minutes'),
+        'eta': etas[-1].isoformat(timespec='minutes'),
+        'speed_kn': speed_kn,
+        'total_nm': round(cumulative[-1], 2),
+        'waypoints': waypoints,
+    }